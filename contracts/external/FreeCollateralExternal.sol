@@ -48,6 +48,40 @@ library FreeCollateralExternal {
         return FreeCollateral.getFreeCollateralView(account, accountContext, block.timestamp);
     }
 
+    /// @notice Batch version of getFreeCollateralView, prime rates, cash groups, ETH rates and nToken
+    /// present values are built once per currency and shared across accounts. Accounts that must settle
+    /// assets are flagged instead of reverting the entire batch and return zero values.
+    /// @param accounts accounts to calculate free collateral for
+    /// @param maxCurrencyId largest listed currency id, used to size the cache
+    /// @return total free collateral in ETH w/ 8 decimal places for each account
+    /// @return net local values in asset values for each account, ordered as in getFreeCollateralView
+    /// @return true if the account must settle assets before its free collateral can be calculated
+    function getFreeCollateralViewBatch(address[] calldata accounts, uint16 maxCurrencyId)
+        external
+        view
+        returns (int256[] memory, int256[][] memory, bool[] memory)
+    {
+        FreeCollateral.FreeCollateralCache memory cache = FreeCollateral.newFreeCollateralCache(maxCurrencyId);
+        int256[] memory netETHValues = new int256[](accounts.length);
+        int256[][] memory netLocalAssetValues = new int256[][](accounts.length);
+        bool[] memory mustSettle = new bool[](accounts.length);
+
+        for (uint256 i; i < accounts.length; i++) {
+            AccountContext memory accountContext = AccountContextHandler.getAccountContext(accounts[i]);
+            if (accountContext.mustSettleAssets()) {
+                mustSettle[i] = true;
+                netLocalAssetValues[i] = new int256[](10);
+                continue;
+            }
+
+            (netETHValues[i], netLocalAssetValues[i]) = FreeCollateral.getFreeCollateralView(
+                accounts[i], accountContext, block.timestamp, cache
+            );
+        }
+
+        return (netETHValues, netLocalAssetValues, mustSettle);
+    }
+
     /// @notice Calculates free collateral and will revert if it falls below zero. If the account context
     /// must be updated due to changes in debt settings, will update. Cannot check free collateral if assets
     /// need to be settled first.
@@ -55,6 +89,20 @@ library FreeCollateralExternal {
     /// called before the end of any transaction for accounts where FC can decrease.
     /// @param account account to calculate free collateral for
     function checkFreeCollateralAndRevert(address account) external {
+        PrimeRate[] memory primeRates;
+        _checkFreeCollateralAndRevert(account, primeRates);
+    }
+
+    /// @notice Version of checkFreeCollateralAndRevert that reuses prime rates already accrued during the
+    /// transaction, indexed by currency id. A zero supply factor marks a prime rate that was not accrued.
+    /// @dev Called from BatchAction after balances and trades have been finalized
+    /// @param account account to calculate free collateral for
+    /// @param primeRates prime rates accrued in the current transaction
+    function checkFreeCollateralAndRevert(address account, PrimeRate[] memory primeRates) external {
+        _checkFreeCollateralAndRevert(account, primeRates);
+    }
+
+    function _checkFreeCollateralAndRevert(address account, PrimeRate[] memory primeRates) private {
         // Prevents new debt positions from being initiated if the sequencer is down, only applies to L2 environments
         // like Arbitrum and Optimism where this is a concern. Accounts with no risk do not get a free
         // collateral check and will bypass this check.
@@ -64,7 +112,7 @@ library FreeCollateralExternal {
         require(!accountContext.mustSettleAssets(), "Assets not settled");
 
         (int256 ethDenominatedFC, bool updateContext) =
-            FreeCollateral.getFreeCollateralStateful(account, accountContext, block.timestamp);
+            FreeCollateral.getFreeCollateralStateful(account, accountContext, block.timestamp, primeRates);
 
         if (updateContext) {
             accountContext.setAccountContext(account);
@@ -99,7 +147,70 @@ library FreeCollateralExternal {
         // Prevents new liquidations from being initiated if the sequencer is down, only applies to L2 environments
         // like Arbitrum and Optimism where this is a concern.
         _checkSequencer();
+        FreeCollateral.FreeCollateralCache memory cache;
+        return _getLiquidationFactors(account, localCurrencyId, collateralCurrencyId, cache);
+    }
+
+    /// @notice Returns a cache of prime rates, cash groups and ETH rates for the local and collateral currency,
+    /// used when liquidating many accounts against the same currencies in a single transaction.
+    /// @param localCurrencyId currency that the debts are denominated in
+    /// @param collateralCurrencyId collateral currency to liquidate against, zero in the case of local liquidation
+    function getLiquidationCache(
+        uint16 localCurrencyId,
+        uint16 collateralCurrencyId
+    ) external returns (FreeCollateral.FreeCollateralCache memory) {
+        // Prevents new liquidations from being initiated if the sequencer is down
+        _checkSequencer();
+        return FreeCollateral.newLiquidationCache(localCurrencyId, collateralCurrencyId);
+    }
 
+    /// @notice Version of getLiquidationFactors that reads shared currency values from a cache returned by
+    /// getLiquidationCache. The sequencer is checked when the cache is built.
+    /// @param account account to liquidate
+    /// @param localCurrencyId currency that the debts are denominated in
+    /// @param collateralCurrencyId collateral currency to liquidate against, set to zero in the case of local currency liquidation
+    /// @param cache cache returned by getLiquidationCache in the same transaction
+    /// @return accountContext the accountContext of the liquidated account
+    /// @return factors struct of relevant factors for liquidation
+    /// @return portfolio the portfolio array of the account (bitmap accounts will return an empty array)
+    /// @return the cache with any values loaded during this call, memory is not shared with the caller
+    /// across the external library call so it must use the returned cache for the next account
+    function getLiquidationFactors(
+        address account,
+        uint256 localCurrencyId,
+        uint256 collateralCurrencyId,
+        FreeCollateral.FreeCollateralCache memory cache
+    )
+        external
+        returns (
+            AccountContext memory accountContext,
+            LiquidationFactors memory factors,
+            PortfolioAsset[] memory portfolio,
+            FreeCollateral.FreeCollateralCache memory
+        )
+    {
+        (accountContext, factors, portfolio) = _getLiquidationFactors(
+            account,
+            localCurrencyId,
+            collateralCurrencyId,
+            cache
+        );
+        return (accountContext, factors, portfolio, cache);
+    }
+
+    function _getLiquidationFactors(
+        address account,
+        uint256 localCurrencyId,
+        uint256 collateralCurrencyId,
+        FreeCollateral.FreeCollateralCache memory cache
+    )
+        private
+        returns (
+            AccountContext memory accountContext,
+            LiquidationFactors memory factors,
+            PortfolioAsset[] memory portfolio
+        )
+    {
         accountContext = AccountContextHandler.getAccountContext(account);
         if (accountContext.mustSettleAssets()) {
             accountContext = SettleAssetsExternal.settleAccount(account, accountContext);
@@ -115,7 +226,8 @@ library FreeCollateralExternal {
             accountContext,
             block.timestamp,
             localCurrencyId,
-            collateralCurrencyId
+            collateralCurrencyId,
+            cache
         );
     }
 }
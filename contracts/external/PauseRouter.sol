@@ -113,7 +113,8 @@ contract PauseRouter is StorageLayoutV2, UUPSUpgradeable, ActionGuards {
         // and therefore we prevent them from being called unless specifically authorized.
         if (
             (sig == NotionalProxy.calculateCollateralCurrencyLiquidation.selector ||
-                sig == NotionalProxy.liquidateCollateralCurrency.selector) &&
+                sig == NotionalProxy.liquidateCollateralCurrency.selector ||
+                sig == NotionalProxy.liquidateCollateralCurrencyBatch.selector) &&
             isEnabled(Constants.COLLATERAL_CURRENCY_ENABLED)
         ) {
             return LIQUIDATE_CURRENCY;
@@ -145,6 +146,7 @@ contract PauseRouter is StorageLayoutV2, UUPSUpgradeable, ActionGuards {
 
         if (
             sig == IVaultAccountHealth.getVaultAccountHealthFactors.selector ||
+            sig == IVaultAccountHealth.getVaultAccountHealthFactorsBatch.selector ||
             sig == IVaultAccountHealth.calculateDepositAmountInDeleverage.selector ||
             sig == IVaultAccountHealth.checkVaultAccountCollateralRatio.selector ||
             sig == IVaultAccountHealth.signedBalanceOfVaultTokenId.selector ||
@@ -46,6 +46,8 @@ contract Router is StorageLayoutV1, IRouter {
     address public immutable override VAULT_ACCOUNT_HEALTH;
     address private immutable DEPLOYER;
 
+    event MarketsInitializationFailed(uint16 currencyId, bytes reason);
+
     // Ensures that when we deploy, the hardcoded addresses are encoded properly to the chain that is
     // being deployed to
     function _checkHardcodedAddresses() private pure {
@@ -102,6 +104,33 @@ contract Router is StorageLayoutV1, IRouter {
         hasInitialized = true;
     }
 
+    /// @notice Initializes markets for a list of currencies in a single transaction, used by keepers to
+    /// roll every currency at the quarterly reference time. Each currency is initialized in its own
+    /// delegate call to the initialize markets action so that a currency which fails to initialize has
+    /// its state changes reverted and is reported via an event instead of reverting the entire batch.
+    /// @dev Runs on the router so that the action address is read from an immutable, an action
+    /// library cannot resolve its own address without calling back into the proxy.
+    /// @param currencyIds currencies of markets to initialize
+    /// @param isFirstInit true if this is the first time the markets have been initialized
+    /// @return success true for each currency that was initialized
+    /// @dev emit:MarketsInitialized emit:MarketsInitializationFailed
+    /// @dev auth:none
+    function initializeMarketsBatch(uint16[] calldata currencyIds, bool isFirstInit)
+        external
+        returns (bool[] memory success)
+    {
+        success = new bool[](currencyIds.length);
+
+        for (uint256 i; i < currencyIds.length; i++) {
+            (bool status, bytes memory reason) = INITIALIZE_MARKET.delegatecall(
+                abi.encodeWithSelector(NotionalProxy.initializeMarkets.selector, currencyIds[i], isFirstInit)
+            );
+
+            success[i] = status;
+            if (!status) emit MarketsInitializationFailed(currencyIds[i], reason);
+        }
+    }
+
     /// @notice Returns the implementation contract for the method signature
     /// @param sig method signature to call
     /// @return implementation address
@@ -115,6 +144,7 @@ contract Router is StorageLayoutV1, IRouter {
             return BATCH_ACTION;
         } else if (
             sig == IVaultAccountHealth.getVaultAccountHealthFactors.selector ||
+            sig == IVaultAccountHealth.getVaultAccountHealthFactorsBatch.selector ||
             sig == IVaultAccountHealth.calculateDepositAmountInDeleverage.selector ||
             sig == IVaultAccountHealth.checkVaultAccountCollateralRatio.selector ||
             sig == IVaultAccountHealth.signedBalanceOfVaultTokenId.selector ||
@@ -140,6 +170,7 @@ contract Router is StorageLayoutV1, IRouter {
             sig == NotionalProxy.withdraw.selector ||
             sig == NotionalProxy.withdrawViaProxy.selector ||
             sig == NotionalProxy.settleAccount.selector ||
+            sig == NotionalProxy.settleAccountsBatch.selector ||
             sig == NotionalProxy.nTokenRedeem.selector ||
             sig == NotionalProxy.enableBitmapCurrency.selector ||
             sig == NotionalProxy.enablePrimeBorrow.selector
@@ -177,6 +208,7 @@ contract Router is StorageLayoutV1, IRouter {
         } else if (
             sig == NotionalProxy.liquidateLocalCurrency.selector ||
             sig == NotionalProxy.liquidateCollateralCurrency.selector ||
+            sig == NotionalProxy.liquidateCollateralCurrencyBatch.selector ||
             sig == NotionalProxy.calculateLocalCurrencyLiquidation.selector ||
             sig == NotionalProxy.calculateCollateralCurrencyLiquidation.selector
         ) {
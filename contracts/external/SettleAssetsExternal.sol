@@ -19,6 +19,7 @@ import {TransferAssets} from "../internal/portfolio/TransferAssets.sol";
 import {BalanceHandler} from "../internal/balances/BalanceHandler.sol";
 import {SettlePortfolioAssets} from "../internal/settlement/SettlePortfolioAssets.sol";
 import {SettleBitmapAssets} from "../internal/settlement/SettleBitmapAssets.sol";
+import {SettlementCache} from "../internal/settlement/SettlementCache.sol";
 import {PrimeRateLib} from "../internal/pCash/PrimeRateLib.sol";
 
 /// @notice External library for settling assets and portfolio management
@@ -26,6 +27,7 @@ library SettleAssetsExternal {
     using SafeInt256 for int256;
     using PortfolioHandler for PortfolioState;
     using AccountContextHandler for AccountContext;
+    using SettlementCache for SettlementCache.SettlementRates;
 
     event AccountSettled(address indexed account);
 
@@ -37,7 +39,30 @@ library SettleAssetsExternal {
     ) external returns (AccountContext memory) {
         // Defensive check to ensure that this is a valid settlement
         require(accountContext.mustSettleAssets());
-        return _settleAccount(account, accountContext);
+        SettlementCache.SettlementRates memory cache;
+        return _settleAccount(account, accountContext, cache);
+    }
+
+    /// @notice Settles each account that has matured assets and stores its updated account context.
+    /// Accounts that do not need settlement are skipped after reading their account context. Present
+    /// prime rates and settlement rates are loaded once per currency and maturity for the batch.
+    /// @dev Called from AccountAction#settleAccountsBatch
+    /// @return didSettle true for each account that was settled
+    function settleAccountsBatch(
+        address[] calldata accounts,
+        uint16 maxCurrencyId
+    ) external returns (bool[] memory didSettle) {
+        SettlementCache.SettlementRates memory cache = SettlementCache.newSettlementRates(maxCurrencyId);
+        didSettle = new bool[](accounts.length);
+
+        for (uint256 i; i < accounts.length; i++) {
+            AccountContext memory accountContext = AccountContextHandler.getAccountContext(accounts[i]);
+            if (!accountContext.mustSettleAssets()) continue;
+
+            accountContext = _settleAccount(accounts[i], accountContext, cache);
+            accountContext.setAccountContext(accounts[i]);
+            didSettle[i] = true;
+        }
     }
 
     /// @notice Transfers a set of assets from one account to the other.
@@ -141,14 +166,14 @@ library SettleAssetsExternal {
 
     function _settleAccount(
         address account,
-        AccountContext memory accountContext
+        AccountContext memory accountContext,
+        SettlementCache.SettlementRates memory cache
     ) private returns (AccountContext memory) {
         SettleAmount[] memory settleAmounts;
         PortfolioState memory portfolioState;
 
         if (accountContext.isBitmapEnabled()) {
-            PrimeRate memory presentPrimeRate = PrimeRateLib
-                .buildPrimeRateStateful(accountContext.bitmapCurrencyId);
+            PrimeRate memory presentPrimeRate = cache.getPresentPrimeRate(accountContext.bitmapCurrencyId);
 
             (int256 positiveSettledCash, int256 negativeSettledCash, uint256 blockTimeUTC0) =
                 SettleBitmapAssets.settleBitmappedCashGroup(
@@ -156,7 +181,8 @@ library SettleAssetsExternal {
                     accountContext.bitmapCurrencyId,
                     accountContext.nextSettleTime,
                     block.timestamp,
-                    presentPrimeRate
+                    presentPrimeRate,
+                    cache
                 );
             require(blockTimeUTC0 < type(uint40).max); // dev: block time utc0 overflow
             accountContext.nextSettleTime = uint40(blockTimeUTC0);
@@ -172,7 +198,9 @@ library SettleAssetsExternal {
             portfolioState = PortfolioHandler.buildPortfolioState(
                 account, accountContext.assetArrayLength, 0
             );
-            settleAmounts = SettlePortfolioAssets.settlePortfolio(account, portfolioState, block.timestamp);
+            settleAmounts = SettlePortfolioAssets.settlePortfolio(
+                account, portfolioState, block.timestamp, cache
+            );
             accountContext.storeAssetsAndUpdateContextForSettlement(
                 account, portfolioState
             );
@@ -191,7 +219,8 @@ library SettleAssetsExternal {
         PortfolioAsset[] memory assets
     ) private returns (AccountContext memory) {
         if (context.mustSettleAssets()) {
-            context = _settleAccount(account, context);
+            SettlementCache.SettlementRates memory cache;
+            context = _settleAccount(account, context, cache);
         }
 
         return TransferAssets.placeAssetsInAccount(account, context, assets);
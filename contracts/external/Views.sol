@@ -476,35 +476,57 @@ contract Views is StorageLayoutV2, NotionalViews {
             AccountBalance[] memory accountBalances,
             PortfolioAsset[] memory portfolio
         )
+    {
+        PrimeRate[] memory primeRates = new PrimeRate[](maxCurrencyId + 1);
+        return _getAccount(account, primeRates);
+    }
+
+    /// @notice Returns the same values as getAccount for many accounts in a single call, prime
+    /// rates are built once per currency and shared by every account.
+    function getAccountsBatch(address[] calldata accounts)
+        external
+        view
+        override
+        returns (
+            AccountContext[] memory accountContexts,
+            AccountBalance[][] memory accountBalances,
+            PortfolioAsset[][] memory portfolios
+        )
+    {
+        PrimeRate[] memory primeRates = new PrimeRate[](maxCurrencyId + 1);
+        accountContexts = new AccountContext[](accounts.length);
+        accountBalances = new AccountBalance[][](accounts.length);
+        portfolios = new PortfolioAsset[][](accounts.length);
+
+        for (uint256 i; i < accounts.length; i++) {
+            (accountContexts[i], accountBalances[i], portfolios[i]) = _getAccount(accounts[i], primeRates);
+        }
+    }
+
+    function _getAccount(address account, PrimeRate[] memory primeRates)
+        private
+        view
+        returns (
+            AccountContext memory accountContext,
+            AccountBalance[] memory accountBalances,
+            PortfolioAsset[] memory portfolio
+        )
     {
         accountContext = AccountContextHandler.getAccountContext(account);
         accountBalances = new AccountBalance[](10);
 
         uint256 i = 0;
         if (accountContext.isBitmapEnabled()) {
-            AccountBalance memory b = accountBalances[0];
-            b.currencyId = accountContext.bitmapCurrencyId;
-            (
-                b.cashBalance,
-                b.nTokenBalance,
-                b.lastClaimTime,
-                b.accountIncentiveDebt
-            ) = BalanceHandler.getBalanceStorageView(account, accountContext.bitmapCurrencyId, block.timestamp);
+            _getAccountBalance(account, accountContext.bitmapCurrencyId, primeRates, accountBalances[0]);
             i += 1;
         }
 
         bytes18 currencies = accountContext.activeCurrencies;
         while (currencies != 0) {
-            AccountBalance memory b = accountBalances[i];
-            b.currencyId = uint16(bytes2(currencies) & Constants.UNMASK_FLAGS);
-            if (b.currencyId == 0) break;
-
-            (
-                b.cashBalance,
-                b.nTokenBalance,
-                b.lastClaimTime,
-                b.accountIncentiveDebt
-            ) = BalanceHandler.getBalanceStorageView(account, b.currencyId, block.timestamp);
+            uint16 currencyId = uint16(bytes2(currencies) & Constants.UNMASK_FLAGS);
+            if (currencyId == 0) break;
+
+            _getAccountBalance(account, currencyId, primeRates, accountBalances[i]);
             i += 1;
             currencies = currencies << 16;
         }
@@ -523,6 +545,26 @@ contract Views is StorageLayoutV2, NotionalViews {
         }
     }
 
+    /// @dev Prime rates are cached by currency id, a zero supply factor marks an unset rate
+    function _getAccountBalance(
+        address account,
+        uint16 currencyId,
+        PrimeRate[] memory primeRates,
+        AccountBalance memory b
+    ) private view {
+        if (primeRates[currencyId].supplyFactor == 0) {
+            (primeRates[currencyId], /* */) = PrimeCashExchangeRate.getPrimeCashRateView(currencyId, block.timestamp);
+        }
+
+        b.currencyId = currencyId;
+        (
+            b.cashBalance,
+            b.nTokenBalance,
+            b.lastClaimTime,
+            b.accountIncentiveDebt
+        ) = BalanceHandler.getBalanceStorage(account, currencyId, primeRates[currencyId]);
+    }
+
     /// @notice Returns account context
     function getAccountContext(address account) external view override returns (AccountContext memory) {
         return AccountContextHandler.getAccountContext(account);
@@ -602,6 +644,17 @@ contract Views is StorageLayoutV2, NotionalViews {
         return FreeCollateralExternal.getFreeCollateralView(account);
     }
 
+    /// @notice Returns free collateral for many accounts in a single call, valuation inputs shared by
+    /// accounts are only built once. Accounts that must settle assets return zero values and are flagged
+    /// in mustSettle rather than reverting.
+    function getFreeCollateralBatch(address[] calldata accounts) external view override returns (
+        int256[] memory netETHValues,
+        int256[][] memory netLocalAssetValues,
+        bool[] memory mustSettle
+    ) {
+        return FreeCollateralExternal.getFreeCollateralViewBatch(accounts, maxCurrencyId);
+    }
+
     /// @notice Returns the current treasury manager contract
     function getTreasuryManager() external view override returns (address) {
         return treasuryManagerContract;
@@ -76,6 +76,17 @@ contract AccountAction is ActionGuards {
         return didSettle;
     }
 
+    /// @notice Batch version of settleAccount for keepers settling many accounts after a maturity. Each
+    /// account is settled exactly as in settleAccount, accounts that do not need settlement are skipped.
+    /// @param accounts the accounts to settle
+    /// @dev emit:AccountSettled emit:AccountContextUpdate
+    /// @dev auth:none
+    /// @return didSettle true for each account that has been settled
+    function settleAccountsBatch(address[] calldata accounts) external returns (bool[] memory) {
+        for (uint256 i; i < accounts.length; i++) requireValidAccount(accounts[i]);
+        return SettleAssetsExternal.settleAccountsBatch(accounts, maxCurrencyId);
+    }
+
     /// @notice Deposits and wraps the underlying token for a particular cToken. Does not settle assets or check free
     /// collateral, idea is to be as gas efficient as possible during potential liquidation events.
     /// @param account the account to deposit into
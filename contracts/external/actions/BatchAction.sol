@@ -58,6 +58,9 @@ contract BatchAction is StorageLayoutV1, ActionGuards {
 
         AccountContext memory accountContext = _settleAccountIfRequired(account);
         BalanceState memory balanceState;
+        PrimeRate[] memory primeRates = _newPrimeRateMemo(
+            actions.length == 0 ? 0 : actions[actions.length - 1].currencyId
+        );
 
         for (uint256 i = 0; i < actions.length; i++) {
             BalanceAction calldata action = actions[i];
@@ -67,7 +70,7 @@ contract BatchAction is StorageLayoutV1, ActionGuards {
                 require(action.currencyId > actions[i - 1].currencyId, "Unsorted actions");
             }
             // Loads the currencyId into balance state
-            balanceState.loadBalanceState(account, action.currencyId, accountContext);
+            balanceState.loadBalanceState(account, action.currencyId, accountContext, primeRates);
 
             _executeDepositAction(
                 account,
@@ -86,7 +89,7 @@ contract BatchAction is StorageLayoutV1, ActionGuards {
             );
         }
 
-        _finalizeAccountContext(account, accountContext);
+        _finalizeAccountContext(account, accountContext, primeRates);
     }
 
     /// @notice Executes a batch of balance transfers and trading actions
@@ -100,8 +103,11 @@ contract BatchAction is StorageLayoutV1, ActionGuards {
     {
         require(account == msg.sender || msg.sender == address(this), "Unauthorized");
         requireValidAccount(account);
-        AccountContext memory accountContext = _batchBalanceAndTradeAction(account, actions);
-        _finalizeAccountContext(account, accountContext);
+        (
+            AccountContext memory accountContext,
+            PrimeRate[] memory primeRates
+        ) = _batchBalanceAndTradeAction(account, actions);
+        _finalizeAccountContext(account, accountContext, primeRates);
     }
 
     /// @notice Executes a batch of lending actions. This is different from batchBalanceAndTrade because
@@ -129,6 +135,9 @@ contract BatchAction is StorageLayoutV1, ActionGuards {
             0
         );
         BalanceState memory balanceState;
+        PrimeRate[] memory primeRates = _newPrimeRateMemo(
+            actions.length == 0 ? 0 : actions[actions.length - 1].currencyId
+        );
 
         for (uint256 i = 0; i < actions.length; i++) {
             BatchLend calldata action = actions[i];
@@ -145,13 +154,14 @@ contract BatchAction is StorageLayoutV1, ActionGuards {
             }
 
             // Loads the currencyId into balance state
-            balanceState.loadBalanceState(account, action.currencyId, accountContext);
+            balanceState.loadBalanceState(account, action.currencyId, accountContext, primeRates);
             (balanceState.netCashChange, portfolioState) = _executeTrades(
                 account,
                 action.currencyId,
                 action.trades,
                 accountContext,
-                portfolioState
+                portfolioState,
+                balanceState.primeRate
             );
             // This must be negative as a result of requiring only lending
             require(balanceState.netCashChange <= 0);
@@ -211,7 +221,7 @@ contract BatchAction is StorageLayoutV1, ActionGuards {
         }
 
         // This will save the account context and check free collateral
-        _finalizeAccountContext(account, accountContext);
+        _finalizeAccountContext(account, accountContext, primeRates);
     }
 
     /// @notice Executes a batch of balance transfers and trading actions via an authorized callback contract. This
@@ -234,7 +244,10 @@ contract BatchAction is StorageLayoutV1, ActionGuards {
         require(authorizedCallbackContract[msg.sender], "Unauthorized");
         requireValidAccount(account);
 
-        AccountContext memory accountContext = _batchBalanceAndTradeAction(account, actions);
+        (
+            AccountContext memory accountContext,
+            PrimeRate[] memory primeRates
+        ) = _batchBalanceAndTradeAction(account, actions);
         accountContext.setAccountContext(account);
 
         // Be sure to set the account context before initiating the callback, all stateful updates
@@ -247,16 +260,20 @@ contract BatchAction is StorageLayoutV1, ActionGuards {
             // is ok because the worst case would be causing an extra free collateral check when it
             // is not required. This check will be entered if the account hasDebt prior to the callback
             // being triggered above, so it will happen regardless of what the callback function does.
-            FreeCollateralExternal.checkFreeCollateralAndRevert(account);
+            // Prime rates do not change within a block so they are still valid after the callback.
+            FreeCollateralExternal.checkFreeCollateralAndRevert(account, primeRates);
         }
     }
 
     function _batchBalanceAndTradeAction(
         address account,
         BalanceActionWithTrades[] calldata actions
-    ) internal returns (AccountContext memory) {
+    ) internal returns (AccountContext memory, PrimeRate[] memory) {
         AccountContext memory accountContext = _settleAccountIfRequired(account);
         BalanceState memory balanceState;
+        PrimeRate[] memory primeRates = _newPrimeRateMemo(
+            actions.length == 0 ? 0 : actions[actions.length - 1].currencyId
+        );
         // NOTE: loading the portfolio state must happen after settle account to get the
         // correct portfolio, it will have changed if the account is settled.
         PortfolioState memory portfolioState = PortfolioHandler.buildPortfolioState(
@@ -273,7 +290,7 @@ contract BatchAction is StorageLayoutV1, ActionGuards {
                 require(action.currencyId > actions[i - 1].currencyId, "Unsorted actions");
             }
             // Loads the currencyId into balance state
-            balanceState.loadBalanceState(account, action.currencyId, accountContext);
+            balanceState.loadBalanceState(account, action.currencyId, accountContext, primeRates);
 
             // Does not revert on invalid action types here, they also have no effect.
             _executeDepositAction(
@@ -290,7 +307,8 @@ contract BatchAction is StorageLayoutV1, ActionGuards {
                     action.currencyId,
                     action.trades,
                     accountContext,
-                    portfolioState
+                    portfolioState,
+                    balanceState.primeRate
                 );
 
                 // If the account owes cash after trading, ensure that it has enough
@@ -317,7 +335,7 @@ contract BatchAction is StorageLayoutV1, ActionGuards {
         }
 
         // NOTE: free collateral and account context will be set outside of this method call.
-        return accountContext;
+        return (accountContext, primeRates);
     }
 
     /// @dev Executes deposits
@@ -446,23 +464,33 @@ contract BatchAction is StorageLayoutV1, ActionGuards {
         balanceState.primeRate.checkSupplyCap(balanceState.currencyId);
     }
 
-    function _finalizeAccountContext(address account, AccountContext memory accountContext)
-        private
-    {
+    function _finalizeAccountContext(
+        address account,
+        AccountContext memory accountContext,
+        PrimeRate[] memory primeRates
+    ) private {
         // At this point all balances, market states and portfolio states should be finalized. Just need to check free
         // collateral if required.
         accountContext.setAccountContext(account);
         if (accountContext.hasDebt != 0x00) {
-            FreeCollateralExternal.checkFreeCollateralAndRevert(account);
+            FreeCollateralExternal.checkFreeCollateralAndRevert(account, primeRates);
         }
     }
 
+    /// @dev Prime rates accrued during the transaction indexed by currency id, shared with trading and the free
+    /// collateral check so each currency is accrued once. Actions are sorted by currency id so the memo is sized
+    /// by the last action, other currencies held by the account are accrued during the free collateral check.
+    function _newPrimeRateMemo(uint16 maxCurrencyId) private pure returns (PrimeRate[] memory) {
+        return new PrimeRate[](uint256(maxCurrencyId) + 1);
+    }
+
     function _executeTrades(
         address account,
         uint16 currencyId,
         bytes32[] calldata trades,
         AccountContext memory accountContext,
-        PortfolioState memory portfolioState
+        PortfolioState memory portfolioState,
+        PrimeRate memory primeRate
     ) private returns (int256 netCash, PortfolioState memory postTradeState) {
         if (accountContext.isBitmapEnabled()) {
             require(
@@ -474,7 +502,8 @@ contract BatchAction is StorageLayoutV1, ActionGuards {
                 account,
                 accountContext.bitmapCurrencyId,
                 accountContext.nextSettleTime,
-                trades
+                trades,
+                primeRate
             );
             if (didIncurDebt) {
                 accountContext.hasDebt = Constants.HAS_ASSET_DEBT | accountContext.hasDebt;
@@ -486,7 +515,8 @@ contract BatchAction is StorageLayoutV1, ActionGuards {
                 account,
                 currencyId,
                 portfolioState,
-                trades
+                trades,
+                primeRate
             );
         }
     }
@@ -10,6 +10,7 @@ import {
 import {StorageLayoutV1} from "../../global/StorageLayoutV1.sol";
 import {Constants} from "../../global/Constants.sol";
 import {SafeInt256} from "../../math/SafeInt256.sol";
+import {Bitmap} from "../../math/Bitmap.sol";
 
 import {Emitter} from "../../internal/Emitter.sol";
 import {AccountContextHandler} from "../../internal/AccountContextHandler.sol";
@@ -36,6 +37,17 @@ import "@openzeppelin/contracts/utils/Address.sol";
 contract ERC1155Action is nERC1155Interface, ActionGuards {
     using SafeInt256 for int256;
     using AccountContextHandler for AccountContext;
+    using Bitmap for bytes32;
+
+    /// @dev Account state loaded once for each run of consecutive (account, id) pairs with the same
+    /// account in the batch balance methods
+    struct BatchBalanceContext {
+        address account;
+        bool isLoaded;
+        AccountContext accountContext;
+        PortfolioAsset[] portfolio;
+        bytes32 assetsBitmap;
+    }
 
     bytes4 internal constant ERC1155_ACCEPTED = bytes4(keccak256("onERC1155Received(address,address,uint256,uint256,bytes)"));
     bytes4 internal constant ERC1155_BATCH_ACCEPTED = bytes4(keccak256("onERC1155BatchReceived(address,address,uint256[],uint256[],bytes)"));
@@ -97,10 +109,10 @@ contract ERC1155Action is nERC1155Interface, ActionGuards {
     {
         require(accounts.length == ids.length);
         int256[] memory amounts = new int256[](accounts.length);
+        BatchBalanceContext memory c;
 
         for (uint256 i; i < accounts.length; i++) {
-            // This is pretty inefficient but gets the job done
-            amounts[i] = signedBalanceOf(accounts[i], ids[i]);
+            amounts[i] = _signedBalanceOfBatch(c, accounts[i], ids[i]);
         }
 
         return amounts;
@@ -119,15 +131,73 @@ contract ERC1155Action is nERC1155Interface, ActionGuards {
     {
         require(accounts.length == ids.length);
         uint256[] memory amounts = new uint256[](accounts.length);
+        BatchBalanceContext memory c;
 
         for (uint256 i; i < accounts.length; i++) {
-            // This is pretty inefficient but gets the job done
-            amounts[i] = balanceOf(accounts[i], ids[i]);
+            int256 notional = _signedBalanceOfBatch(c, accounts[i], ids[i]);
+            amounts[i] = notional < 0 ? 0 : notional.toUint();
         }
 
         return amounts;
     }
 
+    /// @dev Returns the same value as signedBalanceOf. The account context and its portfolio array or assets
+    /// bitmap are loaded once and reused while consecutive pairs in the batch refer to the same account, so
+    /// callers should group ids by account.
+    function _signedBalanceOfBatch(
+        BatchBalanceContext memory c,
+        address account,
+        uint256 id
+    ) private view returns (int256 notional) {
+        if (nTokenHandler.nTokenAddress(Emitter.decodeCurrencyId(id)) == account) {
+            return _balanceInNToken(account, id);
+        } else if (Emitter.isfCash(id)) {
+            (uint16 currencyId, uint256 maturity, bool isfCashDebt) = Emitter.decodefCashId(id);
+            if (!c.isLoaded || c.account != account) _loadBatchBalanceContext(c, account);
+
+            if (c.accountContext.isBitmapEnabled()) {
+                notional = _balanceInBitmapCached(c, currencyId, maturity);
+            } else {
+                notional = _balanceInArray(c.portfolio, currencyId, maturity);
+            }
+
+            if (isfCashDebt) return notional < 0 ? notional.neg() : 0;
+            return notional;
+        } else {
+            return IVaultAccountHealth(address(this)).signedBalanceOfVaultTokenId(account, id);
+        }
+    }
+
+    function _loadBatchBalanceContext(BatchBalanceContext memory c, address account) private view {
+        c.account = account;
+        c.isLoaded = true;
+        c.accountContext = AccountContextHandler.getAccountContext(account);
+
+        if (c.accountContext.isBitmapEnabled()) {
+            c.assetsBitmap = BitmapAssetsHandler.getAssetsBitmap(account, c.accountContext.bitmapCurrencyId);
+            c.portfolio = new PortfolioAsset[](0);
+        } else {
+            c.assetsBitmap = bytes32(0);
+            c.portfolio = PortfolioHandler.getSortedPortfolio(account, c.accountContext.assetArrayLength);
+        }
+    }
+
+    /// @dev Returns the same value as _balanceInBitmap, but skips the notional storage read when the
+    /// maturity maps to a bit that is not set in the assets bitmap (unset bits always have zero notional).
+    /// Matured but unsettled maturities do not map to a bit and are read from storage.
+    function _balanceInBitmapCached(
+        BatchBalanceContext memory c,
+        uint16 currencyId,
+        uint256 maturity
+    ) private view returns (int256) {
+        if (currencyId == 0 || currencyId != c.accountContext.bitmapCurrencyId) return 0;
+
+        (uint256 bitNum, bool isValid) = DateTime.getBitNumFromMaturity(c.accountContext.nextSettleTime, maturity);
+        if (isValid && !c.assetsBitmap.isBitSet(bitNum)) return 0;
+
+        return BitmapAssetsHandler.getifCashNotional(c.account, currencyId, maturity);
+    }
+
     /// @dev Returns the balance from a bitmap given the id
     function _balanceInBitmap(
         address account,
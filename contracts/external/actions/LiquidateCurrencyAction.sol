@@ -13,6 +13,7 @@ import {AccountContextHandler} from "../../internal/AccountContextHandler.sol";
 import {BalanceHandler} from "../../internal/balances/BalanceHandler.sol";
 import {LiquidateCurrency} from "../../internal/liquidation/LiquidateCurrency.sol";
 import {LiquidationHelpers} from "../../internal/liquidation/LiquidationHelpers.sol";
+import {FreeCollateral} from "../../internal/valuation/FreeCollateral.sol";
 import {ActionGuards} from "./ActionGuards.sol";
 
 import {FreeCollateralExternal} from "../FreeCollateralExternal.sol";
@@ -22,6 +23,24 @@ contract LiquidateCurrencyAction is ActionGuards {
     using BalanceHandler for BalanceState;
     using SafeInt256 for int256;
 
+    /// @dev Shared state while liquidating many accounts against the same local and collateral currency
+    struct CollateralLiquidationBatch {
+        uint16 localCurrency;
+        uint16 collateralCurrency;
+        FreeCollateral.FreeCollateralCache cache;
+        int256 totalLocalPrimeCashFromLiquidator;
+        int256 totalCollateralToLiquidator;
+        int256 totalNTokensToLiquidator;
+    }
+
+    /// @dev Liquidation of one account in a batch, finalized after the liquidator has deposited for every account
+    struct CollateralLiquidationResult {
+        address liquidateAccount;
+        AccountContext accountContext;
+        BalanceState collateralBalanceState;
+        int256 localPrimeCashFromLiquidator;
+    }
+
     event LiquidateLocalCurrency(
         address indexed liquidated,
         address indexed liquidator,
@@ -254,6 +273,162 @@ contract LiquidateCurrencyAction is ActionGuards {
         );
     }
 
+    /// @notice Liquidates many accounts between the same local and collateral currency. Prime rates, cash groups
+    /// and ETH rates are loaded once and the liquidator deposits local currency and receives collateral once
+    /// for the sum across all accounts. Liquidations are calculated for every account before the deposit, then
+    /// each account emits the same transfers and LiquidateCollateralCurrency event as liquidateCollateralCurrency.
+    /// @param liquidateAccounts accounts to liquidate, reverts if any account cannot be liquidated
+    /// @param localCurrency id of the local currency
+    /// @param collateralCurrency id of the collateral currency
+    /// @param maxCollateralLiquidation maximum amount of collateral (inclusive of cash and nTokens) to liquidate
+    /// for each account
+    /// @param maxNTokenLiquidation maximum amount of nTokens to purchase (if any) for each account
+    /// @param withdrawCollateral if true, withdraws collateral cash back to msg.sender
+    /// @param redeemToUnderlying if true, converts collateral cash from asset cash to underlying
+    /// @return total local currency required from liquidator
+    /// @return total collateral asset cash paid to liquidator (positive)
+    /// @return total collateral nTokens paid to liquidator (positive)
+    function liquidateCollateralCurrencyBatch(
+        address[] calldata liquidateAccounts,
+        uint16 localCurrency,
+        uint16 collateralCurrency,
+        uint128[] calldata maxCollateralLiquidation,
+        uint96[] calldata maxNTokenLiquidation,
+        bool withdrawCollateral,
+        bool redeemToUnderlying
+    ) external payable nonReentrant returns (int256, int256, int256) {
+        require(liquidateAccounts.length == maxCollateralLiquidation.length); // dev: length mismatch
+        require(liquidateAccounts.length == maxNTokenLiquidation.length); // dev: length mismatch
+
+        CollateralLiquidationBatch memory batch;
+        batch.localCurrency = localCurrency;
+        batch.collateralCurrency = collateralCurrency;
+        batch.cache = FreeCollateralExternal.getLiquidationCache(localCurrency, collateralCurrency);
+
+        CollateralLiquidationResult[] memory results = new CollateralLiquidationResult[](liquidateAccounts.length);
+        for (uint256 i; i < liquidateAccounts.length; i++) {
+            results[i] = _calculateCollateralLiquidationInBatch(
+                batch,
+                liquidateAccounts[i],
+                maxCollateralLiquidation[i],
+                maxNTokenLiquidation[i]
+            );
+        }
+
+        // As in liquidateCollateralCurrency, the liquidator deposits before any transfers to liquidated
+        // accounts are emitted
+        (AccountContext memory liquidatorContext, BalanceState memory liquidatorLocalBalance) =
+            LiquidationHelpers.depositLiquidatorLocal(
+                msg.sender,
+                localCurrency,
+                batch.totalLocalPrimeCashFromLiquidator
+            );
+
+        for (uint256 i; i < results.length; i++) _finalizeLiquidatedAccountInBatch(batch, results[i]);
+
+        _finalizeLiquidatorBatch(
+            batch,
+            liquidatorContext,
+            liquidatorLocalBalance,
+            withdrawCollateral,
+            redeemToUnderlying
+        );
+
+        return (
+            batch.totalLocalPrimeCashFromLiquidator,
+            batch.totalCollateralToLiquidator,
+            batch.totalNTokensToLiquidator
+        );
+    }
+
+    /// @dev Calculates the liquidation of a single account in the batch and adds it to the batch totals
+    function _calculateCollateralLiquidationInBatch(
+        CollateralLiquidationBatch memory batch,
+        address liquidateAccount,
+        uint128 maxCollateralLiquidation,
+        uint96 maxNTokenLiquidation
+    ) private returns (CollateralLiquidationResult memory r) {
+        LiquidationFactors memory factors;
+        r.liquidateAccount = liquidateAccount;
+        // The cache is copied across the external library call, keep values loaded for this account
+        (r.accountContext, factors, /* */, batch.cache) = LiquidationHelpers.preLiquidationActions(
+            liquidateAccount, batch.localCurrency, batch.collateralCurrency, batch.cache
+        );
+
+        (r.localPrimeCashFromLiquidator, r.collateralBalanceState) = _liquidateCollateral(
+            liquidateAccount,
+            batch.collateralCurrency,
+            maxCollateralLiquidation,
+            maxNTokenLiquidation,
+            r.accountContext,
+            factors
+        );
+
+        batch.totalLocalPrimeCashFromLiquidator = batch.totalLocalPrimeCashFromLiquidator
+            .add(r.localPrimeCashFromLiquidator);
+        batch.totalCollateralToLiquidator = batch.totalCollateralToLiquidator
+            .sub(r.collateralBalanceState.netCashChange);
+        batch.totalNTokensToLiquidator = batch.totalNTokensToLiquidator
+            .sub(r.collateralBalanceState.netNTokenTransfer);
+    }
+
+    /// @dev Emits the liquidator transfers for a single account in the batch and finalizes the account, the
+    /// liquidator's balances are only updated once in _finalizeLiquidatorBatch
+    function _finalizeLiquidatedAccountInBatch(
+        CollateralLiquidationBatch memory batch,
+        CollateralLiquidationResult memory r
+    ) private {
+        LiquidationHelpers.emitLiquidatorLocalTransfers(
+            r.liquidateAccount, msg.sender, batch.localCurrency, r.localPrimeCashFromLiquidator, 0
+        );
+        LiquidationHelpers.emitLiquidatorTransfers(
+            r.liquidateAccount,
+            msg.sender,
+            batch.collateralCurrency,
+            r.collateralBalanceState.netCashChange.neg(),
+            r.collateralBalanceState.netNTokenTransfer.neg()
+        );
+
+        LiquidationHelpers.finalizeLiquidatedLocalBalance(
+            r.liquidateAccount,
+            batch.localCurrency,
+            r.accountContext,
+            r.localPrimeCashFromLiquidator
+        );
+        r.collateralBalanceState.finalizeCollateralLiquidation(r.liquidateAccount, r.accountContext);
+
+        _emitCollateralEvent(
+            r.liquidateAccount,
+            batch.localCurrency,
+            r.localPrimeCashFromLiquidator,
+            r.collateralBalanceState
+        );
+        r.accountContext.setAccountContext(r.liquidateAccount);
+    }
+
+    /// @dev Finalizes the liquidator's local balance and credits collateral once for the whole batch
+    function _finalizeLiquidatorBatch(
+        CollateralLiquidationBatch memory batch,
+        AccountContext memory liquidatorContext,
+        BalanceState memory liquidatorLocalBalance,
+        bool withdrawCollateral,
+        bool redeemToUnderlying
+    ) private {
+        liquidatorLocalBalance.finalizeNoWithdraw(msg.sender, liquidatorContext);
+
+        LiquidationHelpers.finalizeLiquidatorCollateralBalance(
+            msg.sender,
+            liquidatorContext,
+            batch.collateralCurrency,
+            batch.totalCollateralToLiquidator,
+            batch.totalNTokensToLiquidator,
+            withdrawCollateral,
+            redeemToUnderlying
+        );
+
+        liquidatorContext.setAccountContext(msg.sender);
+    }
+
     function _emitCollateralEvent(
         address liquidateAccount,
         uint16 localCurrency,
@@ -312,9 +487,27 @@ contract LiquidateCurrencyAction is ActionGuards {
         (accountContext, factors, /* */) = LiquidationHelpers.preLiquidationActions(
             liquidateAccount, localCurrency, collateralCurrency
         );
+        factors.isCalculation = isCalculation;
+
+        (localPrimeCashFromLiquidator, collateralBalanceState) = _liquidateCollateral(
+            liquidateAccount,
+            collateralCurrency,
+            maxCollateralLiquidation,
+            maxNTokenLiquidation,
+            accountContext,
+            factors
+        );
+    }
 
+    function _liquidateCollateral(
+        address liquidateAccount,
+        uint16 collateralCurrency,
+        uint128 maxCollateralLiquidation,
+        uint96 maxNTokenLiquidation,
+        AccountContext memory accountContext,
+        LiquidationFactors memory factors
+    ) private returns (int256 localPrimeCashFromLiquidator, BalanceState memory collateralBalanceState) {
         collateralBalanceState.loadBalanceState(liquidateAccount, collateralCurrency, accountContext);
-        factors.isCalculation = isCalculation;
 
         localPrimeCashFromLiquidator = LiquidateCurrency.liquidateCollateralCurrency(
             maxCollateralLiquidation,
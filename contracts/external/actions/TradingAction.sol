@@ -65,15 +65,17 @@ library TradingAction {
     /// @param bitmapCurrencyId currency id of the bitmap
     /// @param nextSettleTime used to calculate the relative positions in the bitmap
     /// @param trades tightly packed array of trades, schema is defined in global/Types.sol
+    /// @param primeRate prime rate accrued to the current block by the caller
     /// @return netCash generated by trading
     /// @return didIncurDebt if the bitmap had an fCash position go negative
     function executeTradesBitmapBatch(
         address account,
         uint16 bitmapCurrencyId,
         uint40 nextSettleTime,
-        bytes32[] calldata trades
+        bytes32[] calldata trades,
+        PrimeRate memory primeRate
     ) external returns (int256, bool) {
-        CashGroupParameters memory cashGroup = CashGroup.buildCashGroupStateful(bitmapCurrencyId);
+        CashGroupParameters memory cashGroup = CashGroup.buildCashGroup(bitmapCurrencyId, primeRate);
         MarketParameters memory market;
         bool didIncurDebt;
         TradeContext memory c;
@@ -109,15 +111,17 @@ library TradingAction {
     /// @param currencyId currency id to trade
     /// @param portfolioState used to update the positions in the portfolio
     /// @param trades tightly packed array of trades, schema is defined in global/Types.sol
+    /// @param primeRate prime rate accrued to the current block by the caller
     /// @return resulting portfolio state
     /// @return netCash generated by trading
     function executeTradesArrayBatch(
         address account,
         uint16 currencyId,
         PortfolioState memory portfolioState,
-        bytes32[] calldata trades
+        bytes32[] calldata trades,
+        PrimeRate memory primeRate
     ) external returns (PortfolioState memory, int256) {
-        CashGroupParameters memory cashGroup = CashGroup.buildCashGroupStateful(currencyId);
+        CashGroupParameters memory cashGroup = CashGroup.buildCashGroup(currencyId, primeRate);
         MarketParameters memory market;
         TradeContext memory c;
         c.blockTime = block.timestamp;
@@ -92,6 +92,49 @@ contract VaultAccountHealth is IVaultAccountHealth {
             primeRates = VaultSecondaryBorrow.getSecondaryPrimeRateView(vaultConfig, block.timestamp);
         }
 
+        return _getVaultAccountHealthFactors(vaultConfig, vaultAccount, vaultState, primeRates);
+    }
+
+    /// @notice Batch version of getVaultAccountHealthFactors for many accounts in the same vault. The vault
+    /// config and secondary prime rates are loaded once, vault state is reused while consecutive accounts
+    /// share a maturity so callers should sort accounts by maturity.
+    function getVaultAccountHealthFactorsBatch(address[] calldata accounts, address vault) external view override returns (
+        VaultAccountHealthFactors[] memory h,
+        int256[3][] memory maxLiquidatorDepositUnderlying,
+        uint256[3][] memory vaultSharesToLiquidator
+    ) {
+        VaultConfig memory vaultConfig = VaultConfiguration.getVaultConfigView(vault);
+        PrimeRate[2] memory primeRates;
+        if (vaultConfig.hasSecondaryBorrows()) {
+            primeRates = VaultSecondaryBorrow.getSecondaryPrimeRateView(vaultConfig, block.timestamp);
+        }
+
+        h = new VaultAccountHealthFactors[](accounts.length);
+        maxLiquidatorDepositUnderlying = new int256[3][](accounts.length);
+        vaultSharesToLiquidator = new uint256[3][](accounts.length);
+        VaultState memory vaultState;
+
+        for (uint256 i; i < accounts.length; i++) {
+            VaultAccount memory vaultAccount = VaultAccountLib.getVaultAccount(accounts[i], vaultConfig);
+            if (i == 0 || vaultState.maturity != vaultAccount.maturity) {
+                vaultState = VaultStateLib.getVaultState(vaultConfig, vaultAccount.maturity);
+            }
+
+            (h[i], maxLiquidatorDepositUnderlying[i], vaultSharesToLiquidator[i]) =
+                _getVaultAccountHealthFactors(vaultConfig, vaultAccount, vaultState, primeRates);
+        }
+    }
+
+    function _getVaultAccountHealthFactors(
+        VaultConfig memory vaultConfig,
+        VaultAccount memory vaultAccount,
+        VaultState memory vaultState,
+        PrimeRate[2] memory primeRates
+    ) private view returns (
+        VaultAccountHealthFactors memory h,
+        int256[3] memory maxLiquidatorDepositUnderlying,
+        uint256[3] memory vaultSharesToLiquidator
+    ) {
         VaultSecondaryBorrow.SecondaryExchangeRates memory er;
         (h, er) = VaultValuation.calculateAccountHealthFactors(vaultConfig, vaultAccount, vaultState, primeRates);
 
@@ -430,9 +430,7 @@ library nTokenMintAction {
                 }
             }
 
-            // Turn off the bit and look for the next one
-            assetsBitmap = assetsBitmap.setBit(bitNum, false);
-            bitNum = assetsBitmap.getNextBitNum();
+            bitNum = assetsBitmap.getNextBitNumAfter(bitNum);
         }
 
         return nToken.cashGroup.primeRate.convertFromUnderlying(totalCashWithholding);
@@ -407,9 +407,7 @@ library nTokenRedeemAction {
                 nTokenAddress, currencyId, maturity, notional, finalNotional
             );
 
-            // Turn off the bit and look for the next one
-            assetsBitmap = assetsBitmap.setBit(bitNum, false);
-            bitNum = assetsBitmap.getNextBitNum();
+            bitNum = assetsBitmap.getNextBitNumAfter(bitNum);
         }
 
         return assets;
@@ -38,6 +38,16 @@ struct CollateralCurrencyLiquidation {
     TradeData tradeData;
 }
 
+struct CollateralCurrencyBatchLiquidation {
+    address[] liquidateAccounts;
+    uint16 localCurrency;
+    uint16 collateralCurrency;
+    address collateralUnderlyingAddress;
+    uint128[] maxCollateralLiquidation;
+    uint96[] maxNTokenLiquidation;
+    TradeData tradeData;
+}
+
 struct LocalfCashLiquidation {
     address liquidateAccount;
     uint16 localCurrency;
@@ -67,7 +77,8 @@ enum LiquidationType {
     LocalCurrency,
     CollateralCurrency,
     LocalfCash,
-    CrossCurrencyfCash
+    CrossCurrencyfCash,
+    CollateralCurrencyBatch
 }
 
 abstract contract BaseLiquidator is LiquidatorStorageLayoutV1 {
@@ -198,6 +209,46 @@ abstract contract BaseLiquidator is LiquidatorStorageLayoutV1 {
         if (action.hasTransferFee) _redeemAndWithdraw(liquidation.localCurrency, 0, true);
     }
 
+    /// @notice Liquidates all accounts in the batch using a single flash loan of the local currency, the
+    /// collateral received from every account is redeemed and withdrawn once.
+    function _liquidateCollateralBatch(LiquidationAction memory action, address[] memory assets)
+        internal
+    {
+        CollateralCurrencyBatchLiquidation memory liquidation = abi.decode(
+            action.payload,
+            (CollateralCurrencyBatchLiquidation)
+        );
+
+        if (action.hasTransferFee) {
+            // NOTE: This assumes that the first asset flash borrowed is the one with transfer fees
+            uint256 amount = IERC20(assets[0]).balanceOf(address(this));
+            checkAllowanceOrSet(assets[0], address(NOTIONAL));
+            NOTIONAL.depositUnderlyingToken(address(this), liquidation.localCurrency, amount);
+        }
+
+        // prettier-ignore
+        (
+            /* int256 localAssetCashFromLiquidator */,
+            /* int256 collateralAssetCash */,
+            int256 collateralNTokens
+        ) = NOTIONAL.liquidateCollateralCurrencyBatch{value: address(this).balance}(
+            liquidation.liquidateAccounts,
+            liquidation.localCurrency,
+            liquidation.collateralCurrency,
+            liquidation.maxCollateralLiquidation,
+            liquidation.maxNTokenLiquidation,
+            true, // Withdraw collateral
+            true // Redeem to underlying
+        );
+
+        // Redeem nTokens
+        _redeemAndWithdraw(liquidation.collateralCurrency, uint96(collateralNTokens), true);
+
+        // Will withdraw all cash balance, no need to redeem local currency, it will be
+        // redeemed later
+        if (action.hasTransferFee) _redeemAndWithdraw(liquidation.localCurrency, 0, true);
+    }
+
     function _liquidateLocalfCash(LiquidationAction memory action, address[] memory assets)
         internal
     {
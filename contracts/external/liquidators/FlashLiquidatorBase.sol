@@ -11,6 +11,7 @@ import {
     LiquidationAction, 
     TradeData,
     CollateralCurrencyLiquidation,
+    CollateralCurrencyBatchLiquidation,
     CrossCurrencyfCashLiquidation
 } from "./BaseLiquidator.sol";
 import {TradeHandler, Trade} from "./TradeHandler.sol";
@@ -113,6 +114,8 @@ abstract contract FlashLiquidatorBase is BaseLiquidator, IFlashLoanReceiver {
             _liquidateLocalfCash(action, assets);
         } else if (LiquidationType(action.liquidationType) == LiquidationType.CrossCurrencyfCash) {
             _liquidateCrossCurrencyfCash(action, assets);
+        } else if (LiquidationType(action.liquidationType) == LiquidationType.CollateralCurrencyBatch) {
+            _liquidateCollateralBatch(action, assets);
         }
 
         if (action.tradeInWETH) {
@@ -121,7 +124,8 @@ abstract contract FlashLiquidatorBase is BaseLiquidator, IFlashLoanReceiver {
 
         if (
             LiquidationType(action.liquidationType) == LiquidationType.CollateralCurrency ||
-            LiquidationType(action.liquidationType) == LiquidationType.CrossCurrencyfCash
+            LiquidationType(action.liquidationType) == LiquidationType.CrossCurrencyfCash ||
+            LiquidationType(action.liquidationType) == LiquidationType.CollateralCurrencyBatch
         ) {
             _dexTrade(action);
         }
@@ -155,6 +159,14 @@ abstract contract FlashLiquidatorBase is BaseLiquidator, IFlashLoanReceiver {
                 (CollateralCurrencyLiquidation)
             );
 
+            collateralUnderlyingAddress = liquidation.collateralUnderlyingAddress;
+            _executeDexTrade(liquidation.tradeData);
+        } else if (LiquidationType(action.liquidationType) == LiquidationType.CollateralCurrencyBatch) {
+            CollateralCurrencyBatchLiquidation memory liquidation = abi.decode(
+                action.payload,
+                (CollateralCurrencyBatchLiquidation)
+            );
+
             collateralUnderlyingAddress = liquidation.collateralUnderlyingAddress;
             _executeDexTrade(liquidation.tradeData);
         } else {
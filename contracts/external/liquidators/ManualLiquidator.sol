@@ -154,6 +154,35 @@ contract ManualLiquidator is FlashLiquidatorBase, AccessControl, Initializable {
             );
     }
 
+    function liquidateCollateralCurrencyBatch(
+        address[] calldata liquidateAccounts,
+        uint16 localCurrencyId,
+        uint16 collateralCurrencyId,
+        uint128[] calldata maxCollateralLiquidation,
+        uint96[] calldata maxNTokenLiquidation,
+        bool withdrawCollateral,
+        bool redeemNToken
+    )
+        external payable
+        ownerOrUser
+        returns (
+            int256,
+            int256,
+            int256
+        )
+    {
+        return
+            NOTIONAL.liquidateCollateralCurrencyBatch{value: msg.value}(
+                liquidateAccounts,
+                localCurrencyId,
+                collateralCurrencyId,
+                maxCollateralLiquidation,
+                maxNTokenLiquidation,
+                withdrawCollateral,
+                redeemNToken
+            );
+    }
+
     function fcashLocalLiquidate(
         address liquidateAccount,
         uint256[] calldata fCashMaturities,
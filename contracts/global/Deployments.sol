@@ -30,6 +30,15 @@ library Deployments {
     // ARBITRUM: 0xFdB631F5EE196F0ed6FAa767959853A9F217697D
     // AggregatorV2V3Interface internal constant SEQUENCER_UPTIME_ORACLE = AggregatorV2V3Interface(0xFdB631F5EE196F0ed6FAa767959853A9F217697D);
 
+    // When set, Emitter packs consecutive ERC1155 transfers recorded by a single emit call into one
+    // CompactTransfers log instead of emitting TransferSingle and TransferBatch. ERC20 Transfer events on
+    // the pCash, pDebt and nToken proxies are always emitted. Off chain indexers must decode these logs,
+    // see scripts/EventProcessor.py
+    // MAINNET: false
+    bool internal constant COMPACT_EVENTS = false;
+    // ARBITRUM: false
+    // bool internal constant COMPACT_EVENTS = false;
+
     enum BeaconType {
         NTOKEN,
         PCASH,
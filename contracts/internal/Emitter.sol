@@ -11,6 +11,7 @@ import {
 } from "../global/Types.sol";
 import {Constants} from "../global/Constants.sol";
 import {LibStorage} from "../global/LibStorage.sol";
+import {Deployments} from "../global/Deployments.sol";
 
 import {PrimeRateLib} from "./pCash/PrimeRateLib.sol";
 import {SafeInt256} from "../math/SafeInt256.sol";
@@ -43,6 +44,11 @@ import {ITransferEmitter} from "../external/proxies/BaseERC4626Proxy.sol";
  *
  *  - NOTE: Liquidity Token ids are not valid within the Notional V3 schema since they are only held by the nToken
  *    and never transferred.
+ *
+ * When Deployments.COMPACT_EVENTS is set, consecutive ERC1155 transfers recorded by each emit method are packed
+ * into a single CompactTransfers log emitted from address(this) with no indexed topics. Each record is prefixed
+ * with a one byte type and uses packed (unpadded) addresses, see _transferSingle and _transferBatch. ERC20
+ * Transfer events on the pCash, pDebt and nToken proxies are required by EIP-20 and are always emitted.
  */
 library Emitter {
     using SafeInt256 for int256;
@@ -64,6 +70,8 @@ library Emitter {
         uint256[] values
     );
 
+    event CompactTransfers(bytes transfers);
+
     uint256 private constant MATURITY_OFFSET        = 8;
     uint256 private constant CURRENCY_OFFSET        = 48;
     uint256 private constant VAULT_ADDRESS_OFFSET   = 64;
@@ -71,6 +79,9 @@ library Emitter {
     uint256 private constant FCASH_FLAG_OFFSET      = 64;
     uint256 private constant NEGATIVE_FCASH_MASK    = 1 << 64;
 
+    uint8 private constant COMPACT_TRANSFER_SINGLE  = 2;
+    uint8 private constant COMPACT_TRANSFER_BATCH   = 3;
+
     function decodeCurrencyId(uint256 id) internal pure returns (uint16) {
         return uint16(id >> CURRENCY_OFFSET);
     }
@@ -192,6 +203,41 @@ library Emitter {
         return (ids, values);
     }
 
+    /// @notice Emits an ERC1155 TransferSingle. In compact mode appends the record
+    /// [uint8(2), address(operator), address(from), address(to), uint256(id), uint256(value)] instead.
+    function _transferSingle(
+        bytes memory transfers, address from, address to, uint256 id, uint256 value
+    ) private returns (bytes memory) {
+        if (!Deployments.COMPACT_EVENTS) {
+            emit TransferSingle(msg.sender, from, to, id, value);
+            return transfers;
+        }
+
+        return abi.encodePacked(transfers, COMPACT_TRANSFER_SINGLE, msg.sender, from, to, id, value);
+    }
+
+    /// @notice Emits an ERC1155 TransferBatch. In compact mode appends the record [uint8(3), address(operator),
+    /// address(from), address(to), uint8(length), uint256[] ids, uint256[] values] instead.
+    function _transferBatch(
+        bytes memory transfers, address from, address to, uint256[] memory ids, uint256[] memory values
+    ) private returns (bytes memory) {
+        if (!Deployments.COMPACT_EVENTS) {
+            emit TransferBatch(msg.sender, from, to, ids, values);
+            return transfers;
+        }
+
+        // Batches emitted here are always pairs of ids and values
+        return abi.encodePacked(
+            transfers, COMPACT_TRANSFER_BATCH, msg.sender, from, to, uint8(ids.length), ids, values
+        );
+    }
+
+    /// @notice Emits all records appended by a single emit method in one log. Outside of compact mode
+    /// nothing is ever appended and no log is emitted.
+    function _emitCompact(bytes memory transfers) private {
+        if (transfers.length > 0) emit CompactTransfers(transfers);
+    }
+
     /// @notice Emits a pair of fCash mints. fCash is only ever created or destroyed via these pairs and then
     /// the positive side is bought or sold.
     function emitChangefCashLiquidity(
@@ -201,30 +247,40 @@ library Emitter {
         address from; address to;
         if (netDebtChange < 0) from = account; // burning
         else to = account; // minting
-        emit TransferBatch(msg.sender, from, to, ids, values);
+        _emitCompact(_transferBatch("", from, to, ids, values));
     }
 
     /// @notice Transfers positive fCash between accounts
     function emitTransferfCash(
         address from, address to, uint16 currencyId, uint256 maturity, int256 amount
     ) internal {
-        if (amount == 0) return;
+        _emitCompact(_transferfCash("", from, to, currencyId, maturity, amount));
+    }
+
+    function _transferfCash(
+        bytes memory transfers, address from, address to, uint16 currencyId, uint256 maturity, int256 amount
+    ) private returns (bytes memory) {
+        if (amount == 0) return transfers;
         uint256 id = _posfCashId(currencyId, maturity);
         // If the amount is negative, then swap the direction of the transfer. We only ever emit
         // transfers of positive fCash. Negative fCash is minted on an account and never transferred.
         if (amount < 0) (from, to) = (to, from);
 
-        emit TransferSingle(msg.sender, from, to, id, uint256(amount.abs()));
+        return _transferSingle(transfers, from, to, id, uint256(amount.abs()));
     }
 
     function emitBatchTransferfCash(
         address from, address to, PortfolioAsset[] memory assets
     ) internal {
         uint256 len = assets.length;
+        bytes memory transfers;
         // Emit single events since it's unknown if all of the notional values are positive or negative.
         for (uint256 i; i < len; i++) {
-            emitTransferfCash(from, to, assets[i].currencyId, assets[i].maturity, assets[i].notional);
+            transfers = _transferfCash(
+                transfers, from, to, assets[i].currencyId, assets[i].maturity, assets[i].notional
+            );
         }
+        _emitCompact(transfers);
     }
 
     /// @notice When fCash is settled, cash or debt is transferred from the "settlement reserve" to the account
@@ -236,7 +292,7 @@ library Emitter {
         // opposing positive fCash pair.
         uint256 id = _posfCashId(currencyId, maturity);
         if (fCashSettled < 0) id = id | NEGATIVE_FCASH_MASK;
-        emit TransferSingle(msg.sender, account, address(0), id, uint256(fCashSettled.abs()));
+        _emitCompact(_transferSingle("", account, address(0), id, uint256(fCashSettled.abs())));
 
         // NOTE: zero values will emit a pCash event
         ITransferEmitter proxy = _getPrimeProxy(pCashOrDebtValue < 0, currencyId);
@@ -253,7 +309,9 @@ library Emitter {
         int256 excessCash
     ) internal {
         uint256 id = _posfCashId(currencyId, maturity) | NEGATIVE_FCASH_MASK;
-        emit TransferSingle(msg.sender, Constants.SETTLEMENT_RESERVE, address(0), id, uint256(fCashDebtInReserve.abs()));
+        _emitCompact(
+            _transferSingle("", Constants.SETTLEMENT_RESERVE, address(0), id, uint256(fCashDebtInReserve.abs()))
+        );
         // The settled prime debt doesn't exist in this case since we don't add the debt to the
         // total prime debt so we just "burn" the prime cash that only exists in an off chain accounting context.
         emitMintOrBurnPrimeCash(Constants.SETTLEMENT_RESERVE, currencyId, settledPrimeCash);
@@ -290,7 +348,7 @@ library Emitter {
         // When lending (fCashPurchased > 0), the nToken transfers positive fCash to the
         // account. When the borrowing (fCashPurchased < 0), the account transfers positive fCash to the
         // nToken. emitTransferfCash will flip the from and to accordingly.
-        emitTransferfCash(nToken, account, currencyId, maturity, fCashPurchased);
+        _emitCompact(_transferfCash("", nToken, account, currencyId, maturity, fCashPurchased));
     }
 
     /// @notice When underlying tokens are deposited, prime cash is minted. When underlying tokens are
@@ -379,6 +437,7 @@ library Emitter {
     ) internal {
         uint256[] memory ids = new uint256[](2);
         uint256[] memory values = new uint256[](2);
+        bytes memory transfers;
         uint256 baseId = _encodeVaultId(vaultConfig.vault, vaultConfig.borrowCurrencyId, prior.maturity, 0);
         ids[0] = baseId | Constants.VAULT_DEBT_ASSET_TYPE;
         ids[1] = baseId | Constants.VAULT_SHARE_ASSET_TYPE;
@@ -387,7 +446,7 @@ library Emitter {
             // Account has been closed, settled or rolled to a new maturity. Emit burn events for the prior maturity's data.
             values[0] = prior.accountDebt;
             values[1] = prior.vaultShares;
-            emit TransferBatch(msg.sender, vaultAccount.account, address(0), ids, values);
+            transfers = _transferBatch(transfers, vaultAccount.account, address(0), ids, values);
         } else if (vaultAccount.maturity == prior.maturity) {
             // Majority of the time, vault accounts will either burn or mint vault shares and debt at the same time. However,
             // when an account sells vault shares to pay down a secondary debt without paying down any primary
@@ -397,13 +456,13 @@ library Emitter {
             if (isBurn) {
                 values[0] = newDebtStorageValue < uint256(prior.accountDebt) ? prior.accountDebt - newDebtStorageValue : 0;
                 values[1] = uint256(prior.vaultShares).sub(vaultAccount.vaultShares);
-                emit TransferBatch(msg.sender, vaultAccount.account, address(0), ids, values);
+                transfers = _transferBatch(transfers, vaultAccount.account, address(0), ids, values);
             }
 
             if (!isBurn || prior.accountDebt < newDebtStorageValue) {
                 values[0] = newDebtStorageValue.sub(prior.accountDebt);
                 values[1] = prior.vaultShares < vaultAccount.vaultShares ? vaultAccount.vaultShares.sub(prior.vaultShares) : 0;
-                emit TransferBatch(msg.sender, address(0), vaultAccount.account, ids, values);
+                transfers = _transferBatch(transfers, address(0), vaultAccount.account, ids, values);
             }
         }
 
@@ -415,13 +474,13 @@ library Emitter {
             ids[1] = newBaseId | Constants.VAULT_SHARE_ASSET_TYPE;
             values[0] = newDebtStorageValue;
             values[1] = vaultAccount.vaultShares;
-            emit TransferBatch(msg.sender, address(0), vaultAccount.account, ids, values);
+            transfers = _transferBatch(transfers, address(0), vaultAccount.account, ids, values);
         }
 
         if (prior.primaryCash != 0) {
             // Cash must always be burned in this method from the prior maturity
-            emit TransferSingle(
-                msg.sender,
+            transfers = _transferSingle(
+                transfers,
                 vaultAccount.account,
                 address(0),
                 baseId | Constants.VAULT_CASH_ASSET_TYPE,
@@ -429,6 +488,7 @@ library Emitter {
             );
         }
 
+        _emitCompact(transfers);
     }
 
     /// @notice Emits events during a vault deleverage, where a vault account receives cash and loses
@@ -453,21 +513,21 @@ library Emitter {
             int256 primeDebtStorage = PrimeRateLib.convertToStorageValue(pr, depositAmountPrimeCash.neg()).neg();
             if (primeDebtStorage == -1) primeDebtStorage = 0;
 
-            emit TransferSingle(
-                msg.sender,
+            _emitCompact(_transferSingle(
+                "",
                 account,
                 address(0),
                 baseId | Constants.VAULT_DEBT_ASSET_TYPE,
                 primeDebtStorage.toUint()
-            );
+            ));
         } else {
-            emit TransferSingle(
-                msg.sender,
+            _emitCompact(_transferSingle(
+                "",
                 address(0),
                 account,
                 baseId | Constants.VAULT_CASH_ASSET_TYPE,
                 depositAmountPrimeCash.toUint()
-            );
+            ));
         }
     }
 
@@ -483,9 +543,7 @@ library Emitter {
         uint256 vaultSharesId = _encodeVaultId(
             vault, vaultSharesCurrencyId, maturity, Constants.VAULT_SHARE_ASSET_TYPE
         );
-        emit TransferSingle(
-            msg.sender, account, liquidator, vaultSharesId, vaultSharesToLiquidator
-        );
+        _emitCompact(_transferSingle("", account, liquidator, vaultSharesId, vaultSharesToLiquidator));
     }
 
     /// @notice Emits events for primary cash burned on a vault account.
@@ -504,7 +562,7 @@ library Emitter {
         ids[1] = baseId | Constants.VAULT_CASH_ASSET_TYPE;
         values[0] = fCash.toUint();
         values[1] = vaultCash.toUint();
-        emit TransferBatch(msg.sender, account, address(0), ids, values);
+        _emitCompact(_transferBatch("", account, address(0), ids, values));
     }
 
     /// @notice A set of spurious events to record a direct transfer between vaults and an account
@@ -543,7 +601,7 @@ library Emitter {
         }
 
         uint256 value = uint256(netVaultCash.abs());
-        emit TransferSingle(msg.sender, from, to, id, value);
+        _emitCompact(_transferSingle("", from, to, id, value));
     }
 
     /// @notice Emits an event where the vault borrows or repays secondary debt
@@ -567,6 +625,6 @@ library Emitter {
             from = address(0); to = account;
          }
 
-        emit TransferSingle(msg.sender, from, to, id, uint256(vaultDebtAmount.abs()));
+        _emitCompact(_transferSingle("", from, to, id, uint256(vaultDebtAmount.abs())));
     }
 }
\ No newline at end of file
@@ -518,6 +518,19 @@ library BalanceHandler {
         _loadBalanceState(balanceState, account, currencyId, accountContext);
     }
 
+    /// @notice Loads the balance state using a prime rate from a memo indexed by currency id, see
+    /// PrimeRateLib.buildPrimeRateStateful
+    function loadBalanceState(
+        BalanceState memory balanceState,
+        address account,
+        uint16 currencyId,
+        AccountContext memory accountContext,
+        PrimeRate[] memory primeRates
+    ) internal {
+        balanceState.primeRate = PrimeRateLib.buildPrimeRateStateful(primeRates, currencyId);
+        _loadBalanceState(balanceState, account, currencyId, accountContext);
+    }
+
     function loadBalanceStateView(
         BalanceState memory balanceState,
         address account,
@@ -21,6 +21,7 @@ import {ExchangeRate} from "../valuation/ExchangeRate.sol";
 import {BalanceHandler} from "../balances/BalanceHandler.sol";
 import {TokenHandler} from "../balances/TokenHandler.sol";
 import {PrimeRateLib} from "../pCash/PrimeRateLib.sol";
+import {FreeCollateral} from "../valuation/FreeCollateral.sol";
 import {FreeCollateralExternal} from "../../external/FreeCollateralExternal.sol";
 
 library LiquidationHelpers {
@@ -46,11 +47,7 @@ library LiquidationHelpers {
             PortfolioState memory
         )
     {
-        // Cannot liquidate yourself
-        require(msg.sender != liquidateAccount);
-        require(localCurrency != 0);
-        // Collateral currency must be unset or not equal to the local currency
-        require(collateralCurrency != localCurrency);
+        _checkLiquidationCurrencies(liquidateAccount, localCurrency, collateralCurrency);
         (
             AccountContext memory accountContext,
             LiquidationFactors memory factors,
@@ -61,6 +58,71 @@ library LiquidationHelpers {
                 localCurrency,
                 collateralCurrency
             );
+
+        return _postLiquidationFactors(liquidateAccount, accountContext, factors, portfolio);
+    }
+
+    /// @notice Version of preLiquidationActions used when liquidating many accounts in a single transaction,
+    /// reads prime rates, cash groups and ETH rates from a cache returned by FreeCollateralExternal.getLiquidationCache.
+    /// Returns the updated cache which must be passed in when liquidating the next account.
+    function preLiquidationActions(
+        address liquidateAccount,
+        uint16 localCurrency,
+        uint16 collateralCurrency,
+        FreeCollateral.FreeCollateralCache memory cache
+    )
+        internal
+        returns (
+            AccountContext memory,
+            LiquidationFactors memory,
+            PortfolioState memory,
+            FreeCollateral.FreeCollateralCache memory
+        )
+    {
+        _checkLiquidationCurrencies(liquidateAccount, localCurrency, collateralCurrency);
+        AccountContext memory accountContext;
+        LiquidationFactors memory factors;
+        PortfolioAsset[] memory portfolio;
+        (accountContext, factors, portfolio, cache) = FreeCollateralExternal.getLiquidationFactors(
+            liquidateAccount,
+            localCurrency,
+            collateralCurrency,
+            cache
+        );
+
+        (
+            AccountContext memory context,
+            LiquidationFactors memory postFactors,
+            PortfolioState memory portfolioState
+        ) = _postLiquidationFactors(liquidateAccount, accountContext, factors, portfolio);
+        return (context, postFactors, portfolioState, cache);
+    }
+
+    function _checkLiquidationCurrencies(
+        address liquidateAccount,
+        uint16 localCurrency,
+        uint16 collateralCurrency
+    ) private view {
+        // Cannot liquidate yourself
+        require(msg.sender != liquidateAccount);
+        require(localCurrency != 0);
+        // Collateral currency must be unset or not equal to the local currency
+        require(collateralCurrency != localCurrency);
+    }
+
+    function _postLiquidationFactors(
+        address liquidateAccount,
+        AccountContext memory accountContext,
+        LiquidationFactors memory factors,
+        PortfolioAsset[] memory portfolio
+    )
+        private
+        returns (
+            AccountContext memory,
+            LiquidationFactors memory,
+            PortfolioState memory
+        )
+    {
         // Set the account context here to ensure that the context is up to date during
         // calculation methods
         accountContext.setAccountContext(liquidateAccount);
@@ -213,12 +275,31 @@ library LiquidationHelpers {
         int256 netLocalFromLiquidator,
         int256 netLocalNTokens
     ) internal returns (AccountContext memory) {
+        (AccountContext memory liquidatorContext, BalanceState memory liquidatorLocalBalance) =
+            depositLiquidatorLocal(liquidator, localCurrencyId, netLocalFromLiquidator);
+
+        emitLiquidatorLocalTransfers(
+            liquidateAccount, liquidator, localCurrencyId, netLocalFromLiquidator, netLocalNTokens
+        );
+
+        liquidatorLocalBalance.netNTokenTransfer = netLocalNTokens;
+        liquidatorLocalBalance.finalizeNoWithdraw(liquidator, liquidatorContext);
+
+        return liquidatorContext;
+    }
+
+    /// @notice Deposits the local currency owed by the liquidator, returns the liquidator's account context
+    /// and local balance state which must be finalized by the caller. When liquidating many accounts this is
+    /// called once with the sum owed across all of the accounts.
+    function depositLiquidatorLocal(
+        address liquidator,
+        uint16 localCurrencyId,
+        int256 netLocalFromLiquidator
+    ) internal returns (AccountContext memory liquidatorContext, BalanceState memory liquidatorLocalBalance) {
         // Liquidator must deposit netLocalFromLiquidator, in the case of a repo discount then the
         // liquidator will receive some positive amount
         Token memory token = TokenHandler.getUnderlyingToken(localCurrencyId);
-        AccountContext memory liquidatorContext =
-            AccountContextHandler.getAccountContext(liquidator);
-        BalanceState memory liquidatorLocalBalance;
+        liquidatorContext = AccountContextHandler.getAccountContext(liquidator);
         liquidatorLocalBalance.loadBalanceState(liquidator, localCurrencyId, liquidatorContext);
         // netLocalFromLiquidator is always positive. Liquidity token liquidation allows for a negative
         // netLocalFromLiquidator, but we do not allow regular accounts to hold liquidity tokens so those
@@ -244,14 +325,38 @@ library LiquidationHelpers {
                 false // excess ETH is returned to liquidator natively
             );
         }
+    }
 
+    /// @notice Emits the local prime cash transfer from the liquidator to the liquidated account, which is emitted
+    /// even when it is zero, and any local nTokens transferred to the liquidator.
+    function emitLiquidatorLocalTransfers(
+        address liquidateAccount,
+        address liquidator,
+        uint16 localCurrencyId,
+        int256 netLocalFromLiquidator,
+        int256 netLocalNTokens
+    ) internal {
         Emitter.emitTransferPrimeCash(liquidator, liquidateAccount, localCurrencyId, netLocalFromLiquidator);
         if (netLocalNTokens > 0) Emitter.emitTransferNToken(liquidateAccount, liquidator, localCurrencyId, netLocalNTokens);
+    }
 
-        liquidatorLocalBalance.netNTokenTransfer = netLocalNTokens;
-        liquidatorLocalBalance.finalizeNoWithdraw(liquidator, liquidatorContext);
-
-        return liquidatorContext;
+    /// @notice Emits collateral prime cash and nToken transfers from the liquidated account to the liquidator, a
+    /// negative prime cash amount is a transfer from the liquidator to the liquidated account.
+    function emitLiquidatorTransfers(
+        address liquidateAccount,
+        address liquidator,
+        uint16 currencyId,
+        int256 netPrimeCashToLiquidator,
+        int256 netNTokensToLiquidator
+    ) internal {
+        if (netPrimeCashToLiquidator < 0) {
+            Emitter.emitTransferPrimeCash(liquidator, liquidateAccount, currencyId, netPrimeCashToLiquidator.neg());
+        } else if (netPrimeCashToLiquidator > 0) {
+            Emitter.emitTransferPrimeCash(liquidateAccount, liquidator, currencyId, netPrimeCashToLiquidator);
+        }
+        if (netNTokensToLiquidator != 0) {
+            Emitter.emitTransferNToken(liquidateAccount, liquidator, currencyId, netNTokensToLiquidator);
+        }
     }
 
     function finalizeLiquidatorCollateral(
@@ -263,15 +368,38 @@ library LiquidationHelpers {
         int256 netCollateralNTokens,
         bool withdrawCollateral,
         bool redeemToUnderlying
+    ) internal returns (AccountContext memory) {
+        emitLiquidatorTransfers(
+            liquidateAccount, liquidator, collateralCurrencyId, netCollateralToLiquidator, netCollateralNTokens
+        );
+
+        return finalizeLiquidatorCollateralBalance(
+            liquidator,
+            liquidatorContext,
+            collateralCurrencyId,
+            netCollateralToLiquidator,
+            netCollateralNTokens,
+            withdrawCollateral,
+            redeemToUnderlying
+        );
+    }
+
+    /// @notice Credits collateral to the liquidator without emitting transfers, when liquidating many accounts
+    /// transfers are emitted per account and this is called once with the sum across all of the accounts.
+    function finalizeLiquidatorCollateralBalance(
+        address liquidator,
+        AccountContext memory liquidatorContext,
+        uint16 collateralCurrencyId,
+        int256 netCollateralToLiquidator,
+        int256 netCollateralNTokens,
+        bool withdrawCollateral,
+        bool redeemToUnderlying
     ) internal returns (AccountContext memory) {
         require(redeemToUnderlying, "Deprecated: Redeem to cToken");
         BalanceState memory balance;
         balance.loadBalanceState(liquidator, collateralCurrencyId, liquidatorContext);
         balance.netCashChange = netCollateralToLiquidator;
 
-        if (netCollateralToLiquidator != 0) Emitter.emitTransferPrimeCash(liquidateAccount, liquidator, collateralCurrencyId, netCollateralToLiquidator);
-        if (netCollateralNTokens != 0) Emitter.emitTransferNToken(liquidateAccount, liquidator, collateralCurrencyId, netCollateralNTokens);
-
         if (withdrawCollateral) {
             // This will net off the cash balance
             balance.primeCashWithdraw = netCollateralToLiquidator.neg();
@@ -116,7 +116,21 @@ library PrimeRateLib {
         uint256 blockTime
     ) internal returns (int256 signedPrimeSupplyValue) {
         PrimeRate memory settledPrimeRate = buildPrimeRateSettlementStateful(currencyId, maturity, blockTime);
+        return convertSettledfCash(
+            presentPrimeRate, settledPrimeRate, account, currencyId, maturity, fCashBalance
+        );
+    }
 
+    /// @notice Converts settled fCash to the current signed prime supply value given a settlement
+    /// rate that has already been loaded or set
+    function convertSettledfCash(
+        PrimeRate memory presentPrimeRate,
+        PrimeRate memory settledPrimeRate,
+        address account,
+        uint16 currencyId,
+        uint256 maturity,
+        int256 fCashBalance
+    ) internal returns (int256 signedPrimeSupplyValue) {
         int256 settledPrimeStorageValue;
         (signedPrimeSupplyValue, settledPrimeStorageValue) = _convertSettledfCash(
             presentPrimeRate, settledPrimeRate, fCashBalance
@@ -346,6 +360,19 @@ library PrimeRateLib {
         return PrimeCashExchangeRate.getPrimeCashRateStateful(currencyId, block.timestamp);
     }
 
+    /// @notice Returns a prime rate accrued up to the current time from a memo of prime rates
+    /// indexed by currency id, building it on the first lookup. Prime rates do not change once
+    /// they have been accrued in a block. Currency ids outside of the memo are built on every call.
+    function buildPrimeRateStateful(
+        PrimeRate[] memory memo,
+        uint16 currencyId
+    ) internal returns (PrimeRate memory pr) {
+        if (currencyId < memo.length && memo[currencyId].supplyFactor != 0) return memo[currencyId];
+
+        pr = buildPrimeRateStateful(currencyId);
+        if (currencyId < memo.length) memo[currencyId] = pr;
+    }
+
     /// @notice Returns a prime rate object for settlement at a particular maturity
     function buildPrimeRateSettlementView(
         uint16 currencyId,
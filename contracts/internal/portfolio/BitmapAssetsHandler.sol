@@ -194,9 +194,7 @@ library BitmapAssetsHandler {
 
             if (pv < 0) hasDebt = true;
 
-            // Turn off the bit and look for the next one
-            assetsBitmap = assetsBitmap.setBit(bitNum, false);
-            bitNum = assetsBitmap.getNextBitNum();
+            bitNum = assetsBitmap.getNextBitNumAfter(bitNum);
         }
     }
 
@@ -244,9 +242,7 @@ library BitmapAssetsHandler {
             asset.notional = notional;
             index += 1;
 
-            // Turn off the bit and look for the next one
-            assetsBitmap = assetsBitmap.setBit(bitNum, false);
-            bitNum = assetsBitmap.getNextBitNum();
+            bitNum = assetsBitmap.getNextBitNumAfter(bitNum);
         }
 
         return assets;
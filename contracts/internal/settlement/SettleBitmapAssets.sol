@@ -11,6 +11,7 @@ import {Bitmap} from "../../math/Bitmap.sol";
 import {DateTime} from "../markets/DateTime.sol";
 import {PrimeRateLib} from "../pCash/PrimeRateLib.sol";
 import {BitmapAssetsHandler} from "../portfolio/BitmapAssetsHandler.sol";
+import {SettlementCache} from "./SettlementCache.sol";
 
 /**
  * Settles a bitmap portfolio by checking for all matured fCash assets and turning them into cash
@@ -24,6 +25,7 @@ library SettleBitmapAssets {
     using PrimeRateLib for PrimeRate;
     using SafeInt256 for int256;
     using Bitmap for bytes32;
+    using SettlementCache for SettlementCache.SettlementRates;
 
     /// @notice Given a bitmap for a cash group and timestamps, will settle all assets
     /// that have matured and remap the bitmap to correspond to the current time.
@@ -33,6 +35,21 @@ library SettleBitmapAssets {
         uint256 oldSettleTime,
         uint256 blockTime,
         PrimeRate memory presentPrimeRate
+    ) internal returns (int256 positiveSettledCash, int256 negativeSettledCash, uint256 newSettleTime) {
+        SettlementCache.SettlementRates memory cache;
+        return settleBitmappedCashGroup(
+            account, currencyId, oldSettleTime, blockTime, presentPrimeRate, cache
+        );
+    }
+
+    /// @notice Settles a bitmap portfolio, reading settlement rates through the cache
+    function settleBitmappedCashGroup(
+        address account,
+        uint16 currencyId,
+        uint256 oldSettleTime,
+        uint256 blockTime,
+        PrimeRate memory presentPrimeRate,
+        SettlementCache.SettlementRates memory cache
     ) internal returns (int256 positiveSettledCash, int256 negativeSettledCash, uint256 newSettleTime) {
         bytes32 bitmap = BitmapAssetsHandler.getAssetsBitmap(account, currencyId);
 
@@ -53,7 +70,9 @@ library SettleBitmapAssets {
         uint256 nextBitNum = bitmap.getNextBitNum();
         while (nextBitNum != 0 && nextBitNum <= lastSettleBit) {
             uint256 maturity = DateTime.getMaturityFromBitNum(oldSettleTime, nextBitNum);
-            int256 settledPrimeCash = _settlefCashAsset(account, currencyId, maturity, blockTime, presentPrimeRate);
+            int256 settledPrimeCash = _settlefCashAsset(
+                account, currencyId, maturity, blockTime, presentPrimeRate, cache
+            );
 
             // Split up positive and negative amounts so that total prime debt can be properly updated later
             if (settledPrimeCash > 0) {
@@ -62,9 +81,7 @@ library SettleBitmapAssets {
                 negativeSettledCash = negativeSettledCash.add(settledPrimeCash);
             }
 
-            // Turn the bit off now that it is settled
-            bitmap = bitmap.setBit(nextBitNum, false);
-            nextBitNum = bitmap.getNextBitNum();
+            nextBitNum = bitmap.getNextBitNumAfter(nextBitNum);
         }
 
         bytes32 newBitmap;
@@ -75,9 +92,7 @@ library SettleBitmapAssets {
 
             newBitmap = newBitmap.setBit(newBitNum, true);
 
-            // Turn the bit off now that it is remapped
-            bitmap = bitmap.setBit(nextBitNum, false);
-            nextBitNum = bitmap.getNextBitNum();
+            nextBitNum = bitmap.getNextBitNumAfter(nextBitNum);
         }
 
         BitmapAssetsHandler.setAssetsBitmap(account, currencyId, newBitmap);
@@ -90,7 +105,8 @@ library SettleBitmapAssets {
         uint16 currencyId,
         uint256 maturity,
         uint256 blockTime,
-        PrimeRate memory presentPrimeRate
+        PrimeRate memory presentPrimeRate,
+        SettlementCache.SettlementRates memory cache
     ) private returns (int256 signedPrimeSupplyValue) {
         mapping(address => mapping(uint256 =>
             mapping(uint256 => ifCashStorage))) storage store = LibStorage.getifCashBitmapStorage();
@@ -98,8 +114,8 @@ library SettleBitmapAssets {
         
         // Gets the current settlement rate or will store a new settlement rate if it does not
         // yet exist.
-        signedPrimeSupplyValue = presentPrimeRate.convertSettledfCash(
-            account, currencyId, maturity, notional, blockTime
+        signedPrimeSupplyValue = cache.convertSettledfCash(
+            presentPrimeRate, account, currencyId, maturity, notional, blockTime
         );
 
         delete store[account][currencyId][maturity];
@@ -10,6 +10,7 @@ import {PortfolioAsset, AssetHandler} from "../valuation/AssetHandler.sol";
 import {Market, MarketParameters} from "../markets/Market.sol";
 import {PortfolioState, PortfolioHandler} from "../portfolio/PortfolioHandler.sol";
 import {PrimeRateLib} from "../pCash/PrimeRateLib.sol";
+import {SettlementCache} from "./SettlementCache.sol";
 
 library SettlePortfolioAssets {
     using SafeInt256 for int256;
@@ -17,11 +18,13 @@ library SettlePortfolioAssets {
     using Market for MarketParameters;
     using PortfolioHandler for PortfolioState;
     using AssetHandler for PortfolioAsset;
+    using SettlementCache for SettlementCache.SettlementRates;
 
     /// @dev Returns a SettleAmount array for the assets that will be settled
     function _getSettleAmountArray(
         PortfolioState memory portfolioState,
-        uint256 blockTime
+        uint256 blockTime,
+        SettlementCache.SettlementRates memory cache
     ) private returns (SettleAmount[] memory) {
         uint256 currenciesSettled;
         uint16 lastCurrencyId = 0;
@@ -47,7 +50,7 @@ library SettlePortfolioAssets {
         SettleAmount[] memory settleAmounts = new SettleAmount[](currenciesSettled);
         if (currenciesSettled > 0) {
             settleAmounts[0].currencyId = lastCurrencyId;
-            settleAmounts[0].presentPrimeRate = PrimeRateLib.buildPrimeRateStateful(lastCurrencyId);
+            settleAmounts[0].presentPrimeRate = cache.getPresentPrimeRate(lastCurrencyId);
         }
 
         return settleAmounts;
@@ -59,7 +62,18 @@ library SettlePortfolioAssets {
         PortfolioState memory portfolioState,
         uint256 blockTime
     ) internal returns (SettleAmount[] memory) {
-        SettleAmount[] memory settleAmounts = _getSettleAmountArray(portfolioState, blockTime);
+        SettlementCache.SettlementRates memory cache;
+        return settlePortfolio(account, portfolioState, blockTime, cache);
+    }
+
+    /// @notice Settles a portfolio array, reading prime rates and settlement rates through the cache
+    function settlePortfolio(
+        address account,
+        PortfolioState memory portfolioState,
+        uint256 blockTime,
+        SettlementCache.SettlementRates memory cache
+    ) internal returns (SettleAmount[] memory) {
+        SettleAmount[] memory settleAmounts = _getSettleAmountArray(portfolioState, blockTime, cache);
         if (settleAmounts.length == 0) return settleAmounts;
         uint256 settleAmountIndex;
 
@@ -74,15 +88,15 @@ library SettlePortfolioAssets {
                 settleAmountIndex += 1;
                 settleAmounts[settleAmountIndex].currencyId = asset.currencyId;
                 settleAmounts[settleAmountIndex].presentPrimeRate =
-                    PrimeRateLib.buildPrimeRateStateful(asset.currencyId);
+                    cache.getPresentPrimeRate(asset.currencyId);
             }
             SettleAmount memory sa = settleAmounts[settleAmountIndex];
 
             // Only the nToken is allowed to hold liquidity tokens
             require(asset.assetType == Constants.FCASH_ASSET_TYPE);
             // Gets or sets the settlement rate, only do this before settling fCash
-            int256 primeCash = sa.presentPrimeRate.convertSettledfCash(
-                account, asset.currencyId, asset.maturity, asset.notional, blockTime
+            int256 primeCash = cache.convertSettledfCash(
+                sa.presentPrimeRate, account, asset.currencyId, asset.maturity, asset.notional, blockTime
             );
             portfolioState.deleteAsset(i);
 
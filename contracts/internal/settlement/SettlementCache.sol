@@ -0,0 +1,84 @@
+// SPDX-License-Identifier: BSUL-1.1
+pragma solidity =0.7.6;
+pragma abicoder v2;
+
+import {PrimeRate} from "../../global/Types.sol";
+import {PrimeRateLib} from "../pCash/PrimeRateLib.sol";
+
+/// @notice Memory cache of present prime rates and prime settlement rates used when settling many
+/// accounts in a single transaction. Present prime rates do not change once they have been accrued in
+/// a block and settlement rates do not change once they are set, so every account settled against
+/// the cache sees exactly the same values it would have read from storage. An empty cache (zero length
+/// arrays) reads from storage on every lookup.
+library SettlementCache {
+    using PrimeRateLib for PrimeRate;
+
+    // Number of (currency, maturity) settlement rates held in memory, lookups past this are not cached
+    uint256 internal constant MAX_SETTLEMENT_RATES = 32;
+
+    struct SettlementRates {
+        // Indexed by currency id, a zero supply factor marks a rate that has not been loaded
+        PrimeRate[] presentPrimeRates;
+        // Keyed by currencyId << 40 | maturity, in the order they were loaded
+        uint256[] settlementKeys;
+        PrimeRate[] settlementRates;
+        uint256 numSettlementRates;
+    }
+
+    function newSettlementRates(uint16 maxCurrencyId) internal pure returns (SettlementRates memory c) {
+        c.presentPrimeRates = new PrimeRate[](uint256(maxCurrencyId) + 1);
+        c.settlementKeys = new uint256[](MAX_SETTLEMENT_RATES);
+        c.settlementRates = new PrimeRate[](MAX_SETTLEMENT_RATES);
+    }
+
+    /// @notice Returns the prime rate accrued to the current block, accruing it on the first lookup
+    function getPresentPrimeRate(
+        SettlementRates memory c,
+        uint16 currencyId
+    ) internal returns (PrimeRate memory pr) {
+        if (c.presentPrimeRates.length <= currencyId) return PrimeRateLib.buildPrimeRateStateful(currencyId);
+
+        pr = c.presentPrimeRates[currencyId];
+        if (pr.supplyFactor == 0) {
+            pr = PrimeRateLib.buildPrimeRateStateful(currencyId);
+            c.presentPrimeRates[currencyId] = pr;
+        }
+    }
+
+    /// @notice Returns the settlement rate for a maturity, setting it in storage if it does not exist
+    function getSettlementRate(
+        SettlementRates memory c,
+        uint16 currencyId,
+        uint256 maturity,
+        uint256 blockTime
+    ) internal returns (PrimeRate memory pr) {
+        uint256 key = (uint256(currencyId) << 40) | maturity;
+        for (uint256 i; i < c.numSettlementRates; i++) {
+            if (c.settlementKeys[i] == key) return c.settlementRates[i];
+        }
+
+        pr = PrimeRateLib.buildPrimeRateSettlementStateful(currencyId, maturity, blockTime);
+        if (c.numSettlementRates < c.settlementKeys.length) {
+            c.settlementKeys[c.numSettlementRates] = key;
+            c.settlementRates[c.numSettlementRates] = pr;
+            c.numSettlementRates += 1;
+        }
+    }
+
+    /// @notice Converts settled fCash to the current signed prime supply value using the cached
+    /// settlement rate, see PrimeRateLib.convertSettledfCash
+    function convertSettledfCash(
+        SettlementRates memory c,
+        PrimeRate memory presentPrimeRate,
+        address account,
+        uint16 currencyId,
+        uint256 maturity,
+        int256 fCashBalance,
+        uint256 blockTime
+    ) internal returns (int256 signedPrimeSupplyValue) {
+        PrimeRate memory settledPrimeRate = getSettlementRate(c, currencyId, maturity, blockTime);
+        return presentPrimeRate.convertSettledfCash(
+            settledPrimeRate, account, currencyId, maturity, fCashBalance
+        );
+    }
+}
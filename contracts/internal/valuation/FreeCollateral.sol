@@ -46,6 +46,86 @@ library FreeCollateral {
         PortfolioAsset[] portfolio;
         PrimeRate primeRate;
         nTokenPortfolio nToken;
+        FreeCollateralCache cache;
+    }
+
+    /// @notice Per currency values shared by all accounts in a batch view at the same block time,
+    /// arrays are indexed by currency id. Currencies outside of the arrays are not cached, an empty
+    /// cache (zero length arrays) disables caching.
+    struct FreeCollateralCache {
+        PrimeRate[] primeRates;
+        CashGroupParameters[] cashGroups;
+        ETHRate[] ethRates;
+        int256[] nTokenPrimePV;
+        int256[] nTokenTotalSupply;
+        bytes6[] nTokenParameters;
+    }
+
+    /// @notice Allocates a cache for currency ids up to and including maxCurrencyId
+    function newFreeCollateralCache(uint16 maxCurrencyId) internal pure returns (FreeCollateralCache memory cache) {
+        uint256 size = uint256(maxCurrencyId) + 1;
+        cache.primeRates = new PrimeRate[](size);
+        cache.cashGroups = new CashGroupParameters[](size);
+        cache.ethRates = new ETHRate[](size);
+        cache.nTokenPrimePV = new int256[](size);
+        cache.nTokenTotalSupply = new int256[](size);
+        cache.nTokenParameters = new bytes6[](size);
+    }
+
+    function _buildPrimeRateView(
+        FreeCollateralFactors memory factors,
+        uint16 currencyId,
+        uint256 blockTime
+    ) private view returns (PrimeRate memory pr) {
+        PrimeRate[] memory primeRates = factors.cache.primeRates;
+        if (primeRates.length <= currencyId || primeRates[currencyId].supplyFactor == 0) {
+            (pr, /* */) = PrimeCashExchangeRate.getPrimeCashRateView(currencyId, blockTime);
+            if (currencyId < primeRates.length) primeRates[currencyId] = pr;
+        } else {
+            pr = primeRates[currencyId];
+        }
+    }
+
+    function _buildCashGroupView(
+        FreeCollateralFactors memory factors,
+        uint16 currencyId
+    ) private view returns (CashGroupParameters memory cashGroup) {
+        CashGroupParameters[] memory cashGroups = factors.cache.cashGroups;
+        if (cashGroups.length <= currencyId || cashGroups[currencyId].currencyId == 0) {
+            cashGroup = CashGroup.buildCashGroupView(currencyId);
+            if (currencyId < cashGroups.length) cashGroups[currencyId] = cashGroup;
+        } else {
+            cashGroup = cashGroups[currencyId];
+        }
+    }
+
+    function _buildCashGroupStateful(
+        FreeCollateralFactors memory factors,
+        uint16 currencyId
+    ) private returns (CashGroupParameters memory cashGroup) {
+        CashGroupParameters[] memory cashGroups = factors.cache.cashGroups;
+        if (cashGroups.length <= currencyId || cashGroups[currencyId].currencyId == 0) {
+            cashGroup = CashGroup.buildCashGroup(
+                currencyId,
+                PrimeRateLib.buildPrimeRateStateful(factors.cache.primeRates, currencyId)
+            );
+            if (currencyId < cashGroups.length) cashGroups[currencyId] = cashGroup;
+        } else {
+            cashGroup = cashGroups[currencyId];
+        }
+    }
+
+    function _buildExchangeRate(
+        FreeCollateralFactors memory factors,
+        uint256 currencyId
+    ) private view returns (ETHRate memory ethRate) {
+        ETHRate[] memory ethRates = factors.cache.ethRates;
+        if (ethRates.length <= currencyId || ethRates[currencyId].rateDecimals == 0) {
+            ethRate = ExchangeRate.buildExchangeRate(currencyId);
+            if (currencyId < ethRates.length) ethRates[currencyId] = ethRate;
+        } else {
+            ethRate = ethRates[currencyId];
+        }
     }
 
     /// @notice Checks if an asset is active in the portfolio
@@ -76,29 +156,56 @@ library FreeCollateral {
         return (0, 0);
     }
 
+    /// @notice Returns the nToken prime PV, total supply and parameters, the nToken portfolio held in
+    /// factors is overwritten so cached values are copied out of it.
+    function _getNTokenPrimePV(
+        FreeCollateralFactors memory factors,
+        uint256 blockTime
+    ) private view returns (int256 nTokenPrimePV, int256 totalSupply, bytes6 parameters) {
+        FreeCollateralCache memory cache = factors.cache;
+        uint16 currencyId = factors.cashGroup.currencyId;
+        if (currencyId < cache.nTokenTotalSupply.length && cache.nTokenTotalSupply[currencyId] > 0) {
+            return (
+                cache.nTokenPrimePV[currencyId],
+                cache.nTokenTotalSupply[currencyId],
+                cache.nTokenParameters[currencyId]
+            );
+        }
+
+        nTokenPortfolio memory nToken = factors.nToken;
+        nToken.loadNTokenPortfolioNoCashGroup(currencyId);
+        nToken.cashGroup = factors.cashGroup;
+
+        nTokenPrimePV = nTokenCalculations.getNTokenPrimePV(nToken, blockTime);
+        totalSupply = nToken.totalSupply;
+        parameters = nToken.parameters;
+
+        if (currencyId < cache.nTokenTotalSupply.length) {
+            cache.nTokenPrimePV[currencyId] = nTokenPrimePV;
+            cache.nTokenTotalSupply[currencyId] = totalSupply;
+            cache.nTokenParameters[currencyId] = parameters;
+        }
+    }
+
     /// @notice Calculates the nToken asset value with a haircut set by governance
     /// @return the value of the account's nTokens after haircut, the nToken parameters
     function _getNTokenHaircutPrimePV(
-        CashGroupParameters memory cashGroup,
-        nTokenPortfolio memory nToken,
+        FreeCollateralFactors memory factors,
         int256 tokenBalance,
         uint256 blockTime
     ) internal view returns (int256, bytes6) {
-        nToken.loadNTokenPortfolioNoCashGroup(cashGroup.currencyId);
-        nToken.cashGroup = cashGroup;
-
-        int256 nTokenPrimePV = nTokenCalculations.getNTokenPrimePV(nToken, blockTime);
+        (int256 nTokenPrimePV, int256 totalSupply, bytes6 parameters) = _getNTokenPrimePV(factors, blockTime);
 
         // (tokenBalance * nTokenValue * haircut) / totalSupply
         int256 nTokenHaircutPrimePV =
             tokenBalance
                 .mul(nTokenPrimePV)
-                .mul(uint8(nToken.parameters[Constants.PV_HAIRCUT_PERCENTAGE]))
+                .mul(uint8(parameters[Constants.PV_HAIRCUT_PERCENTAGE]))
                 .div(Constants.PERCENTAGE_DECIMALS)
-                .div(nToken.totalSupply);
+                .div(totalSupply);
 
-        // nToken.parameters is returned for use in liquidation
-        return (nTokenHaircutPrimePV, nToken.parameters);
+        // nToken parameters are returned for use in liquidation
+        return (nTokenHaircutPrimePV, parameters);
     }
 
     /// @notice Calculates portfolio and/or nToken values while using the supplied cash groups and
@@ -135,8 +242,7 @@ library FreeCollateral {
 
         if (nTokenBalance > 0) {
             (nTokenHaircutPrimeValue, nTokenParameters) = _getNTokenHaircutPrimePV(
-                factors.cashGroup,
-                factors.nToken,
+                factors,
                 nTokenBalance,
                 blockTime
             );
@@ -176,8 +282,7 @@ library FreeCollateral {
 
         if (nTokenBalance > 0) {
             (nTokenHaircutPrimeValue, nTokenParameters) = _getNTokenHaircutPrimePV(
-                factors.cashGroup,
-                factors.nToken,
+                factors,
                 nTokenBalance,
                 blockTime
             );
@@ -225,7 +330,7 @@ library FreeCollateral {
         int256 netLocalAssetValue,
         FreeCollateralFactors memory factors
     ) private view returns (ETHRate memory) {
-        ETHRate memory ethRate = ExchangeRate.buildExchangeRate(currencyId);
+        ETHRate memory ethRate = _buildExchangeRate(factors, currencyId);
         // Converts to underlying first, ETH exchange rates are in underlying
         factors.netETHValue = factors.netETHValue.add(
             ethRate.convertToETH(factors.primeRate.convertToUnderlying(netLocalAssetValue))
@@ -240,12 +345,27 @@ library FreeCollateral {
         address account,
         AccountContext memory accountContext,
         uint256 blockTime
+    ) internal returns (int256, bool) {
+        PrimeRate[] memory primeRates;
+        return getFreeCollateralStateful(account, accountContext, blockTime, primeRates);
+    }
+
+    /// @notice Stateful version of get free collateral that reuses prime rates already accrued during the
+    /// transaction, indexed by currency id. Missing prime rates are accrued and added to the memo.
+    function getFreeCollateralStateful(
+        address account,
+        AccountContext memory accountContext,
+        uint256 blockTime,
+        PrimeRate[] memory primeRates
     ) internal returns (int256, bool) {
         FreeCollateralFactors memory factors;
         bool hasCashDebt;
 
         if (accountContext.isBitmapEnabled()) {
-            factors.cashGroup = CashGroup.buildCashGroupStateful(accountContext.bitmapCurrencyId);
+            factors.cashGroup = CashGroup.buildCashGroup(
+                accountContext.bitmapCurrencyId,
+                PrimeRateLib.buildPrimeRateStateful(primeRates, accountContext.bitmapCurrencyId)
+            );
 
             // prettier-ignore
             (
@@ -276,14 +396,15 @@ library FreeCollateral {
             // Explicitly ensures that bitmap currency cannot be double counted
             require(currencyId != accountContext.bitmapCurrencyId);
 
-            factors.primeRate = PrimeRateLib.buildPrimeRateStateful(currencyId);
+            factors.primeRate = PrimeRateLib.buildPrimeRateStateful(primeRates, currencyId);
             
             (int256 netLocalAssetValue, int256 nTokenBalance) =
                 _getCurrencyBalances(account, currencyBytes, factors.primeRate);
             if (netLocalAssetValue < 0) hasCashDebt = true;
 
             if (_isActiveInPortfolio(currencyBytes) || nTokenBalance > 0) {
-                factors.cashGroup = CashGroup.buildCashGroupStateful(currencyId);
+                // The prime rate was accrued above, no need to accrue it again for the cash group
+                factors.cashGroup = CashGroup.buildCashGroup(currencyId, factors.primeRate);
 
                 // prettier-ignore
                 (
@@ -321,13 +442,26 @@ library FreeCollateral {
         address account,
         AccountContext memory accountContext,
         uint256 blockTime
+    ) internal view returns (int256, int256[] memory) {
+        FreeCollateralCache memory cache;
+        return getFreeCollateralView(account, accountContext, blockTime, cache);
+    }
+
+    /// @notice View version of getFreeCollateral that shares prime rates, cash groups, ETH rates and nToken
+    /// present values with other accounts valued at the same block time through the cache.
+    function getFreeCollateralView(
+        address account,
+        AccountContext memory accountContext,
+        uint256 blockTime,
+        FreeCollateralCache memory cache
     ) internal view returns (int256, int256[] memory) {
         FreeCollateralFactors memory factors;
+        factors.cache = cache;
         uint256 netLocalIndex;
         int256[] memory netLocalAssetValues = new int256[](10);
 
         if (accountContext.isBitmapEnabled()) {
-            factors.cashGroup = CashGroup.buildCashGroupView(accountContext.bitmapCurrencyId);
+            factors.cashGroup = _buildCashGroupView(factors, accountContext.bitmapCurrencyId);
 
             // prettier-ignore
             (
@@ -363,7 +497,7 @@ library FreeCollateral {
             // Explicitly ensures that bitmap currency cannot be double counted
             require(currencyId != accountContext.bitmapCurrencyId);
             int256 nTokenBalance;
-            (factors.primeRate, /* */) = PrimeCashExchangeRate.getPrimeCashRateView(currencyId, blockTime);
+            factors.primeRate = _buildPrimeRateView(factors, currencyId, blockTime);
 
             (netLocalAssetValues[netLocalIndex], nTokenBalance) = _getCurrencyBalances(
                 account,
@@ -372,7 +506,7 @@ library FreeCollateral {
             );
 
             if (_isActiveInPortfolio(currencyBytes) || nTokenBalance > 0) {
-                factors.cashGroup = CashGroup.buildCashGroupView(currencyId);
+                factors.cashGroup = _buildCashGroupView(factors, currencyId);
                 // prettier-ignore
                 (
                     int256 netPortfolioValue,
@@ -403,12 +537,12 @@ library FreeCollateral {
         uint256 blockTime
     ) private returns (int256) {
         uint16 currencyId = uint16(currencyBytes & Constants.UNMASK_FLAGS);
-        factors.primeRate = PrimeRateLib.buildPrimeRateStateful(currencyId);
+        factors.primeRate = PrimeRateLib.buildPrimeRateStateful(factors.cache.primeRates, currencyId);
         (int256 netLocalAssetValue, int256 nTokenBalance) =
             _getCurrencyBalances(liquidationFactors.account, currencyBytes, factors.primeRate);
 
         if (_isActiveInPortfolio(currencyBytes) || nTokenBalance > 0) {
-            factors.cashGroup = CashGroup.buildCashGroupStateful(currencyId);
+            factors.cashGroup = _buildCashGroupStateful(factors, currencyId);
             (int256 netPortfolioValue, int256 nTokenHaircutPrimeValue, bytes6 nTokenParameters) =
                 _getPortfolioAndNTokenAssetValue(factors, nTokenBalance, blockTime);
 
@@ -427,6 +561,28 @@ library FreeCollateral {
         return netLocalAssetValue;
     }
 
+    /// @notice Allocates a cache for liquidating many accounts against the same local and collateral currency
+    /// in a single transaction. Prime rates, cash groups and ETH rates for both currencies are loaded up front,
+    /// none of these change during currency or fCash liquidation at the same block time. nToken present values
+    /// are cached as they are first calculated, liquidation does not change the nToken's portfolio or supply.
+    function newLiquidationCache(
+        uint16 localCurrencyId,
+        uint16 collateralCurrencyId
+    ) internal returns (FreeCollateralCache memory cache) {
+        cache = newFreeCollateralCache(
+            localCurrencyId > collateralCurrencyId ? localCurrencyId : collateralCurrencyId
+        );
+        FreeCollateralFactors memory factors;
+        factors.cache = cache;
+
+        _buildCashGroupStateful(factors, localCurrencyId);
+        _buildExchangeRate(factors, localCurrencyId);
+        if (collateralCurrencyId != 0) {
+            _buildCashGroupStateful(factors, collateralCurrencyId);
+            _buildExchangeRate(factors, collateralCurrencyId);
+        }
+    }
+
     /// @notice A version of getFreeCollateral used during liquidation to save off necessary additional information.
     function getLiquidationFactors(
         address account,
@@ -434,14 +590,31 @@ library FreeCollateral {
         uint256 blockTime,
         uint256 localCurrencyId,
         uint256 collateralCurrencyId
+    ) internal returns (LiquidationFactors memory, PortfolioAsset[] memory) {
+        FreeCollateralCache memory cache;
+        return getLiquidationFactors(
+            account, accountContext, blockTime, localCurrencyId, collateralCurrencyId, cache
+        );
+    }
+
+    /// @notice Version of getLiquidationFactors that reads prime rates, cash groups and ETH rates from a cache
+    /// built by newLiquidationCache, currencies missing from the cache are loaded from storage.
+    function getLiquidationFactors(
+        address account,
+        AccountContext memory accountContext,
+        uint256 blockTime,
+        uint256 localCurrencyId,
+        uint256 collateralCurrencyId,
+        FreeCollateralCache memory cache
     ) internal returns (LiquidationFactors memory, PortfolioAsset[] memory) {
         FreeCollateralFactors memory factors;
         LiquidationFactors memory liquidationFactors;
         // This is only set to reduce the stack size
         liquidationFactors.account = account;
+        factors.cache = cache;
 
         if (accountContext.isBitmapEnabled()) {
-            factors.cashGroup = CashGroup.buildCashGroupStateful(accountContext.bitmapCurrencyId);
+            factors.cashGroup = _buildCashGroupStateful(factors, accountContext.bitmapCurrencyId);
             (int256 netCashBalance, int256 nTokenHaircutPrimeValue, bytes6 nTokenParameters) =
                 _getBitmapBalanceValue(account, blockTime, accountContext, factors);
             int256 portfolioBalance =
@@ -41,41 +41,25 @@ library Bitmap {
         return (x & 0xFF) + (x >> 128 & 0xFF);
     }
 
-    // Does a binary search over x to get the position of the most significant bit
+    /// @notice Returns the zero indexed position of the most significant bit of x. Narrows the
+    /// search to a byte with branchless comparisons and resolves the final byte using a de Bruijn
+    /// style multiply and shift into a 32 byte lookup table.
     function getMSB(uint256 x) internal pure returns (uint256 msb) {
         // If x == 0 then there is no MSB and this method will return zero. That would
         // be the same as the return value when x == 1 (MSB is zero indexed), so instead
         // we have this require here to ensure that the values don't get mixed up.
         require(x != 0); // dev: get msb zero value
-        if (x >= 0x100000000000000000000000000000000) {
-            x >>= 128;
-            msb += 128;
+        assembly {
+            msb := shl(7, lt(0xffffffffffffffffffffffffffffffff, x))
+            msb := or(msb, shl(6, lt(0xffffffffffffffff, shr(msb, x))))
+            msb := or(msb, shl(5, lt(0xffffffff, shr(msb, x))))
+            msb := or(msb, shl(4, lt(0xffff, shr(msb, x))))
+            msb := or(msb, shl(3, lt(0xff, shr(msb, x))))
+            // shr(msb, x) is now a single byte, the multiply and shift maps each of its possible
+            // MSB positions to a unique index in the table.
+            msb := or(msb, byte(and(0x1f, shr(shr(msb, x), 0x8421084210842108cc6318c6db6d54be)),
+                0x0706060506020504060203020504030106050205030304010505030400000000))
         }
-        if (x >= 0x10000000000000000) {
-            x >>= 64;
-            msb += 64;
-        }
-        if (x >= 0x100000000) {
-            x >>= 32;
-            msb += 32;
-        }
-        if (x >= 0x10000) {
-            x >>= 16;
-            msb += 16;
-        }
-        if (x >= 0x100) {
-            x >>= 8;
-            msb += 8;
-        }
-        if (x >= 0x10) {
-            x >>= 4;
-            msb += 4;
-        }
-        if (x >= 0x4) {
-            x >>= 2;
-            msb += 2;
-        }
-        if (x >= 0x2) msb += 1; // No need to shift xc anymore
     }
 
     /// @dev getMSB returns a zero indexed bit number where zero is the first bit counting
@@ -87,4 +71,16 @@ library Bitmap {
 
         return 255 - getMSB(uint256(bitmap)) + 1;
     }
+
+    /// @notice Iterates over the set bits in a bitmap from left to right without modifying it. Returns
+    /// the first set bit after bitNum or zero if there are none, pass bitNum = 0 to get the first set bit.
+    /// @dev Equivalent to getNextBitNum(setBit(bitmap, bitNum, false)) when bitNum is the bit returned by
+    /// the previous call, but skips the bounds checks and bit masking.
+    function getNextBitNumAfter(bytes32 bitmap, uint256 bitNum) internal pure returns (uint256) {
+        // Shifting out all the bits up to and including bitNum, bitNum >= 256 results in zero
+        bytes32 remaining = bitmap << bitNum;
+        if (remaining == 0x00) return 0;
+
+        return bitNum + 256 - getMSB(uint256(remaining));
+    }
 }
@@ -30,4 +30,138 @@ contract MockBitmap {
     function getNextBitNum(bytes32 x) external pure returns (uint256) {
         return Bitmap.getNextBitNum(x);
     }
+
+    function getNextBitNumAfter(bytes32 x, uint256 bitNum) external pure returns (uint256) {
+        return x.getNextBitNumAfter(bitNum);
+    }
+
+    /// @notice Returns the set bit numbers in order using getNextBitNumAfter
+    function getSetBits(bytes32 bitmap) external pure returns (uint256[] memory bitNums) {
+        bitNums = new uint256[](bitmap.totalBitsSet());
+        uint256 index;
+        uint256 bitNum = bitmap.getNextBitNum();
+        while (bitNum != 0) {
+            bitNums[index] = bitNum;
+            index += 1;
+            bitNum = bitmap.getNextBitNumAfter(bitNum);
+        }
+    }
+
+    /// @notice Returns the set bit numbers in order by turning off each bit and binary searching for
+    /// the next one, this is how bitmaps were iterated prior to getNextBitNumAfter.
+    function getSetBitsBinarySearch(bytes32 bitmap) external pure returns (uint256[] memory bitNums) {
+        bitNums = new uint256[](bitmap.totalBitsSet());
+        uint256 index;
+        uint256 bitNum = bitmap == 0x00 ? 0 : 255 - _getMSBBinarySearch(uint256(bitmap)) + 1;
+        while (bitNum != 0) {
+            bitNums[index] = bitNum;
+            index += 1;
+            bitmap = bitmap.setBit(bitNum, false);
+            bitNum = bitmap == 0x00 ? 0 : 255 - _getMSBBinarySearch(uint256(bitmap)) + 1;
+        }
+    }
+
+    /// @dev Binary search MSB implementation that getMSB replaced, kept as a parity reference
+    function _getMSBBinarySearch(uint256 x) private pure returns (uint256 msb) {
+        require(x != 0);
+        if (x >= 0x100000000000000000000000000000000) {
+            x >>= 128;
+            msb += 128;
+        }
+        if (x >= 0x10000000000000000) {
+            x >>= 64;
+            msb += 64;
+        }
+        if (x >= 0x100000000) {
+            x >>= 32;
+            msb += 32;
+        }
+        if (x >= 0x10000) {
+            x >>= 16;
+            msb += 16;
+        }
+        if (x >= 0x100) {
+            x >>= 8;
+            msb += 8;
+        }
+        if (x >= 0x10) {
+            x >>= 4;
+            msb += 4;
+        }
+        if (x >= 0x4) {
+            x >>= 2;
+            msb += 2;
+        }
+        if (x >= 0x2) msb += 1;
+    }
+
+    /// @notice Batch entry points used by the fuzz harness to evaluate many inputs per eth_call
+    function batchIsBitSet(
+        bytes32[] calldata bitmaps,
+        uint256[] calldata indexes
+    ) external pure returns (bool[] memory results) {
+        require(bitmaps.length == indexes.length);
+        results = new bool[](bitmaps.length);
+        for (uint256 i; i < bitmaps.length; i++) {
+            results[i] = bitmaps[i].isBitSet(indexes[i]);
+        }
+    }
+
+    function batchSetBit(
+        bytes32[] calldata bitmaps,
+        uint256[] calldata indexes,
+        bool[] calldata setOn
+    ) external pure returns (bytes32[] memory results) {
+        require(bitmaps.length == indexes.length && bitmaps.length == setOn.length);
+        results = new bytes32[](bitmaps.length);
+        for (uint256 i; i < bitmaps.length; i++) {
+            results[i] = bitmaps[i].setBit(indexes[i], setOn[i]);
+        }
+    }
+
+    function batchTotalBitsSet(bytes32[] calldata bitmaps) external pure returns (uint256[] memory results) {
+        results = new uint256[](bitmaps.length);
+        for (uint256 i; i < bitmaps.length; i++) {
+            results[i] = bitmaps[i].totalBitsSet();
+        }
+    }
+
+    /// @dev Reverts if any value is zero, same as getMSB
+    function batchGetMSB(uint256[] calldata values) external pure returns (uint256[] memory results) {
+        results = new uint256[](values.length);
+        for (uint256 i; i < values.length; i++) {
+            results[i] = Bitmap.getMSB(values[i]);
+        }
+    }
+
+    function batchGetNextBitNum(bytes32[] calldata bitmaps) external pure returns (uint256[] memory results) {
+        results = new uint256[](bitmaps.length);
+        for (uint256 i; i < bitmaps.length; i++) {
+            results[i] = Bitmap.getNextBitNum(bitmaps[i]);
+        }
+    }
+
+    /// @dev Returns getMSB and the binary search reference for each value, reverts on zero values
+    function batchGetMSBParity(uint256[] calldata values) external pure returns (
+        uint256[] memory results,
+        uint256[] memory binarySearch
+    ) {
+        results = new uint256[](values.length);
+        binarySearch = new uint256[](values.length);
+        for (uint256 i; i < values.length; i++) {
+            results[i] = Bitmap.getMSB(values[i]);
+            binarySearch[i] = _getMSBBinarySearch(values[i]);
+        }
+    }
+
+    function batchGetNextBitNumAfter(
+        bytes32[] calldata bitmaps,
+        uint256[] calldata bitNums
+    ) external pure returns (uint256[] memory results) {
+        require(bitmaps.length == bitNums.length);
+        results = new uint256[](bitmaps.length);
+        for (uint256 i; i < bitmaps.length; i++) {
+            results[i] = bitmaps[i].getNextBitNumAfter(bitNums[i]);
+        }
+    }
 }
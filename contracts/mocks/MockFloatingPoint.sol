@@ -26,4 +26,31 @@ contract MockFloatingPoint {
     function getMSB(uint256 x) external pure returns (uint256) {
         return Bitmap.getMSB(x);
     }
+
+    /// @notice Batch entry points used by the fuzz harness to evaluate many inputs per eth_call
+    function batchPackingUnpacking56(uint256[] calldata values)
+        external
+        pure
+        returns (bytes32[] memory packed, uint256[] memory unpacked)
+    {
+        packed = new bytes32[](values.length);
+        unpacked = new uint256[](values.length);
+        for (uint256 i; i < values.length; i++) {
+            packed[i] = bytes32(uint256(FloatingPoint.packTo56Bits(values[i])));
+            unpacked[i] = FloatingPoint.unpackFromBits(uint256(packed[i]));
+        }
+    }
+
+    function batchPackingUnpacking32(uint256[] calldata values)
+        external
+        pure
+        returns (bytes32[] memory packed, uint256[] memory unpacked)
+    {
+        packed = new bytes32[](values.length);
+        unpacked = new uint256[](values.length);
+        for (uint256 i; i < values.length; i++) {
+            packed[i] = bytes32(uint256(FloatingPoint.packTo32Bits(values[i])));
+            unpacked[i] = FloatingPoint.unpackFromBits(uint256(packed[i]));
+        }
+    }
 }
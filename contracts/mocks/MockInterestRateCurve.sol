@@ -70,4 +70,42 @@ contract MockInterestRateCurve {
 
         return InterestRateCurve.getUtilizationFromInterestRate(irParams, interestRate);
     }
-}
\ No newline at end of file
+
+    /// @notice Batch entry points used by the fuzz harness to evaluate many inputs per eth_call,
+    /// the interest rate parameters are only loaded from storage once per call.
+    function batchGetInterestRates(
+        uint16 currencyId,
+        uint8 marketIndex,
+        bool[] calldata isBorrow,
+        uint256[] calldata utilization
+    ) external view returns (uint256[] memory preFeeInterestRate, uint256[] memory postFeeInterestRate) {
+        require(isBorrow.length == utilization.length);
+        InterestRateParameters memory irParams = InterestRateCurve.getActiveInterestRateParameters(
+            currencyId, marketIndex
+        );
+
+        preFeeInterestRate = new uint256[](utilization.length);
+        postFeeInterestRate = new uint256[](utilization.length);
+        for (uint256 i; i < utilization.length; i++) {
+            preFeeInterestRate[i] = InterestRateCurve.getInterestRate(irParams, utilization[i]);
+            postFeeInterestRate[i] = InterestRateCurve.getPostFeeInterestRate(
+                irParams, preFeeInterestRate[i], isBorrow[i]
+            );
+        }
+    }
+
+    function batchGetUtilizationFromInterestRate(
+        uint16 currencyId,
+        uint8 marketIndex,
+        uint256[] calldata interestRate
+    ) external view returns (uint256[] memory utilization) {
+        InterestRateParameters memory irParams = InterestRateCurve.getActiveInterestRateParameters(
+            currencyId, marketIndex
+        );
+
+        utilization = new uint256[](interestRate.length);
+        for (uint256 i; i < interestRate.length; i++) {
+            utilization[i] = InterestRateCurve.getUtilizationFromInterestRate(irParams, interestRate[i]);
+        }
+    }
+}
@@ -0,0 +1,47 @@
+// SPDX-License-Identifier: MIT
+pragma solidity =0.7.6;
+pragma abicoder v2;
+
+/// @notice Implements the aggregate methods of Multicall3 (0xcA11bde05977b3631167028862bE2a173976CA11)
+/// for local test environments where it is not deployed. Used by gas scenarios to compare batch
+/// entry points with the Multicall3 workarounds used by scripts.
+contract MockMulticall3 {
+    struct Call {
+        address target;
+        bytes callData;
+    }
+
+    struct Call3 {
+        address target;
+        bool allowFailure;
+        bytes callData;
+    }
+
+    struct Result {
+        bool success;
+        bytes returnData;
+    }
+
+    function aggregate(Call[] calldata calls)
+        external
+        payable
+        returns (uint256 blockNumber, bytes[] memory returnData)
+    {
+        blockNumber = block.number;
+        returnData = new bytes[](calls.length);
+        for (uint256 i; i < calls.length; i++) {
+            bool success;
+            (success, returnData[i]) = calls[i].target.call(calls[i].callData);
+            require(success, "Multicall3: call failed");
+        }
+    }
+
+    function aggregate3(Call3[] calldata calls) external payable returns (Result[] memory returnData) {
+        returnData = new Result[](calls.length);
+        for (uint256 i; i < calls.length; i++) {
+            Result memory result = returnData[i];
+            (result.success, result.returnData) = calls[i].target.call(calls[i].callData);
+            require(calls[i].allowFailure || result.success, "Multicall3: call failed");
+        }
+    }
+}
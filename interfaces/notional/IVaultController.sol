@@ -230,6 +230,12 @@ interface IVaultAccountHealth {
         uint256[3] memory vaultSharesToLiquidator
     );
 
+    function getVaultAccountHealthFactorsBatch(address[] calldata accounts, address vault) external view returns (
+        VaultAccountHealthFactors[] memory h,
+        int256[3][] memory maxLiquidatorDepositUnderlying,
+        uint256[3][] memory vaultSharesToLiquidator
+    );
+
     function calculateDepositAmountInDeleverage(
         uint256 currencyIndex,
         VaultAccount memory vaultAccount,
@@ -22,6 +22,7 @@ interface NotionalProxy is
 {
     /** User trading events */
     event MarketsInitialized(uint16 currencyId);
+    event MarketsInitializationFailed(uint16 currencyId, bytes reason);
     event SweepCashIntoMarkets(uint16 currencyId, int256 cashIntoMarkets);
 
     /// @notice Emitted once when incentives are migrated
@@ -101,6 +102,10 @@ interface NotionalProxy is
     /** Initialize Markets Action */
     function initializeMarkets(uint16 currencyId, bool isFirstInit) external;
 
+    function initializeMarketsBatch(uint16[] calldata currencyIds, bool isFirstInit)
+        external
+        returns (bool[] memory success);
+
     function sweepCashIntoMarkets(uint16 currencyId) external;
 
     /** Account Action */
@@ -116,6 +121,8 @@ interface NotionalProxy is
 
     function settleAccount(address account) external;
 
+    function settleAccountsBatch(address[] calldata accounts) external returns (bool[] memory didSettle);
+
     function depositUnderlyingToken(
         address account,
         uint16 currencyId,
@@ -182,6 +189,16 @@ interface NotionalProxy is
         bool redeemToUnderlying
     ) external payable returns (int256, int256, int256);
 
+    function liquidateCollateralCurrencyBatch(
+        address[] calldata liquidateAccounts,
+        uint16 localCurrency,
+        uint16 collateralCurrency,
+        uint128[] calldata maxCollateralLiquidation,
+        uint96[] calldata maxNTokenLiquidation,
+        bool withdrawCollateral,
+        bool redeemToUnderlying
+    ) external payable returns (int256, int256, int256);
+
     function calculatefCashLocalLiquidation(
         address liquidateAccount,
         uint16 localCurrency,
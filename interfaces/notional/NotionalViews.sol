@@ -151,6 +151,15 @@ interface NotionalViews {
             PortfolioAsset[] memory portfolio
         );
 
+    function getAccountsBatch(address[] calldata accounts)
+        external
+        view
+        returns (
+            AccountContext[] memory accountContexts,
+            AccountBalance[][] memory accountBalances,
+            PortfolioAsset[][] memory portfolios
+        );
+
     function getAccountContext(address account) external view returns (AccountContext memory);
 
     function getAccountPrimeDebtBalance(uint16 currencyId, address account) external view returns (
@@ -183,6 +192,12 @@ interface NotionalViews {
 
     function getFreeCollateral(address account) external view returns (int256, int256[] memory);
 
+    function getFreeCollateralBatch(address[] calldata accounts) external view returns (
+        int256[] memory netETHValues,
+        int256[][] memory netLocalAssetValues,
+        bool[] memory mustSettle
+    );
+
     function getTreasuryManager() external view returns (address);
 
     function getReserveBuffer(uint16 currencyId) external view returns (uint256);
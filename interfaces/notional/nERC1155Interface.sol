@@ -19,6 +19,9 @@ interface nERC1155Interface {
         uint256[] ids,
         uint256[] values
     );
+    // Packed ERC1155 transfers emitted in place of TransferSingle and TransferBatch when
+    // Deployments.COMPACT_EVENTS is set
+    event CompactTransfers(bytes transfers);
     event ApprovalForAll(address indexed account, address indexed operator, bool approved);
     event URI(string value, uint256 indexed id);
 
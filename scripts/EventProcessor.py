@@ -1,11 +1,31 @@
 import logging
 from brownie import ZERO_ADDRESS
+from brownie.convert import to_address
 from scripts.events.bundles import bundleCriteria
 from scripts.events.transactions import typeMatchers
 from tests.constants import FEE_RESERVE, SETTLEMENT_RESERVE
 
 LOGGER = logging.getLogger(__name__)
 
+# Record types packed into Emitter.CompactTransfers logs, ERC20 proxy transfers are never packed
+COMPACT_TRANSFER_SINGLE = 2
+COMPACT_TRANSFER_BATCH = 3
+
+class DecodedEvent:
+    # Mirrors the parts of the brownie event interface used by the processor so that transfers
+    # decoded from compact logs are processed exactly like the events they replace
+    def __init__(self, name, address, data, pos):
+        self.name = name
+        self.address = address
+        self.pos = pos
+        self._data = data
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __contains__(self, key):
+        return key in self._data
+
 def findIndex(arr, func):
     for (i, v) in enumerate(arr):
         if func(v): return i
@@ -37,7 +57,7 @@ def processTxn(environment, txn):
         'markers': []
     }
 
-    for e in txn.events:
+    for e in expandCompactTransfers(environment, txn.events):
         bundleId = None
         if isValidTransfer(environment, e):
             decodeEvent(environment, eventStore, e, txn)
@@ -59,6 +79,64 @@ def processTxn(environment, txn):
 
     return eventStore
 
+def isCompactTransfers(environment, e):
+    return e.address == environment.notional.address and e.name == 'CompactTransfers'
+
+def _readAddress(data, offset):
+    return (to_address('0x' + data[offset:offset + 20].hex()), offset + 20)
+
+def _readUint(data, offset):
+    return (int.from_bytes(data[offset:offset + 32], 'big'), offset + 32)
+
+def decodeCompactTransfers(notional, data):
+    # Decodes the packed records in a CompactTransfers log, see Emitter.sol for the layout. Returns
+    # (name, address, args) for each TransferSingle or TransferBatch event it replaces.
+    data = bytes(data)
+    decoded = []
+    offset = 0
+    while offset < len(data):
+        recordType = data[offset]
+        offset += 1
+
+        (operator, offset) = _readAddress(data, offset)
+        (sender, offset) = _readAddress(data, offset)
+        (receiver, offset) = _readAddress(data, offset)
+        args = {'operator': operator, 'from': sender, 'to': receiver}
+        if recordType == COMPACT_TRANSFER_SINGLE:
+            (args['id'], offset) = _readUint(data, offset)
+            (args['value'], offset) = _readUint(data, offset)
+            decoded.append(('TransferSingle', notional, args))
+        elif recordType == COMPACT_TRANSFER_BATCH:
+            length = data[offset]
+            offset += 1
+            args['ids'] = [_readUint(data, offset + 32 * i)[0] for i in range(length)]
+            offset += 32 * length
+            args['values'] = [_readUint(data, offset + 32 * i)[0] for i in range(length)]
+            offset += 32 * length
+            decoded.append(('TransferBatch', notional, args))
+        else:
+            raise Exception("Unknown compact transfer record", recordType)
+
+    return decoded
+
+def expandCompactTransfers(environment, events):
+    # When Notional is deployed with compact events, each CompactTransfers log is replaced by the
+    # events it packs. Positions are renumbered so the resulting stream, including transfer and
+    # bundle ids, is identical to the one produced by a deployment that emits events individually.
+    if not any(isCompactTransfers(environment, e) for e in events):
+        return events
+
+    expanded = []
+    for e in events:
+        if isCompactTransfers(environment, e):
+            records = decodeCompactTransfers(environment.notional.address, e['transfers'])
+            for (name, address, args) in records:
+                expanded.append(DecodedEvent(name, address, args, (len(expanded),)))
+        else:
+            expanded.append(DecodedEvent(e.name, e.address, dict(e), (len(expanded),)))
+
+    return expanded
+
 def isMarker(environment, e):
     return e.address == environment.notional.address and e.name in [
         'MarketsInitialized',
@@ -0,0 +1,183 @@
+import math
+
+from brownie import accounts
+from brownie.network.state import Chain
+from scripts.gas.runner import write_json
+from tests.helpers import get_balance_action, initialize_environment
+
+chain = Chain()
+
+# Number of accounts liquidated per batch call
+BATCH_SIZES = [1, 2, 4, 8]
+# Gas price used to net gas costs out of liquidation profit
+GAS_PRICE = 30 * 10 ** 9
+LOCAL_CURRENCY = 2
+COLLATERAL_CURRENCY = 1
+
+
+def _setup_borrowers(env, borrowers, mintNToken=False):
+    """Deposits ETH collateral and borrows DAI prime cash just below the free collateral limit"""
+    oracle = env.ethOracle["DAI"]
+    buffer = env.notional.getRateStorage(LOCAL_CURRENCY)["ethRate"]["buffer"]
+    for account in borrowers:
+        if mintNToken:
+            env.notional.batchBalanceAction(
+                account,
+                [
+                    get_balance_action(
+                        COLLATERAL_CURRENCY,
+                        "DepositUnderlyingAndMintNToken",
+                        depositActionAmount=10e18,
+                    )
+                ],
+                {"from": account, "value": 10e18},
+            )
+        else:
+            env.notional.depositUnderlyingToken(
+                account, COLLATERAL_CURRENCY, 10e18, {"from": account, "value": 10e18}
+            )
+        env.notional.enablePrimeBorrow(True, {"from": account})
+        (fc, _) = env.notional.getFreeCollateral(account)
+        maxBorrowUnderlying = math.floor(fc * 1e18 / oracle.latestAnswer() * 99 / buffer)
+        env.notional.withdraw(
+            LOCAL_CURRENCY,
+            env.notional.convertUnderlyingToPrimeCash(LOCAL_CURRENCY, maxBorrowUnderlying * 1e10),
+            True,
+            {"from": account},
+        )
+
+
+def _move_price(env):
+    # Move the DAI price so that every borrower becomes liquidatable against ETH
+    oracle = env.ethOracle["DAI"]
+    oracle.setAnswer(math.floor(oracle.latestAnswer() * 1.10))
+
+
+def _profit(env, events):
+    """Collateral received less local currency paid by the liquidator, in ETH wei at oracle price"""
+    rate = env.ethOracle["DAI"].latestAnswer()
+    # nTokens are valued at their present value, without the liquidation discount
+    nTokenPV = env.notional.nTokenPresentValueUnderlyingDenominated(COLLATERAL_CURRENCY)
+    nTokenSupply = env.nToken[COLLATERAL_CURRENCY].totalSupply()
+    profit = 0
+    for e in events:
+        collateral = env.notional.convertCashBalanceToExternal(
+            COLLATERAL_CURRENCY, e["netCollateralTransfer"], True
+        )
+        if e["netNTokenTransfer"] > 0:
+            collateral += e["netNTokenTransfer"] * nTokenPV * 10 ** 10 // nTokenSupply
+        local = env.notional.convertCashBalanceToExternal(
+            LOCAL_CURRENCY, e["localPrimeCashFromLiquidator"], True
+        )
+        profit += collateral - local * rate // 10 ** 18
+    return profit
+
+
+def _sequential(env, liquidator, batchAccounts):
+    gas = 0
+    events = []
+    for account in batchAccounts:
+        txn = env.notional.liquidateCollateralCurrency(
+            account, LOCAL_CURRENCY, COLLATERAL_CURRENCY, 0, 0, True, True, {"from": liquidator}
+        )
+        gas += txn.gas_used
+        events.append(txn.events["LiquidateCollateralCurrency"])
+    return (gas, _profit(env, events))
+
+
+def _batch(env, liquidator, batchAccounts):
+    zeros = [0] * len(batchAccounts)
+    txn = env.notional.liquidateCollateralCurrencyBatch(
+        batchAccounts,
+        LOCAL_CURRENCY,
+        COLLATERAL_CURRENCY,
+        zeros,
+        zeros,
+        True,
+        True,
+        {"from": liquidator},
+    )
+    return (txn.gas_used, _profit(env, list(txn.events["LiquidateCollateralCurrency"])))
+
+
+def measure(sequential, batch, batchSize):
+    """Compares batchSize sequential liquidations with one batch liquidation, per account"""
+    (sequentialGas, sequentialProfit) = sequential
+    (batchGas, batchProfit) = batch
+    return {
+        "batchSize": batchSize,
+        "sequentialGasPerAccount": sequentialGas // batchSize,
+        "batchGasPerAccount": batchGas // batchSize,
+        "ratio": round(batchGas / sequentialGas, 4),
+        "sequentialProfitPerAccount": sequentialProfit // batchSize,
+        "batchProfitPerAccount": batchProfit // batchSize,
+        "sequentialNetProfitPerAccount": (sequentialProfit - sequentialGas * GAS_PRICE)
+        // batchSize,
+        "batchNetProfitPerAccount": (batchProfit - batchGas * GAS_PRICE) // batchSize,
+    }
+
+
+def benchmark_collateral_liquidation(env, liquidator, borrowers):
+    results = []
+    for size in BATCH_SIZES:
+        batchAccounts = borrowers[:size]
+        # Both paths liquidate the same accounts from the same starting state
+        chain.snapshot()
+        sequential = _sequential(env, liquidator, batchAccounts)
+        chain.revert()
+        batch = _batch(env, liquidator, batchAccounts)
+        chain.revert()
+        results.append(measure(sequential, batch, size))
+    return results
+
+
+def render_report(results):
+    lines = [
+        "## Batch Liquidation Gas",
+        "",
+        "Profit is in ETH wei at oracle prices, net profit deducts gas at {} gwei.".format(
+            GAS_PRICE // 10 ** 9
+        ),
+        "",
+        "| Liquidation | Accounts | Sequential Gas / Account | Batch Gas / Account "
+        + "| Batch / Sequential | Sequential Profit / Account | Batch Profit / Account "
+        + "| Sequential Net Profit / Account | Batch Net Profit / Account |",
+        "| --- | ---: | ---: | ---: | ---: | ---: | ---: | ---: | ---: |",
+    ]
+    for (liquidation, rows) in results.items():
+            lines.append(
+                "| {} | {batchSize} | {sequentialGasPerAccount} | {batchGasPerAccount} | {ratio} "
+                "| {sequentialProfitPerAccount} | {batchProfitPerAccount} "
+                "| {sequentialNetProfitPerAccount} | {batchNetProfitPerAccount} |".format(
+                    liquidation, **r
+                )
+            )
+
+    return "\n".join(lines) + "\n"
+
+
+def main(outputPrefix="gas_batch_liquidation"):
+    """brownie run scripts/gas/batch_liquidation.py main [output prefix]"""
+    env = initialize_environment(accounts)
+    numAccounts = max(BATCH_SIZES)
+    # Development networks only have ten funded accounts, the rest are generated and funded
+    while len(accounts) < 2 * numAccounts + 1:
+        account = accounts.add()
+        accounts[0].transfer(account, 100e18)
+
+    liquidator = accounts[0]
+    borrowers = accounts[1 : numAccounts + 1]
+    nTokenBorrowers = accounts[numAccounts + 1 : 2 * numAccounts + 1]
+    _setup_borrowers(env, borrowers)
+    _setup_borrowers(env, nTokenBorrowers, mintNToken=True)
+    _move_price(env)
+
+    results = {
+        "collateralCurrency": benchmark_collateral_liquidation(env, liquidator, borrowers),
+        # The batch loads each nToken present value once and shares it between accounts
+        "nTokenCollateral": benchmark_collateral_liquidation(env, liquidator, nTokenBorrowers),
+    }
+    write_json("{}.json".format(outputPrefix), results)
+    with open("{}.md".format(outputPrefix), "w") as f:
+        f.write(render_report(results))
+    print(render_report(results))
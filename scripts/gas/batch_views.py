@@ -0,0 +1,154 @@
+from brownie import SimpleStrategyVault, accounts
+from scripts.gas.runner import write_json
+from tests.constants import PRIME_CASH_VAULT_MATURITY
+from tests.helpers import get_balance_action, get_balance_trade_action, initialize_environment
+from tests.internal.vaults.fixtures import get_vault_config, set_flags
+
+# Number of accounts valued per batch call
+BATCH_SIZES = [1, 2, 4, 8]
+# Gas charged by estimate_gas for every transaction regardless of execution
+INTRINSIC_GAS = 21_000
+
+
+def _setup_borrowers(env, borrowers):
+    """Borrows DAI against ETH, every other borrower also holds USDC nTokens"""
+    for (i, account) in enumerate(borrowers):
+        actions = [
+            get_balance_action(1, "DepositUnderlying", depositActionAmount=10e18),
+            get_balance_trade_action(
+                2,
+                "None",
+                [
+                    {
+                        "tradeActionType": "Borrow",
+                        "marketIndex": 1,
+                        "notional": 100e8,
+                        "maxSlippage": 0,
+                    }
+                ],
+                withdrawEntireCashBalance=True,
+                redeemToUnderlying=True,
+            ),
+        ]
+        if i % 2 == 1:
+            actions.append(
+                get_balance_action(
+                    3, "DepositUnderlyingAndMintNToken", depositActionAmount=1000e6
+                )
+            )
+        env.notional.batchBalanceAndTradeAction(
+            account, actions, {"from": account, "value": 10e18}
+        )
+
+
+def _setup_vault(env, vaultAccounts):
+    vault = SimpleStrategyVault.deploy(
+        "Simple Strategy", env.notional.address, 2, {"from": accounts[0]}
+    )
+    vault.setExchangeRate(1e18)
+    env.notional.updateVault(
+        vault.address,
+        get_vault_config(currencyId=2, flags=set_flags(0, ENABLED=True)),
+        100_000_000e8,
+    )
+    for account in vaultAccounts:
+        env.notional.enterVault(
+            account,
+            vault.address,
+            25_000e18,
+            PRIME_CASH_VAULT_MATURITY,
+            100_000e8,
+            0,
+            "",
+            {"from": account},
+        )
+    return vault
+
+
+def _fund_accounts(env, fundedAccounts):
+    for account in fundedAccounts:
+        for symbol in ["DAI", "USDC"]:
+            token = env.token[symbol]
+            token.transfer(account, 100_000 * 10 ** token.decimals(), {"from": accounts[0]})
+            token.approve(env.notional.address, 2 ** 255, {"from": account})
+
+
+def measure(single, batch, batchSize):
+    """Compares batchSize single view calls with one batch call, both measured via estimate_gas"""
+    singleGas = sum(single)
+    return {
+        "batchSize": batchSize,
+        "singleGas": singleGas,
+        "batchGas": batch,
+        "singleExecutionGas": singleGas - INTRINSIC_GAS * batchSize,
+        "batchExecutionGas": batch - INTRINSIC_GAS,
+        "ratio": round(batch / singleGas, 4),
+    }
+
+
+def benchmark_free_collateral(env, borrowers):
+    results = []
+    for size in BATCH_SIZES:
+        batchAccounts = borrowers[:size]
+        single = [env.notional.getFreeCollateral.estimate_gas(a) for a in batchAccounts]
+        batch = env.notional.getFreeCollateralBatch.estimate_gas(batchAccounts)
+        results.append(measure(single, batch, size))
+    return results
+
+
+def benchmark_vault_health(env, vault, vaultAccounts):
+    results = []
+    for size in BATCH_SIZES:
+        batchAccounts = vaultAccounts[:size]
+        single = [
+            env.notional.getVaultAccountHealthFactors.estimate_gas(a, vault.address)
+            for a in batchAccounts
+        ]
+        batch = env.notional.getVaultAccountHealthFactorsBatch.estimate_gas(
+            batchAccounts, vault.address
+        )
+        results.append(measure(single, batch, size))
+    return results
+
+
+def render_report(results):
+    lines = [
+        "## Batch View Gas",
+        "",
+        "| View | Accounts | N Single Calls | One Batch Call | Batch / Single "
+        + "| N Single Calls (execution) | One Batch Call (execution) |",
+        "| --- | ---: | ---: | ---: | ---: | ---: | ---: |",
+    ]
+    for (view, rows) in results.items():
+        for r in rows:
+            lines.append(
+                "| {} | {batchSize} | {singleGas} | {batchGas} | {ratio} "
+                "| {singleExecutionGas} | {batchExecutionGas} |".format(view, **r)
+            )
+
+    return "\n".join(lines) + "\n"
+
+
+def main(outputPrefix="gas_batch_views"):
+    """brownie run scripts/gas/batch_views.py main [output prefix]"""
+    env = initialize_environment(accounts)
+    numAccounts = max(BATCH_SIZES)
+    # Development networks only have ten funded accounts, the rest are generated and funded
+    while len(accounts) < 2 * numAccounts + 1:
+        account = accounts.add()
+        accounts[0].transfer(account, 100e18)
+
+    borrowers = accounts[1 : numAccounts + 1]
+    vaultAccounts = accounts[numAccounts + 1 : 2 * numAccounts + 1]
+    _fund_accounts(env, borrowers + vaultAccounts)
+    _setup_borrowers(env, borrowers)
+    vault = _setup_vault(env, vaultAccounts)
+
+    results = {
+        "getFreeCollateral": benchmark_free_collateral(env, borrowers),
+        "getVaultAccountHealthFactors": benchmark_vault_health(env, vault, vaultAccounts),
+    }
+    write_json("{}.json".format(outputPrefix), results)
+    with open("{}.md".format(outputPrefix), "w") as f:
+        f.write(render_report(results))
+    print(render_report(results))
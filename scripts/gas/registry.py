@@ -0,0 +1,65 @@
+import fnmatch
+import itertools
+
+# Relative increase in gas over the baseline that is tolerated before a scenario is
+# marked as a regression
+DEFAULT_TOLERANCE = 0.01
+# Number of times the action is repeated after the cold run to sample warm gas
+DEFAULT_WARM_RUNS = 3
+
+SCENARIOS = {}
+
+
+class Scenario:
+    """
+    A gas benchmark scenario. The runner reverts to the base environment snapshot, calls
+    setup(env, accounts, **params) and then measures action(env, accounts, **params) once cold
+    and warmRuns times warm for every combination of values in the params grid.
+
+    Actions return either a transaction receipt or an integer gas amount (for view methods
+    measured via estimate_gas).
+    """
+
+    def __init__(self, name, action, setup=None, params=None, tolerance=DEFAULT_TOLERANCE,
+                 warmRuns=DEFAULT_WARM_RUNS):
+        self.name = name
+        self.action = action
+        self.setup = setup
+        self.params = params or {}
+        self.tolerance = tolerance
+        self.warmRuns = warmRuns
+
+    def key(self, kwargs):
+        return self.name + "".join(
+            ".{}={}".format(k, kwargs[k]) for k in sorted(kwargs.keys())
+        )
+
+    def instances(self):
+        keys = sorted(self.params.keys())
+        for values in itertools.product(*[self.params[k] for k in keys]):
+            kwargs = dict(zip(keys, values))
+            yield (self.key(kwargs), kwargs)
+
+
+def scenario(name, params=None, setup=None, tolerance=DEFAULT_TOLERANCE,
+             warmRuns=DEFAULT_WARM_RUNS):
+    """Decorator that registers the decorated function as the action of a scenario"""
+
+    def decorator(action):
+        assert name not in SCENARIOS, "Duplicate scenario {}".format(name)
+        SCENARIOS[name] = Scenario(name, action, setup, params, tolerance, warmRuns)
+        return action
+
+    return decorator
+
+
+def select_scenarios(pattern=None):
+    """Returns registered scenarios whose name matches the comma separated glob patterns"""
+    if not pattern:
+        return list(SCENARIOS.values())
+
+    patterns = pattern.split(",")
+    return [
+        s for s in SCENARIOS.values()
+        if any(fnmatch.fnmatch(s.name, p) for p in patterns)
+    ]
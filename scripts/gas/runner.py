@@ -0,0 +1,235 @@
+import json
+import os
+import statistics
+
+from brownie import accounts
+from brownie.network.state import Chain
+from scripts.gas.registry import SCENARIOS, select_scenarios
+from tests.helpers import initialize_environment
+
+import scripts.gas.scenarios  # noqa: F401 registers the scenarios
+
+chain = Chain()
+
+BASELINE_PATH = "scripts/gas/baseline.json"
+RESULTS_PATH = "gas_stats.json"
+REPORT_PATH = "gas_report.md"
+# Comparison statuses that fail the check
+FAILED_STATUSES = ("regression", "error", "new", "missing")
+
+
+def gas_of(result):
+    return result if isinstance(result, int) else result.gas_used
+
+
+def summarize(cold, warm):
+    if len(warm) == 0:
+        # Scenarios that cannot be repeated report the cold run as warm
+        warm = [cold]
+
+    return {
+        "cold": cold,
+        "warm": {
+            "min": min(warm),
+            "median": int(statistics.median(warm)),
+            "max": max(warm),
+            "mean": int(statistics.mean(warm)),
+            "stdev": int(statistics.pstdev(warm)),
+            "samples": len(warm),
+        },
+    }
+
+
+def _run_action(s, env, kwargs, key, phase, onResult):
+    result = s.action(env, accounts, **kwargs)
+    if onResult:
+        onResult(key, phase, result)
+    return gas_of(result)
+
+
+def run_scenarios(env, scenarios, onResult=None):
+    """
+    Measures every instance of the given scenarios. Each instance runs in isolation from
+    the base environment snapshot taken here. If set, onResult(key, phase, result) is called
+    with every action result so that transactions can be profiled while they are current.
+    """
+    results = {}
+    chain.snapshot()
+
+    for s in scenarios:
+        for (key, kwargs) in s.instances():
+            chain.revert()
+            try:
+                if s.setup:
+                    s.setup(env, accounts, **kwargs)
+                cold = _run_action(s, env, kwargs, key, "cold", onResult)
+                warm = [
+                    _run_action(s, env, kwargs, key, "warm{}".format(i), onResult)
+                    for i in range(s.warmRuns)
+                ]
+                results[key] = summarize(cold, warm)
+            except Exception as e:
+                results[key] = {"error": str(e)}
+
+            print("{}: {}".format(key, results[key]))
+
+    chain.revert()
+    return results
+
+
+def _delta(value, baseline):
+    return (value - baseline) / baseline if baseline else 0
+
+
+def compare(results, baseline, scenarios=SCENARIOS, selected=None):
+    """
+    Diffs results against the baseline, a scenario regresses if either its cold or median
+    warm gas increases by more than the scenario tolerance. Baseline entries without a
+    result are reported as missing unless they belong to a registered scenario that is not
+    in selected, so entries of deleted or renamed scenarios are always missing.
+    """
+    tolerances = {key: s.tolerance for s in scenarios.values() for (key, _) in s.instances()}
+    comparisons = []
+
+    for key in sorted(results.keys()):
+        result = results[key]
+        base = baseline.get(key)
+        row = {"key": key, "result": result, "baseline": base}
+
+        if "error" in result:
+            row["status"] = "error"
+        elif base is None or "error" in base:
+            row["status"] = "new"
+        else:
+            row["coldDelta"] = _delta(result["cold"], base["cold"])
+            row["warmDelta"] = _delta(result["warm"]["median"], base["warm"]["median"])
+            tolerance = tolerances.get(key, 0)
+            if row["coldDelta"] > tolerance or row["warmDelta"] > tolerance:
+                row["status"] = "regression"
+            elif row["coldDelta"] < -tolerance or row["warmDelta"] < -tolerance:
+                row["status"] = "improved"
+            else:
+                row["status"] = "ok"
+
+        comparisons.append(row)
+
+    skipped = set()
+    if selected is not None:
+        selectedNames = {s.name for s in selected}
+        skipped = {
+            key
+            for s in scenarios.values()
+            if s.name not in selectedNames
+            for (key, _) in s.instances()
+        }
+
+    missing = sorted(set(baseline.keys()) - set(results.keys()) - skipped)
+    for key in missing:
+        comparisons.append(
+            {"key": key, "result": None, "baseline": baseline[key], "status": "missing"}
+        )
+
+    return comparisons
+
+
+def _format_delta(row, field):
+    return "{:+.2%}".format(row[field]) if field in row else ""
+
+
+def render_report(comparisons):
+    regressions = [c for c in comparisons if c["status"] in FAILED_STATUSES]
+    lines = [
+        "## Gas Report",
+        "",
+        "{} scenarios, {} regressions, errors or missing baselines".format(
+            len(comparisons), len(regressions)
+        ),
+        "",
+        "| Scenario | Cold | Warm (median) | Baseline Cold | Baseline Warm "
+        + "| Cold Δ | Warm Δ | Status |",
+        "| --- | ---: | ---: | ---: | ---: | ---: | ---: | --- |",
+    ]
+
+    for row in comparisons:
+        result = row["result"] or {}
+        base = row["baseline"] or {}
+        lines.append(
+            "| {} | {} | {} | {} | {} | {} | {} | {} |".format(
+                row["key"],
+                result.get("cold", ""),
+                result.get("warm", {}).get("median", ""),
+                base.get("cold", ""),
+                base.get("warm", {}).get("median", ""),
+                _format_delta(row, "coldDelta"),
+                _format_delta(row, "warmDelta"),
+                row["status"],
+            )
+        )
+
+    return "\n".join(lines) + "\n"
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f, sort_keys=True, indent=4)
+
+
+def diff(resultsPath, basePath, reportPath=REPORT_PATH):
+    """
+    brownie run scripts/gas/runner.py diff [results path] [base results path] [report path]
+
+    Reports the gas delta of every scenario between two results files written by main, for
+    example the same scenarios run against two builds. Tolerances are reported but not enforced.
+    """
+    with open(resultsPath, "r") as f:
+        results = json.load(f)
+    with open(basePath, "r") as f:
+        base = json.load(f)
+
+    report = render_report(compare(results, base))
+    with open(reportPath, "w") as f:
+        f.write(report)
+    print(report)
+
+
+def main(mode="check", pattern="", reportPath=REPORT_PATH):
+    """
+    brownie run scripts/gas/runner.py main [check|update] [scenario globs] [report path]
+
+    In check mode the script exits with an error if any scenario regresses past its tolerance,
+    has no baseline entry or a baseline entry has no scenario. In update mode the results are
+    written to the committed baseline and entries of deleted or renamed scenarios are removed.
+    """
+    env = initialize_environment(accounts)
+    selected = select_scenarios(pattern)
+    results = run_scenarios(env, selected)
+    write_json(RESULTS_PATH, results)
+
+    baseline = load_baseline()
+    comparisons = compare(results, baseline, selected=selected)
+    with open(reportPath, "w") as f:
+        f.write(render_report(comparisons))
+
+    if mode == "update":
+        baseline.update({k: v for (k, v) in results.items() if "error" not in v})
+        for c in comparisons:
+            if c["status"] == "missing":
+                del baseline[c["key"]]
+        write_json(BASELINE_PATH, baseline)
+        return
+
+    # Scenarios without a baseline cannot be checked and baseline entries without a scenario
+    # were deleted or renamed, both fail the check until the baseline is updated
+    if any(c["status"] in FAILED_STATUSES for c in comparisons):
+        raise SystemExit(
+            "Gas regressions or scenarios missing from {} found, see {}".format(
+                BASELINE_PATH, reportPath
+            )
+        )
@@ -0,0 +1,262 @@
+import numpy as np
+from brownie import accounts
+from brownie.network.state import Chain
+from scripts.gas.runner import gas_of, write_json
+from tests.constants import SECONDS_IN_DAY, SECONDS_IN_QUARTER
+from tests.helpers import (
+    get_balance_action,
+    get_balance_trade_action,
+    get_interest_rate_curve,
+    get_tref,
+    initialize_environment,
+)
+
+chain = Chain()
+
+BLOCK_GAS_LIMIT = 30_000_000
+# Largest portfolio shapes that the protocol allows, used to predict worst case gas
+WORST_CASE = {"assetArrayLength": 8, "assetsBitmapSize": 20, "activeCurrencies": 9}
+# Sizes that can be constructed in the test environment for each dimension
+DIMENSIONS = {
+    "assetArrayLength": range(1, 7),
+    "assetsBitmapSize": range(1, 21),
+    "activeCurrencies": range(1, 5),
+}
+METRICS = ["getFreeCollateral", "borrowWithFreeCollateral", "settleAccount"]
+
+# Market maturities in days from tRef for market indexes 1 through 7
+MARKET_OFFSET_DAYS = [90, 180, 360, 720, 1800, 3600, 7200]
+BITMAP_CURRENCY = 2
+# (currencyId, marketIndex) pairs lent to when building array portfolios
+ARRAY_ASSETS = [(1, 1), (1, 2), (2, 1), (2, 2), (3, 1), (3, 2)]
+CASH_CURRENCIES = [1, 2, 3, 4]
+DEPOSIT_AMOUNT = {1: 10e18, 2: 5000e18, 3: 5000e6, 4: 1e8}
+LEND_NOTIONAL = {1: 1e8, 2: 100e8, 3: 100e8}
+TRADED_CURRENCIES = [1, 2, 3]
+
+
+def plan_bitmap_lends(numAssets, maxMarketIndex=7):
+    """
+    Returns a list of market indexes to lend to in each successive quarter such that the
+    account holds numAssets distinct fCash maturities that are all unsettled after the final
+    quarter roll. Lending across quarters is the only way to get idiosyncratic maturities.
+    """
+    quarter = SECONDS_IN_QUARTER
+    offsets = [d * SECONDS_IN_DAY for d in MARKET_OFFSET_DAYS[:maxMarketIndex]]
+
+    for numQuarters in range(0, 10):
+        finalTime = numQuarters * quarter
+        held = set()
+        plan = []
+        for q in range(0, numQuarters + 1):
+            markets = []
+            for (i, offset) in enumerate(offsets):
+                maturity = q * quarter + offset
+                if maturity > finalTime and maturity not in held and len(held) < numAssets:
+                    held.add(maturity)
+                    markets.append(i + 1)
+            plan.append(markets)
+
+        if len(held) == numAssets:
+            return plan
+
+    raise Exception("Cannot construct bitmap of size {}".format(numAssets))
+
+
+def _trade(tradeActionType, marketIndex, notional):
+    slippage = "minSlippage" if tradeActionType == "Lend" else "maxSlippage"
+    return {
+        "tradeActionType": tradeActionType,
+        "marketIndex": marketIndex,
+        "notional": notional,
+        slippage: 0,
+    }
+
+
+def _lend(env, account, currencyId, marketIndexes):
+    amount = DEPOSIT_AMOUNT[currencyId]
+    env.notional.batchBalanceAndTradeAction(
+        account,
+        [
+            get_balance_trade_action(
+                currencyId,
+                "DepositUnderlying",
+                [_trade("Lend", m, LEND_NOTIONAL[currencyId]) for m in marketIndexes],
+                depositActionAmount=amount,
+                withdrawEntireCashBalance=True,
+            )
+        ],
+        {"from": account, "value": amount if currencyId == 1 else 0},
+    )
+
+
+def _roll_quarter(env):
+    blockTime = chain.time()
+    chain.mine(1, timestamp=get_tref(blockTime) + SECONDS_IN_QUARTER + 1)
+    for currencyId in TRADED_CURRENCIES:
+        env.notional.initializeMarkets(currencyId, False, {"from": accounts[0]})
+
+
+def _enable_all_markets(env, currencyId):
+    # Bitmap portfolios need all seven markets to reach the max bitmap size in a few quarters
+    cashGroup = list(env.notional.getCashGroup(currencyId))
+    cashGroup[0] = 7
+    env.notional.updateCashGroup(currencyId, cashGroup)
+    env.notional.updateDepositParameters(
+        currencyId, [int(0.2e8)] * 4 + [int(0.1e8), int(0.05e8), int(0.05e8)], [int(0.8e9)] * 7
+    )
+    env.notional.updateInitializationParameters(currencyId, [0] * 7, [int(0.5e9)] * 7)
+    env.notional.updateInterestRateCurve(
+        currencyId, list(range(1, 8)), [get_interest_rate_curve()] * 7
+    )
+    _roll_quarter(env)
+
+
+def _fund_account(env, account):
+    for symbol in ["DAI", "USDC", "WBTC"]:
+        token = env.token[symbol]
+        token.transfer(account, 100_000 * 10 ** token.decimals(), {"from": accounts[0]})
+        token.approve(env.notional.address, 2 ** 255, {"from": account})
+
+
+def build_array_portfolio(env, account, size):
+    for (currencyId, marketIndex) in ARRAY_ASSETS[:size]:
+        _lend(env, account, currencyId, [marketIndex])
+
+
+def build_bitmap_portfolio(env, account, size):
+    env.notional.enableBitmapCurrency(BITMAP_CURRENCY, {"from": account})
+    for (q, marketIndexes) in enumerate(plan_bitmap_lends(size)):
+        if q > 0:
+            _roll_quarter(env)
+        if len(marketIndexes) > 0:
+            _lend(env, account, BITMAP_CURRENCY, marketIndexes)
+
+
+def build_active_currencies(env, account, size):
+    currencies = CASH_CURRENCIES[:size]
+    env.notional.batchBalanceAction(
+        account,
+        [
+            get_balance_action(c, "DepositUnderlying", depositActionAmount=DEPOSIT_AMOUNT[c])
+            for c in currencies
+        ],
+        {"from": account, "value": DEPOSIT_AMOUNT[1] if 1 in currencies else 0},
+    )
+
+
+BUILDERS = {
+    "assetArrayLength": build_array_portfolio,
+    "assetsBitmapSize": build_bitmap_portfolio,
+    "activeCurrencies": build_active_currencies,
+}
+
+
+def measure(env, account):
+    """Measures all metrics for the account, settlement is measured last since it rolls time"""
+    result = {"getFreeCollateral": gas_of(env.notional.getFreeCollateral.estimate_gas(account))}
+
+    borrow = get_balance_trade_action(2, "None", [_trade("Borrow", 1, 10e8)])
+    txn = env.notional.batchBalanceAndTradeAction(account, [borrow], {"from": account})
+    result["borrowWithFreeCollateral"] = gas_of(txn)
+    chain.undo(1)
+
+    _roll_quarter(env)
+    result["settleAccount"] = gas_of(env.notional.settleAccount(account, {"from": accounts[0]}))
+
+    return result
+
+
+def sweep(env, account, dimensions=DIMENSIONS):
+    points = []
+    chain.snapshot()
+
+    for (dimension, sizes) in dimensions.items():
+        for size in sizes:
+            chain.revert()
+            try:
+                BUILDERS[dimension](env, account, size)
+                for (metric, gas) in measure(env, account).items():
+                    points.append(
+                        {"dimension": dimension, "size": size, "metric": metric, "gas": gas}
+                    )
+            except Exception as e:
+                print("{} {} failed: {}".format(dimension, size, e))
+
+    chain.revert()
+    return points
+
+
+def fit_models(points):
+    """
+    Fits gas = base + marginal * size for each (dimension, metric) and extrapolates to the
+    worst case portfolio shape and to the size at which the block gas limit is reached.
+    """
+    models = []
+    for dimension in DIMENSIONS.keys():
+        for metric in METRICS:
+            series = [p for p in points if p["dimension"] == dimension and p["metric"] == metric]
+            if len(series) < 2:
+                continue
+
+            x = np.array([p["size"] for p in series], dtype=float)
+            y = np.array([p["gas"] for p in series], dtype=float)
+            (marginal, base) = np.polyfit(x, y, 1)
+            residuals = y - (base + marginal * x)
+
+            models.append(
+                {
+                    "dimension": dimension,
+                    "metric": metric,
+                    "base": int(base),
+                    "marginal": int(marginal),
+                    "maxResidual": int(np.abs(residuals).max()),
+                    "worstCaseSize": WORST_CASE[dimension],
+                    "worstCaseGas": int(base + marginal * WORST_CASE[dimension]),
+                    "sizeAtBlockLimit": int((BLOCK_GAS_LIMIT - base) // marginal)
+                    if marginal > 0
+                    else None,
+                }
+            )
+
+    return models
+
+
+def render_report(models):
+    lines = [
+        "## Gas Scaling by Portfolio Shape",
+        "",
+        "| Dimension | Metric | Base | Marginal / unit | Max Residual "
+        + "| Worst Case Size | Worst Case Gas | Size at Block Limit |",
+        "| --- | --- | ---: | ---: | ---: | ---: | ---: | ---: |",
+    ]
+    for m in models:
+        lines.append(
+            "| {dimension} | {metric} | {base} | {marginal} | {maxResidual} "
+            "| {worstCaseSize} | {worstCaseGas} | {sizeAtBlockLimit} |".format(**m)
+        )
+
+    return "\n".join(lines) + "\n"
+
+
+def write_curves(path, points):
+    with open(path, "w") as f:
+        f.write("dimension,size,metric,gas\n")
+        for p in points:
+            f.write("{dimension},{size},{metric},{gas}\n".format(**p))
+
+
+def main(outputPrefix="gas_scaling"):
+    """brownie run scripts/gas/scaling.py main [output prefix]"""
+    env = initialize_environment(accounts)
+    _enable_all_markets(env, BITMAP_CURRENCY)
+    account = accounts[5]
+    _fund_account(env, account)
+
+    points = sweep(env, account)
+    models = fit_models(points)
+
+    write_curves("{}.csv".format(outputPrefix), points)
+    write_json("{}.json".format(outputPrefix), {"points": points, "models": models})
+    with open("{}.md".format(outputPrefix), "w") as f:
+        f.write(render_report(models))
@@ -0,0 +1,763 @@
+import math
+
+from brownie import MockBitmap, MockMulticall3
+from brownie.network.state import Chain
+from scripts.config import CurrencyDefaults
+from scripts.gas.registry import scenario
+from tests.constants import SECONDS_IN_DAY, SECONDS_IN_QUARTER, ZERO_ADDRESS
+from tests.helpers import (
+    _enable_cash_group,
+    get_balance_action,
+    get_balance_trade_action,
+    get_interest_rate_curve,
+    get_lend_action,
+    get_tref,
+)
+
+chain = Chain()
+
+# Deposit amounts in external precision for each currency in the test environment, currency 5
+# is USDT which has a transfer fee and is only listed by scenarios that use it
+DEPOSIT_AMOUNT = {1: 10e18, 2: 5000e18, 3: 5000e6, 5: 5000e8}
+# Deprecated asset token (cToken) deposit amount, accounts[1] holds 500000e8 cDAI and cUSDC
+DEPOSIT_ASSET_AMOUNT = 50000e8
+TRANSFER_FEE_CURRENCY_ID = 5
+# Max market index settings swept by the nToken and initialize markets scenarios
+MAX_MARKETS = [2, 3, 4, 5, 6, 7]
+DEPOSIT_SHARES = {
+    2: [0.5e8, 0.5e8],
+    3: [0.4e8, 0.4e8, 0.2e8],
+    4: [0.4e8, 0.2e8, 0.2e8, 0.2e8],
+    5: [0.2e8, 0.2e8, 0.2e8, 0.2e8, 0.2e8],
+    6: [0.2e8, 0.2e8, 0.2e8, 0.2e8, 0.1e8, 0.1e8],
+    7: [0.2e8, 0.2e8, 0.2e8, 0.2e8, 0.1e8, 0.05e8, 0.05e8],
+}
+
+
+def _value(currencyId, amount):
+    return amount if currencyId == 1 else 0
+
+
+def _deposit(env, account, currencyId, mintNToken=False):
+    amount = DEPOSIT_AMOUNT[currencyId]
+    return env.notional.batchBalanceAction(
+        account,
+        [
+            get_balance_action(
+                currencyId,
+                "DepositUnderlyingAndMintNToken" if mintNToken else "DepositUnderlying",
+                depositActionAmount=amount,
+            )
+        ],
+        {"from": account, "value": _value(currencyId, amount)},
+    )
+
+
+def _lend_action(marketIndex, notional=100e8):
+    return [
+        {
+            "tradeActionType": "Lend",
+            "marketIndex": marketIndex,
+            "notional": notional,
+            "minSlippage": 0,
+        }
+    ]
+
+
+def _borrow_action(marketIndex, notional=100e8):
+    return [
+        {
+            "tradeActionType": "Borrow",
+            "marketIndex": marketIndex,
+            "notional": notional,
+            "maxSlippage": 0,
+        }
+    ]
+
+
+def _roll_to_next_quarter(env):
+    blockTime = chain.time()
+    chain.mine(1, timestamp=get_tref(blockTime) + SECONDS_IN_QUARTER + 1)
+
+
+def _initialize_all_markets(env, accounts):
+    for cid in [1, 2, 3]:
+        env.notional.initializeMarkets(cid, False, {"from": accounts[0]})
+
+
+def _list_transfer_fee_token(env, accounts):
+    """Lists USDT, which charges a fee on transfer, as currency 5 and funds accounts[1]"""
+    env.token["USDT"].approve(env.notional.address, 2 ** 255, {"from": accounts[0]})
+    env.token["USDT"].approve(env.cToken["USDT"].address, 2 ** 255, {"from": accounts[0]})
+    env.cToken["USDT"].approve(env.notional.address, 2 ** 255, {"from": accounts[0]})
+    env.cToken["USDT"].mint(10_000_000e8, {"from": accounts[0]})
+    env.enableCurrency("USDT", CurrencyDefaults)
+    _enable_cash_group(TRANSFER_FEE_CURRENCY_ID, env, accounts, 1_000_000e8)
+
+    env.token["USDT"].transfer(accounts[1], 100_000e8, {"from": accounts[0]})
+    env.token["USDT"].approve(env.notional.address, 2 ** 255, {"from": accounts[1]})
+
+
+def _set_max_markets(env, currencyId, maxMarkets):
+    """Sets the max market index and the nToken parameters for every market, markets are
+    initialized at the next quarter roll"""
+    cashGroup = list(env.notional.getCashGroup(currencyId))
+    cashGroup[0] = maxMarkets
+    env.notional.updateCashGroup(currencyId, cashGroup)
+    env.notional.updateDepositParameters(
+        currencyId, DEPOSIT_SHARES[maxMarkets], [0.8e9] * maxMarkets
+    )
+    env.notional.updateInterestRateCurve(
+        currencyId, list(range(1, maxMarkets + 1)), [get_interest_rate_curve()] * maxMarkets
+    )
+    env.notional.updateInitializationParameters(
+        currencyId, [0] * maxMarkets, [0.5e9] * maxMarkets
+    )
+
+
+def _setup_deposit(env, accounts, currencyId, **kwargs):
+    if currencyId == TRANSFER_FEE_CURRENCY_ID:
+        _list_transfer_fee_token(env, accounts)
+
+
+@scenario(
+    "deposit.underlying",
+    params={"currencyId": [1, 2, 3, TRANSFER_FEE_CURRENCY_ID]},
+    setup=_setup_deposit,
+)
+def deposit_underlying(env, accounts, currencyId):
+    """Currency 5 measures a deposit of a token with a transfer fee"""
+    amount = DEPOSIT_AMOUNT[currencyId]
+    return env.notional.depositUnderlyingToken(
+        accounts[1], currencyId, amount, {"from": accounts[1], "value": _value(currencyId, amount)}
+    )
+
+
+def _setup_batch_deposit(env, accounts, currencyId, depositType):
+    if currencyId == 1 and depositType.startswith("DepositAsset"):
+        # accounts[1] is only funded with cDAI and cUSDC by the test environment
+        env.cToken["ETH"].transfer(
+            accounts[1], DEPOSIT_ASSET_AMOUNT * 4, {"from": accounts[0]}
+        )
+        env.cToken["ETH"].approve(env.notional.address, 2 ** 255, {"from": accounts[1]})
+
+
+@scenario(
+    "batch.deposit",
+    params={
+        "currencyId": [1, 2, 3],
+        "depositType": [
+            "DepositUnderlying",
+            "DepositUnderlyingAndMintNToken",
+            "DepositAsset",
+            "DepositAssetAndMintNToken",
+        ],
+    },
+    setup=_setup_batch_deposit,
+)
+def batch_deposit(env, accounts, currencyId, depositType):
+    """Asset deposits transfer the deprecated cToken and redeem it to prime cash"""
+    if depositType.startswith("DepositAsset"):
+        return env.notional.batchBalanceAction(
+            accounts[1],
+            [get_balance_action(currencyId, depositType, depositActionAmount=DEPOSIT_ASSET_AMOUNT)],
+            {"from": accounts[1]},
+        )
+
+    return _deposit(env, accounts[1], currencyId, depositType == "DepositUnderlyingAndMintNToken")
+
+
+def _setup_batch_deposit_transfer_fee(env, accounts, **kwargs):
+    _list_transfer_fee_token(env, accounts)
+
+
+@scenario(
+    "batch.deposit.hasTransferFee",
+    params={"mintNToken": [False, True]},
+    setup=_setup_batch_deposit_transfer_fee,
+)
+def batch_deposit_transfer_fee(env, accounts, mintNToken):
+    return _deposit(env, accounts[1], TRANSFER_FEE_CURRENCY_ID, mintNToken)
+
+
+# Withdraw tokens mapped to (currency id, redeemToUnderlying). Withdrawing to cTokens is
+# deprecated after the prime cash migration, ETH can still be withdrawn as WETH.
+WITHDRAW_TOKENS = {"ETH": (1, True), "WETH": (1, False), "DAI": (2, True), "USDC": (3, True)}
+
+
+def _setup_withdraw_token(env, accounts, token, **kwargs):
+    _deposit(env, accounts[1], WITHDRAW_TOKENS[token][0])
+
+
+@scenario(
+    "withdraw",
+    params={"token": ["ETH", "WETH", "DAI", "USDC"], "entireBalance": [False, True]},
+    setup=_setup_withdraw_token,
+    warmRuns=0,
+)
+def withdraw(env, accounts, token, entireBalance):
+    (currencyId, redeemToUnderlying) = WITHDRAW_TOKENS[token]
+    # uint88 max withdraws the entire cash balance
+    amount = 2 ** 88 - 1 if entireBalance else 100e8
+    return env.notional.withdraw(currencyId, amount, redeemToUnderlying, {"from": accounts[1]})
+
+
+def _setup_withdraw(env, accounts, currencyId, **kwargs):
+    _deposit(env, accounts[1], currencyId)
+
+
+@scenario(
+    "batch.withdraw",
+    params={"currencyId": [2, 3], "entireBalance": [False, True]},
+    setup=_setup_withdraw,
+    warmRuns=0,
+)
+def batch_withdraw(env, accounts, currencyId, entireBalance):
+    return env.notional.batchBalanceAction(
+        accounts[1],
+        [
+            get_balance_action(
+                currencyId,
+                "None",
+                withdrawAmountInternalPrecision=0 if entireBalance else 100e8,
+                withdrawEntireCashBalance=entireBalance,
+                redeemToUnderlying=True,
+            )
+        ],
+        {"from": accounts[1]},
+    )
+
+
+def _setup_ntoken_markets(env, accounts, currencyId, maxMarkets):
+    _set_max_markets(env, currencyId, maxMarkets)
+    _roll_to_next_quarter(env)
+    _initialize_all_markets(env, accounts)
+
+
+def _setup_mint(env, accounts, depositType, maxMarkets):
+    _setup_ntoken_markets(env, accounts, 2, maxMarkets)
+    if depositType == "ConvertCashToNToken":
+        _deposit(env, accounts[1], 2)
+
+
+@scenario(
+    "nToken.mint",
+    params={
+        "depositType": [
+            "DepositUnderlyingAndMintNToken",
+            "DepositAssetAndMintNToken",
+            "ConvertCashToNToken",
+        ],
+        "maxMarkets": MAX_MARKETS,
+    },
+    setup=_setup_mint,
+)
+def ntoken_mint(env, accounts, depositType, maxMarkets):
+    if depositType == "DepositUnderlyingAndMintNToken":
+        amount = DEPOSIT_AMOUNT[2]
+    elif depositType == "DepositAssetAndMintNToken":
+        amount = DEPOSIT_ASSET_AMOUNT
+    else:
+        # Converts a quarter of the remaining cash balance so that warm runs can repeat
+        amount = env.notional.getAccountBalance(2, accounts[1])[0] // 4
+
+    return env.notional.batchBalanceAction(
+        accounts[1],
+        [get_balance_action(2, depositType, depositActionAmount=amount)],
+        {"from": accounts[1]},
+    )
+
+
+def _setup_redeem(env, accounts, currencyId, maxMarkets):
+    _setup_ntoken_markets(env, accounts, currencyId, maxMarkets)
+    _deposit(env, accounts[1], currencyId, mintNToken=True)
+
+
+@scenario(
+    "nToken.redeem",
+    params={"currencyId": [2, 3], "maxMarkets": MAX_MARKETS},
+    setup=_setup_redeem,
+)
+def ntoken_redeem(env, accounts, currencyId, maxMarkets):
+    return env.notional.batchBalanceAction(
+        accounts[1],
+        [
+            get_balance_action(
+                currencyId, "RedeemNToken", depositActionAmount=10e8, withdrawEntireCashBalance=True
+            )
+        ],
+        {"from": accounts[1]},
+    )
+
+
+def _setup_lend(env, accounts, currencyId, deposit, **kwargs):
+    if deposit == "None":
+        _deposit(env, accounts[1], currencyId)
+
+
+@scenario(
+    "batchAction.lend",
+    params={
+        "currencyId": [2, 3],
+        "marketIndex": [1, 2],
+        "deposit": ["DepositUnderlying", "DepositAsset", "None"],
+    },
+    setup=_setup_lend,
+)
+def batch_action_lend(env, accounts, currencyId, marketIndex, deposit):
+    """Lends from a deposit or, when deposit is None, from an existing cash balance"""
+    amount = {"DepositUnderlying": DEPOSIT_AMOUNT[currencyId], "DepositAsset": DEPOSIT_ASSET_AMOUNT}
+    return env.notional.batchBalanceAndTradeAction(
+        accounts[1],
+        [
+            get_balance_trade_action(
+                currencyId,
+                deposit,
+                _lend_action(marketIndex),
+                depositActionAmount=amount.get(deposit, 0),
+                withdrawEntireCashBalance=deposit != "None",
+            )
+        ],
+        {"from": accounts[1]},
+    )
+
+
+def _setup_lend_exit(env, accounts, currencyId, **kwargs):
+    batch_action_lend(env, accounts, currencyId, 1, "DepositUnderlying")
+
+
+@scenario(
+    "batchAction.lendExit",
+    params={
+        "currencyId": [2, 3],
+        "exit": ["WithdrawToUnderlying", "WithdrawCash", "RollToMaturity"],
+    },
+    setup=_setup_lend_exit,
+    warmRuns=0,
+)
+def batch_action_lend_exit(env, accounts, currencyId, exit):
+    """
+    Exits a lend in the first market by borrowing back the fCash, either withdrawing to
+    underlying, holding the cash balance or rolling into the second market
+    """
+    trades = _borrow_action(1)
+    if exit == "RollToMaturity":
+        trades = trades + _lend_action(2, notional=80e8)
+
+    return env.notional.batchBalanceAndTradeAction(
+        accounts[1],
+        [
+            get_balance_trade_action(
+                currencyId,
+                "None",
+                trades,
+                withdrawEntireCashBalance=exit != "WithdrawCash",
+                redeemToUnderlying=True,
+            )
+        ],
+        {"from": accounts[1]},
+    )
+
+
+@scenario("batchLend", params={"currencyId": [2, 3], "marketIndex": [1, 2]})
+def batch_lend(env, accounts, currencyId, marketIndex):
+    return env.notional.batchLend(
+        accounts[1],
+        [get_lend_action(currencyId, _lend_action(marketIndex), True)],
+        {"from": accounts[1]},
+    )
+
+
+def _collateral_action(collateral):
+    if collateral == "ETH":
+        return (
+            get_balance_trade_action(1, "DepositUnderlying", [], depositActionAmount=10e18),
+            10e18,
+        )
+    elif collateral == "USDC":
+        return (
+            get_balance_trade_action(3, "DepositUnderlying", [], depositActionAmount=10000e6),
+            0,
+        )
+    elif collateral == "nToken":
+        return (
+            get_balance_trade_action(
+                3, "DepositUnderlyingAndMintNToken", [], depositActionAmount=10000e6
+            ),
+            0,
+        )
+
+
+@scenario(
+    "batchAction.borrow",
+    params={
+        "collateral": ["ETH", "USDC", "nToken"],
+        "marketIndex": [1, 2],
+        "withdraw": [False, True],
+    },
+)
+def batch_action_borrow(env, accounts, collateral, marketIndex, withdraw):
+    borrowAction = get_balance_trade_action(
+        2,
+        "None",
+        _borrow_action(marketIndex),
+        withdrawEntireCashBalance=withdraw,
+        redeemToUnderlying=True,
+    )
+    (collateralAction, value) = _collateral_action(collateral)
+    actions = sorted([borrowAction, collateralAction], key=lambda a: a[1])
+
+    return env.notional.batchBalanceAndTradeAction(
+        accounts[1], actions, {"from": accounts[1], "value": value}
+    )
+
+
+def _setup_initialize_markets(env, accounts, currencyId, maxMarkets):
+    _set_max_markets(env, currencyId, maxMarkets)
+    _roll_to_next_quarter(env)
+
+
+@scenario(
+    "initializeMarkets",
+    params={"currencyId": [1, 2, 3], "maxMarkets": MAX_MARKETS},
+    setup=_setup_initialize_markets,
+    warmRuns=0,
+)
+def initialize_markets(env, accounts, currencyId, maxMarkets):
+    return env.notional.initializeMarkets(currencyId, False, {"from": accounts[0]})
+
+
+def _setup_initialize_markets_batch(env, accounts, **kwargs):
+    _roll_to_next_quarter(env)
+
+
+@scenario(
+    "initializeMarketsBatch",
+    params={"numCurrencies": [1, 2, 3], "method": ["transactions", "multicall", "batch"]},
+    setup=_setup_initialize_markets_batch,
+    warmRuns=0,
+)
+def initialize_markets_batch(env, accounts, numCurrencies, method):
+    """
+    Total gas to roll numCurrencies currencies at the quarter: one initializeMarkets transaction
+    per currency, the Multicall3 aggregate3 workaround used by keeper scripts, or a single
+    initializeMarketsBatch call
+    """
+    currencyIds = [1, 2, 3][:numCurrencies]
+    if method == "transactions":
+        return sum(
+            env.notional.initializeMarkets(cid, False, {"from": accounts[0]}).gas_used
+            for cid in currencyIds
+        )
+    elif method == "multicall":
+        multicall = MockMulticall3.deploy({"from": accounts[0]})
+        calls = [
+            (env.notional.address, True, env.notional.initializeMarkets.encode_input(cid, False))
+            for cid in currencyIds
+        ]
+        return multicall.aggregate3(calls, {"from": accounts[0]})
+
+    return env.notional.initializeMarketsBatch(currencyIds, False, {"from": accounts[0]})
+
+
+def _setup_settle_account(env, accounts, currencyId, assets):
+    actions = [
+        get_balance_trade_action(
+            currencyId,
+            "DepositUnderlying",
+            _lend_action(1) if assets == "lend" else _lend_action(1) + _lend_action(2),
+            depositActionAmount=DEPOSIT_AMOUNT[currencyId],
+            withdrawEntireCashBalance=True,
+        )
+    ]
+    env.notional.batchBalanceAndTradeAction(accounts[1], actions, {"from": accounts[1]})
+
+    _roll_to_next_quarter(env)
+    _initialize_all_markets(env, accounts)
+
+
+@scenario(
+    "settleAccount",
+    params={"currencyId": [2, 3], "assets": ["lend", "lendTwoMarkets"]},
+    setup=_setup_settle_account,
+    warmRuns=0,
+)
+def settle_account(env, accounts, currencyId, assets):
+    return env.notional.settleAccount(accounts[1], {"from": accounts[0]})
+
+
+def _setup_settle_accounts_batch(env, accounts, currencyId, numAccounts):
+    token = env.token["DAI" if currencyId == 2 else "USDC"]
+    for account in accounts[1 : numAccounts + 1]:
+        if account != accounts[1]:
+            token.transfer(account, DEPOSIT_AMOUNT[currencyId], {"from": accounts[0]})
+            token.approve(env.notional.address, 2 ** 255, {"from": account})
+
+        env.notional.batchBalanceAndTradeAction(
+            account,
+            [
+                get_balance_trade_action(
+                    currencyId,
+                    "DepositUnderlying",
+                    _lend_action(1),
+                    depositActionAmount=DEPOSIT_AMOUNT[currencyId],
+                    withdrawEntireCashBalance=True,
+                )
+            ],
+            {"from": account},
+        )
+
+    _roll_to_next_quarter(env)
+    _initialize_all_markets(env, accounts)
+
+
+@scenario(
+    "settleAccountsBatch",
+    params={"currencyId": [2, 3], "numAccounts": [1, 4, 8]},
+    setup=_setup_settle_accounts_batch,
+    warmRuns=0,
+)
+def settle_accounts_batch(env, accounts, currencyId, numAccounts):
+    """Reports gas per settled account, comparable to settleAccount.assets=lend"""
+    txn = env.notional.settleAccountsBatch(accounts[1 : numAccounts + 1], {"from": accounts[0]})
+    return txn.gas_used // numAccounts
+
+
+def _setup_free_collateral(env, accounts, collateral):
+    batch_action_borrow(env, accounts, collateral, 1, False)
+
+
+@scenario(
+    "view.getFreeCollateral",
+    params={"collateral": ["ETH", "USDC", "nToken"]},
+    setup=_setup_free_collateral,
+)
+def view_get_free_collateral(env, accounts, collateral):
+    return env.notional.getFreeCollateral.estimate_gas(accounts[1])
+
+
+def _setup_balance_of(env, accounts, portfolio, numIds):
+    if portfolio == "bitmap":
+        env.notional.enableBitmapCurrency(2, {"from": accounts[1]})
+
+    actions = [
+        get_balance_trade_action(
+            2,
+            "DepositUnderlying",
+            _lend_action(1) + _lend_action(2),
+            depositActionAmount=DEPOSIT_AMOUNT[2],
+            withdrawEntireCashBalance=True,
+        )
+    ]
+    env.notional.batchBalanceAndTradeAction(accounts[1], actions, {"from": accounts[1]})
+
+
+def _balance_of_ids(env, numIds):
+    """Positive and debt fCash ids in every active market, repeated up to numIds"""
+    ids = [
+        env.notional.encode(2, m[1], 1, ZERO_ADDRESS, isDebt)
+        for m in env.notional.getActiveMarkets(2)
+        for isDebt in [False, True]
+    ]
+    return (ids * numIds)[:numIds]
+
+
+@scenario(
+    "view.signedBalanceOfBatch",
+    params={"portfolio": ["array", "bitmap"], "numIds": [1, 10, 100]},
+    setup=_setup_balance_of,
+)
+def view_signed_balance_of_batch(env, accounts, portfolio, numIds):
+    ids = _balance_of_ids(env, numIds)
+    return env.notional.signedBalanceOfBatch.estimate_gas([accounts[1]] * numIds, ids)
+
+
+@scenario(
+    "view.signedBalanceOf",
+    params={"portfolio": ["array", "bitmap"], "numIds": [1, 10, 100]},
+    setup=_setup_balance_of,
+)
+def view_signed_balance_of(env, accounts, portfolio, numIds):
+    """Sum of one signedBalanceOf call per id, the baseline for view.signedBalanceOfBatch"""
+    return sum(
+        env.notional.signedBalanceOf.estimate_gas(accounts[1], i)
+        for i in _balance_of_ids(env, numIds)
+    )
+
+
+def _borrow_prime_to_limit(env, account, currencyId=2):
+    """Borrows prime cash in the local currency just below the account's free collateral"""
+    env.notional.enablePrimeBorrow(True, {"from": account})
+    oracle = env.ethOracle["DAI" if currencyId == 2 else "USDC"]
+    (fc, _) = env.notional.getFreeCollateral(account)
+    buffer = env.notional.getRateStorage(currencyId)["ethRate"]["buffer"]
+    maxBorrowInternal = math.floor(fc * 1e18 / oracle.latestAnswer() * 99 / buffer)
+    decimals = env.notional.getCurrency(currencyId)["underlyingToken"]["decimals"]
+    env.notional.withdraw(
+        currencyId,
+        env.notional.convertUnderlyingToPrimeCash(currencyId, maxBorrowInternal * decimals / 1e8),
+        True,
+        {"from": account},
+    )
+    # Moves the local currency price so that the account is under collateralized
+    oracle.setAnswer(math.floor(oracle.latestAnswer() * 1.10))
+
+
+def _setup_liquidate_local_currency(env, accounts, **kwargs):
+    # Borrows ETH prime cash to mint nTokens, debt accrual leaves the account under collateralized
+    account = accounts[2]
+    env.notional.enablePrimeBorrow(True, {"from": account})
+    env.notional.depositUnderlyingToken(account, 1, 150.1e18, {"from": account, "value": 150.1e18})
+    cashBalance = env.notional.getAccountBalance(1, account)[0]
+    env.notional.batchBalanceAndTradeAction(
+        account,
+        [
+            get_balance_trade_action(
+                1, "ConvertCashToNToken", [], depositActionAmount=cashBalance * 6.666
+            )
+        ],
+        {"from": account},
+    )
+    chain.mine(1, timedelta=45 * SECONDS_IN_DAY)
+
+
+@scenario("liquidateLocalCurrency", setup=_setup_liquidate_local_currency, warmRuns=0)
+def liquidate_local_currency(env, accounts):
+    (localPrimeCash, _) = env.notional.calculateLocalCurrencyLiquidation.call(accounts[2], 1, 0)
+    value = env.notional.convertCashBalanceToExternal(1, localPrimeCash, True) + 2e18
+    return env.notional.liquidateLocalCurrency(
+        accounts[2], 1, 0, {"from": accounts[0], "value": value}
+    )
+
+
+def _setup_liquidate_collateral_currency(env, accounts, collateral):
+    account = accounts[2]
+    env.notional.depositUnderlyingToken(account, 1, 10e18, {"from": account, "value": 10e18})
+    if collateral == "nToken":
+        cashBalance = env.notional.getAccountBalance(1, account)[0]
+        env.notional.batchBalanceAction(
+            account,
+            [get_balance_action(1, "ConvertCashToNToken", depositActionAmount=cashBalance // 2)],
+            {"from": account},
+        )
+    _borrow_prime_to_limit(env, account)
+
+
+@scenario(
+    "liquidateCollateralCurrency",
+    params={"collateral": ["cash", "nToken"]},
+    setup=_setup_liquidate_collateral_currency,
+    warmRuns=0,
+)
+def liquidate_collateral_currency(env, accounts, collateral):
+    """DAI prime debt against ETH cash or ETH nToken collateral"""
+    return env.notional.liquidateCollateralCurrency(
+        accounts[2], 2, 1, 0, 0, True, True, {"from": accounts[0]}
+    )
+
+
+def _setup_liquidate_fcash_local(env, accounts, **kwargs):
+    account = accounts[2]
+    env.token["DAI"].transfer(account, 1000e18, {"from": accounts[0]})
+    env.token["DAI"].approve(env.notional.address, 2 ** 255, {"from": account})
+    # Creates a trade on the spread between the 3 month and 6 month markets
+    env.notional.batchBalanceAndTradeAction(
+        account,
+        [
+            get_balance_trade_action(
+                2,
+                "DepositUnderlying",
+                _lend_action(1, notional=103.8e8) + _borrow_action(2),
+                depositActionAmount=100e18,
+                withdrawEntireCashBalance=True,
+            )
+        ],
+        {"from": account},
+    )
+
+    # Moves the lend borrow spread against the account
+    env.notional.batchBalanceAndTradeAction(
+        accounts[0],
+        [
+            get_balance_trade_action(
+                2,
+                "DepositUnderlying",
+                _borrow_action(1, notional=200_000e8) + _lend_action(2, notional=300_000e8),
+                depositActionAmount=1_000_000e18,
+            )
+        ],
+        {"from": accounts[0]},
+    )
+    # Allows the rate oracle to catch up
+    chain.mine(1, timedelta=SECONDS_IN_DAY / 4)
+
+
+def _positive_fcash_maturities(env, account):
+    portfolio = env.notional.getAccountPortfolio(account)
+    return list(reversed([asset[1] for asset in portfolio if asset[3] > 0]))
+
+
+@scenario("liquidatefCashLocal", setup=_setup_liquidate_fcash_local, warmRuns=0)
+def liquidate_fcash_local(env, accounts):
+    maturities = _positive_fcash_maturities(env, accounts[2])
+    return env.notional.liquidatefCashLocal(
+        accounts[2], 2, maturities, [0] * len(maturities), {"from": accounts[0]}
+    )
+
+
+def _setup_liquidate_fcash_cross_currency(env, accounts, fCashAssets):
+    account = accounts[2]
+    trades = []
+    for i in range(fCashAssets):
+        trades = trades + _lend_action(i + 1, notional=100e8 / fCashAssets)
+
+    env.notional.batchBalanceAndTradeAction(
+        account,
+        [
+            get_balance_trade_action(
+                1,
+                "DepositUnderlying",
+                trades,
+                depositActionAmount=100e18,
+                withdrawEntireCashBalance=True,
+            )
+        ],
+        {"from": account, "value": 100e18},
+    )
+    _borrow_prime_to_limit(env, account)
+
+
+@scenario(
+    "liquidatefCashCrossCurrency",
+    params={"fCashAssets": [1, 2]},
+    setup=_setup_liquidate_fcash_cross_currency,
+    warmRuns=0,
+)
+def liquidate_fcash_cross_currency(env, accounts, fCashAssets):
+    """DAI prime debt against ETH fCash collateral"""
+    maturities = _positive_fcash_maturities(env, accounts[2])
+    return env.notional.liquidatefCashCrossCurrency(
+        accounts[2], 2, 1, maturities, [0] * len(maturities), {"from": accounts[0]}
+    )
+
+
+def _bitmap_with_density(density):
+    """Bitmap with density set bits spread evenly across all 256 bits"""
+    bitmap = 0
+    for i in range(density):
+        bitmap |= 1 << (255 - (i * 256) // density)
+    return "0x{:064x}".format(bitmap)
+
+
+@scenario(
+    "math.bitmapIteration",
+    params={
+        "method": ["iterator", "binarySearch"],
+        "density": [1, 2, 4, 8, 16, 32, 64, 128, 256],
+    },
+)
+def math_bitmap_iteration(env, accounts, method, density):
+    """Gas to walk every set bit, getNextBitNumAfter versus the prior setBit and search loop"""
+    mockBitmap = MockBitmap.deploy({"from": accounts[0]})
+    fn = mockBitmap.getSetBits if method == "iterator" else mockBitmap.getSetBitsBinarySearch
+    return fn.estimate_gas(_bitmap_with_density(density))
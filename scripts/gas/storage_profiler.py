@@ -0,0 +1,248 @@
+import os
+
+from brownie import accounts
+from eth_utils import keccak
+from scripts.gas.registry import select_scenarios
+from scripts.gas.runner import run_scenarios
+from scripts.gas.trace_profiler import CALL_OPS, get_struct_logs
+from tests.helpers import initialize_environment
+
+# Mirrors LibStorage.StorageId, storage slots are STORAGE_SLOT_BASE + the enum index
+STORAGE_SLOT_BASE = 1000000
+STORAGE_IDS = [
+    "Unused",
+    "AccountStorage",
+    "nTokenContext",
+    "nTokenAddress",
+    "nTokenDeposit",
+    "nTokenInitialization",
+    "Balance",
+    "Token",
+    "SettlementRate_deprecated",
+    "CashGroup",
+    "Market",
+    "AssetsBitmap",
+    "ifCashBitmap",
+    "PortfolioArray",
+    "nTokenTotalSupply_deprecated",
+    "AssetRate_deprecated",
+    "ExchangeRate",
+    "nTokenTotalSupply",
+    "SecondaryIncentiveRewarder",
+    "LendingPool",
+    "VaultConfig",
+    "VaultState",
+    "VaultAccount",
+    "VaultBorrowCapacity",
+    "VaultSecondaryBorrow",
+    "VaultSettledAssets_deprecated",
+    "VaultAccountSecondaryDebtShare",
+    "ActiveInterestRateParameters",
+    "NextInterestRateParameters",
+    "PrimeCashFactors",
+    "PrimeSettlementRates",
+    "PrimeCashHoldingsOracles",
+    "TotalfCashDebtOutstanding",
+    "pCashAddress",
+    "pDebtAddress",
+    "pCashTransferAllowance",
+    "RebalancingTargets",
+    "RebalancingContext",
+    "StoredTokenBalances",
+]
+
+# Gas costs from EIP-2929 and EIP-2200
+COLD_SLOAD_COST = 2100
+WARM_STORAGE_READ_COST = 100
+# Structs and arrays are laid out at most this many slots past their hashed base slot
+MAX_STRUCT_OFFSET = 256
+
+
+def _to_int(value):
+    return int(value, 16)
+
+
+def _memory_slice(memory, offset, length):
+    data = bytes.fromhex("".join(w[2:] if w.startswith("0x") else w for w in memory))
+    return data[offset : offset + length].ljust(length, b"\x00")
+
+
+class StorageAccess:
+    def __init__(self, address, slot, op, cold):
+        self.address = address
+        self.slot = slot
+        self.op = op
+        self.cold = cold
+
+
+class StorageProfile:
+    """
+    Storage accesses made by a single transaction. Accesses are marked cold or warm using the
+    EIP-2929 access set for the transaction, which is what the gas schedule charges, rather
+    than by comparing gas across repeated transactions.
+    """
+
+    def __init__(self, accesses, preimages):
+        self.accesses = accesses
+        self.preimages = preimages
+        self._hashes = sorted(preimages.keys())
+
+    def resolve(self, slot):
+        """
+        Returns a label for the slot as a LibStorage id followed by mapping keys and a struct
+        or array offset, i.e. Balance[0xabc..][2]+0. Slots that are not derived from a
+        LibStorage base slot are returned as hex.
+        """
+        if STORAGE_SLOT_BASE <= slot < STORAGE_SLOT_BASE + len(STORAGE_IDS):
+            return STORAGE_IDS[slot - STORAGE_SLOT_BASE]
+
+        for offset in range(0, MAX_STRUCT_OFFSET):
+            preimage = self.preimages.get(slot - offset)
+            if preimage is None:
+                continue
+
+            if len(preimage) == 64:
+                # Mapping value slot is keccak256(key . slot)
+                key = int.from_bytes(preimage[:32], "big")
+                parent = self.resolve(int.from_bytes(preimage[32:], "big"))
+                label = "{}[{}]".format(parent, _format_key(key))
+            elif len(preimage) == 32:
+                # Dynamic array data begins at keccak256(slot)
+                label = "{}[]".format(self.resolve(int.from_bytes(preimage, "big")))
+            else:
+                break
+
+            return label if offset == 0 else "{}+{}".format(label, offset)
+
+        return hex(slot)
+
+    def storage_id(self, slot):
+        label = self.resolve(slot)
+        name = label.split("[")[0].split("+")[0]
+        return name if name in STORAGE_IDS else "other"
+
+    def summary(self):
+        """Counts of cold and warm loads and stores keyed by (address, slot label)"""
+        rows = {}
+        for a in self.accesses:
+            row = rows.setdefault(
+                (a.address, self.resolve(a.slot)),
+                {"coldSLOAD": 0, "warmSLOAD": 0, "coldSSTORE": 0, "warmSSTORE": 0},
+            )
+            row["{}{}".format("cold" if a.cold else "warm", a.op)] += 1
+
+        return rows
+
+    def by_storage_id(self):
+        totals = {}
+        for a in self.accesses:
+            row = totals.setdefault(
+                self.storage_id(a.slot),
+                {"coldSLOAD": 0, "warmSLOAD": 0, "coldSSTORE": 0, "warmSSTORE": 0},
+            )
+            row["{}{}".format("cold" if a.cold else "warm", a.op)] += 1
+
+        return totals
+
+    def redundant_reads(self):
+        """Slots loaded more than once, the warm reloads could be cached in memory instead"""
+        return {k: v["warmSLOAD"] for (k, v) in self.summary().items() if v["warmSLOAD"] > 0}
+
+    def redundant_read_gas(self):
+        return sum(self.redundant_reads().values()) * WARM_STORAGE_READ_COST
+
+
+def _format_key(key):
+    if 2 ** 64 <= key < 2 ** 160:
+        return "0x{:040x}".format(key)
+    return str(key)
+
+
+def replay_storage_accesses(structLogs, to):
+    """
+    Replays structLogs tracking the storage context of each call frame. Delegate calls and
+    call code execute against the caller's storage so the context is only changed by CALL
+    and STATICCALL. Keccak preimages are recorded so that slots can be mapped back to keys.
+    """
+    contexts = [to.lower()]
+    accessed = set()
+    accesses = []
+    preimages = {}
+    pendingContext = None
+    prevDepth = 1
+
+    for step in structLogs:
+        depth = step["depth"]
+        if depth > prevDepth:
+            contexts.append(pendingContext)
+        while depth < len(contexts):
+            contexts.pop()
+        pendingContext = None
+        prevDepth = depth
+
+        op = step["op"]
+        stack = step["stack"]
+        if op in ("SHA3", "KECCAK256"):
+            data = _memory_slice(step.get("memory") or [], _to_int(stack[-1]), _to_int(stack[-2]))
+            preimages[int.from_bytes(keccak(data), "big")] = data
+        elif op in ("SLOAD", "SSTORE"):
+            key = (contexts[-1], _to_int(stack[-1]))
+            accesses.append(StorageAccess(key[0], key[1], op, key not in accessed))
+            accessed.add(key)
+        elif op in CALL_OPS:
+            if op in ("CALL", "STATICCALL"):
+                pendingContext = "0x{:040x}".format(_to_int(stack[-2]) & (2 ** 160 - 1))
+            else:
+                pendingContext = contexts[-1]
+
+    return StorageProfile(accesses, preimages)
+
+
+def profile_storage(txn):
+    return replay_storage_accesses(get_struct_logs(txn.txid), txn.receiver)
+
+
+def render_profile(profile, name=None):
+    lines = ["## Storage Accesses{}".format(": " + name if name else ""), ""]
+    lines.append("| Storage Id | Cold SLOAD | Warm SLOAD | Cold SSTORE | Warm SSTORE |")
+    lines.append("| --- | ---: | ---: | ---: | ---: |")
+    for (storageId, r) in sorted(profile.by_storage_id().items()):
+        lines.append(
+            "| {} | {coldSLOAD} | {warmSLOAD} | {coldSSTORE} | {warmSSTORE} |".format(
+                storageId, **r
+            )
+        )
+
+    redundant = profile.redundant_reads()
+    lines += [
+        "",
+        "{} redundant reads, {} gas".format(
+            sum(redundant.values()), profile.redundant_read_gas()
+        ),
+        "",
+        "| Address | Slot | Warm Reloads |",
+        "| --- | --- | ---: |",
+    ]
+    for ((address, label), count) in sorted(redundant.items(), key=lambda kv: -kv[1]):
+        lines.append("| {} | {} | {} |".format(address, label, count))
+
+    return "\n".join(lines) + "\n"
+
+
+def main(pattern="", outputDir="storage_profiles"):
+    """
+    brownie run scripts/gas/storage_profiler.py main [scenario globs] [output dir]
+
+    Writes a markdown report of cold and warm storage accesses by LibStorage id, and of
+    redundant reads by slot, for every transaction in the selected gas scenarios.
+    """
+    env = initialize_environment(accounts)
+    os.makedirs(outputDir, exist_ok=True)
+
+    def onResult(key, phase, result):
+        if not isinstance(result, int):
+            name = "{}.{}".format(key, phase)
+            with open(os.path.join(outputDir, "{}.md".format(name)), "w") as f:
+                f.write(render_profile(profile_storage(result), name))
+
+    run_scenarios(env, select_scenarios(pattern), onResult)
@@ -0,0 +1,246 @@
+import os
+
+from brownie import accounts, project
+from brownie.network import web3
+from brownie.network.state import _find_contract
+from scripts.gas.registry import select_scenarios
+from scripts.gas.runner import run_scenarios
+from tests.helpers import initialize_environment
+
+CALL_OPS = {
+    # Stack positions (from the top) of the address, args offset and args length
+    "CALL": (-2, -4, -5),
+    "CALLCODE": (-2, -4, -5),
+    "DELEGATECALL": (-2, -3, -4),
+    "STATICCALL": (-2, -3, -4),
+}
+
+# Router immutable getters and the contract names deployed behind them
+ROUTER_TARGETS = {
+    "GOVERNANCE": "GovernanceAction",
+    "VIEWS": "Views",
+    "INITIALIZE_MARKET": "InitializeMarketsAction",
+    "NTOKEN_ACTIONS": "nTokenAction",
+    "BATCH_ACTION": "BatchAction",
+    "ACCOUNT_ACTION": "AccountAction",
+    "ERC1155": "ERC1155Action",
+    "LIQUIDATE_CURRENCY": "LiquidateCurrencyAction",
+    "LIQUIDATE_FCASH": "LiquidatefCashAction",
+    "TREASURY": "TreasuryAction",
+    "CALCULATION_VIEWS": "CalculationViews",
+    "VAULT_ACCOUNT_ACTION": "VaultAccountAction",
+    "VAULT_ACTION": "VaultAction",
+    "VAULT_LIQUIDATION_ACTION": "VaultLiquidationAction",
+    "VAULT_ACCOUNT_HEALTH": "VaultAccountHealth",
+}
+
+# Names of the linked libraries returned by getLibInfo() on each router target, in order
+LIB_INFO = {
+    "Views": ["FreeCollateralExternal"],
+    "InitializeMarketsAction": ["nTokenMintAction"],
+    "nTokenAction": ["FreeCollateralExternal", "SettleAssetsExternal"],
+    "BatchAction": [
+        "FreeCollateralExternal",
+        "SettleAssetsExternal",
+        "TradingAction",
+        "nTokenMintAction",
+        "nTokenRedeemAction",
+    ],
+    "AccountAction": ["FreeCollateralExternal", "SettleAssetsExternal", "nTokenRedeemAction"],
+    "ERC1155Action": ["FreeCollateralExternal", "SettleAssetsExternal"],
+    "LiquidateCurrencyAction": ["FreeCollateralExternal"],
+    "LiquidatefCashAction": ["FreeCollateralExternal", "SettleAssetsExternal"],
+    "VaultAccountAction": ["TradingAction"],
+    "VaultAction": ["TradingAction"],
+    "VaultLiquidationAction": ["FreeCollateralExternal", "SettleAssetsExternal"],
+}
+
+
+class Frame:
+    def __init__(self, address, selector, callType, depth):
+        self.address = address
+        self.selector = selector
+        self.callType = callType
+        self.depth = depth
+        self.children = []
+        self.inclusive = 0
+
+    @property
+    def exclusive(self):
+        return self.inclusive - sum(c.inclusive for c in self.children)
+
+
+class AddressBook:
+    """Resolves addresses and selectors to contract and function names"""
+
+    def __init__(self, names=None, selectors=None):
+        self.names = {k.lower(): v for (k, v) in (names or {}).items()}
+        self.selectors = selectors or {}
+
+    @classmethod
+    def from_environment(cls, env):
+        names = {env.proxy.address: "nProxy", env.router.address: "Router"}
+        for (getter, name) in ROUTER_TARGETS.items():
+            target = getattr(env.router, getter)()
+            names[target] = name
+            if name in LIB_INFO:
+                container = getattr(project.get_loaded_projects()[0], name)
+                libs = container.at(target).getLibInfo()
+                libs = libs if isinstance(libs, (list, tuple)) else [libs]
+                names.update(dict(zip(libs, LIB_INFO[name])))
+
+        selectors = {}
+        for container in project.get_loaded_projects()[0]:
+            selectors.update(container.selectors)
+
+        return cls(names, selectors)
+
+    def contract(self, address):
+        name = self.names.get(address.lower())
+        if name is None:
+            contract = _find_contract(address)
+            name = contract._name if contract else address
+        return name
+
+    def function(self, selector):
+        return self.selectors.get(selector, selector)
+
+    def label(self, frame):
+        return "{}.{}".format(self.contract(frame.address), self.function(frame.selector))
+
+
+def _to_int(value):
+    return int(value, 16)
+
+
+def _selector(memory, offset, length):
+    if length < 4:
+        return "0x"
+    data = "".join(w[2:] if w.startswith("0x") else w for w in memory)
+    return "0x" + data[2 * offset : 2 * offset + 8]
+
+
+def get_struct_logs(txHash):
+    response = web3.provider.make_request(
+        "debug_traceTransaction", [txHash, {"disableStorage": True, "disableMemory": False}]
+    )
+    return response["result"]["structLogs"]
+
+
+def build_call_tree(structLogs, to, input, gasUsed):
+    """
+    Builds a call tree from structLogs. A call frame's inclusive gas is the parent's gas
+    at the call opcode minus the parent's gas when execution returns to the parent's depth,
+    which includes the call overhead. The root frame is charged the total gas used.
+    """
+    root = Frame(to, input[:10], "CALL", 1)
+    stack = [(root, None)]
+    pending = None
+
+    for step in structLogs:
+        depth = step["depth"]
+        if pending:
+            (child, gasAtCall, callDepth) = pending
+            pending = None
+            if depth == callDepth + 1:
+                stack.append((child, gasAtCall))
+            else:
+                # Calls to precompiles or accounts without code do not change depth
+                child.inclusive = gasAtCall - step["gas"]
+
+        while len(stack) > 1 and depth < stack[-1][0].depth:
+            (frame, gasAtCall) = stack.pop()
+            frame.inclusive = gasAtCall - step["gas"]
+
+        if step["op"] in CALL_OPS:
+            (addressIndex, offsetIndex, lengthIndex) = CALL_OPS[step["op"]]
+            stackItems = step["stack"]
+            address = "0x{:040x}".format(_to_int(stackItems[addressIndex]) & (2 ** 160 - 1))
+            selector = _selector(
+                step.get("memory") or [],
+                _to_int(stackItems[offsetIndex]),
+                _to_int(stackItems[lengthIndex]),
+            )
+            child = Frame(address, selector, step["op"], depth + 1)
+            stack[-1][0].children.append(child)
+            pending = (child, step["gas"], depth)
+
+    root.inclusive = gasUsed
+    return root
+
+
+def profile_transaction(txn):
+    structLogs = get_struct_logs(txn.txid)
+    return build_call_tree(structLogs, txn.receiver, txn.input, txn.gas_used)
+
+
+def walk(frame, path=()):
+    yield (path + (frame,), frame)
+    for child in frame.children:
+        yield from walk(child, path + (frame,))
+
+
+def aggregate(root, book):
+    """
+    Aggregates inclusive and exclusive gas by (contract, function). Inclusive gas of a
+    function that appears recursively in its own call stack is only counted once.
+    """
+    totals = {}
+    for (path, frame) in walk(root):
+        label = book.label(frame)
+        entry = totals.setdefault(label, {"inclusive": 0, "exclusive": 0, "calls": 0})
+        entry["calls"] += 1
+        entry["exclusive"] += frame.exclusive
+        if label not in [book.label(f) for f in path[:-1]]:
+            entry["inclusive"] += frame.inclusive
+
+    return totals
+
+
+def to_folded_stacks(root, book):
+    """Returns exclusive gas per call stack in the folded format read by flamegraph tools"""
+    lines = []
+    for (path, frame) in walk(root):
+        if frame.exclusive > 0:
+            lines.append("{} {}".format(";".join(book.label(f) for f in path), frame.exclusive))
+    return "\n".join(lines) + "\n"
+
+
+def render_table(totals):
+    lines = [
+        "| Function | Calls | Inclusive | Exclusive |",
+        "| --- | ---: | ---: | ---: |",
+    ]
+    for (label, t) in sorted(totals.items(), key=lambda kv: -kv[1]["inclusive"]):
+        lines.append(
+            "| {} | {} | {} | {} |".format(label, t["calls"], t["inclusive"], t["exclusive"])
+        )
+    return "\n".join(lines) + "\n"
+
+
+def write_profile(txn, book, outputDir, name):
+    root = profile_transaction(txn)
+    os.makedirs(outputDir, exist_ok=True)
+    with open(os.path.join(outputDir, "{}.folded".format(name)), "w") as f:
+        f.write(to_folded_stacks(root, book))
+    with open(os.path.join(outputDir, "{}.md".format(name)), "w") as f:
+        f.write("## {}\n\n".format(name))
+        f.write(render_table(aggregate(root, book)))
+
+
+def main(pattern="", outputDir="gas_profiles"):
+    """
+    brownie run scripts/gas/trace_profiler.py main [scenario globs] [output dir]
+
+    Profiles every transaction in the selected gas scenarios. Writes a folded stack file per
+    transaction (render with flamegraph.pl, inferno or speedscope) and a markdown table of
+    inclusive and exclusive gas by contract and function.
+    """
+    env = initialize_environment(accounts)
+    book = AddressBook.from_environment(env)
+
+    def onResult(key, phase, result):
+        if not isinstance(result, int):
+            write_profile(result, book, outputDir, "{}.{}".format(key, phase))
+
+    run_scenarios(env, select_scenarios(pattern), onResult)
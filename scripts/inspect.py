@@ -1,10 +1,9 @@
 # flake8: noqa
 import json
-import math
 from brownie import NoteERC20, Router, network, interface, accounts
 from brownie.network import Chain
 from brownie.network.contract import Contract
-from tests.constants import SECONDS_IN_YEAR
+from scripts.offchain.ntoken import NTokenValuationEngine
 from tests.helpers import get_balance_action, get_balance_trade_action
 
 chain = Chain()
@@ -35,23 +34,18 @@ def get_multicall():
     )
 
 def get_ntoken_spot_value(notional, currencyId):
-    address = notional.nTokenAddress(currencyId)
-    (_, fCashAssets) = notional.getNTokenPortfolio(address)
-    markets = notional.getActiveMarkets(currencyId)
-    ntoken = notional.getNTokenAccount(address)
-    totalPCash = ntoken['cashBalance']
-    totalUnderlying = 0
-    oracleValue = notional.nTokenPresentValueUnderlyingDenominated(currencyId)
-
-    for i in range(0, len(fCashAssets)):
-        netFCash = fCashAssets[i][3] + markets[i][2]
-        timeToMaturity = markets[i][1] - chain.time()
-        discountFactor = math.exp(-(markets[i][5] * timeToMaturity) / (1e9 * SECONDS_IN_YEAR))
-        totalUnderlying += netFCash * discountFactor
-        totalPCash += markets[i][3]
+    (nToken,) = get_ntoken_values(notional, [currencyId]).values()
+    return (
+        nToken.spotUnderlyingPV / nToken.totalSupply,
+        nToken.oracleUnderlyingPV / nToken.totalSupply,
+        nToken.spotUnderlyingPV,
+        nToken.oracleUnderlyingPV,
+        nToken.totalSupply,
+    )
 
-    totalUnderlying += notional.convertCashBalanceToExternal(currencyId, totalPCash, True) * 1e8 / 1e6
-    return (totalUnderlying / ntoken['totalSupply'], oracleValue / ntoken['totalSupply'], totalUnderlying, oracleValue, ntoken['totalSupply'])
+def get_ntoken_values(notional, currencyIds=None, blockIdentifier="latest"):
+    # Values all listed nTokens (or the given currencies) in a single multicall
+    return NTokenValuationEngine(notional, currencyIds, blockIdentifier).value(blockIdentifier)
 
 def mint_ntokens(notional, currencyId, account, amount):
     # >>> whale = '0xb38e8c17e38363af6ebdcb3dae12e0243582891d'
@@ -84,11 +78,27 @@ def get_addresses():
 def main():
     (addresses, notional, note, router, networkName, multicall, tradingModule) = get_addresses()
 
+def has_initialize_markets_batch(notional):
+    # Routers deployed before initializeMarketsBatch send the selector to the views contract,
+    # which reverts. An empty batch does not initialize anything on routers that support it.
+    try:
+        notional.initializeMarketsBatch.call([], False)
+        return True
+    except Exception:
+        return False
+
+def get_init_markets_calls(notional, currencyIds):
+    if has_initialize_markets_batch(notional):
+        return [ (notional.address, notional.initializeMarketsBatch.encode_input(currencyIds, False)) ]
+
+    # Falls back to one initializeMarkets call per currency in the multicall
+    return [ (notional.address, notional.initializeMarkets.encode_input(i, False)) for i in currencyIds ]
+
 def init_markets():
     (addresses, notional, note, router, networkName, multicall, tradingModule) = get_addresses()
     v3 = [1,2,3,5,6,7,8,9,11]
     v2 = [1,2,3,4]
-    calls = [ (notional.address, notional.initializeMarkets.encode_input(i, False)) for i in v3 ] + \
+    calls = get_init_markets_calls(notional, v3) + \
         [ ("0x1344A36A1B56144C3Bc62E7757377D288fDE0369", notional.initializeMarkets.encode_input(i, False)) for i in v2 ]
     deployer = accounts.load("MAINNET_DEPLOYER")
     multicall.aggregate(calls, {"from": deployer})
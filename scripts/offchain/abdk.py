@@ -0,0 +1,159 @@
+"""
+Bit exact port of the ABDKMath64x64 functions used to convert interest rates to fCash
+exchange rates, vectorized over numpy object arrays of python ints.
+"""
+import numpy as np
+from scripts.offchain.constants import YEAR
+from scripts.offchain.safe_math import as_int
+
+MIN_64x64 = -(2 ** 127)
+MAX_64x64 = 2 ** 127 - 1
+RATE_PRECISION_64x64 = 0x3B9ACA000000000000000000
+LOG2_E_128x128 = 0x171547652B82FE1777D0FFDA0D23A7D12
+
+# Bit mask and multiplier for each fractional bit of x in exp_2
+EXP_2_TABLE = [
+    (0x8000000000000000, 0x16A09E667F3BCC908B2FB1366EA957D3E),
+    (0x4000000000000000, 0x1306FE0A31B7152DE8D5A46305C85EDEC),
+    (0x2000000000000000, 0x1172B83C7D517ADCDF7C8C50EB14A791F),
+    (0x1000000000000000, 0x10B5586CF9890F6298B92B71842A98363),
+    (0x800000000000000, 0x1059B0D31585743AE7C548EB68CA417FD),
+    (0x400000000000000, 0x102C9A3E778060EE6F7CACA4F7A29BDE8),
+    (0x200000000000000, 0x10163DA9FB33356D84A66AE336DCDFA3F),
+    (0x100000000000000, 0x100B1AFA5ABCBED6129AB13EC11DC9543),
+    (0x80000000000000, 0x10058C86DA1C09EA1FF19D294CF2F679B),
+    (0x40000000000000, 0x1002C605E2E8CEC506D21BFC89A23A00F),
+    (0x20000000000000, 0x100162F3904051FA128BCA9C55C31E5DF),
+    (0x10000000000000, 0x1000B175EFFDC76BA38E31671CA939725),
+    (0x8000000000000, 0x100058BA01FB9F96D6CACD4B180917C3D),
+    (0x4000000000000, 0x10002C5CC37DA9491D0985C348C68E7B3),
+    (0x2000000000000, 0x1000162E525EE054754457D5995292026),
+    (0x1000000000000, 0x10000B17255775C040618BF4A4ADE83FC),
+    (0x800000000000, 0x1000058B91B5BC9AE2EED81E9B7D4CFAB),
+    (0x400000000000, 0x100002C5C89D5EC6CA4D7C8ACC017B7C9),
+    (0x200000000000, 0x10000162E43F4F831060E02D839A9D16D),
+    (0x100000000000, 0x100000B1721BCFC99D9F890EA06911763),
+    (0x80000000000, 0x10000058B90CF1E6D97F9CA14DBCC1628),
+    (0x40000000000, 0x1000002C5C863B73F016468F6BAC5CA2B),
+    (0x20000000000, 0x100000162E430E5A18F6119E3C02282A5),
+    (0x10000000000, 0x1000000B1721835514B86E6D96EFD1BFE),
+    (0x8000000000, 0x100000058B90C0B48C6BE5DF846C5B2EF),
+    (0x4000000000, 0x10000002C5C8601CC6B9E94213C72737A),
+    (0x2000000000, 0x1000000162E42FFF037DF38AA2B219F06),
+    (0x1000000000, 0x10000000B17217FBA9C739AA5819F44F9),
+    (0x800000000, 0x1000000058B90BFCDEE5ACD3C1CEDC823),
+    (0x400000000, 0x100000002C5C85FE31F35A6A30DA1BE50),
+    (0x200000000, 0x10000000162E42FF0999CE3541B9FFFCF),
+    (0x100000000, 0x100000000B17217F80F4EF5AADDA45554),
+    (0x80000000, 0x10000000058B90BFBF8479BD5A81B51AD),
+    (0x40000000, 0x1000000002C5C85FDF84BD62AE30A74CC),
+    (0x20000000, 0x100000000162E42FEFB2FED257559BDAA),
+    (0x10000000, 0x1000000000B17217F7D5A7716BBA4A9AE),
+    (0x8000000, 0x100000000058B90BFBE9DDBAC5E109CCE),
+    (0x4000000, 0x10000000002C5C85FDF4B15DE6F17EB0D),
+    (0x2000000, 0x1000000000162E42FEFA494F1478FDE05),
+    (0x1000000, 0x10000000000B17217F7D20CF927C8E94C),
+    (0x800000, 0x1000000000058B90BFBE8F71CB4E4B33D),
+    (0x400000, 0x100000000002C5C85FDF477B662B26945),
+    (0x200000, 0x10000000000162E42FEFA3AE53369388C),
+    (0x100000, 0x100000000000B17217F7D1D351A389D40),
+    (0x80000, 0x10000000000058B90BFBE8E8B2D3D4EDE),
+    (0x40000, 0x1000000000002C5C85FDF4741BEA6E77E),
+    (0x20000, 0x100000000000162E42FEFA39FE95583C2),
+    (0x10000, 0x1000000000000B17217F7D1CFB72B45E1),
+    (0x8000, 0x100000000000058B90BFBE8E7CC35C3F0),
+    (0x4000, 0x10000000000002C5C85FDF473E242EA38),
+    (0x2000, 0x1000000000000162E42FEFA39F02B772C),
+    (0x1000, 0x10000000000000B17217F7D1CF7D83C1A),
+    (0x800, 0x1000000000000058B90BFBE8E7BDCBE2E),
+    (0x400, 0x100000000000002C5C85FDF473DEA871F),
+    (0x200, 0x10000000000000162E42FEFA39EF44D91),
+    (0x100, 0x100000000000000B17217F7D1CF79E949),
+    (0x80, 0x10000000000000058B90BFBE8E7BCE544),
+    (0x40, 0x1000000000000002C5C85FDF473DE6ECA),
+    (0x20, 0x100000000000000162E42FEFA39EF366F),
+    (0x10, 0x1000000000000000B17217F7D1CF79AFA),
+    (0x8, 0x100000000000000058B90BFBE8E7BCD6D),
+    (0x4, 0x10000000000000002C5C85FDF473DE6B2),
+    (0x2, 0x1000000000000000162E42FEFA39EF358),
+    (0x1, 0x10000000000000000B17217F7D1CF79AB),
+]
+
+
+def _check(overflow, reverts, message="ABDKMath64x64 overflow"):
+    """
+    Raises if any element overflows, unless a reverts mask is given in which case the
+    overflowing elements are flagged in place so the rest of a batch can still be used
+    """
+    if reverts is None:
+        if np.any(overflow):
+            raise ValueError(message)
+    else:
+        reverts |= overflow
+
+
+def from_uint(x, reverts=None):
+    x = as_int(x)
+    overflow = x > 0x7FFFFFFFFFFFFFFF
+    _check(overflow, reverts)
+    return np.where(overflow, 0, x << 64)
+
+
+def div(x, y, reverts=None):
+    """64.64 division for non negative x and positive y"""
+    result = (as_int(x) << 64) // as_int(y)
+    overflow = (result > MAX_64x64) | (result < MIN_64x64)
+    _check(overflow, reverts)
+    return np.where(overflow, 0, result)
+
+
+def mul(x, y, reverts=None):
+    result = (as_int(x) * as_int(y)) >> 64
+    overflow = (result > MAX_64x64) | (result < MIN_64x64)
+    _check(overflow, reverts)
+    return np.where(overflow, 0, result)
+
+
+def to_int(x):
+    return as_int(x) >> 64
+
+
+def exp_2(x, reverts=None):
+    x = as_int(x)
+    overflow = x >= 0x400000000000000000
+    _check(overflow, reverts)
+    x = np.where(overflow, 0, x)
+
+    result = np.full(x.shape, 0x80000000000000000000000000000000, dtype=object)
+    for (bit, multiplier) in EXP_2_TABLE:
+        result = np.where(x & bit > 0, (result * multiplier) >> 128, result)
+
+    # Underflows are set to zero below, the shift is clamped so it is always valid
+    result = result >> np.minimum(63 - (x >> 64), 255)
+    result = np.where(x < -0x400000000000000000, 0, result)
+    overflow = result > MAX_64x64
+    _check(overflow, reverts)
+    return np.where(overflow, 0, result)
+
+
+def exp(x, reverts=None):
+    x = as_int(x)
+    overflow = x >= 0x400000000000000000
+    _check(overflow, reverts)
+    x = np.where(overflow, 0, x)
+
+    result = exp_2((x * LOG2_E_128x128) >> 128, reverts)
+    return np.where(x < -0x400000000000000000, 0, result)
+
+
+def get_fcash_exchange_rate(interestRate, timeToMaturity, reverts=None):
+    """
+    Mirrors InterestRateCurve.getfCashExchangeRate, E = e^(rt) in RATE_PRECISION. If reverts is
+    set, elements that would revert on chain are flagged in it and return zero.
+    """
+    expValue = from_uint(as_int(interestRate) * as_int(timeToMaturity) // YEAR, reverts)
+    expValueScaled = div(expValue, RATE_PRECISION_64x64, reverts)
+    expResult = exp(expValueScaled, reverts)
+    expResultScaled = mul(expResult, RATE_PRECISION_64x64, reverts)
+    result = to_int(expResultScaled)
+    return result if reverts is None else np.where(reverts, 0, result)
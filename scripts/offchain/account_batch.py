@@ -0,0 +1,122 @@
+"""
+Client for Views.getAccountsBatch, which returns the same values as getAccount for many
+accounts in one eth_call with prime rates built once per currency.
+
+Large account sets are split into chunks that are all read at the same block. Each call is
+sent with an explicit gas limit at the node's eth_call gas cap, a chunk that runs out of gas is
+halved and the smaller chunk size is kept for the rest of the set. Results are returned as
+columnar arrays with one row per account, per active balance and per portfolio asset.
+"""
+from collections import namedtuple
+
+import numpy as np
+from brownie.network import web3
+from scripts.offchain.account_context import decode_account_contexts
+from scripts.offchain.safe_math import as_int
+from web3.exceptions import ContractLogicError
+
+# Default of the geth --rpc.gascap flag
+DEFAULT_GAS_CAP = 50_000_000
+DEFAULT_CHUNK_SIZE = 200
+
+AccountsBatch = namedtuple(
+    "AccountsBatch",
+    [
+        "accounts",
+        "contexts",
+        "balanceAccount",
+        "balanceCurrency",
+        "cashBalance",
+        "nTokenBalance",
+        "lastClaimTime",
+        "accountIncentiveDebt",
+        "assetAccount",
+        "assetCurrency",
+        "maturity",
+        "assetType",
+        "notional",
+    ],
+)
+
+
+def _call_batch(notional, accounts, blockIdentifier, gasCap):
+    method = notional.getAccountsBatch
+    data = method.encode_input(accounts)
+    returnData = web3.eth.call(
+        {"to": notional.address, "data": data, "gas": gasCap}, blockIdentifier
+    )
+    return method.decode_output("0x" + bytes(returnData).hex())
+
+
+def get_accounts_batch(notional, accounts, blockIdentifier="latest", chunkSize=DEFAULT_CHUNK_SIZE,
+                       gasCap=DEFAULT_GAS_CAP):
+    """
+    Returns a list of (accountContext, accountBalances, portfolio) for each account, reading
+    every chunk at the same block
+    """
+    accounts = [str(a) for a in accounts]
+    if blockIdentifier == "latest":
+        blockIdentifier = web3.eth.block_number
+
+    results = []
+    start = 0
+    while start < len(accounts):
+        chunk = accounts[start : start + chunkSize]
+        try:
+            (contexts, balances, portfolios) = _call_batch(
+                notional, chunk, blockIdentifier, gasCap
+            )
+        except ContractLogicError:
+            # Reverts are not resolved by smaller chunks
+            raise
+        except ValueError:
+            # Out of gas errors are raised as ValueError by the node
+            if len(chunk) == 1:
+                raise
+            chunkSize = len(chunk) // 2
+            continue
+
+        results.extend(zip(contexts, balances, portfolios))
+        start += len(chunk)
+
+    return results
+
+
+def decode_accounts_batch(accounts, results):
+    """Converts getAccountsBatch results into columnar AccountsBatch arrays"""
+    balanceRows = [
+        (i, b[0], b[1], b[2], b[3], b[4])
+        for (i, (_, balances, _)) in enumerate(results)
+        for b in balances
+        # Balances are returned in a fixed size array, unused slots have a zero currency id
+        if b[0] != 0
+    ]
+    assetRows = [
+        (i, a[0], a[1], a[2], a[3])
+        for (i, (_, _, portfolio)) in enumerate(results)
+        for a in portfolio
+    ]
+    balanceColumns = list(zip(*balanceRows)) if balanceRows else [[]] * 6
+    assetColumns = list(zip(*assetRows)) if assetRows else [[]] * 5
+
+    return AccountsBatch(
+        [str(a) for a in accounts],
+        decode_account_contexts([c for (c, _, _) in results]),
+        np.array(balanceColumns[0], dtype=np.int64),
+        np.array(balanceColumns[1], dtype=np.int64),
+        as_int(balanceColumns[2]),
+        as_int(balanceColumns[3]),
+        np.array(balanceColumns[4], dtype=np.int64),
+        as_int(balanceColumns[5]),
+        np.array(assetColumns[0], dtype=np.int64),
+        np.array(assetColumns[1], dtype=np.int64),
+        np.array(assetColumns[2], dtype=np.int64),
+        np.array(assetColumns[3], dtype=np.int64),
+        as_int(assetColumns[4]),
+    )
+
+
+def load_accounts_batch(notional, accounts, blockIdentifier="latest",
+                        chunkSize=DEFAULT_CHUNK_SIZE, gasCap=DEFAULT_GAS_CAP):
+    results = get_accounts_batch(notional, accounts, blockIdentifier, chunkSize, gasCap)
+    return decode_accounts_batch(accounts, results)
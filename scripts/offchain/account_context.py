@@ -0,0 +1,161 @@
+"""
+Vectorized codec for AccountContext (contracts/global/Types.sol) and the packed bytes18 active
+currencies list maintained by contracts/internal/AccountContextHandler.sol.
+
+Active currencies are packed as up to nine big endian uint16 values sorted ascending, the two
+high bits flag if the currency is active in the portfolio and in balances. Lists are decoded
+into arrays with a trailing axis of MAX_ACTIVE_CURRENCIES slots, slots after the first empty
+slot are never read on chain and are marked inactive.
+"""
+from collections import namedtuple
+
+import numpy as np
+from scripts.offchain.multicall import aggregate
+
+HAS_ASSET_DEBT = 0x01
+HAS_CASH_DEBT = 0x02
+ACTIVE_IN_PORTFOLIO = 0x8000
+ACTIVE_IN_BALANCES = 0x4000
+UNMASK_FLAGS = 0x3FFF
+MAX_CURRENCIES = UNMASK_FLAGS
+MAX_ACTIVE_CURRENCIES = 9
+
+ActiveCurrencies = namedtuple(
+    "ActiveCurrencies", ["currencyId", "inPortfolio", "inBalances", "active"]
+)
+
+AccountContexts = namedtuple(
+    "AccountContexts",
+    [
+        "nextSettleTime",
+        "hasDebt",
+        "assetArrayLength",
+        "bitmapCurrencyId",
+        "activeCurrencies",
+        "allowPrimeBorrow",
+    ],
+)
+
+
+def _to_bytes18(value):
+    if isinstance(value, str):
+        data = bytes.fromhex(value[2:] if value.startswith("0x") else value)
+    else:
+        data = bytes(value)
+    if len(data) > 2 * MAX_ACTIVE_CURRENCIES:
+        raise ValueError("Invalid active currencies")
+    # bytesN values are left aligned
+    return data.ljust(2 * MAX_ACTIVE_CURRENCIES, b"\x00")
+
+
+def bytes18_array(values):
+    """
+    Converts an array like of bytes18 values (hex strings or bytes) into a uint8 array with a
+    trailing axis of 18 bytes
+    """
+    values = np.asarray(values, dtype=object)
+    flat = b"".join(_to_bytes18(v) for v in values.reshape(-1))
+    return np.frombuffer(flat, dtype=np.uint8).reshape(values.shape + (18,))
+
+
+def decode_active_currencies(activeCurrencies):
+    """Decodes bytes18 active currencies into ActiveCurrencies arrays"""
+    data = np.asarray(activeCurrencies)
+    if data.dtype != np.uint8 or data.shape[-1:] != (18,):
+        data = bytes18_array(activeCurrencies)
+    pairs = data.reshape(data.shape[:-1] + (MAX_ACTIVE_CURRENCIES, 2)).astype(np.int64)
+    values = pairs[..., 0] << 8 | pairs[..., 1]
+    active = np.cumprod(values != 0, axis=-1).astype(bool)
+
+    return ActiveCurrencies(
+        np.where(active, values & UNMASK_FLAGS, 0),
+        active & (values & ACTIVE_IN_PORTFOLIO != 0),
+        active & (values & ACTIVE_IN_BALANCES != 0),
+        active,
+    )
+
+
+def encode_active_currencies(currencyId, inPortfolio, inBalances):
+    """
+    Inverse of decode_active_currencies, currency ids of zero are empty slots and must come
+    after every active currency. Returns a uint8 array with a trailing axis of 18 bytes.
+    """
+    currencyId = np.asarray(currencyId, dtype=np.int64)
+    (inPortfolio, inBalances) = (
+        np.broadcast_to(np.asarray(flag, dtype=bool), currencyId.shape)
+        for flag in (inPortfolio, inBalances)
+    )
+    if currencyId.shape[-1:] != (MAX_ACTIVE_CURRENCIES,):
+        raise ValueError("Invalid active currencies length")
+    if np.any((currencyId < 0) | (currencyId > MAX_CURRENCIES)):
+        raise ValueError("Invalid currency id")
+    active = currencyId != 0
+    if np.any(active & ~np.cumprod(active, axis=-1).astype(bool)):
+        raise ValueError("Empty slot before active currency")
+
+    values = (
+        currencyId
+        | np.where(active & inPortfolio, ACTIVE_IN_PORTFOLIO, 0)
+        | np.where(active & inBalances, ACTIVE_IN_BALANCES, 0)
+    )
+    pairs = np.stack([values >> 8, values & 0xFF], axis=-1).astype(np.uint8)
+    return pairs.reshape(currencyId.shape[:-1] + (2 * MAX_ACTIVE_CURRENCIES,))
+
+
+def active_currencies_to_list(activeCurrencies):
+    """Returns (currencyId, inPortfolio, inBalances) for each currency in a bytes18 value"""
+    decoded = decode_active_currencies([activeCurrencies])
+    return [
+        (int(c), bool(p), bool(b))
+        for (c, p, b, a) in zip(*(field[0] for field in decoded))
+        if a
+    ]
+
+
+def list_to_active_currencies(currenciesList):
+    """Encodes a list of (currencyId, inPortfolio, inBalances) into bytes18"""
+    if len(currenciesList) > MAX_ACTIVE_CURRENCIES:
+        raise ValueError("Currency list too long")
+    padding = [(0, False, False)] * (MAX_ACTIVE_CURRENCIES - len(currenciesList))
+    (currencyId, inPortfolio, inBalances) = zip(*(list(currenciesList) + padding))
+    return encode_active_currencies(currencyId, inPortfolio, inBalances).tobytes()
+
+
+def _to_bytes1(value):
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+    return bytes(value)
+
+
+def decode_account_contexts(contexts):
+    """Decodes a list of getAccountContext return values into AccountContexts arrays"""
+    contexts = [tuple(c) for c in contexts]
+    columns = list(zip(*contexts)) if contexts else [[] for _ in AccountContexts._fields]
+    hasDebt = [
+        h if isinstance(h, int) else int.from_bytes(_to_bytes1(h), "big") for h in columns[1]
+    ]
+
+    return AccountContexts(
+        np.array(columns[0], dtype=np.int64),
+        np.array(hasDebt, dtype=np.uint8),
+        np.array(columns[2], dtype=np.int64),
+        np.array(columns[3], dtype=np.int64),
+        bytes18_array(list(columns[4])).reshape(-1, 18),
+        np.array(columns[5], dtype=bool),
+    )
+
+
+def has_asset_debt(hasDebt):
+    return np.asarray(hasDebt, dtype=np.uint8) & HAS_ASSET_DEBT != 0
+
+
+def has_cash_debt(hasDebt):
+    return np.asarray(hasDebt, dtype=np.uint8) & HAS_CASH_DEBT != 0
+
+
+def load_account_contexts(notional, accounts, blockIdentifier="latest", multicall=None):
+    """Loads the account contexts of many accounts at the same block"""
+    contexts = aggregate(
+        [(notional.getAccountContext, [str(a)]) for a in accounts], blockIdentifier, multicall
+    )
+    return decode_account_contexts(contexts)
@@ -0,0 +1,67 @@
+"""fCash present value calculations from contracts/internal/valuation/AssetHandler.sol"""
+import numpy as np
+from scripts.offchain import abdk
+from scripts.offchain.cash_group import (
+    calculate_oracle_rate,
+    calculate_risk_adjusted_debt_oracle_rate,
+    calculate_risk_adjusted_fcash_oracle_rate,
+)
+from scripts.offchain.constants import RATE_PRECISION, YEAR
+from scripts.offchain.safe_math import as_int, mul_in_rate_precision
+
+
+def get_discount_factor(timeToMaturity, oracleRate, reverts=None):
+    """Continuously compounded discount factor e^(-rate * time) in RATE_PRECISION"""
+    expValue = abdk.from_uint(as_int(oracleRate) * as_int(timeToMaturity) // YEAR, reverts)
+    expValue = abdk.div(expValue, abdk.RATE_PRECISION_64x64, reverts)
+    expValue = abdk.exp(-expValue, reverts)
+    expValue = abdk.mul(expValue, abdk.RATE_PRECISION_64x64, reverts)
+    return abdk.to_int(expValue)
+
+
+def get_risk_adjusted_discount_factors(cashGroup, marketOracleRates, oracleSupplyRate,
+                                       maturity, blockTime, reverts=None):
+    """
+    Returns the discount factors applied to positive fCash and to fCash debt at each maturity,
+    both positions share the same oracle rate so it is only calculated once per maturity.
+    """
+    maturity = np.asarray(maturity, dtype=np.int64)
+    mask = np.zeros(maturity.shape, dtype=bool) if reverts is None else reverts
+    # Matured assets revert on the subtraction, they must be settled first
+    mask |= maturity < blockTime
+    oracleRate = calculate_oracle_rate(
+        cashGroup, marketOracleRates, oracleSupplyRate, maturity, blockTime, mask
+    )
+    timeToMaturity = np.where(mask, 0, maturity - blockTime)
+
+    fCashRate = calculate_risk_adjusted_fcash_oracle_rate(cashGroup, oracleRate)
+    fCashDiscount = np.minimum(
+        get_discount_factor(timeToMaturity, fCashRate, mask), cashGroup.maxDiscountFactor
+    )
+
+    debtRate = calculate_risk_adjusted_debt_oracle_rate(cashGroup, oracleRate)
+    # Short circuits the exp calculation if the oracle rate is floored to zero
+    debtDiscount = np.where(
+        debtRate == 0, RATE_PRECISION, get_discount_factor(timeToMaturity, debtRate, mask)
+    )
+
+    if reverts is None and np.any(mask):
+        raise ValueError("Invalid discount factor")
+    return (fCashDiscount, debtDiscount)
+
+
+def get_present_fcash_value(notional, discountFactor, reverts=None):
+    """
+    Present value of fCash given its discount factor, debts always return at least -1. This
+    applies to both the risk adjusted and the non risk adjusted present value.
+    """
+    (notional, discountFactor) = (as_int(notional), as_int(discountFactor))
+    invalid = discountFactor > RATE_PRECISION
+    if reverts is None:
+        if np.any(invalid & (notional != 0)):
+            raise ValueError("Invalid discount factor")
+    else:
+        reverts |= invalid & (notional != 0)
+
+    pv = mul_in_rate_precision(notional, discountFactor)
+    return np.where(notional < 0, np.minimum(pv, -1), pv)
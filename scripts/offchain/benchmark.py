@@ -0,0 +1,91 @@
+import time
+
+import numpy as np
+from brownie import accounts
+from scripts.offchain.fcash_trade import (
+    get_cash_amount_given_fcash_amount,
+    get_fcash_amount_given_cash_amount,
+    load_market_snapshot,
+)
+from tests.helpers import get_balance_action, initialize_environment
+
+
+def _rate(count, seconds):
+    return count / seconds if seconds > 0 else float("inf")
+
+
+def random_quotes(snapshot, rng, size):
+    """Random lend and borrow sizes up to 10% of each market's liquidity"""
+    rows = rng.integers(0, len(snapshot.currencyId), size=size)
+    liquidity = np.array([int(c) for c in snapshot.totalCashUnderlying[rows]], dtype=np.float64)
+    amounts = (rng.uniform(-0.1, 0.1, size=size) * liquidity).astype(np.int64)
+    amounts[amounts == 0] = 1
+    return (snapshot.currencyId[rows], snapshot.marketIndex[rows], amounts)
+
+
+def benchmark_fcash_quotes(notional, currencyIds, numQuotes=5000, rpcSamples=50, seed=0):
+    """
+    Compares quotes per second for the CalculationViews RPC methods against the off chain
+    simulator. RPC throughput is extrapolated from the successful calls out of rpcSamples,
+    failed calls are counted separately and excluded from the rate.
+    """
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    snapshot = load_market_snapshot(notional, currencyIds)
+    loadTime = time.perf_counter() - start
+    (currencyId, marketIndex, amounts) = random_quotes(snapshot, rng, numQuotes)
+
+    results = {"snapshotLoadSeconds": loadTime, "quotes": numQuotes}
+    for (name, simulate, view) in [
+        (
+            "cashGivenfCash",
+            get_cash_amount_given_fcash_amount,
+            notional.getCashAmountGivenfCashAmount,
+        ),
+        (
+            "fCashGivenCash",
+            get_fcash_amount_given_cash_amount,
+            notional.getfCashAmountGivenCashAmount,
+        ),
+    ]:
+        start = time.perf_counter()
+        reverted = simulate(snapshot, currencyId, marketIndex, amounts)[-1]
+        offChain = time.perf_counter() - start
+
+        # Reverted views return early, so only successful calls count towards the RPC rate
+        (rpc, rpcQuotes, rpcFailures) = (0, 0, 0)
+        for i in range(min(rpcSamples, numQuotes)):
+            start = time.perf_counter()
+            try:
+                view(int(currencyId[i]), int(amounts[i]), int(marketIndex[i]), snapshot.blockTime)
+            except Exception:
+                rpcFailures += 1
+                continue
+            rpc += time.perf_counter() - start
+            rpcQuotes += 1
+
+        results[name] = {
+            "offChainQuotesPerSecond": _rate(numQuotes, offChain),
+            "offChainReverted": int(np.count_nonzero(reverted)),
+            "rpcQuotesPerSecond": _rate(rpcQuotes, rpc) if rpcQuotes > 0 else 0,
+            "rpcFailures": rpcFailures,
+        }
+
+    return results
+
+
+def main(numQuotes=5000):
+    """brownie run scripts/offchain/benchmark.py main [number of quotes]"""
+    env = initialize_environment(accounts)
+    mint = "DepositUnderlyingAndMintNToken"
+    env.notional.batchBalanceAction(
+        accounts[0],
+        [
+            get_balance_action(2, mint, depositActionAmount=1_000_000e18),
+            get_balance_action(3, mint, depositActionAmount=1_000_000e6),
+        ],
+        {"from": accounts[0]},
+    )
+
+    for (k, v) in benchmark_fcash_quotes(env.notional, [2, 3], int(numQuotes)).items():
+        print("{}: {}".format(k, v))
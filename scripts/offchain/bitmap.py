@@ -0,0 +1,104 @@
+"""
+Vectorized port of contracts/math/Bitmap.sol and the bitmap portfolio encoding in
+contracts/internal/portfolio/BitmapAssetsHandler.sol. Bitmaps are uint8 arrays with a trailing
+axis of 32 big endian bytes (see codec.bytes32_array), bit numbers are one indexed from the
+most significant bit as they are on chain.
+"""
+import numpy as np
+from scripts.offchain.codec import bytes32_array
+from scripts.offchain.date_time import get_bit_num_from_maturity, get_maturity_from_bit_num
+
+
+def as_bitmaps(bitmaps):
+    """Accepts uint8 bitmap arrays as is, converts ints, hex strings or bytes via bytes32_array"""
+    if isinstance(bitmaps, np.ndarray) and bitmaps.dtype == np.uint8:
+        if bitmaps.shape[-1:] == (32,):
+            return bitmaps
+    return bytes32_array(bitmaps)
+
+
+def to_bits(bitmaps):
+    """Returns a bool array with a trailing axis of 256 bits, bit number n is at position n - 1"""
+    return np.unpackbits(as_bitmaps(bitmaps), axis=-1).astype(bool)
+
+
+def from_bits(bits):
+    return np.packbits(np.asarray(bits, dtype=bool), axis=-1)
+
+
+def _check_index(index):
+    index = np.asarray(index, dtype=np.int64)
+    if np.any((index < 1) | (index > 256)):
+        raise ValueError("Invalid bit index")
+    return index - 1
+
+
+def is_bit_set(bitmaps, index):
+    bits = to_bits(bitmaps)
+    position = np.broadcast_to(_check_index(index), bits.shape[:-1])
+    return np.take_along_axis(bits, position[..., np.newaxis], axis=-1)[..., 0]
+
+
+def set_bit(bitmaps, index, setOn):
+    bits = to_bits(bitmaps)
+    position = np.broadcast_to(_check_index(index), bits.shape[:-1])
+    setOn = np.broadcast_to(np.asarray(setOn, dtype=bool), bits.shape[:-1])
+    np.put_along_axis(bits, position[..., np.newaxis], setOn[..., np.newaxis], axis=-1)
+    return from_bits(bits)
+
+
+def total_bits_set(bitmaps):
+    return to_bits(bitmaps).sum(axis=-1)
+
+
+def get_next_bit_num(bitmaps):
+    """Bit number of the most significant set bit or zero if the bitmap is empty"""
+    bits = to_bits(bitmaps)
+    return np.where(bits.any(axis=-1), bits.argmax(axis=-1) + 1, 0)
+
+
+def get_msb(bitmaps):
+    """Zero indexed position of the most significant bit counted from the right"""
+    nextBitNum = get_next_bit_num(bitmaps)
+    if np.any(nextBitNum == 0):
+        raise ValueError("Bitmap is zero")
+    return 256 - nextBitNum
+
+
+def get_bit_nums(bitmaps):
+    """
+    Returns (index, bitNum) for every set bit in the order they are visited by the on chain
+    getNextBitNum loop, where index is the position of the bitmap in the flattened input.
+    """
+    bits = to_bits(bitmaps).reshape(-1, 256)
+    (index, position) = np.nonzero(bits)
+    return (index, position + 1)
+
+
+def get_assets_bitmap_maturities(bitmaps, nextSettleTime):
+    """
+    Decodes bitmap portfolios into (index, maturity) for every set bit. Bits are relative to the
+    account's next settle time (or the nToken's last initialized time).
+    """
+    bitmaps = as_bitmaps(bitmaps)
+    nextSettleTime = np.broadcast_to(
+        np.asarray(nextSettleTime, dtype=np.int64), bitmaps.shape[:-1]
+    ).reshape(-1)
+    (index, bitNum) = get_bit_nums(bitmaps)
+    return (index, get_maturity_from_bit_num(nextSettleTime[index], bitNum))
+
+
+def get_assets_bitmap(index, maturity, nextSettleTime, size):
+    """
+    Encodes maturities into size bitmaps, where index selects the bitmap that each maturity is
+    set on. Maturities that do not fall exactly on a bit revert on chain and raise here.
+    """
+    index = np.asarray(index, dtype=np.int64)
+    nextSettleTime = np.broadcast_to(np.asarray(nextSettleTime, dtype=np.int64), (size,))
+    (bitNum, isExact) = get_bit_num_from_maturity(nextSettleTime[index], maturity)
+    if not np.all(isExact):
+        raise ValueError("Invalid maturity")
+
+    bits = np.zeros((size, 256), dtype=bool)
+    bits[index, bitNum - 1] = True
+    return from_bits(bits)
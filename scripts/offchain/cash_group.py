@@ -0,0 +1,132 @@
+"""
+Oracle rate calculations from contracts/internal/markets/CashGroup.sol, vectorized over
+asset maturities for a single currency at a block time.
+"""
+from collections import namedtuple
+
+import numpy as np
+from scripts.offchain.constants import FIVE_BASIS_POINTS, RATE_PRECISION, TWENTY_FIVE_BASIS_POINTS
+from scripts.offchain.date_time import TRADED_MARKETS, get_market_index, get_reference_time
+
+CashGroup = namedtuple(
+    "CashGroup",
+    [
+        "currencyId",
+        "maxMarketIndex",
+        "rateOracleTimeWindow",
+        "maxDiscountFactor",
+        "reserveFeeShare",
+        "debtBuffer",
+        "fCashHaircut",
+        "minOracleRate",
+        "liquidationfCashHaircut",
+        "liquidationDebtBuffer",
+        "maxOracleRate",
+    ],
+)
+
+
+def from_cash_group_settings(currencyId, settings):
+    """Converts CashGroupSettings returned by getCashGroup into rate precision values"""
+    (maxMarketIndex, timeWindow5Min, maxDiscountFactor5BPS, reserveFeeShare, *bps25) = [
+        int(s) for s in settings
+    ]
+    (debtBuffer, fCashHaircut, minOracleRate, liqfCashHaircut, liqDebtBuffer, maxOracleRate) = [
+        v * TWENTY_FIVE_BASIS_POINTS for v in bps25
+    ]
+    return CashGroup(
+        currencyId,
+        maxMarketIndex,
+        timeWindow5Min * 5 * 60,
+        RATE_PRECISION - maxDiscountFactor5BPS * FIVE_BASIS_POINTS,
+        reserveFeeShare,
+        debtBuffer,
+        fCashHaircut,
+        minOracleRate,
+        liqfCashHaircut,
+        liqDebtBuffer,
+        maxOracleRate,
+    )
+
+
+def interpolate_oracle_rate(shortMaturity, longMaturity, shortRate, longRate, assetMaturity,
+                            reverts=None):
+    (shortMaturity, longMaturity, shortRate, longRate, assetMaturity) = [
+        np.asarray(v, dtype=np.int64)
+        for v in (shortMaturity, longMaturity, shortRate, longRate, assetMaturity)
+    ]
+    invalid = (assetMaturity <= shortMaturity) | (longMaturity <= assetMaturity)
+    if reverts is None:
+        if np.any(invalid):
+            raise ValueError("Cash group interpolation error")
+    else:
+        reverts |= invalid
+
+    span = np.where(invalid, 1, longMaturity - shortMaturity)
+    elapsed = np.where(invalid, 0, assetMaturity - shortMaturity)
+    # Rates can be inverted where the short rate is above the long rate, the slope is then
+    # applied as a decrease to keep all the intermediate values positive
+    return np.where(
+        longRate >= shortRate,
+        (longRate - shortRate) * elapsed // span + shortRate,
+        shortRate - (shortRate - longRate) * elapsed // span,
+    )
+
+
+def calculate_oracle_rate(cashGroup, marketOracleRates, oracleSupplyRate, maturity, blockTime,
+                          reverts=None):
+    """
+    Returns the oracle rate for each maturity, using the market oracle rate when the maturity
+    falls on a market and interpolating between markets otherwise. Before the first market the
+    short rate is the prime cash oracle supply rate. marketOracleRates are the oracle rates of
+    markets 1 through maxMarketIndex already updated to the block time, as returned by
+    getActiveMarketsAtBlockTime.
+    """
+    maturity = np.asarray(maturity, dtype=np.int64)
+    mask = np.zeros(maturity.shape, dtype=bool) if reverts is None else reverts
+    (marketIndex, idiosyncratic) = get_market_index(
+        cashGroup.maxMarketIndex, maturity, blockTime, mask
+    )
+
+    rates = np.zeros(len(TRADED_MARKETS), dtype=np.int64)
+    rates[1 : len(marketOracleRates) + 1] = [int(r) for r in marketOracleRates]
+    longRate = rates[marketIndex]
+    shortIndex = np.maximum(marketIndex - 1, 0)
+    shortRate = np.where(marketIndex == 1, int(oracleSupplyRate), rates[shortIndex])
+
+    # Market.getOracleRate requires the market to be initialized
+    mask |= (marketIndex > 0) & (longRate == 0)
+    mask |= idiosyncratic & (marketIndex > 1) & (shortRate == 0)
+
+    referenceTime = get_reference_time(blockTime)
+    longMaturity = referenceTime + TRADED_MARKETS[marketIndex]
+    shortMaturity = np.where(
+        marketIndex == 1, int(blockTime), referenceTime + TRADED_MARKETS[shortIndex]
+    )
+    # Maturities that fall on a market are given a valid dummy interval so they do not revert
+    interpolated = interpolate_oracle_rate(
+        np.where(idiosyncratic, shortMaturity, maturity - 1),
+        np.where(idiosyncratic, longMaturity, maturity + 1),
+        shortRate,
+        longRate,
+        maturity,
+        mask,
+    )
+    oracleRate = np.where(idiosyncratic, interpolated, longRate)
+
+    if reverts is None and np.any(mask):
+        raise ValueError("Invalid oracle rate")
+    return np.where(mask, 0, oracleRate)
+
+
+def calculate_risk_adjusted_fcash_oracle_rate(cashGroup, oracleRate):
+    return np.maximum(
+        np.asarray(oracleRate, dtype=np.int64) + cashGroup.fCashHaircut, cashGroup.minOracleRate
+    )
+
+
+def calculate_risk_adjusted_debt_oracle_rate(cashGroup, oracleRate):
+    oracleRate = np.asarray(oracleRate, dtype=np.int64)
+    # The oracle rate is floored at zero if the debt buffer exceeds it
+    adjusted = np.minimum(oracleRate - cashGroup.debtBuffer, cashGroup.maxOracleRate)
+    return np.where(oracleRate <= cashGroup.debtBuffer, 0, adjusted)
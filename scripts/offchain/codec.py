@@ -0,0 +1,47 @@
+import numpy as np
+
+
+def to_bytes32(value):
+    """Converts an int, hex string or bytes like value to 32 big endian bytes"""
+    if isinstance(value, (int, np.integer)):
+        return int(value).to_bytes(32, "big")
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith("0x") else value).rjust(32, b"\x00")
+    return bytes(value).rjust(32, b"\x00")
+
+
+def bytes32_array(values):
+    """
+    Converts an array like of bytes32 values into a uint8 array with a trailing axis of
+    32 bytes, where byte zero is the most significant byte (i.e. data[0] in Solidity).
+    """
+    values = np.asarray(values, dtype=object)
+    flat = b"".join(to_bytes32(v) for v in values.reshape(-1))
+    return np.frombuffer(flat, dtype=np.uint8).reshape(values.shape + (32,))
+
+
+def bytes32_to_int(data):
+    """Inverse of bytes32_array, returns an object array of python ints"""
+    data = np.asarray(data, dtype=np.uint8)
+    flat = data.reshape(-1, 32)
+    ints = [int.from_bytes(row.tobytes(), "big") for row in flat]
+    return np.array(ints, dtype=object).reshape(data.shape[:-1])
+
+
+def int_array(values, maxValue):
+    """
+    Returns values as an int64 array if every absolute value is at most maxValue (the largest
+    operand that is safe for the caller's arithmetic), otherwise as an object array of python
+    ints so that results remain exact.
+    """
+    values = np.asarray(values)
+    if values.dtype != object and np.issubdtype(values.dtype, np.integer):
+        ints = values
+    elif values.size:
+        ints = np.vectorize(int, otypes=[object])(values)
+    else:
+        return values.astype(np.int64)
+
+    if values.size == 0 or max(abs(int(ints.max())), abs(int(ints.min()))) <= maxValue:
+        return ints.astype(np.int64)
+    return ints.astype(object)
@@ -0,0 +1,49 @@
+# Mirrors the values in contracts/global/Constants.sol that are used by the off chain engines
+INTERNAL_TOKEN_PRECISION = 10 ** 8
+ETH_CURRENCY_ID = 1
+PERCENTAGE_DECIMALS = 100
+MAX_TRADED_MARKET_INDEX = 7
+MAX_BITMAP_ASSETS = 20
+
+DAY = 86400
+WEEK = DAY * 6
+MONTH = WEEK * 5
+QUARTER = MONTH * 3
+YEAR = QUARTER * 4
+
+RATE_PRECISION = 10 ** 9
+SCALAR_PRECISION = 10 ** 18
+DOUBLE_SCALAR_PRECISION = 10 ** 36
+BASIS_POINT = RATE_PRECISION // 10000
+FIVE_BASIS_POINTS = 5 * BASIS_POINT
+TEN_BASIS_POINTS = 10 * BASIS_POINT
+FIFTEEN_BASIS_POINTS = 15 * BASIS_POINT
+TWENTY_FIVE_BASIS_POINTS = 25 * BASIS_POINT
+ONE_HUNDRED_FIFTY_BASIS_POINTS = 150 * BASIS_POINT
+MAX_LOWER_INCREMENT = 150
+MAX_LOWER_INCREMENT_VALUE = 150 * 25 * BASIS_POINT
+
+# Largest value that can be multiplied by RATE_PRECISION scale values in int64 arithmetic
+INT64_SAFE_OPERAND = (2 ** 63 - 1) // (4 * RATE_PRECISION)
+
+# Bitmap portfolio time offsets from contracts/internal/markets/DateTime.sol
+DAYS_IN_WEEK = 6
+DAYS_IN_MONTH = 30
+DAYS_IN_QUARTER = 90
+MAX_DAY_OFFSET = 90
+MAX_WEEK_OFFSET = 360
+MAX_MONTH_OFFSET = 2160
+MAX_QUARTER_OFFSET = 7650
+WEEK_BIT_OFFSET = 90
+MONTH_BIT_OFFSET = 135
+QUARTER_BIT_OFFSET = 195
+
+# Exchange rate buffers and liquidation amounts
+ETH_DECIMALS = 10 ** 18
+MIN_BUFFER_SCALE = 150
+BUFFER_SCALE = 10
+DEFAULT_LIQUIDATION_PORTION = 40
+
+# Leveraged vaults
+PRIME_CASH_VAULT_MATURITY = 2 ** 40 - 1
+INT256_MAX = 2 ** 255 - 1
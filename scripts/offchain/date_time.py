@@ -0,0 +1,126 @@
+"""Vectorized port of the maturity helpers in contracts/internal/markets/DateTime.sol"""
+import numpy as np
+from scripts.offchain.constants import (
+    DAY,
+    DAYS_IN_MONTH,
+    DAYS_IN_QUARTER,
+    DAYS_IN_WEEK,
+    MAX_DAY_OFFSET,
+    MAX_MONTH_OFFSET,
+    MAX_QUARTER_OFFSET,
+    MAX_TRADED_MARKET_INDEX,
+    MAX_WEEK_OFFSET,
+    MONTH,
+    MONTH_BIT_OFFSET,
+    QUARTER,
+    QUARTER_BIT_OFFSET,
+    WEEK,
+    WEEK_BIT_OFFSET,
+    YEAR,
+)
+
+# Market lengths indexed by market index, index zero is unused
+TRADED_MARKETS = np.array(
+    [0, QUARTER, 2 * QUARTER, YEAR, 2 * YEAR, 5 * YEAR, 10 * YEAR, 20 * YEAR], dtype=np.int64
+)
+
+
+def get_reference_time(blockTime):
+    blockTime = np.asarray(blockTime, dtype=np.int64)
+    if np.any(blockTime < QUARTER):
+        raise ValueError("Block time before first quarter")
+    return blockTime - blockTime % QUARTER
+
+
+def get_time_utc0(time):
+    time = np.asarray(time, dtype=np.int64)
+    if np.any(time < DAY):
+        raise ValueError("Time before first day")
+    return time - time % DAY
+
+
+def get_traded_market(index):
+    index = np.asarray(index, dtype=np.int64)
+    if np.any((index < 1) | (index > MAX_TRADED_MARKET_INDEX)):
+        raise ValueError("Invalid index")
+    return TRADED_MARKETS[index]
+
+
+def get_market_maturities(maxMarketIndex, blockTime):
+    """Maturities of markets 1 through maxMarketIndex at the block time"""
+    return get_reference_time(blockTime) + TRADED_MARKETS[1 : maxMarketIndex + 1]
+
+
+def get_market_index(maxMarketIndex, maturity, blockTime, reverts=None):
+    """
+    Returns the market index that matches each maturity, or the market immediately after it
+    along with an idiosyncratic flag. Maturities past the last market revert on chain, these
+    are flagged in reverts if given and return market index zero.
+    """
+    maturity = np.asarray(maturity, dtype=np.int64)
+    marketMaturities = get_market_maturities(maxMarketIndex, blockTime)
+    position = np.searchsorted(marketMaturities, maturity, side="left")
+    beyondMax = position >= len(marketMaturities)
+    if reverts is None:
+        if np.any(beyondMax):
+            raise ValueError("Maturity past max market")
+    else:
+        reverts |= beyondMax
+
+    position = np.where(beyondMax, 0, position)
+    idiosyncratic = marketMaturities[position] != maturity
+    return (np.where(beyondMax, 0, position + 1), idiosyncratic)
+
+
+def get_bit_num_from_maturity(blockTime, maturity):
+    """
+    Returns the bitmap portfolio bit number for each maturity relative to the block time and
+    whether the maturity falls exactly on that bit. Maturities that are not on a day boundary
+    or not after the block time return (0, False) and maturities past the last quarterly bit
+    return (256, False), matching the on chain return values.
+    """
+    (blockTime, maturity) = np.broadcast_arrays(
+        np.asarray(blockTime, dtype=np.int64), np.asarray(maturity, dtype=np.int64)
+    )
+    utc0 = get_time_utc0(blockTime)
+    invalid = (maturity % DAY != 0) | (utc0 >= maturity)
+    daysOffset = np.where(invalid, 0, maturity - utc0) // DAY
+
+    bitNum = np.full(daysOffset.shape, 256, dtype=np.int64)
+    isExact = np.zeros(daysOffset.shape, dtype=bool)
+    tiers = [
+        (MAX_WEEK_OFFSET, MAX_DAY_OFFSET, WEEK, DAYS_IN_WEEK, WEEK_BIT_OFFSET),
+        (MAX_MONTH_OFFSET, MAX_WEEK_OFFSET, MONTH, DAYS_IN_MONTH, MONTH_BIT_OFFSET),
+        (MAX_QUARTER_OFFSET, MAX_MONTH_OFFSET, QUARTER, DAYS_IN_QUARTER, QUARTER_BIT_OFFSET),
+    ]
+    # Evaluated from the longest offset down so that shorter offsets take precedence
+    for (maxOffset, prevOffset, period, daysInPeriod, bitOffset) in reversed(tiers):
+        inTier = daysOffset <= maxOffset
+        offsetInDays = daysOffset - prevOffset + (utc0 % period) // DAY
+        bitNum = np.where(inTier, bitOffset + offsetInDays // daysInPeriod, bitNum)
+        isExact = np.where(inTier, offsetInDays % daysInPeriod == 0, isExact)
+
+    inDays = daysOffset <= MAX_DAY_OFFSET
+    bitNum = np.where(inDays, daysOffset, bitNum)
+    isExact = np.where(inDays, True, isExact)
+    return (np.where(invalid, 0, bitNum), np.where(invalid, False, isExact))
+
+
+def get_maturity_from_bit_num(blockTime, bitNum):
+    """Inverse of get_bit_num_from_maturity, returns the maturity at each bit number"""
+    (blockTime, bitNum) = np.broadcast_arrays(
+        np.asarray(blockTime, dtype=np.int64), np.asarray(bitNum, dtype=np.int64)
+    )
+    if np.any((bitNum < 1) | (bitNum > 256)):
+        raise ValueError("Invalid bit num")
+    utc0 = get_time_utc0(blockTime)
+
+    return np.select(
+        [bitNum <= WEEK_BIT_OFFSET, bitNum <= MONTH_BIT_OFFSET, bitNum <= QUARTER_BIT_OFFSET],
+        [
+            utc0 + bitNum * DAY,
+            utc0 + MAX_DAY_OFFSET * DAY - utc0 % WEEK + (bitNum - WEEK_BIT_OFFSET) * WEEK,
+            utc0 + MAX_WEEK_OFFSET * DAY - utc0 % MONTH + (bitNum - MONTH_BIT_OFFSET) * MONTH,
+        ],
+        utc0 + MAX_MONTH_OFFSET * DAY - utc0 % QUARTER + (bitNum - QUARTER_BIT_OFFSET) * QUARTER,
+    )
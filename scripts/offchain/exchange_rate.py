@@ -0,0 +1,62 @@
+"""ETH exchange rate conversions from contracts/internal/valuation/ExchangeRate.sol"""
+from collections import namedtuple
+
+import numpy as np
+from scripts.offchain.constants import (
+    BUFFER_SCALE,
+    ETH_CURRENCY_ID,
+    ETH_DECIMALS,
+    MIN_BUFFER_SCALE,
+    PERCENTAGE_DECIMALS,
+)
+from scripts.offchain.safe_math import as_int, div
+
+# Field order matches the ETHRate struct returned by getCurrencyAndRates
+ETHRate = namedtuple(
+    "ETHRate", ["rateDecimals", "rate", "buffer", "haircut", "liquidationDiscount"]
+)
+
+
+def build_exchange_rate(currencyId, ethRateStorage, oracleRate):
+    """
+    Builds an ETHRate from ETHRateStorage (rateOracle, rateDecimalPlaces, mustInvert, buffer,
+    haircut, liquidationDiscount) and the latest answer of the rate oracle, which is ignored
+    for ETH. Stored buffers above MIN_BUFFER_SCALE are scaled up by BUFFER_SCALE.
+    """
+    (_, rateDecimalPlaces, mustInvert, buffer, haircut, liquidationDiscount) = ethRateStorage
+    if currencyId == ETH_CURRENCY_ID:
+        (rateDecimals, rate) = (ETH_DECIMALS, ETH_DECIMALS)
+    else:
+        rate = int(oracleRate)
+        if rate <= 0:
+            raise ValueError("Invalid oracle rate")
+        rateDecimals = 10 ** int(rateDecimalPlaces)
+        if mustInvert:
+            rate = rateDecimals * rateDecimals // rate
+
+    buffer = int(buffer)
+    if buffer > MIN_BUFFER_SCALE:
+        buffer = (buffer - MIN_BUFFER_SCALE) * BUFFER_SCALE + MIN_BUFFER_SCALE
+    return ETHRate(rateDecimals, rate, buffer, int(haircut), int(liquidationDiscount))
+
+
+def convert_to_eth(ethRate, balance):
+    """Converts internal balances to ETH, haircuts apply to positive and buffers to negative"""
+    balance = as_int(balance)
+    multiplier = np.where(balance > 0, as_int(ethRate.haircut), as_int(ethRate.buffer))
+    result = div(
+        div(balance * as_int(ethRate.rate) * multiplier, PERCENTAGE_DECIMALS),
+        as_int(ethRate.rateDecimals),
+    )
+    return np.where(balance < 0, np.minimum(result, -1), result)
+
+
+def convert_eth_to(ethRate, balance):
+    """Converts an ETH balance to the base currency without buffers or haircuts"""
+    return div(as_int(balance) * as_int(ethRate.rateDecimals), as_int(ethRate.rate))
+
+
+def exchange_rate(baseRate, quoteRate):
+    return div(
+        as_int(baseRate.rate) * as_int(quoteRate.rateDecimals), as_int(quoteRate.rate)
+    )
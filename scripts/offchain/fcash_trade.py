@@ -0,0 +1,319 @@
+"""
+Vectorized fCash trade simulator, a bit exact port of InterestRateCurve.calculatefCashTrade
+and the getfCashGivenCashAmount secant solver as used by CalculationViews.
+
+Market state is loaded once per block into a MarketSnapshot and any number of trades
+across currencies and markets are then evaluated without further RPC calls. Trades that
+would revert on chain are flagged in the returned reverted mask instead of raising, trades
+that fail without reverting (i.e. exceeding market liquidity) return zero like on chain.
+"""
+from collections import namedtuple
+
+import numpy as np
+from brownie.network import web3
+from scripts.offchain.abdk import get_fcash_exchange_rate
+from scripts.offchain.constants import PERCENTAGE_DECIMALS, RATE_PRECISION
+from scripts.offchain.interest_rate_curve import (
+    InterestRateParameters,
+    decode_curve_storage,
+    get_fcash_utilization,
+    get_interest_rate,
+    get_post_fee_interest_rate,
+    read_curve_storage,
+)
+from scripts.offchain.prime_rate import convert_from_underlying, convert_to_underlying
+from scripts.offchain.safe_math import as_int, div, div_in_rate_precision, mul_in_rate_precision
+
+# Maximum number of secant iterations in getfCashGivenCashAmount
+MAX_SOLVER_ITERATIONS = 250
+
+TradeResult = namedtuple(
+    "TradeResult",
+    [
+        "netPrimeCashToAccount",
+        "primeCashToReserve",
+        "postFeeInterestRate",
+        "netUnderlyingToAccount",
+        "reverted",
+    ],
+)
+
+
+class MarketSnapshot:
+    """
+    Columnar market state for every active market of a set of currencies at a single block
+    time. Rows are ordered by currency and then market index.
+    """
+
+    def __init__(self, blockTime, currencyId, marketIndex, maturity, totalfCash,
+                 totalPrimeCash, supplyFactor, reserveFeeShare, irParams):
+        self.blockTime = int(blockTime)
+        self.currencyId = np.asarray(currencyId, dtype=np.int64)
+        self.marketIndex = np.asarray(marketIndex, dtype=np.int64)
+        self.maturity = as_int(maturity)
+        self.totalfCash = as_int(totalfCash)
+        self.totalPrimeCash = as_int(totalPrimeCash)
+        self.supplyFactor = as_int(supplyFactor)
+        self.reserveFeeShare = as_int(reserveFeeShare)
+        self.irParams = irParams
+        self._rows = {
+            (int(c), int(m)): i for (i, (c, m)) in enumerate(zip(currencyId, marketIndex))
+        }
+
+    @property
+    def totalCashUnderlying(self):
+        return convert_to_underlying(self.supplyFactor, self.totalPrimeCash)
+
+    def rows(self, currencyId, marketIndex):
+        """Returns the row index for each (currencyId, marketIndex) pair"""
+        (currencyId, marketIndex) = np.broadcast_arrays(currencyId, marketIndex)
+        pairs = zip(currencyId.ravel(), marketIndex.ravel())
+        rows = [self._rows[(int(c), int(m))] for (c, m) in pairs]
+        return np.array(rows, dtype=np.int64).reshape(currencyId.shape)
+
+    def params(self, rows):
+        return InterestRateParameters(*[f[rows] for f in self.irParams])
+
+
+def load_market_snapshot(notional, currencyIds, blockIdentifier="latest"):
+    """
+    Loads markets, prime rates, reserve fee shares and the packed interest rate curves for the
+    currencies. All calls are made against the same block so the snapshot is consistent.
+    """
+    blockTime = web3.eth.get_block(blockIdentifier)["timestamp"]
+    columns = {k: [] for k in ["currencyId", "marketIndex", "maturity", "totalfCash",
+                               "totalPrimeCash", "supplyFactor", "reserveFeeShare"]}
+    call = {"block_identifier": blockIdentifier}
+
+    for currencyId in currencyIds:
+        markets = notional.getActiveMarketsAtBlockTime(currencyId, blockTime, **call)
+        (primeRate, *_) = notional.getPrimeFactors(currencyId, blockTime, **call)
+        reserveFeeShare = notional.getCashGroup(currencyId, **call)[3]
+
+        for (i, market) in enumerate(markets):
+            columns["currencyId"].append(currencyId)
+            columns["marketIndex"].append(i + 1)
+            columns["maturity"].append(market[1])
+            columns["totalfCash"].append(market[2])
+            columns["totalPrimeCash"].append(market[3])
+            columns["supplyFactor"].append(primeRate[0])
+            columns["reserveFeeShare"].append(reserveFeeShare)
+
+    storage = read_curve_storage(notional.address, currencyIds, True, blockIdentifier)
+    currencyRow = {c: i for (i, c) in enumerate(currencyIds)}
+    storageRows = np.array([currencyRow[c] for c in columns["currencyId"]], dtype=np.int64)
+    irParams = decode_curve_storage(
+        storage[storageRows], np.array(columns["marketIndex"], dtype=np.int64)
+    )
+
+    return MarketSnapshot(blockTime, irParams=irParams, **columns)
+
+
+def _time_to_maturity(snapshot, rows, reverted):
+    timeToMaturity = snapshot.maturity[rows] - snapshot.blockTime
+    # CalculationViews requires the market to mature after the block time
+    reverted |= timeToMaturity <= 0
+    return np.where(timeToMaturity > 0, timeToMaturity, 0)
+
+
+def _stage(active, reverted, stageReverts):
+    """Applies the reverts of a stage to elements that reached it"""
+    reverted |= stageReverts & active
+    active &= ~stageReverts
+
+
+def calculate_fcash_trade(snapshot, rows, fCashToAccount):
+    """
+    Mirrors InterestRateCurve.calculatefCashTrade for each trade of fCashToAccount (positive
+    to lend, negative to borrow) on the market at each row of the snapshot. Also returns the
+    net underlying to the account as CalculationViews.getCashAmountGivenfCashAmount does.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    fCashToAccount = as_int(np.broadcast_to(fCashToAccount, rows.shape))
+    reverted = np.zeros(rows.shape, dtype=bool)
+    timeToMaturity = _time_to_maturity(snapshot, rows, reverted)
+    active = ~reverted
+
+    totalfCash = snapshot.totalfCash[rows]
+    supplyFactor = snapshot.supplyFactor[rows]
+    irParams = snapshot.params(rows)
+    # Not enough fCash to support the trade
+    active &= ~(totalfCash <= fCashToAccount)
+    fCash = np.where(active, fCashToAccount, 0)
+    totalCashUnderlying = convert_to_underlying(supplyFactor, snapshot.totalPrimeCash[rows])
+
+    # _getNetCashAmountsUnderlying
+    r = np.zeros(rows.shape, dtype=bool)
+    utilization = get_fcash_utilization(fCash, totalfCash, totalCashUnderlying, r)
+    _stage(active, reverted, r)
+    active &= ~(utilization > RATE_PRECISION)
+
+    r = np.zeros(rows.shape, dtype=bool)
+    preFeeInterestRate = get_interest_rate(irParams, np.where(active, utilization, 0), r)
+    preFeeExchangeRate = get_fcash_exchange_rate(preFeeInterestRate, timeToMaturity, r)
+    postFeeInterestRate = get_post_fee_interest_rate(irParams, preFeeInterestRate, fCash < 0)
+    postFeeExchangeRate = get_fcash_exchange_rate(postFeeInterestRate, timeToMaturity, r)
+    _stage(active, reverted, r)
+
+    preFeeCashToAccount = -div_in_rate_precision(
+        fCash, np.where(active, preFeeExchangeRate, RATE_PRECISION)
+    )
+    postFeeCashToAccount = -div_in_rate_precision(
+        fCash, np.where(active, postFeeExchangeRate, RATE_PRECISION)
+    )
+    _stage(active, reverted, postFeeCashToAccount > preFeeCashToAccount)
+
+    fee = preFeeCashToAccount - postFeeCashToAccount
+    cashToReserve = div(fee * snapshot.reserveFeeShare[rows], PERCENTAGE_DECIMALS)
+    netUnderlyingToMarket = -(postFeeCashToAccount + cashToReserve)
+    # Signifies a failed net cash amount calculation
+    active &= postFeeCashToAccount != 0
+
+    # Utilization after the trade must not exceed 100%
+    r = np.zeros(rows.shape, dtype=bool)
+    utilization = get_fcash_utilization(
+        0,
+        np.where(active, totalfCash - fCash, 0),
+        np.where(active, totalCashUnderlying + netUnderlyingToMarket, 0),
+        r,
+    )
+    _stage(active, reverted, r)
+    active &= ~(utilization > RATE_PRECISION)
+
+    r = np.zeros(rows.shape, dtype=bool)
+    newPreFeeImpliedRate = get_interest_rate(irParams, np.where(active, utilization, 0), r)
+    _stage(active, reverted, r)
+    active &= newPreFeeImpliedRate != 0
+
+    # _setNewMarketState
+    netPrimeCashToAccount = np.where(
+        active, convert_from_underlying(supplyFactor, postFeeCashToAccount), 0
+    )
+    primeCashToReserve = np.where(active, convert_from_underlying(supplyFactor, cashToReserve), 0)
+
+    return TradeResult(
+        netPrimeCashToAccount=netPrimeCashToAccount,
+        primeCashToReserve=primeCashToReserve,
+        postFeeInterestRate=np.where(active, postFeeInterestRate, 0),
+        netUnderlyingToAccount=convert_to_underlying(supplyFactor, netPrimeCashToAccount),
+        reverted=reverted,
+    )
+
+
+def _post_fee_exchange_rate(irParams, totalfCash, totalCashUnderlying, timeToMaturity,
+                            fCashToAccount, reverts):
+    utilization = get_fcash_utilization(fCashToAccount, totalfCash, totalCashUnderlying, reverts)
+    preFeeInterestRate = get_interest_rate(irParams, utilization, reverts)
+    postFeeInterestRate = get_post_fee_interest_rate(
+        irParams, preFeeInterestRate, fCashToAccount < 0
+    )
+    return get_fcash_exchange_rate(postFeeInterestRate, timeToMaturity, reverts)
+
+
+def _calculate_diff(irParams, totalfCash, totalCashUnderlying, fCashToAccount, timeToMaturity,
+                    netUnderlyingToAccount, reverts):
+    exchangeRate = _post_fee_exchange_rate(
+        irParams, totalfCash, totalCashUnderlying, timeToMaturity, fCashToAccount, reverts
+    )
+    return fCashToAccount + mul_in_rate_precision(netUnderlyingToAccount, exchangeRate)
+
+
+def get_fcash_given_cash_amount(snapshot, rows, netUnderlyingToAccount):
+    """
+    Mirrors InterestRateCurve.getfCashGivenCashAmount, the secant method runs on all trades
+    at once and each iteration only evaluates trades that have not yet converged. Returns
+    the fCash amounts and a mask of the trades that revert.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    net = as_int(np.broadcast_to(netUnderlyingToAccount, rows.shape))
+    reverted = np.zeros(rows.shape, dtype=bool)
+    timeToMaturity = _time_to_maturity(snapshot, rows, reverted)
+
+    totalfCash = snapshot.totalfCash[rows]
+    totalCashUnderlying = convert_to_underlying(
+        snapshot.supplyFactor[rows], snapshot.totalPrimeCash[rows]
+    )
+    irParams = snapshot.params(rows)
+    # Cannot borrow more than total cash underlying
+    reverted |= (net == 0) | (net > totalCashUnderlying)
+
+    r = np.zeros(rows.shape, dtype=bool)
+    currentExchangeRate = _post_fee_exchange_rate(
+        irParams, totalfCash, totalCashUnderlying, timeToMaturity, np.where(net > 0, -1, 1), r
+    )
+    maxRateExchangeRate = get_fcash_exchange_rate(
+        np.where(net > 0, irParams.maxRate, 0), timeToMaturity, r
+    )
+    reverted |= r
+
+    fCash_0 = np.where(net < 0, -net, -mul_in_rate_precision(net, currentExchangeRate))
+    fCash_1 = np.where(
+        net < 0,
+        -mul_in_rate_precision(net, currentExchangeRate),
+        -mul_in_rate_precision(net, maxRateExchangeRate),
+    )
+
+    result = np.zeros(rows.shape, dtype=object)
+    active = np.flatnonzero(~reverted.ravel())
+    (fCash_0, fCash_1) = (fCash_0.ravel()[active], fCash_1.ravel()[active])
+    args = [
+        InterestRateParameters(*[f.ravel()[active] for f in irParams]),
+        totalfCash.ravel()[active],
+        totalCashUnderlying.ravel()[active],
+    ]
+    timeToMaturity = timeToMaturity.ravel()[active]
+    net = net.ravel()[active]
+    flatResult = result.ravel()
+    flatReverted = reverted.ravel()
+
+    r = np.zeros(active.shape, dtype=bool)
+    diff_0 = _calculate_diff(*args, fCash_0, timeToMaturity, net, r)
+
+    for _ in range(MAX_SOLVER_ITERATIONS):
+        fCashDelta = fCash_1 - fCash_0
+        converged = fCashDelta == 0
+        done = converged | r
+        flatResult[active[converged & ~r]] = fCash_1[converged & ~r]
+        flatReverted[active[r]] = True
+
+        keep = ~done
+        active = active[keep]
+        if len(active) == 0:
+            break
+
+        (fCash_0, fCash_1, diff_0, fCashDelta) = (
+            fCash_0[keep], fCash_1[keep], diff_0[keep], fCashDelta[keep]
+        )
+        args = [
+            InterestRateParameters(*[f[keep] for f in args[0]]),
+            args[1][keep],
+            args[2][keep],
+        ]
+        (timeToMaturity, net) = (timeToMaturity[keep], net[keep])
+
+        r = np.zeros(active.shape, dtype=bool)
+        diff_1 = _calculate_diff(*args, fCash_1, timeToMaturity, net, r)
+        denominator = diff_1 - diff_0
+        r |= denominator == 0
+        fCash_n = fCash_1 - div(diff_1 * fCashDelta, np.where(denominator == 0, 1, denominator))
+
+        (fCash_1, fCash_0) = (fCash_n, fCash_1)
+        diff_0 = diff_1
+    else:
+        # No convergence
+        flatReverted[active] = True
+
+    return (result, reverted)
+
+
+def get_cash_amount_given_fcash_amount(snapshot, currencyId, marketIndex, fCashAmount):
+    """Vectorized CalculationViews.getCashAmountGivenfCashAmount at the snapshot block time"""
+    trade = calculate_fcash_trade(snapshot, snapshot.rows(currencyId, marketIndex), fCashAmount)
+    return (trade.netPrimeCashToAccount, trade.netUnderlyingToAccount, trade.reverted)
+
+
+def get_fcash_amount_given_cash_amount(snapshot, currencyId, marketIndex, netCashToAccount):
+    """Vectorized CalculationViews.getfCashAmountGivenCashAmount at the snapshot block time"""
+    return get_fcash_given_cash_amount(
+        snapshot, snapshot.rows(currencyId, marketIndex), netCashToAccount
+    )
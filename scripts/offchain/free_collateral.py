@@ -0,0 +1,547 @@
+"""
+Batched free collateral engine, a bit exact port of FreeCollateral.getFreeCollateralView
+evaluated over columnar positions for many accounts at once.
+
+Inputs that are shared by every account (prime rates, ETH rates, cash groups, market oracle
+rates and nToken present values) are loaded once per block into ValuationInputs. Account
+positions are loaded into AccountPositions with one row per (account, currency) balance and
+one row per fCash asset. Accounts that would revert on chain (i.e. accounts that must settle
+first) are flagged in the reverted mask of the result rather than raising.
+
+FreeCollateralEngine keeps results for a fixed set of accounts up to date across blocks and
+only revalues accounts whose positions changed or that hold a currency whose valuation inputs
+changed, ETH rate changes only require the final conversion to ETH.
+"""
+from collections import namedtuple
+
+import numpy as np
+from brownie.network import web3
+from eth_utils import keccak
+from scripts.offchain.account_context import active_currencies_to_list
+from scripts.offchain.asset_handler import (
+    get_present_fcash_value,
+    get_risk_adjusted_discount_factors,
+)
+from scripts.offchain.cash_group import from_cash_group_settings
+from scripts.offchain.constants import PERCENTAGE_DECIMALS
+from scripts.offchain.date_time import get_time_utc0
+from scripts.offchain.exchange_rate import ETHRate, convert_to_eth
+from scripts.offchain.prime_rate import convert_from_underlying, convert_to_underlying
+from scripts.offchain.safe_math import as_int, div
+
+BALANCE_STORAGE_SLOT = 1000000 + 6
+# Indexes of the haircuts in the nToken parameters
+LIQUIDATION_HAIRCUT_PERCENTAGE = 0
+PV_HAIRCUT_PERCENTAGE = 3
+FCASH_ASSET_TYPE = 1
+
+CurrencyInputs = namedtuple(
+    "CurrencyInputs",
+    [
+        "currencyId",
+        "supplyFactor",
+        "debtFactor",
+        "oracleSupplyRate",
+        "ethRate",
+        "cashGroup",
+        "marketOracleRates",
+        "nTokenPrimePV",
+        "nTokenTotalSupply",
+        "nTokenPVHaircut",
+        "nTokenLiquidationHaircut",
+    ],
+)
+
+FreeCollateralResult = namedtuple(
+    "FreeCollateralResult", ["netETHValue", "netLocalPrimeValue", "reverted"]
+)
+
+
+class ValuationInputs:
+    """Per currency valuation inputs at a single block time shared by all accounts"""
+
+    def __init__(self, blockTime, currencies):
+        self.blockTime = int(blockTime)
+        self.currencies = currencies
+        self._discountFactors = {}
+
+    def valuation_key(self, currencyId):
+        """Inputs that determine the prime cash value of positions, excludes the ETH rate"""
+        c = self.currencies[currencyId]
+        return (self.blockTime,) + c[:4] + c[5:]
+
+    def discount_factors(self, currencyId, maturity):
+        """
+        Risk adjusted (fCash, debt) discount factors and a reverted flag for each maturity,
+        calculated once per unique maturity and cached for the block.
+        """
+        c = self.currencies[currencyId]
+        cache = self._discountFactors.setdefault(currencyId, {})
+        (unique, inverse) = np.unique(np.asarray(maturity, dtype=np.int64), return_inverse=True)
+        missing = np.array([m for m in unique if int(m) not in cache], dtype=np.int64)
+
+        if len(missing):
+            reverts = np.zeros(missing.shape, dtype=bool)
+            if c.cashGroup is None:
+                reverts[:] = True
+                (fCashDF, debtDF) = (np.zeros(missing.shape), np.zeros(missing.shape))
+            else:
+                (fCashDF, debtDF) = get_risk_adjusted_discount_factors(
+                    c.cashGroup,
+                    c.marketOracleRates,
+                    c.oracleSupplyRate,
+                    missing,
+                    self.blockTime,
+                    reverts,
+                )
+            for (i, m) in enumerate(missing):
+                cache[int(m)] = (int(fCashDF[i]), int(debtDF[i]), bool(reverts[i]))
+
+        values = [cache[int(m)] for m in unique]
+        (fCashDF, debtDF, reverted) = [
+            np.array([v[i] for v in values], dtype=dtype)[inverse]
+            for (i, dtype) in enumerate([object, object, bool])
+        ]
+        return (fCashDF, debtDF, reverted)
+
+    def with_eth_rates(self, ethRates):
+        """Returns a copy of the inputs with ETH rates replaced, i.e. to apply price shocks"""
+        currencies = {
+            c: v._replace(ethRate=ethRates.get(c, v.ethRate))
+            for (c, v) in self.currencies.items()
+        }
+        inputs = ValuationInputs(self.blockTime, currencies)
+        inputs._discountFactors = self._discountFactors
+        return inputs
+
+
+def load_valuation_inputs(notional, currencyIds, blockIdentifier="latest"):
+    """Loads the valuation inputs for the currencies, all calls are made at the same block"""
+    blockTime = web3.eth.get_block(blockIdentifier)["timestamp"]
+    call = {"block_identifier": blockIdentifier}
+    currencies = {}
+
+    for currencyId in currencyIds:
+        (primeRate, *_) = notional.getPrimeFactors(currencyId, blockTime, **call)
+        ethRate = ETHRate(*[int(v) for v in notional.getCurrencyAndRates(currencyId, **call)[2]])
+        settings = notional.getCashGroup(currencyId, **call)
+        (cashGroup, oracleRates, nTokenPV, totalSupply) = (None, (), 0, 0)
+        (pvHaircut, liquidationHaircut) = (0, 0)
+
+        # Currencies without a cash group can only be held as cash balances
+        if settings[0] > 0:
+            cashGroup = from_cash_group_settings(currencyId, settings)
+            markets = notional.getActiveMarketsAtBlockTime(currencyId, blockTime, **call)
+            oracleRates = tuple(int(m[6]) for m in markets)
+            nTokenAddress = notional.nTokenAddress(currencyId, **call)
+            nTokenAccount = notional.getNTokenAccount(nTokenAddress, **call)
+            totalSupply = int(nTokenAccount[1])
+            parameters = bytes.fromhex(nTokenAccount[4][2:])
+            pvHaircut = parameters[PV_HAIRCUT_PERCENTAGE]
+            liquidationHaircut = parameters[LIQUIDATION_HAIRCUT_PERCENTAGE]
+            if totalSupply > 0:
+                nTokenPV = int(notional.nTokenPresentValueAssetDenominated(currencyId, **call))
+
+        currencies[currencyId] = CurrencyInputs(
+            currencyId,
+            int(primeRate[0]),
+            int(primeRate[1]),
+            int(primeRate[2]),
+            ethRate,
+            cashGroup,
+            oracleRates,
+            nTokenPV,
+            totalSupply,
+            pvHaircut,
+            liquidationHaircut,
+        )
+
+    return ValuationInputs(blockTime, currencies)
+
+
+def balance_storage_slot(account, currencyId):
+    accountKey = bytes.fromhex(account[2:]).rjust(32, b"\x00")
+    accountSlot = keccak(accountKey + BALANCE_STORAGE_SLOT.to_bytes(32, "big"))
+    return int.from_bytes(keccak(int(currencyId).to_bytes(32, "big") + accountSlot), "big")
+
+
+def decode_balance_storage(word):
+    """Returns the stored (cashBalance, nTokenBalance) from a packed BalanceStorage word"""
+    word = int.from_bytes(bytes(word), "big") if not isinstance(word, int) else word
+    cashBalance = word >> 168
+    if cashBalance >= 2 ** 87:
+        cashBalance -= 2 ** 88
+    return (cashBalance, word & (2 ** 80 - 1))
+
+
+class AccountPositions:
+    """
+    Columnar positions for a set of accounts. Balance rows are ordered by account and then in
+    the order free collateral visits currencies (bitmap currency first, then active currencies)
+    so that each account's rows line up with the netLocalAssetValues returned on chain. Cash
+    balances are held as stored, negative balances are converted using the prime rate at
+    valuation time.
+    """
+
+    def __init__(self, accounts, nextSettleTime, bitmapCurrencyId, balanceAccount,
+                 balanceCurrency, storedCashBalance, nTokenBalance, countsPortfolio,
+                 assetAccount, assetCurrency, maturity, notional, invalid):
+        self.accounts = list(accounts)
+        self.nextSettleTime = np.asarray(nextSettleTime, dtype=np.int64)
+        self.bitmapCurrencyId = np.asarray(bitmapCurrencyId, dtype=np.int64)
+        self.balanceAccount = np.asarray(balanceAccount, dtype=np.int64)
+        self.balanceCurrency = np.asarray(balanceCurrency, dtype=np.int64)
+        self.storedCashBalance = as_int(storedCashBalance)
+        self.nTokenBalance = as_int(nTokenBalance)
+        self.countsPortfolio = np.asarray(countsPortfolio, dtype=bool)
+        self.assetAccount = np.asarray(assetAccount, dtype=np.int64)
+        self.assetCurrency = np.asarray(assetCurrency, dtype=np.int64)
+        self.maturity = np.asarray(maturity, dtype=np.int64)
+        self.notional = as_int(notional)
+        # Accounts that fail a require in free collateral regardless of valuation inputs
+        self.invalid = np.asarray(invalid, dtype=bool)
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Builds positions from a list of (account, accountContext, balances, portfolio) where
+        balances maps currency id to the stored (cashBalance, nTokenBalance)
+        """
+        columns = {
+            k: []
+            for k in [
+                "accounts",
+                "nextSettleTime",
+                "bitmapCurrencyId",
+                "balanceAccount",
+                "balanceCurrency",
+                "storedCashBalance",
+                "nTokenBalance",
+                "countsPortfolio",
+                "assetAccount",
+                "assetCurrency",
+                "maturity",
+                "notional",
+                "invalid",
+            ]
+        }
+        for (i, (account, context, balances, portfolio)) in enumerate(records):
+            (nextSettleTime, _, _, bitmapCurrencyId, activeCurrencies) = context[:5]
+            columns["accounts"].append(account)
+            columns["nextSettleTime"].append(nextSettleTime)
+            columns["bitmapCurrencyId"].append(bitmapCurrencyId)
+
+            rows = [(bitmapCurrencyId, True, True)] if bitmapCurrencyId != 0 else []
+            rows += active_currencies_to_list(activeCurrencies)
+            # Free collateral requires that the bitmap currency is not double counted
+            columns["invalid"].append(
+                bitmapCurrencyId != 0 and any(c == bitmapCurrencyId for (c, _, _) in rows[1:])
+            )
+            for (currencyId, inPortfolio, inBalances) in rows:
+                (cashBalance, nTokenBalance) = (
+                    balances.get(currencyId, (0, 0)) if inBalances else (0, 0)
+                )
+                columns["balanceAccount"].append(i)
+                columns["balanceCurrency"].append(currencyId)
+                columns["storedCashBalance"].append(cashBalance)
+                columns["nTokenBalance"].append(nTokenBalance)
+                columns["countsPortfolio"].append(inPortfolio or nTokenBalance > 0)
+
+            for asset in portfolio:
+                if asset[2] != FCASH_ASSET_TYPE:
+                    continue
+                columns["assetAccount"].append(i)
+                columns["assetCurrency"].append(asset[0])
+                columns["maturity"].append(asset[1])
+                columns["notional"].append(asset[3])
+
+        return cls(**columns)
+
+    def select(self, accountMask):
+        """Returns the positions of the selected accounts along with the selected balance rows"""
+        accountMask = np.asarray(accountMask, dtype=bool)
+        newIndex = np.cumsum(accountMask) - 1
+        balanceRows = accountMask[self.balanceAccount]
+        assetRows = accountMask[self.assetAccount]
+        positions = AccountPositions(
+            [a for (a, m) in zip(self.accounts, accountMask) if m],
+            self.nextSettleTime[accountMask],
+            self.bitmapCurrencyId[accountMask],
+            newIndex[self.balanceAccount[balanceRows]],
+            self.balanceCurrency[balanceRows],
+            self.storedCashBalance[balanceRows],
+            self.nTokenBalance[balanceRows],
+            self.countsPortfolio[balanceRows],
+            newIndex[self.assetAccount[assetRows]],
+            self.assetCurrency[assetRows],
+            self.maturity[assetRows],
+            self.notional[assetRows],
+            self.invalid[accountMask],
+        )
+        return (positions, balanceRows)
+
+    def net_local_values(self, netLocalPrimeValue, accountIndex):
+        """Net local prime cash values for an account in the order returned on chain"""
+        return list(netLocalPrimeValue[self.balanceAccount == accountIndex])
+
+
+def load_account_records(notional, accounts, blockIdentifier="latest"):
+    """
+    Loads (account, accountContext, balances, portfolio) records for AccountPositions, all
+    reads are made at the same block. Balances are read directly from storage since the
+    views only return cash balances converted at the block time.
+    """
+    call = {"block_identifier": blockIdentifier}
+    records = []
+    for account in [str(a) for a in accounts]:
+        context = notional.getAccountContext(account, **call)
+        portfolio = notional.getAccountPortfolio(account, **call)
+        currencyIds = [c for (c, _, _) in active_currencies_to_list(context[4])]
+        if context[3] != 0:
+            currencyIds.append(context[3])
+
+        balances = {}
+        for currencyId in currencyIds:
+            word = web3.eth.get_storage_at(
+                notional.address, balance_storage_slot(account, currencyId), blockIdentifier
+            )
+            balances[currencyId] = decode_balance_storage(word)
+        records.append((account, context, balances, portfolio))
+
+    return records
+
+
+def load_account_positions(notional, accounts, blockIdentifier="latest"):
+    records = load_account_records(notional, accounts, blockIdentifier)
+    return AccountPositions.from_records(records)
+
+
+def _currency_column(inputs, currencyIds, field):
+    """Looks up a per currency input for each row"""
+    values = {c: getattr(inputs.currencies[c], field) for c in np.unique(currencyIds)}
+    return np.array([values[c] for c in currencyIds], dtype=object)
+
+
+def get_invalid_accounts(inputs, positions):
+    """
+    Accounts that revert regardless of their valuation, free collateral cannot be calculated
+    for accounts that must settle assets first.
+    """
+    bitmapSettle = positions.nextSettleTime < get_time_utc0(inputs.blockTime)
+    arraySettle = (0 < positions.nextSettleTime) & (positions.nextSettleTime <= inputs.blockTime)
+    mustSettle = np.where(positions.bitmapCurrencyId != 0, bitmapSettle, arraySettle)
+    return mustSettle | positions.invalid
+
+
+def get_cash_balances(inputs, positions):
+    """Prime cash value of each stored cash balance, debts are converted at the prime rate"""
+    currencyId = positions.balanceCurrency
+    stored = positions.storedCashBalance
+    debtFactor = _currency_column(inputs, currencyId, "debtFactor")
+    supplyFactor = _currency_column(inputs, currencyId, "supplyFactor")
+    return np.where(stored >= 0, stored, div(stored * debtFactor, supplyFactor))
+
+
+def get_ntoken_haircut_values(inputs, positions):
+    """Haircut prime cash value of each nToken balance"""
+    currencyId = positions.balanceCurrency
+    nTokenBalance = positions.nTokenBalance
+    hasNToken = nTokenBalance > 0
+    totalSupply = _currency_column(inputs, currencyId, "nTokenTotalSupply")
+    nTokenValue = div(
+        div(
+            nTokenBalance
+            * _currency_column(inputs, currencyId, "nTokenPrimePV")
+            * _currency_column(inputs, currencyId, "nTokenPVHaircut"),
+            PERCENTAGE_DECIMALS,
+        ),
+        np.where(hasNToken, totalSupply, 1),
+    )
+    return np.where(hasNToken, nTokenValue, 0)
+
+
+def get_net_local_values(inputs, positions):
+    """
+    Returns the net prime cash value of each balance row (cash balance, risk adjusted fCash
+    and haircut nToken value) and a flag for each account that has an asset that cannot be
+    valued on chain.
+    """
+    missing = set(np.unique(positions.balanceCurrency)) - set(inputs.currencies.keys())
+    if missing:
+        raise ValueError("Missing valuation inputs for currencies {}".format(sorted(missing)))
+
+    reverted = np.zeros(len(positions.accounts), dtype=bool)
+    currencyId = positions.balanceCurrency
+    supplyFactor = _currency_column(inputs, currencyId, "supplyFactor")
+    cash = get_cash_balances(inputs, positions)
+    nTokenValue = get_ntoken_haircut_values(inputs, positions)
+
+    portfolioValue = _get_portfolio_values(inputs, positions, supplyFactor, reverted)
+    return (cash + portfolioValue + nTokenValue, reverted)
+
+
+def _get_portfolio_values(inputs, positions, supplyFactor, reverted):
+    """Sums risk adjusted fCash present values into the matching balance row"""
+    numRows = len(positions.balanceCurrency)
+    rowKey = {
+        (int(a), int(c)): i
+        for (i, (a, c)) in enumerate(zip(positions.balanceAccount, positions.balanceCurrency))
+        if positions.countsPortfolio[i]
+    }
+    assetRow = np.array(
+        [
+            rowKey.get((int(a), int(c)), -1)
+            for (a, c) in zip(positions.assetAccount, positions.assetCurrency)
+        ],
+        dtype=np.int64,
+    )
+    counted = assetRow >= 0
+
+    presentValue = np.zeros(len(assetRow), dtype=object)
+    assetReverted = np.zeros(len(assetRow), dtype=bool)
+    for currencyId in np.unique(positions.assetCurrency[counted]):
+        rows = counted & (positions.assetCurrency == currencyId)
+        (fCashDF, debtDF, dfReverted) = inputs.discount_factors(
+            int(currencyId), positions.maturity[rows]
+        )
+        notional = positions.notional[rows]
+        discountFactor = np.where(notional > 0, fCashDF, debtDF)
+        pvReverted = dfReverted & (notional != 0)
+        presentValue[rows] = np.where(
+            pvReverted, 0, get_present_fcash_value(notional, discountFactor, pvReverted)
+        )
+        assetReverted[rows] = pvReverted
+
+    underlying = np.zeros(numRows, dtype=object)
+    np.add.at(underlying, assetRow[counted], presentValue[counted])
+    np.logical_or.at(reverted, positions.assetAccount[counted], assetReverted[counted])
+    return convert_from_underlying(supplyFactor, underlying) if numRows else underlying
+
+
+def get_net_eth_values(inputs, positions, netLocalPrimeValue):
+    """Converts each balance row to ETH with buffers and haircuts and sums by account"""
+    currencyId = positions.balanceCurrency
+    netETHValue = np.zeros(len(positions.accounts), dtype=object)
+    if len(currencyId) == 0:
+        return netETHValue
+
+    underlying = convert_to_underlying(
+        _currency_column(inputs, currencyId, "supplyFactor"), netLocalPrimeValue
+    )
+    ethRate = ETHRate(
+        *[
+            np.array([getattr(inputs.currencies[c].ethRate, f) for c in currencyId], dtype=object)
+            for f in ETHRate._fields
+        ]
+    )
+    np.add.at(netETHValue, positions.balanceAccount, convert_to_eth(ethRate, underlying))
+    return netETHValue
+
+
+def get_free_collateral(inputs, positions):
+    """Free collateral for every account in positions, mirrors Views.getFreeCollateral"""
+    (netLocalPrimeValue, reverted) = get_net_local_values(inputs, positions)
+    reverted |= get_invalid_accounts(inputs, positions)
+    netETHValue = get_net_eth_values(inputs, positions, netLocalPrimeValue)
+    return FreeCollateralResult(
+        np.where(reverted, 0, netETHValue), netLocalPrimeValue, reverted
+    )
+
+
+class FreeCollateralEngine:
+    """
+    Incrementally maintains free collateral for a set of accounts. Call update once per block
+    with the accounts whose positions changed since the previous update (i.e. from emitted
+    events). Positions, which make up nearly all of the RPC calls, are only reloaded for those
+    accounts. Accounts are revalued if their positions changed or if they hold a currency whose
+    valuation inputs changed, note that prime rates and oracle rates accrue with the block time
+    so a new block time will generally revalue every account holding fCash or prime debt.
+    """
+
+    def __init__(self, notional, accounts, currencyIds, blockIdentifier="latest"):
+        self.notional = notional
+        self.currencyIds = list(currencyIds)
+        self.inputs = load_valuation_inputs(notional, self.currencyIds, blockIdentifier)
+        records = load_account_records(notional, accounts, blockIdentifier)
+        self._records = {r[0]: r for r in records}
+        self.positions = AccountPositions.from_records(list(self._records.values()))
+        (self.netLocalPrimeValue, self.valuationReverted) = get_net_local_values(
+            self.inputs, self.positions
+        )
+        self.result = self._result()
+
+    def _result(self):
+        netETHValue = get_net_eth_values(self.inputs, self.positions, self.netLocalPrimeValue)
+        reverted = self.valuationReverted | get_invalid_accounts(self.inputs, self.positions)
+        return FreeCollateralResult(
+            np.where(reverted, 0, netETHValue), self.netLocalPrimeValue, reverted
+        )
+
+    def _reload_accounts(self, accounts, blockIdentifier):
+        """Reloads records for accounts and realigns cached values with the new positions"""
+        previous = self.positions
+        bounds = np.searchsorted(previous.balanceAccount, np.arange(1, len(previous.accounts)))
+        cachedRows = dict(zip(previous.accounts, np.split(self.netLocalPrimeValue, bounds)))
+        cachedReverted = dict(zip(previous.accounts, self.valuationReverted))
+
+        for record in load_account_records(self.notional, accounts, blockIdentifier):
+            self._records[record[0]] = record
+            cachedRows.pop(record[0], None)
+
+        self.positions = AccountPositions.from_records(list(self._records.values()))
+        numRows = np.bincount(self.positions.balanceAccount, minlength=len(self._records))
+        self.netLocalPrimeValue = np.concatenate(
+            [np.zeros(0, dtype=object)]
+            + [
+                cachedRows.get(a, np.zeros(n, dtype=object))
+                for (a, n) in zip(self.positions.accounts, numRows)
+            ]
+        )
+        self.valuationReverted = np.array(
+            [cachedReverted.get(a, False) for a in self.positions.accounts], dtype=bool
+        )
+
+    def update(self, blockIdentifier="latest", changedAccounts=()):
+        """
+        Reloads valuation inputs at the block and positions for changedAccounts, returns the
+        list of accounts that were revalued.
+        """
+        previous = self.inputs
+        self.inputs = load_valuation_inputs(self.notional, self.currencyIds, blockIdentifier)
+        changedCurrencies = [
+            c for c in self.currencyIds
+            if previous.valuation_key(c) != self.inputs.valuation_key(c)
+        ]
+
+        changedAccounts = [str(a) for a in changedAccounts]
+        if changedAccounts:
+            self._reload_accounts(changedAccounts, blockIdentifier)
+
+        accountMask = np.array([a in changedAccounts for a in self.positions.accounts], dtype=bool)
+        currencyRows = np.isin(self.positions.balanceCurrency, changedCurrencies)
+        accountMask[self.positions.balanceAccount[currencyRows]] = True
+        accountMask[self.positions.assetAccount[
+            np.isin(self.positions.assetCurrency, changedCurrencies)
+        ]] = True
+
+        if np.any(accountMask):
+            (subset, balanceRows) = self.positions.select(accountMask)
+            (netLocal, reverted) = get_net_local_values(self.inputs, subset)
+            self.netLocalPrimeValue[balanceRows] = netLocal
+            self.valuationReverted[accountMask] = reverted
+
+        self.result = self._result()
+        return [a for (a, m) in zip(self.positions.accounts, accountMask) if m]
+
+    def shock_eth_rates(self, ethRates):
+        """
+        Returns free collateral with the ETH rates of some currencies replaced, i.e. to find
+        accounts that become liquidatable after a price move. Only the conversion to ETH is
+        repeated since ETH rates do not affect net local values.
+        """
+        inputs = self.inputs.with_eth_rates(ethRates)
+        netETHValue = get_net_eth_values(inputs, self.positions, self.netLocalPrimeValue)
+        reverted = self.result.reverted
+        return FreeCollateralResult(
+            np.where(reverted, 0, netETHValue), self.netLocalPrimeValue, reverted
+        )
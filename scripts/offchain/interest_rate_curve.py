@@ -0,0 +1,324 @@
+"""
+Integer exact, vectorized port of the interest rate curve functions in
+contracts/internal/markets/InterestRateCurve.sol.
+
+All functions broadcast over their array arguments, so a rate surface over currencies,
+markets and utilizations can be evaluated in a single call. Values are int64 arrays when
+the inputs are small enough for the arithmetic to be exact in 64 bits and object arrays of
+python ints otherwise. Inputs that would revert on chain raise a ValueError, or when a
+boolean reverts array is passed, are flagged in it and evaluate to zero.
+"""
+from collections import namedtuple
+
+import numpy as np
+from brownie.network import web3
+from eth_utils import keccak
+from scripts.offchain.codec import bytes32_array, int_array
+from scripts.offchain.constants import (
+    FIVE_BASIS_POINTS,
+    INT64_SAFE_OPERAND,
+    MAX_LOWER_INCREMENT,
+    MAX_LOWER_INCREMENT_VALUE,
+    MAX_TRADED_MARKET_INDEX,
+    ONE_HUNDRED_FIFTY_BASIS_POINTS,
+    PERCENTAGE_DECIMALS,
+    RATE_PRECISION,
+    TWENTY_FIVE_BASIS_POINTS,
+)
+
+# LibStorage.StorageId values for the mapping(uint256 => bytes32[2]) curve storage
+ACTIVE_INTEREST_RATE_PARAMETERS_SLOT = 1000000 + 27
+NEXT_INTEREST_RATE_PARAMETERS_SLOT = 1000000 + 28
+# Market index zero in the first storage word holds the prime cash curve
+PRIME_CASH_MARKET_INDEX = 0
+
+KINK_UTILIZATION_1_BYTE = 0
+KINK_UTILIZATION_2_BYTE = 1
+MAX_RATE_BYTE = 2
+KINK_RATE_1_BYTE = 3
+KINK_RATE_2_BYTE = 4
+MIN_FEE_RATE_BYTE = 5
+MAX_FEE_RATE_BYTE = 6
+FEE_RATE_PERCENT_BYTE = 7
+
+# Field order matches InterestRateParameters in contracts/global/Types.sol
+InterestRateParameters = namedtuple(
+    "InterestRateParameters",
+    [
+        "kinkUtilization1",
+        "kinkUtilization2",
+        "kinkRate1",
+        "kinkRate2",
+        "maxRate",
+        "minFeeRate",
+        "maxFeeRate",
+        "feeRatePercent",
+    ],
+)
+
+
+def _require(condition, message, reverts=None):
+    """
+    Raises if the condition fails for any element, unless a reverts mask is given in which case
+    the failing elements are flagged in place so the rest of a batch can still be used
+    """
+    if reverts is None:
+        if not np.all(condition):
+            raise ValueError(message)
+    else:
+        reverts |= ~np.asarray(condition, dtype=bool)
+
+
+def _safe_denominator(denominator, used, reverts=None):
+    """Reverts where a zero denominator is used, otherwise replaces zeros so np.where is safe"""
+    _require(~(used & (denominator == 0)), "Division by zero", reverts)
+    return np.where(denominator == 0, 1, denominator)
+
+
+def _masked(result, reverts):
+    return result if reverts is None else np.where(reverts, 0, result)
+
+
+def get_market_index_offset(marketIndex):
+    """
+    Returns the storage word (0 or 1) and the byte offset of the curve for each market index,
+    market index zero is the prime cash curve.
+    """
+    marketIndex = np.asarray(marketIndex, dtype=np.int64)
+    _require(
+        (0 <= marketIndex) & (marketIndex <= MAX_TRADED_MARKET_INDEX), "Invalid market index"
+    )
+    word = np.where(marketIndex < 4, 0, 1)
+    offset = np.where(marketIndex < 4, marketIndex, marketIndex - 4) * 8
+    return (word, offset)
+
+
+def calculate_max_rate(maxRateByte):
+    maxRateByte = np.asarray(maxRateByte, dtype=np.int64)
+    return np.where(
+        MAX_LOWER_INCREMENT < maxRateByte,
+        MAX_LOWER_INCREMENT_VALUE
+        + (maxRateByte - MAX_LOWER_INCREMENT) * ONE_HUNDRED_FIFTY_BASIS_POINTS,
+        maxRateByte * TWENTY_FIVE_BASIS_POINTS,
+    )
+
+
+def unpack_interest_rate_params(offset, data):
+    """
+    Unpacks interest rate parameters at the byte offset of each bytes32 word in data, where
+    data is an array like of bytes32 values (ints, hex strings or bytes) or a uint8 array with
+    a trailing axis of 32 bytes.
+    """
+    data = np.asarray(data)
+    if not (data.dtype == np.uint8 and data.ndim > 0 and data.shape[-1] == 32):
+        data = bytes32_array(data)
+
+    offset = np.asarray(offset, dtype=np.int64)
+    shape = np.broadcast_shapes(data.shape[:-1], offset.shape)
+    data = np.broadcast_to(data, shape + (32,))
+    offset = np.broadcast_to(offset, shape)
+
+    def byte(b):
+        index = (offset + b)[..., np.newaxis]
+        return np.take_along_axis(data, index, axis=-1)[..., 0].astype(np.int64)
+
+    maxRate = calculate_max_rate(byte(MAX_RATE_BYTE))
+    return InterestRateParameters(
+        kinkUtilization1=byte(KINK_UTILIZATION_1_BYTE) * RATE_PRECISION // PERCENTAGE_DECIMALS,
+        kinkUtilization2=byte(KINK_UTILIZATION_2_BYTE) * RATE_PRECISION // PERCENTAGE_DECIMALS,
+        kinkRate1=byte(KINK_RATE_1_BYTE) * maxRate // 256,
+        kinkRate2=byte(KINK_RATE_2_BYTE) * maxRate // 256,
+        maxRate=maxRate,
+        minFeeRate=byte(MIN_FEE_RATE_BYTE) * FIVE_BASIS_POINTS,
+        maxFeeRate=byte(MAX_FEE_RATE_BYTE) * TWENTY_FIVE_BASIS_POINTS,
+        feeRatePercent=byte(FEE_RATE_PERCENT_BYTE),
+    )
+
+
+def decode_curve_storage(storage, marketIndex):
+    """
+    Decodes curves from the raw bytes32[2] storage of a currency. storage has a trailing axis
+    of two storage words and broadcasts against marketIndex, i.e. an (n, 1, 2) storage array
+    and an (m,) market index array decode into (n, m) parameters.
+    """
+    storage = np.asarray(storage)
+    if not (storage.dtype == np.uint8 and storage.ndim > 1 and storage.shape[-1] == 32):
+        storage = bytes32_array(storage)
+
+    (word, offset) = get_market_index_offset(marketIndex)
+    shape = np.broadcast_shapes(storage.shape[:-2], word.shape)
+    storage = np.broadcast_to(storage, shape + (2, 32))
+    word = np.broadcast_to(word, shape)
+
+    data = np.where((word == 0)[..., np.newaxis], storage[..., 0, :], storage[..., 1, :])
+    return unpack_interest_rate_params(offset, data)
+
+
+def pack_interest_rate_params(settings):
+    """
+    Packs InterestRateCurveSettings (as returned by tests.helpers.get_interest_rate_curve)
+    into the 64 bit value stored for a single curve
+    """
+    (kinkUtilization1, kinkUtilization2, kinkRate1, kinkRate2, maxRateUnits, minFeeRate5BPS,
+        maxFeeRate25BPS, feeRatePercent) = [int(s) for s in settings]
+    _require(kinkUtilization1 < kinkUtilization2, "Invalid kink utilization")
+    _require(kinkUtilization2 <= 100, "Invalid kink utilization")
+    _require(kinkRate1 < kinkRate2, "Invalid kink rate")
+    _require(
+        minFeeRate5BPS * FIVE_BASIS_POINTS <= maxFeeRate25BPS * TWENTY_FIVE_BASIS_POINTS,
+        "Invalid fee rate",
+    )
+    _require(feeRatePercent < 100, "Invalid fee rate percent")
+
+    packed = 0
+    for (b, value) in [
+        (KINK_UTILIZATION_1_BYTE, kinkUtilization1),
+        (KINK_UTILIZATION_2_BYTE, kinkUtilization2),
+        (MAX_RATE_BYTE, maxRateUnits),
+        (KINK_RATE_1_BYTE, kinkRate1),
+        (KINK_RATE_2_BYTE, kinkRate2),
+        (MIN_FEE_RATE_BYTE, minFeeRate5BPS),
+        (MAX_FEE_RATE_BYTE, maxFeeRate25BPS),
+        (FEE_RATE_PERCENT_BYTE, feeRatePercent),
+    ]:
+        packed |= value << (56 - b * 8)
+    return packed
+
+
+def set_interest_rate_params(storage, marketIndex, settings):
+    """Returns a copy of the bytes32[2] storage (as ints) with the curve at marketIndex set"""
+    (word, offset) = get_market_index_offset(marketIndex)
+    (word, offset) = (int(word), int(offset))
+    shift = 192 - offset * 8
+    mask = ((2 ** 64 - 1) << shift) ^ (2 ** 256 - 1)
+    storage = [int(s) for s in storage]
+    storage[word] = (storage[word] & mask) | (pack_interest_rate_params(settings) << shift)
+    return storage
+
+
+def curve_storage_slot(currencyId, active=True):
+    """Storage slot of the first bytes32 word of the curves for a currency"""
+    base = ACTIVE_INTEREST_RATE_PARAMETERS_SLOT if active else NEXT_INTEREST_RATE_PARAMETERS_SLOT
+    key = int(currencyId).to_bytes(32, "big") + base.to_bytes(32, "big")
+    return int.from_bytes(keccak(key), "big")
+
+
+def read_curve_storage(address, currencyIds, active=True, blockIdentifier="latest"):
+    """
+    Reads the raw bytes32[2] curve storage for each currency directly from the storage of the
+    proxy (or any contract using LibStorage), returns a uint8 array of shape (n, 2, 32)
+    """
+    words = []
+    for currencyId in currencyIds:
+        slot = curve_storage_slot(currencyId, active)
+        for i in range(2):
+            word = web3.eth.get_storage_at(address, slot + i, blockIdentifier)
+            words.append(bytes(word).rjust(32, b"\x00"))
+
+    return np.frombuffer(b"".join(words), dtype=np.uint8).reshape((len(currencyIds), 2, 32))
+
+
+def get_fcash_utilization(fCashToAccount, totalfCash, totalCashUnderlying, reverts=None):
+    """(totalfCash - fCashToAccount) / (totalfCash + totalCash) in RATE_PRECISION"""
+    fCashToAccount = np.asarray(fCashToAccount, dtype=object)
+    totalfCash = np.asarray(totalfCash, dtype=object)
+    totalCashUnderlying = np.asarray(totalCashUnderlying, dtype=object)
+    _require(totalfCash >= 0, "Negative total fCash", reverts)
+    _require(totalCashUnderlying >= 0, "Negative total cash", reverts)
+
+    numerator = totalfCash - fCashToAccount
+    _require(numerator >= 0, "Negative utilization", reverts)
+    denominator = totalCashUnderlying + totalfCash
+    denominator = _safe_denominator(denominator, np.ones(denominator.shape, dtype=bool), reverts)
+    return _masked(numerator * RATE_PRECISION // denominator, reverts)
+
+
+def get_interest_rate(irParams, utilization, reverts=None):
+    """Returns the pre fee interest rate at each utilization"""
+    utilization = int_array(utilization, INT64_SAFE_OPERAND)
+    _require(irParams.maxRate > 0, "Interest rate parameters not set", reverts)
+    _require(
+        (0 <= utilization) & (utilization <= RATE_PRECISION), "Utilization above 100%", reverts
+    )
+
+    (ku1, ku2, kr1, kr2, maxRate) = (
+        irParams.kinkUtilization1,
+        irParams.kinkUtilization2,
+        irParams.kinkRate1,
+        irParams.kinkRate2,
+        irParams.maxRate,
+    )
+    first = utilization <= ku1
+    second = ~first & (utilization <= ku2)
+    third = ~(first | second)
+
+    return _masked(
+        np.where(
+            first,
+            utilization * kr1 // _safe_denominator(ku1, first, reverts),
+            np.where(
+                second,
+                (utilization - ku1) * (kr2 - kr1)
+                // _safe_denominator(ku2 - ku1, second, reverts)
+                + kr1,
+                (utilization - ku2) * (maxRate - kr2)
+                // _safe_denominator(RATE_PRECISION - ku2, third, reverts)
+                + kr2,
+            ),
+        ),
+        reverts,
+    )
+
+
+def get_utilization_from_interest_rate(irParams, interestRate, reverts=None):
+    """
+    Inverse of get_interest_rate, interest rates above the max rate return a utilization
+    above 100%
+    """
+    interestRate = int_array(interestRate, INT64_SAFE_OPERAND)
+    _require(irParams.maxRate > 0, "Interest rate parameters not set", reverts)
+    _require(interestRate >= 0, "Negative interest rate", reverts)
+
+    (ku1, ku2, kr1, kr2, maxRate) = (
+        irParams.kinkUtilization1,
+        irParams.kinkUtilization2,
+        irParams.kinkRate1,
+        irParams.kinkRate2,
+        irParams.maxRate,
+    )
+    first = interestRate <= kr1
+    second = ~first & (interestRate <= kr2)
+    third = ~(first | second)
+
+    return _masked(
+        np.where(
+            first,
+            interestRate * ku1 // _safe_denominator(kr1, first, reverts),
+            np.where(
+                second,
+                (interestRate - kr1) * (ku2 - ku1)
+                // _safe_denominator(kr2 - kr1, second, reverts)
+                + ku1,
+                (interestRate - kr2) * (RATE_PRECISION - ku2)
+                // _safe_denominator(maxRate - kr2, third, reverts)
+                + ku2,
+            ),
+        ),
+        reverts,
+    )
+
+
+def get_post_fee_interest_rate(irParams, preFeeInterestRate, isBorrow):
+    """Applies fees to interest rates, borrows increase the rate and lends decrease it"""
+    preFeeInterestRate = int_array(preFeeInterestRate, INT64_SAFE_OPERAND)
+    isBorrow = np.asarray(isBorrow, dtype=bool)
+
+    feeRate = preFeeInterestRate * irParams.feeRatePercent // PERCENTAGE_DECIMALS
+    feeRate = np.where(feeRate < irParams.minFeeRate, irParams.minFeeRate, feeRate)
+    feeRate = np.where(feeRate > irParams.maxFeeRate, irParams.maxFeeRate, feeRate)
+
+    return np.where(
+        isBorrow,
+        preFeeInterestRate + feeRate,
+        np.where(feeRate > preFeeInterestRate, 0, preFeeInterestRate - feeRate),
+    )
@@ -0,0 +1,804 @@
+"""
+Batched liquidation calculator, a bit exact port of the liquidation amount calculations in
+contracts/internal/liquidation/LiquidationHelpers.sol, LiquidateCurrency.sol and
+LiquidatefCash.sol evaluated over many liquidation candidates at once.
+
+Each candidate is an (account, local currency, collateral currency) triple described by one
+element of LiquidationFactors, the columnar equivalent of the struct built by
+FreeCollateral.getLiquidationFactors. Candidates that would revert on chain are flagged in the
+reverts mask and their results are undefined. As on chain, a maximum liquidation amount of zero
+means there is no user specified maximum.
+
+fCash liquidations take (candidate, slot) arrays of maturities sorted descending, trailing slots
+with a maturity of zero are padding and are never visited.
+
+get_liquidation_opportunities derives every candidate from the results of the free collateral
+engine, calculates each liquidation without user specified maximums and ranks them by the
+profit to the liquidator, valued in ETH at oracle prices without haircuts or buffers.
+"""
+from collections import namedtuple
+
+import numpy as np
+from scripts.offchain.asset_handler import get_discount_factor, get_risk_adjusted_discount_factors
+from scripts.offchain.cash_group import calculate_oracle_rate
+from scripts.offchain.constants import DEFAULT_LIQUIDATION_PORTION, PERCENTAGE_DECIMALS
+from scripts.offchain.exchange_rate import ETHRate, convert_eth_to, exchange_rate
+from scripts.offchain.free_collateral import (
+    _currency_column,
+    get_cash_balances,
+    get_ntoken_haircut_values,
+)
+from scripts.offchain.prime_rate import convert_from_underlying, convert_to_underlying
+from scripts.offchain.safe_math import as_int, div, div_in_rate_precision, mul_in_rate_precision
+
+# Matches the LiquidationType enum in contracts/external/liquidators/BaseLiquidator.sol
+LOCAL_CURRENCY = 0
+COLLATERAL_CURRENCY = 1
+LOCAL_FCASH = 2
+CROSS_CURRENCY_FCASH = 3
+COLLATERAL_CURRENCY_BATCH = 4
+
+# The nToken parameters and prime rates of the struct are reduced to the values that are used
+# during liquidation, ETH rates are ETHRate tuples of arrays
+LiquidationFactors = namedtuple(
+    "LiquidationFactors",
+    [
+        "netETHValue",
+        "localPrimeAvailable",
+        "collateralAssetAvailable",
+        "nTokenHaircutPrimeValue",
+        "nTokenLiquidationHaircut",
+        "nTokenPVHaircut",
+        "localETHRate",
+        "collateralETHRate",
+        "localSupplyFactor",
+        "collateralSupplyFactor",
+    ],
+)
+
+LiquidationOpportunities = namedtuple(
+    "LiquidationOpportunities",
+    [
+        "accountIndex",
+        "liquidationType",
+        "localCurrency",
+        "collateralCurrency",
+        "localPrimeCashFromLiquidator",
+        "collateralPrimeCashToLiquidator",
+        "nTokensPurchased",
+        "fCashMaturities",
+        "fCashNotionalTransfers",
+        "profitETH",
+    ],
+)
+
+
+def _where(condition, x, y):
+    return np.where(condition, as_int(x), as_int(y))
+
+
+def _safe_denominator(denominator):
+    return _where(as_int(denominator) == 0, 1, denominator)
+
+
+def _mask(shape, reverts):
+    return np.zeros(shape, dtype=bool) if reverts is None else reverts
+
+
+def calculate_liquidation_amount(liquidateAmountRequired, maxTotalBalance, userSpecifiedMaximum):
+    """
+    Limits the amount required by the total balance available, liquidators may always purchase
+    up to DEFAULT_LIQUIDATION_PORTION of the total balance subject to the user maximum.
+    """
+    (required, maxTotal, userMaximum) = [
+        as_int(v) for v in (liquidateAmountRequired, maxTotalBalance, userSpecifiedMaximum)
+    ]
+    defaultAllowedAmount = div(maxTotal * DEFAULT_LIQUIDATION_PORTION, PERCENTAGE_DECIMALS)
+    result = _where(required > maxTotal, maxTotal, required)
+    result = _where(required < defaultAllowedAmount, defaultAllowedAmount, result)
+    return _where((userMaximum > 0) & (result > userMaximum), userMaximum, result)
+
+
+def calculate_local_liquidation_underlying_required(localPrimeAvailable, netETHValue,
+                                                    localETHRate, reverts=None):
+    """Underlying local currency benefit required to bring free collateral back to zero"""
+    localPrimeAvailable = as_int(localPrimeAvailable)
+    mask = _mask(localPrimeAvailable.shape, reverts)
+    multiple = _where(localPrimeAvailable > 0, localETHRate.haircut, localETHRate.buffer)
+    # Haircut assets with a zero haircut cannot be liquidated
+    mask |= multiple <= 0
+
+    if reverts is None and np.any(mask):
+        raise ValueError("Cannot liquidate haircut asset")
+    return div(
+        convert_eth_to(localETHRate, -as_int(netETHValue)) * PERCENTAGE_DECIMALS,
+        _safe_denominator(multiple),
+    )
+
+
+def calculate_cross_currency_factors(factors):
+    """Returns the free collateral shortfall in collateral prime cash and the discount applied"""
+    collateralDenominatedFC = convert_from_underlying(
+        factors.collateralSupplyFactor,
+        convert_eth_to(factors.collateralETHRate, -as_int(factors.netETHValue)),
+    )
+    liquidationDiscount = np.maximum(
+        as_int(factors.collateralETHRate.liquidationDiscount),
+        as_int(factors.localETHRate.liquidationDiscount),
+    )
+    return (collateralDenominatedFC, liquidationDiscount)
+
+
+def calculate_local_to_purchase(factors, liquidationDiscount, collateralUnderlyingPresentValue,
+                                collateralBalanceToSell, reverts=None):
+    """
+    Returns (collateralBalanceToSell, localPrimeCashFromLiquidator) where the local currency is
+    purchased at the liquidation discount and limited to the local debt outstanding.
+    """
+    collateralBalanceToSell = as_int(collateralBalanceToSell)
+    mask = _mask(collateralBalanceToSell.shape, reverts)
+    rate = exchange_rate(factors.localETHRate, factors.collateralETHRate)
+    liquidationDiscount = as_int(liquidationDiscount)
+    mask |= (rate == 0) | (liquidationDiscount == 0)
+
+    localUnderlyingFromLiquidator = div(
+        div(
+            as_int(collateralUnderlyingPresentValue)
+            * PERCENTAGE_DECIMALS
+            * as_int(factors.localETHRate.rateDecimals),
+            _safe_denominator(rate),
+        ),
+        _safe_denominator(liquidationDiscount),
+    )
+    localAssetFromLiquidator = convert_from_underlying(
+        factors.localSupplyFactor, localUnderlyingFromLiquidator
+    )
+    maxLocalAsset = -as_int(factors.localPrimeAvailable)
+    isLimited = localAssetFromLiquidator > maxLocalAsset
+    mask |= isLimited & (localAssetFromLiquidator == 0)
+
+    if reverts is None and np.any(mask):
+        raise ValueError("Invalid local to purchase")
+    return (
+        _where(
+            isLimited,
+            div(
+                collateralBalanceToSell * maxLocalAsset,
+                _safe_denominator(localAssetFromLiquidator),
+            ),
+            collateralBalanceToSell,
+        ),
+        _where(isLimited, maxLocalAsset, localAssetFromLiquidator),
+    )
+
+
+def calculate_local_currency_liquidation(factors, nTokenBalance, maxNTokenLiquidation=0,
+                                         reverts=None):
+    """
+    Local currency liquidation of nTokens held in the local currency, returns
+    (localPrimeCashFromLiquidator, nTokensPurchased).
+    """
+    localPrimeAvailable = as_int(factors.localPrimeAvailable)
+    mask = _mask(localPrimeAvailable.shape, reverts)
+    mask |= localPrimeAvailable == 0
+    primeBenefitRequired = convert_from_underlying(
+        factors.localSupplyFactor,
+        calculate_local_liquidation_underlying_required(
+            localPrimeAvailable, factors.netETHValue, factors.localETHRate, mask
+        ),
+    )
+
+    nTokenBalance = as_int(nTokenBalance)
+    haircutValue = as_int(factors.nTokenHaircutPrimeValue)
+    liquidationHaircut = as_int(factors.nTokenLiquidationHaircut)
+    pvHaircut = as_int(factors.nTokenPVHaircut)
+    hasNTokens = haircutValue > 0
+    mask |= hasNTokens & (liquidationHaircut <= pvHaircut)
+
+    nTokensToLiquidate = div(
+        primeBenefitRequired * nTokenBalance * pvHaircut,
+        _safe_denominator(haircutValue * (liquidationHaircut - pvHaircut)),
+    )
+    nTokensToLiquidate = calculate_liquidation_amount(
+        nTokensToLiquidate, nTokenBalance, maxNTokenLiquidation
+    )
+    localPrimeCash = div(
+        div(nTokensToLiquidate * liquidationHaircut * haircutValue, _safe_denominator(pvHaircut)),
+        _safe_denominator(nTokenBalance),
+    )
+
+    if reverts is None and np.any(mask):
+        raise ValueError("Invalid local currency liquidation")
+    return (_where(hasNTokens, localPrimeCash, 0), _where(hasNTokens, nTokensToLiquidate, 0))
+
+
+def calculate_collateral_currency_liquidation(factors, cashBalance, nTokenBalance,
+                                              maxCollateralLiquidation=0, maxNTokenLiquidation=0,
+                                              reverts=None):
+    """
+    Collateral currency liquidation, collateral is withdrawn from the cash balance first and
+    then from nTokens. Returns (localPrimeCashFromLiquidator, collateralPrimeCashToLiquidator,
+    nTokensPurchased).
+    """
+    localPrimeAvailable = as_int(factors.localPrimeAvailable)
+    collateralAssetAvailable = as_int(factors.collateralAssetAvailable)
+    mask = _mask(localPrimeAvailable.shape, reverts)
+    mask |= (localPrimeAvailable >= 0) | (collateralAssetAvailable <= 0)
+
+    (collateralDenominatedFC, liquidationDiscount) = calculate_cross_currency_factors(factors)
+    denominator = div(
+        as_int(factors.localETHRate.buffer) * PERCENTAGE_DECIMALS, liquidationDiscount
+    ) - as_int(factors.collateralETHRate.haircut)
+    mask |= denominator <= 0
+    required = div(
+        collateralDenominatedFC * PERCENTAGE_DECIMALS, _safe_denominator(denominator)
+    )
+    required = calculate_liquidation_amount(
+        required, collateralAssetAvailable, maxCollateralLiquidation
+    )
+    (remaining, localPrimeCashFromLiquidator) = calculate_local_to_purchase(
+        factors,
+        liquidationDiscount,
+        convert_to_underlying(factors.collateralSupplyFactor, required),
+        required,
+        mask,
+    )
+
+    cashBalance = as_int(cashBalance)
+    hasCash = cashBalance > 0
+    coversRemaining = cashBalance >= remaining
+    netCashChange = _where(hasCash, _where(coversRemaining, -remaining, -cashBalance), 0)
+    remaining = _where(hasCash, _where(coversRemaining, 0, remaining - cashBalance), remaining)
+
+    nTokenBalance = as_int(nTokenBalance)
+    haircutValue = as_int(factors.nTokenHaircutPrimeValue)
+    liquidationHaircut = as_int(factors.nTokenLiquidationHaircut)
+    pvHaircut = as_int(factors.nTokenPVHaircut)
+    maxNTokenLiquidation = as_int(maxNTokenLiquidation)
+    useNTokens = (remaining > 0) & (haircutValue > 0)
+    mask |= useNTokens & ((liquidationHaircut == 0) | (pvHaircut == 0))
+
+    nTokensToLiquidate = div(
+        remaining * nTokenBalance * pvHaircut,
+        _safe_denominator(haircutValue * liquidationHaircut),
+    )
+    nTokensToLiquidate = _where(
+        (maxNTokenLiquidation > 0) & (nTokensToLiquidate > maxNTokenLiquidation),
+        maxNTokenLiquidation,
+        nTokensToLiquidate,
+    )
+    nTokensToLiquidate = _where(
+        nTokensToLiquidate > nTokenBalance, nTokenBalance, nTokensToLiquidate
+    )
+    nTokensToLiquidate = _where(useNTokens, nTokensToLiquidate, 0)
+    nTokenRemaining = remaining - div(
+        div(nTokensToLiquidate * haircutValue * liquidationHaircut, _safe_denominator(pvHaircut)),
+        _safe_denominator(nTokenBalance),
+    )
+    mask |= useNTokens & (nTokenRemaining < 0)
+    remaining = _where(useNTokens, nTokenRemaining, remaining)
+    netCashChange = _where(remaining > 0, netCashChange - remaining, netCashChange)
+
+    if reverts is None and np.any(mask):
+        raise ValueError("Invalid collateral currency liquidation")
+    return (localPrimeCashFromLiquidator, -netCashChange, nTokensToLiquidate)
+
+
+def get_fcash_liquidation_discount_factors(cashGroup, marketOracleRates, oracleSupplyRate,
+                                           maturity, blockTime, isPositive, reverts=None):
+    """
+    Returns (riskAdjustedDiscountFactor, liquidationDiscountFactor, oracleDiscountFactor) for
+    each maturity in a single cash group. fCash is purchased at the liquidation discount factor,
+    the oracle discount factor is its fair value before haircuts and buffers.
+    """
+    maturity = np.asarray(maturity, dtype=np.int64)
+    isPositive = np.broadcast_to(np.asarray(isPositive, dtype=bool), maturity.shape)
+    mask = _mask(maturity.shape, reverts)
+    (fCashDF, debtDF) = get_risk_adjusted_discount_factors(
+        cashGroup, marketOracleRates, oracleSupplyRate, maturity, blockTime, mask
+    )
+    oracleRate = calculate_oracle_rate(
+        cashGroup, marketOracleRates, oracleSupplyRate, maturity, blockTime, mask
+    )
+    timeToMaturity = np.where(mask, 0, maturity - blockTime)
+
+    buffer = cashGroup.liquidationDebtBuffer
+    liquidationRate = np.where(
+        isPositive,
+        oracleRate + cashGroup.liquidationfCashHaircut,
+        np.where(oracleRate < buffer, 0, oracleRate - buffer),
+    )
+    liquidationDF = get_discount_factor(timeToMaturity, liquidationRate, mask)
+    oracleDF = get_discount_factor(timeToMaturity, oracleRate, mask)
+
+    if reverts is None and np.any(mask):
+        raise ValueError("Invalid discount factor")
+    return (_where(isPositive, fCashDF, debtDF), liquidationDF, oracleDF)
+
+
+def _check_maturities(maturity, column, active, mask):
+    """Maturities must be strictly descending, only checked for slots that are visited"""
+    if column > 0:
+        mask |= active & ~(maturity[:, column - 1] > maturity[:, column])
+
+
+def calculate_fcash_local_liquidation(factors, maturity, notional, maxfCashLiquidateAmounts,
+                                      riskAdjustedDiscountFactor, liquidationDiscountFactor,
+                                      localCashBalance, discountReverts=None, reverts=None):
+    """
+    Local fCash liquidation, arrays of shape (candidate, slot) hold the account's notional and
+    the discount factors at each maturity. localCashBalance is the stored prime cash balance,
+    which must be non negative to liquidate fCash debt, and discountReverts flags slots where
+    the discount factors revert. Returns (fCashNotionalTransfers, localPrimeCashFromLiquidator).
+    """
+    maturity = np.asarray(maturity, dtype=np.int64)
+    (notional, maxAmounts, riskAdjustedDF, liquidationDF) = [
+        as_int(np.broadcast_to(as_int(v), maturity.shape))
+        for v in (notional, maxfCashLiquidateAmounts, riskAdjustedDiscountFactor,
+                  liquidationDiscountFactor)
+    ]
+    discountReverts = np.broadcast_to(
+        np.asarray(False if discountReverts is None else discountReverts, dtype=bool),
+        maturity.shape,
+    )
+    localPrimeAvailable = as_int(factors.localPrimeAvailable)
+    mask = _mask(localPrimeAvailable.shape, reverts)
+    mask |= localPrimeAvailable == 0
+
+    benefitRequired = calculate_local_liquidation_underlying_required(
+        localPrimeAvailable, factors.netETHValue, factors.localETHRate, mask
+    )
+    cashUnderlying = convert_to_underlying(factors.localSupplyFactor, localCashBalance)
+    localUnderlyingFromLiquidator = np.zeros(localPrimeAvailable.shape, dtype=object)
+    transfers = np.zeros(maturity.shape, dtype=object)
+    done = np.zeros(localPrimeAvailable.shape, dtype=bool)
+
+    for i in range(maturity.shape[-1]):
+        active = ~done & (maturity[:, i] != 0)
+        _check_maturities(maturity, i, active, mask)
+        n = notional[:, i]
+        mask |= active & (n < 0) & (cashUnderlying < 0)
+        active &= (n != 0) & ~mask
+        mask |= active & discountReverts[:, i]
+
+        discountDiff = liquidationDF[:, i] - riskAdjustedDF[:, i]
+        mask |= active & (discountDiff == 0)
+        active &= ~mask
+
+        fCashToLiquidate = div_in_rate_precision(
+            benefitRequired, _safe_denominator(np.abs(discountDiff))
+        )
+        fCashToLiquidate = calculate_liquidation_amount(
+            fCashToLiquidate, np.abs(n), maxAmounts[:, i]
+        )
+        value = mul_in_rate_precision(fCashToLiquidate, liquidationDF[:, i])
+
+        # fCash debt is transferred along with cash to cover its liquidation value
+        isLimited = (n < 0) & (value > cashUnderlying)
+        fCashToLiquidate = _where(
+            isLimited,
+            div(fCashToLiquidate * cashUnderlying, _safe_denominator(value)),
+            fCashToLiquidate,
+        )
+        value = _where(isLimited, cashUnderlying, value)
+        fCashToLiquidate = _where(n < 0, -fCashToLiquidate, fCashToLiquidate)
+        value = _where(n < 0, -value, value)
+
+        transfers[:, i] = _where(active, fCashToLiquidate, 0)
+        localUnderlyingFromLiquidator += _where(active, value, 0)
+        cashUnderlying = cashUnderlying + _where(active, value, 0)
+        benefitRequired = benefitRequired - _where(
+            active, np.abs(mul_in_rate_precision(fCashToLiquidate, discountDiff)), 0
+        )
+        done |= active & (benefitRequired <= 0)
+
+    if reverts is None and np.any(mask):
+        raise ValueError("Invalid fCash local liquidation")
+    return (
+        transfers,
+        convert_from_underlying(factors.localSupplyFactor, localUnderlyingFromLiquidator),
+    )
+
+
+def calculate_fcash_cross_currency_liquidation(factors, maturity, notional,
+                                               maxfCashLiquidateAmounts,
+                                               riskAdjustedDiscountFactor,
+                                               liquidationDiscountFactor,
+                                               discountReverts=None, reverts=None):
+    """
+    Cross currency fCash liquidation of positive fCash in the collateral currency, arrays are
+    shaped as in calculate_fcash_local_liquidation. Returns (fCashNotionalTransfers,
+    localPrimeCashFromLiquidator).
+    """
+    maturity = np.asarray(maturity, dtype=np.int64)
+    (notional, maxAmounts, riskAdjustedDF, liquidationDF) = [
+        as_int(np.broadcast_to(as_int(v), maturity.shape))
+        for v in (notional, maxfCashLiquidateAmounts, riskAdjustedDiscountFactor,
+                  liquidationDiscountFactor)
+    ]
+    discountReverts = np.broadcast_to(
+        np.asarray(False if discountReverts is None else discountReverts, dtype=bool),
+        maturity.shape,
+    )
+    localPrimeAvailable = as_int(factors.localPrimeAvailable)
+    collateralAssetAvailable = as_int(factors.collateralAssetAvailable)
+    mask = _mask(localPrimeAvailable.shape, reverts)
+    mask |= (localPrimeAvailable >= 0) | (collateralAssetAvailable <= 0)
+
+    (benefitRequired, liquidationDiscount) = calculate_cross_currency_factors(factors)
+    benefitRequired = convert_to_underlying(factors.collateralSupplyFactor, benefitRequired)
+    termTwoMultiple = div(
+        as_int(factors.localETHRate.buffer) * PERCENTAGE_DECIMALS,
+        _safe_denominator(liquidationDiscount),
+    ) - as_int(factors.collateralETHRate.haircut)
+
+    localPrimeCashFromLiquidator = np.zeros(localPrimeAvailable.shape, dtype=object)
+    transfers = np.zeros(maturity.shape, dtype=object)
+    done = np.zeros(localPrimeAvailable.shape, dtype=bool)
+
+    for i in range(maturity.shape[-1]):
+        active = ~done & (maturity[:, i] != 0)
+        _check_maturities(maturity, i, active, mask)
+        n = notional[:, i]
+        active &= (n != 0) & ~mask
+        mask |= active & ((n < 0) | discountReverts[:, i])
+
+        (raDF, liqDF) = (riskAdjustedDF[:, i], liquidationDF[:, i])
+        benefitDivisor = (liqDF - raDF) + div(liqDF * termTwoMultiple, PERCENTAGE_DECIMALS)
+        mask |= active & (benefitDivisor == 0)
+        active &= ~mask
+
+        fCashToLiquidate = div_in_rate_precision(
+            benefitRequired, _safe_denominator(benefitDivisor)
+        )
+        fCashToLiquidate = calculate_liquidation_amount(fCashToLiquidate, n, maxAmounts[:, i])
+        liquidationPV = mul_in_rate_precision(fCashToLiquidate, liqDF)
+        riskAdjustedPV = mul_in_rate_precision(fCashToLiquidate, raDF)
+
+        # Limits the purchase to the collateral available
+        collateralUnderlyingAvailable = convert_to_underlying(
+            factors.collateralSupplyFactor, collateralAssetAvailable
+        )
+        isLimited = riskAdjustedPV > collateralUnderlyingAvailable
+        mask |= active & isLimited & (raDF == 0)
+        fCashToLiquidate = _where(
+            isLimited,
+            div_in_rate_precision(collateralUnderlyingAvailable, _safe_denominator(raDF)),
+            fCashToLiquidate,
+        )
+        riskAdjustedPV = _where(isLimited, collateralUnderlyingAvailable, riskAdjustedPV)
+        liquidationPV = _where(
+            isLimited, mul_in_rate_precision(fCashToLiquidate, liqDF), liquidationPV
+        )
+        (fCashToLiquidate, localFromLiquidator) = calculate_local_to_purchase(
+            factors._replace(localPrimeAvailable=localPrimeAvailable),
+            liquidationDiscount,
+            liquidationPV,
+            fCashToLiquidate,
+            np.zeros(mask.shape, dtype=bool),
+        )
+        newCollateralAvailable = collateralAssetAvailable - convert_from_underlying(
+            factors.collateralSupplyFactor, riskAdjustedPV
+        )
+        mask |= active & ((newCollateralAvailable < 0) | (localFromLiquidator < 0))
+        active &= ~mask
+
+        transfers[:, i] = _where(active, fCashToLiquidate, 0)
+        collateralAssetAvailable = _where(
+            active, newCollateralAvailable, collateralAssetAvailable
+        )
+        localPrimeAvailable = localPrimeAvailable + _where(active, localFromLiquidator, 0)
+        localPrimeCashFromLiquidator += _where(active, localFromLiquidator, 0)
+        benefitRequired = benefitRequired - _where(
+            active, mul_in_rate_precision(fCashToLiquidate, benefitDivisor), 0
+        )
+        done |= active & (
+            (benefitRequired <= 0) | (collateralAssetAvailable == 0) | (localPrimeAvailable == 0)
+        )
+
+    if reverts is None and np.any(mask):
+        raise ValueError("Invalid fCash cross currency liquidation")
+    return (transfers, localPrimeCashFromLiquidator)
+
+
+def _balance_rows(positions, accountIndex, currencyId):
+    """Balance row of each (account, currency) pair or -1 if the account does not hold it"""
+    rowKey = {
+        (int(a), int(c)): i
+        for (i, (a, c)) in enumerate(zip(positions.balanceAccount, positions.balanceCurrency))
+    }
+    return np.array(
+        [rowKey.get((int(a), int(c)), -1) for (a, c) in zip(accountIndex, currencyId)],
+        dtype=np.int64,
+    )
+
+
+def _eth_rate_column(inputs, currencyId):
+    return ETHRate(
+        *[
+            np.array(
+                [getattr(inputs.currencies[c].ethRate, f) if c else 1 for c in currencyId],
+                dtype=object,
+            )
+            for f in ETHRate._fields
+        ]
+    )
+
+
+def get_liquidation_factors(inputs, positions, result, accountIndex, localCurrency,
+                            collateralCurrency, reverts=None):
+    """
+    Builds LiquidationFactors for each (account, local, collateral) candidate from free
+    collateral results, a collateral currency of zero is used for local currency and local
+    fCash liquidation. Accounts with sufficient collateral revert.
+    """
+    accountIndex = np.asarray(accountIndex, dtype=np.int64)
+    localCurrency = np.asarray(localCurrency, dtype=np.int64)
+    collateralCurrency = np.asarray(collateralCurrency, dtype=np.int64)
+    mask = _mask(accountIndex.shape, reverts)
+    netETHValue = as_int(result.netETHValue)[accountIndex]
+    mask |= result.reverted[accountIndex] | (netETHValue >= 0)
+
+    netLocal = np.append(as_int(result.netLocalPrimeValue), 0)
+    haircutValue = np.append(as_int(get_ntoken_haircut_values(inputs, positions)), 0)
+    localRow = _balance_rows(positions, accountIndex, localCurrency)
+    collateralRow = _balance_rows(positions, accountIndex, collateralCurrency)
+    # The bitmap currency can only be liquidated as the local currency
+    collateralRow[collateralCurrency == positions.bitmapCurrencyId[accountIndex]] = -1
+    nTokenRow = np.where(collateralCurrency == 0, localRow, collateralRow)
+    nTokenCurrency = np.where(collateralCurrency == 0, localCurrency, collateralCurrency)
+
+    return (
+        LiquidationFactors(
+            netETHValue,
+            netLocal[localRow],
+            netLocal[collateralRow],
+            haircutValue[nTokenRow],
+            _currency_column(inputs, nTokenCurrency, "nTokenLiquidationHaircut"),
+            _currency_column(inputs, nTokenCurrency, "nTokenPVHaircut"),
+            _eth_rate_column(inputs, localCurrency),
+            _eth_rate_column(inputs, collateralCurrency),
+            _currency_column(inputs, localCurrency, "supplyFactor"),
+            _supply_factor_column(inputs, collateralCurrency),
+        ),
+        mask,
+    )
+
+
+def _supply_factor_column(inputs, currencyId):
+    return np.array(
+        [inputs.currencies[c].supplyFactor if c else 1 for c in currencyId], dtype=object
+    )
+
+
+def _to_eth(inputs, currencyId, underlying):
+    """Converts underlying amounts to ETH at the oracle rate without haircuts or buffers"""
+    ethRate = _eth_rate_column(inputs, currencyId)
+    return div(as_int(underlying) * ethRate.rate, ethRate.rateDecimals)
+
+
+def _ntoken_value(inputs, currencyId, nTokens):
+    """Prime cash value of nTokens without the present value haircut"""
+    totalSupply = _currency_column(inputs, currencyId, "nTokenTotalSupply")
+    return div(
+        as_int(nTokens) * _currency_column(inputs, currencyId, "nTokenPrimePV"),
+        _safe_denominator(totalSupply),
+    )
+
+
+def _fcash_slots(inputs, positions, accountIndex, currencyId, includeDebt):
+    """
+    Padded (candidate, slot) arrays of an account's fCash in a currency sorted by descending
+    maturity, along with the discount factors at each maturity
+    """
+    assets = {}
+    for (a, c, m, n) in zip(
+        positions.assetAccount, positions.assetCurrency, positions.maturity, positions.notional
+    ):
+        if n != 0:
+            assets.setdefault((int(a), int(c)), []).append((int(m), n))
+
+    slots = [
+        sorted(
+            [(m, n) for (m, n) in assets.get((int(a), int(c)), []) if n > 0 or debt],
+            reverse=True,
+        )
+        for (a, c, debt) in zip(accountIndex, currencyId, includeDebt)
+    ]
+    shape = (len(slots), max([len(s) for s in slots] + [0]))
+    maturity = np.zeros(shape, dtype=np.int64)
+    notional = np.zeros(shape, dtype=object)
+    for (i, s) in enumerate(slots):
+        maturity[i, : len(s)] = [m for (m, _) in s]
+        notional[i, : len(s)] = [n for (_, n) in s]
+
+    (raDF, liqDF, oracleDF) = [np.zeros(shape, dtype=object) for _ in range(3)]
+    discountReverts = np.zeros(shape, dtype=bool)
+    currencyId = np.broadcast_to(np.asarray(currencyId, dtype=np.int64)[:, np.newaxis], shape)
+    for c in np.unique(currencyId[maturity != 0]):
+        slot = (currencyId == c) & (maturity != 0)
+        inputsForCurrency = inputs.currencies[int(c)]
+        if inputsForCurrency.cashGroup is None:
+            discountReverts[slot] = True
+            continue
+        slotReverts = np.zeros(np.count_nonzero(slot), dtype=bool)
+        (raDF[slot], liqDF[slot], oracleDF[slot]) = get_fcash_liquidation_discount_factors(
+            inputsForCurrency.cashGroup,
+            inputsForCurrency.marketOracleRates,
+            inputsForCurrency.oracleSupplyRate,
+            maturity[slot],
+            inputs.blockTime,
+            notional[slot] > 0,
+            slotReverts,
+        )
+        discountReverts[slot] = slotReverts
+
+    return (maturity, notional, raDF, liqDF, oracleDF, discountReverts)
+
+
+def _get_candidates(positions, result):
+    """Enumerates (account, type, local, collateral) candidates for liquidatable accounts"""
+    liquidatable = ~result.reverted & (as_int(result.netETHValue) < 0)
+    netLocal = as_int(result.netLocalPrimeValue)
+    fCashKeys = {
+        (int(a), int(c), bool(n > 0))
+        for (a, c, n) in zip(positions.assetAccount, positions.assetCurrency, positions.notional)
+        if n != 0
+    }
+
+    candidates = []
+    for accountIndex in np.nonzero(liquidatable)[0]:
+        rows = np.nonzero(positions.balanceAccount == accountIndex)[0]
+        bitmapCurrencyId = positions.bitmapCurrencyId[accountIndex]
+        for local in rows:
+            localId = int(positions.balanceCurrency[local])
+            if netLocal[local] != 0:
+                if positions.nTokenBalance[local] > 0:
+                    candidates.append((accountIndex, LOCAL_CURRENCY, localId, 0))
+                if (accountIndex, localId, True) in fCashKeys or (
+                    (accountIndex, localId, False) in fCashKeys
+                ):
+                    candidates.append((accountIndex, LOCAL_FCASH, localId, 0))
+            if netLocal[local] >= 0:
+                continue
+
+            for collateral in rows:
+                collateralId = int(positions.balanceCurrency[collateral])
+                if netLocal[collateral] <= 0 or collateralId == bitmapCurrencyId:
+                    continue
+                candidates.append((accountIndex, COLLATERAL_CURRENCY, localId, collateralId))
+                if (accountIndex, collateralId, True) in fCashKeys:
+                    candidates.append(
+                        (accountIndex, CROSS_CURRENCY_FCASH, localId, collateralId)
+                    )
+
+    columns = list(zip(*candidates)) if candidates else [[], [], [], []]
+    return [np.array(c, dtype=np.int64) for c in columns]
+
+
+def get_liquidation_opportunities(inputs, positions, result):
+    """
+    Calculates every liquidation available for the undercollateralized accounts in a free
+    collateral result (i.e. FreeCollateralEngine inputs, positions and result) and returns
+    the ones that do not revert sorted by descending profitETH. fCash liquidations include
+    every fCash asset the account holds in the currency, fCash debt is only included if the
+    account's cash balance is not negative.
+    """
+    (accountIndex, liquidationType, localCurrency, collateralCurrency) = _get_candidates(
+        positions, result
+    )
+    numCandidates = len(accountIndex)
+    (factors, reverted) = get_liquidation_factors(
+        inputs, positions, result, accountIndex, localCurrency, collateralCurrency
+    )
+    cash = np.append(as_int(get_cash_balances(inputs, positions)), 0)
+    nTokenBalance = np.append(as_int(positions.nTokenBalance), 0)
+
+    localPrimeCash = np.zeros(numCandidates, dtype=object)
+    collateralPrimeCash = np.zeros(numCandidates, dtype=object)
+    nTokens = np.zeros(numCandidates, dtype=object)
+    profitETH = np.zeros(numCandidates, dtype=object)
+    fCashMaturities = np.empty(numCandidates, dtype=object)
+    fCashTransfers = np.empty(numCandidates, dtype=object)
+    fCashMaturities[:] = [()] * numCandidates
+    fCashTransfers[:] = [()] * numCandidates
+
+    def select(rows):
+        return (
+            LiquidationFactors(
+                *[
+                    ETHRate(*[f[rows] for f in v]) if isinstance(v, ETHRate) else v[rows]
+                    for v in factors
+                ]
+            ),
+            reverted[rows],
+        )
+
+    rows = liquidationType == LOCAL_CURRENCY
+    if np.any(rows):
+        (f, mask) = select(rows)
+        localRow = _balance_rows(positions, accountIndex[rows], localCurrency[rows])
+        (localPrimeCash[rows], nTokens[rows]) = calculate_local_currency_liquidation(
+            f, nTokenBalance[localRow], 0, mask
+        )
+        received = _ntoken_value(inputs, localCurrency[rows], nTokens[rows])
+        profitETH[rows] = _to_eth(
+            inputs,
+            localCurrency[rows],
+            convert_to_underlying(f.localSupplyFactor, received - localPrimeCash[rows]),
+        )
+        reverted[rows] = mask
+
+    rows = liquidationType == COLLATERAL_CURRENCY
+    if np.any(rows):
+        (f, mask) = select(rows)
+        collateralRow = _balance_rows(positions, accountIndex[rows], collateralCurrency[rows])
+        (localPrimeCash[rows], collateralPrimeCash[rows], nTokens[rows]) = (
+            calculate_collateral_currency_liquidation(
+                f, cash[collateralRow], nTokenBalance[collateralRow], 0, 0, mask
+            )
+        )
+        received = collateralPrimeCash[rows] + _ntoken_value(
+            inputs, collateralCurrency[rows], nTokens[rows]
+        )
+        profitETH[rows] = _to_eth(
+            inputs,
+            collateralCurrency[rows],
+            convert_to_underlying(f.collateralSupplyFactor, received),
+        ) - _to_eth(
+            inputs,
+            localCurrency[rows],
+            convert_to_underlying(f.localSupplyFactor, localPrimeCash[rows]),
+        )
+        reverted[rows] = mask
+
+    for (fCashType, fCashCurrency) in [
+        (LOCAL_FCASH, localCurrency),
+        (CROSS_CURRENCY_FCASH, collateralCurrency),
+    ]:
+        rows = liquidationType == fCashType
+        if not np.any(rows):
+            continue
+        (f, mask) = select(rows)
+        localRow = _balance_rows(positions, accountIndex[rows], localCurrency[rows])
+        # fCash debt can only be liquidated if the local cash balance is not negative
+        includeDebt = (cash[localRow] >= 0) & (fCashType == LOCAL_FCASH)
+        (maturity, notional, raDF, liqDF, oracleDF, discountReverts) = _fcash_slots(
+            inputs, positions, accountIndex[rows], fCashCurrency[rows], includeDebt
+        )
+        if fCashType == LOCAL_FCASH:
+            (transfers, localPrimeCash[rows]) = calculate_fcash_local_liquidation(
+                f, maturity, notional, 0, raDF, liqDF, cash[localRow], discountReverts, mask
+            )
+        else:
+            (transfers, localPrimeCash[rows]) = calculate_fcash_cross_currency_liquidation(
+                f, maturity, notional, 0, raDF, liqDF, discountReverts, mask
+            )
+
+        receivedUnderlying = mul_in_rate_precision(transfers, oracleDF).sum(axis=-1)
+        profitETH[rows] = _to_eth(inputs, fCashCurrency[rows], receivedUnderlying) - _to_eth(
+            inputs,
+            localCurrency[rows],
+            convert_to_underlying(f.localSupplyFactor, localPrimeCash[rows]),
+        )
+        fCashMaturities[rows] = [
+            tuple(int(m) for (m, t) in zip(ms, ts) if t != 0)
+            for (ms, ts) in zip(maturity, transfers)
+        ]
+        fCashTransfers[rows] = [tuple(t for t in ts if t != 0) for ts in transfers]
+        reverted[rows] = mask
+
+    # Candidates that transfer nothing are not liquidations
+    order = sorted(np.nonzero(~reverted & (localPrimeCash != 0))[0], key=lambda i: -profitETH[i])
+    return LiquidationOpportunities(
+        accountIndex[order],
+        liquidationType[order],
+        localCurrency[order],
+        collateralCurrency[order],
+        localPrimeCash[order],
+        collateralPrimeCash[order],
+        nTokens[order],
+        fCashMaturities[order],
+        fCashTransfers[order],
+        profitETH[order],
+    )
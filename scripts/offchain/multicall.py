@@ -0,0 +1,47 @@
+"""
+Batches view calls against a single block into one Multicall3 eth_call. Networks without
+Multicall3 deployed (i.e. local development chains) fall back to one eth_call per view so
+callers do not need to special case them.
+"""
+import json
+
+from brownie.network import web3
+from brownie.network.contract import Contract
+from web3.exceptions import ContractLogicError
+
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+
+def get_multicall():
+    """Returns the Multicall3 contract or None if it is not deployed on the active network"""
+    if len(web3.eth.get_code(MULTICALL3_ADDRESS)) == 0:
+        return None
+    multicall_abi = json.load(open("abi/Multicall3.json"))
+    return Contract.from_abi("Multicall", MULTICALL3_ADDRESS, multicall_abi)
+
+
+def aggregate(calls, blockIdentifier="latest", multicall=None):
+    """
+    Executes a list of (method, args) view calls at the same block, where method is a brownie
+    contract call such as notional.getNTokenAccount. Returns the decoded output of each call
+    or None for calls that revert, a revert does not fail the rest of the batch.
+    """
+    encoded = [(method._address, method.encode_input(*args)) for (method, args) in calls]
+
+    if multicall is None:
+        results = []
+        for (target, data) in encoded:
+            try:
+                results.append((True, web3.eth.call({"to": target, "data": data}, blockIdentifier)))
+            except (ContractLogicError, ValueError):
+                results.append((False, b""))
+    else:
+        results = multicall.aggregate3.call(
+            [(target, True, data) for (target, data) in encoded],
+            block_identifier=blockIdentifier,
+        )
+
+    return [
+        method.decode_output("0x" + bytes(returnData).hex()) if success else None
+        for ((method, _), (success, returnData)) in zip(calls, results)
+    ]
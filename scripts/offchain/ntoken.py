@@ -0,0 +1,330 @@
+"""
+Batched nToken valuation from contracts/internal/nToken/nTokenCalculations.sol.
+
+The state of every nToken is fetched in a single multicall per block and the oracle and spot
+present values are then calculated vectorized across all currencies and markets. Oracle
+values match nTokenPresentValueAssetDenominated, spot values are the values used alongside
+them when minting nTokens.
+"""
+from collections import namedtuple
+
+import numpy as np
+from brownie.network import web3
+from scripts.offchain.asset_handler import get_discount_factor, get_present_fcash_value
+from scripts.offchain.cash_group import calculate_oracle_rate, from_cash_group_settings
+from scripts.offchain.constants import QUARTER, RATE_PRECISION
+from scripts.offchain.date_time import get_market_maturities, get_reference_time
+from scripts.offchain.multicall import aggregate, get_multicall
+from scripts.offchain.prime_rate import convert_from_underlying, convert_to_underlying
+from scripts.offchain.safe_math import as_int, div
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+NTokenValue = namedtuple(
+    "NTokenValue",
+    [
+        "currencyId",
+        "tokenAddress",
+        "blockTime",
+        "valuationTime",
+        "totalSupply",
+        "cashBalance",
+        "netfCash",
+        "ifCashPrimePV",
+        "oraclePrimePV",
+        "spotPrimePV",
+        "oracleUnderlyingPV",
+        "spotUnderlyingPV",
+        "deviation",
+        "reverted",
+    ],
+)
+
+
+def _sum_by(index, values, size):
+    total = np.zeros(size, dtype=object)
+    np.add.at(total, index, as_int(values))
+    return total
+
+
+def _any_by(index, values, size):
+    result = np.zeros(size, dtype=bool)
+    np.logical_or.at(result, index, values)
+    return result
+
+
+class NTokenSnapshot:
+    """
+    Columnar nToken state at a single block. Market rows hold the liquidity token of each
+    market along with the market state, ifCash rows hold the idiosyncratic fCash residuals.
+    """
+
+    def __init__(self, blockTime, currencies, markets, ifCash):
+        self.blockTime = int(blockTime)
+        for (k, v) in currencies.items():
+            setattr(self, k, v)
+        self.market = markets
+        self.ifCash = ifCash
+
+    @property
+    def size(self):
+        return len(self.currencyId)
+
+
+def get_valuation_time(blockTime, lastInitializedTime):
+    """
+    Once the first market has matured nTokens are valued one second before the next settle
+    time until markets are initialized again, as in getNTokenPrimePV
+    """
+    if lastInitializedTime == 0:
+        return blockTime
+    nextSettleTime = int(get_reference_time(lastInitializedTime)) + QUARTER
+    return nextSettleTime - 1 if nextSettleTime <= blockTime else blockTime
+
+
+def _calls(notional, currencyId, tokenAddress, blockTime):
+    return [
+        (notional.getNTokenAccount, [tokenAddress]),
+        (notional.getNTokenPortfolio, [tokenAddress]),
+        (notional.getPrimeFactors, [currencyId, blockTime]),
+        (notional.getCashGroup, [currencyId]),
+        (notional.getActiveMarketsAtBlockTime, [currencyId, blockTime]),
+    ]
+
+
+def load_ntoken_addresses(notional, currencyIds=None, blockIdentifier="latest", multicall=None):
+    """Returns the nToken address of each currency, currencies without an nToken are skipped"""
+    if currencyIds is None:
+        maxCurrencyId = notional.getMaxCurrencyId(block_identifier=blockIdentifier)
+        currencyIds = range(1, maxCurrencyId + 1)
+
+    currencyIds = list(currencyIds)
+    addresses = aggregate(
+        [(notional.nTokenAddress, [c]) for c in currencyIds], blockIdentifier, multicall
+    )
+    return {c: a for (c, a) in zip(currencyIds, addresses) if a not in (None, ZERO_ADDRESS)}
+
+
+def load_ntoken_snapshot(notional, nTokenAddresses, blockIdentifier="latest", multicall=None):
+    """
+    Loads the nToken state for each currency in nTokenAddresses (as returned by
+    load_ntoken_addresses) in a single multicall. Currencies waiting on market initialization
+    are valued at an earlier time, their markets are reloaded in a second multicall.
+    """
+    blockTime = web3.eth.get_block(blockIdentifier)["timestamp"]
+    currencyIds = list(nTokenAddresses)
+    calls = []
+    for c in currencyIds:
+        calls.extend(_calls(notional, c, nTokenAddresses[c], blockTime))
+    results = aggregate(calls, blockIdentifier, multicall)
+    stride = len(calls) // len(currencyIds) if currencyIds else 0
+    results = [results[i * stride : (i + 1) * stride] for i in range(len(currencyIds))]
+
+    valuationTime = [
+        get_valuation_time(blockTime, r[0][3]) if r[0] is not None else blockTime
+        for r in results
+    ]
+    stale = [i for (i, t) in enumerate(valuationTime) if t != blockTime]
+    if stale:
+        reloaded = aggregate(
+            [
+                (notional.getActiveMarketsAtBlockTime, [currencyIds[i], valuationTime[i]])
+                for i in stale
+            ],
+            blockIdentifier,
+            multicall,
+        )
+        for (i, markets) in zip(stale, reloaded):
+            results[i][4] = markets
+
+    return _build_snapshot(blockTime, currencyIds, nTokenAddresses, valuationTime, results)
+
+
+def _build_snapshot(blockTime, currencyIds, nTokenAddresses, valuationTime, results):
+    currencies = {k: [] for k in ["currencyId", "tokenAddress", "valuationTime", "totalSupply",
+                                  "cashBalance", "supplyFactor", "oracleSupplyRate",
+                                  "cashGroup", "marketOracleRates", "reverted"]}
+    markets = {k: [] for k in ["row", "maturity", "tokens", "totalfCash", "totalPrimeCash",
+                               "totalLiquidity", "oracleRate", "lastImpliedRate", "ifCash"]}
+    ifCash = {k: [] for k in ["row", "maturity", "notional"]}
+
+    for (row, (c, r)) in enumerate(zip(currencyIds, results)):
+        (account, portfolio, primeFactors, cashGroupSettings, activeMarkets) = r
+        reverted = any(v is None for v in r)
+        cashGroup = None if reverted else from_cash_group_settings(c, cashGroupSettings)
+        currencies["currencyId"].append(c)
+        currencies["tokenAddress"].append(nTokenAddresses[c])
+        currencies["valuationTime"].append(valuationTime[row])
+        currencies["totalSupply"].append(0 if reverted else account[1])
+        currencies["cashBalance"].append(0 if reverted else account[5])
+        currencies["supplyFactor"].append(1 if reverted else primeFactors[0][0])
+        currencies["oracleSupplyRate"].append(0 if reverted else primeFactors[0][2])
+        currencies["cashGroup"].append(cashGroup)
+        currencies["marketOracleRates"].append([] if reverted else [m[6] for m in activeMarkets])
+        currencies["reverted"].append(reverted)
+        if reverted:
+            continue
+
+        (liquidityTokens, bitmapAssets) = portfolio
+        bitmap = {int(a[1]): int(a[3]) for a in bitmapAssets}
+        for (i, token) in enumerate(liquidityTokens):
+            market = activeMarkets[i]
+            markets["row"].append(row)
+            markets["maturity"].append(token[1])
+            markets["tokens"].append(token[3])
+            markets["totalfCash"].append(market[2])
+            markets["totalPrimeCash"].append(market[3])
+            markets["totalLiquidity"].append(market[4])
+            markets["lastImpliedRate"].append(market[5])
+            markets["oracleRate"].append(market[6])
+            markets["ifCash"].append(bitmap.get(int(token[1]), 0))
+
+        # Residuals are the bitmap assets that do not fall on an active market, there are
+        # none by construction with two or fewer markets
+        if cashGroup.maxMarketIndex <= 2:
+            continue
+        marketMaturities = set(
+            get_market_maturities(cashGroup.maxMarketIndex, valuationTime[row]).tolist()
+        )
+        for (maturity, notional) in bitmap.items():
+            if maturity not in marketMaturities and notional != 0:
+                ifCash["row"].append(row)
+                ifCash["maturity"].append(maturity)
+                ifCash["notional"].append(notional)
+
+    currencies["valuationTime"] = np.array(currencies["valuationTime"], dtype=np.int64)
+    currencies["reverted"] = np.array(currencies["reverted"], dtype=bool)
+    for k in ["totalSupply", "cashBalance", "supplyFactor", "oracleSupplyRate"]:
+        currencies[k] = as_int(currencies[k])
+    markets = {k: as_int(v) if k != "row" else np.array(v, dtype=np.int64)
+               for (k, v) in markets.items()}
+    ifCash = {k: as_int(v) if k != "row" else np.array(v, dtype=np.int64)
+              for (k, v) in ifCash.items()}
+    return NTokenSnapshot(blockTime, currencies, markets, ifCash)
+
+
+def get_market_values(snapshot, useOracleRate, reverts):
+    """
+    Returns the prime cash value of each market row, which is the prime cash claim plus the
+    present value of the net fCash (fCash claim plus bitmap fCash) at the market maturity
+    """
+    m = snapshot.market
+    row = m["row"]
+    totalLiquidity = np.where(m["totalLiquidity"] == 0, 1, m["totalLiquidity"])
+    reverts |= (m["totalLiquidity"] == 0) | (m["tokens"] < 0)
+    primeCashClaim = div(m["totalPrimeCash"] * m["tokens"], totalLiquidity)
+    netfCash = div(m["totalfCash"] * m["tokens"], totalLiquidity) + m["ifCash"]
+
+    # Zero fCash is not discounted so it cannot revert
+    valuationTime = snapshot.valuationTime[row]
+    reverts |= (m["maturity"] < valuationTime) & (netfCash != 0)
+    timeToMaturity = np.where(reverts, 0, m["maturity"] - valuationTime)
+    rate = m["oracleRate"] if useOracleRate else m["lastImpliedRate"]
+    discountFactor = get_discount_factor(timeToMaturity, rate, reverts)
+    pv = get_present_fcash_value(netfCash, discountFactor, reverts)
+    return (primeCashClaim + convert_from_underlying(snapshot.supplyFactor[row], pv), netfCash)
+
+
+def get_ifcash_underlying_pv(snapshot, reverts):
+    """Present value of each ifCash row at its interpolated oracle rate"""
+    f = snapshot.ifCash
+    oracleRate = np.zeros(len(f["row"]), dtype=np.int64)
+    for row in np.unique(f["row"]):
+        rows = f["row"] == row
+        rowReverts = np.zeros(np.count_nonzero(rows), dtype=bool)
+        notMatured = f["maturity"][rows] > snapshot.valuationTime[row]
+        oracleRate[rows] = calculate_oracle_rate(
+            snapshot.cashGroup[row],
+            snapshot.marketOracleRates[row],
+            snapshot.oracleSupplyRate[row],
+            np.where(notMatured, f["maturity"][rows], snapshot.valuationTime[row] + 1),
+            int(snapshot.valuationTime[row]),
+            rowReverts,
+        )
+        reverts[rows] |= rowReverts & notMatured
+
+    # Matured residuals are valued at their notional
+    valuationTime = snapshot.valuationTime[f["row"]]
+    matured = f["maturity"] <= valuationTime
+    timeToMaturity = np.where(matured | reverts, 0, f["maturity"] - valuationTime)
+    discountFactor = get_discount_factor(timeToMaturity, oracleRate, reverts)
+    pv = get_present_fcash_value(f["notional"], discountFactor, reverts)
+    return np.where(matured, f["notional"], pv)
+
+
+def get_ntoken_values(snapshot):
+    """Returns an NTokenValue record for each currency in the snapshot"""
+    n = snapshot.size
+    marketReverts = np.zeros(len(snapshot.market["row"]), dtype=bool)
+    (oracleValue, netfCash) = get_market_values(snapshot, True, marketReverts)
+    (spotValue, _) = get_market_values(snapshot, False, marketReverts)
+    ifCashReverts = np.zeros(len(snapshot.ifCash["row"]), dtype=bool)
+    ifCashPV = get_ifcash_underlying_pv(snapshot, ifCashReverts)
+
+    reverted = (
+        snapshot.reverted
+        | _any_by(snapshot.market["row"], marketReverts, n)
+        | _any_by(snapshot.ifCash["row"], ifCashReverts, n)
+    )
+    # Residual present value is summed in underlying and then converted once
+    ifCashPrimePV = convert_from_underlying(
+        snapshot.supplyFactor, _sum_by(snapshot.ifCash["row"], ifCashPV, n)
+    )
+    oraclePrimePV = (
+        _sum_by(snapshot.market["row"], oracleValue, n) + ifCashPrimePV + snapshot.cashBalance
+    )
+    spotPrimePV = (
+        _sum_by(snapshot.market["row"], spotValue, n) + ifCashPrimePV + snapshot.cashBalance
+    )
+    deviation = div(
+        np.abs(oraclePrimePV - spotPrimePV) * RATE_PRECISION,
+        np.where(oraclePrimePV == 0, 1, oraclePrimePV),
+    )
+
+    records = []
+    for i in range(n):
+        rows = snapshot.market["row"] == i
+        records.append(
+            NTokenValue(
+                currencyId=snapshot.currencyId[i],
+                tokenAddress=snapshot.tokenAddress[i],
+                blockTime=snapshot.blockTime,
+                valuationTime=int(snapshot.valuationTime[i]),
+                totalSupply=snapshot.totalSupply[i],
+                cashBalance=snapshot.cashBalance[i],
+                netfCash=list(netfCash[rows]),
+                ifCashPrimePV=ifCashPrimePV[i],
+                oraclePrimePV=oraclePrimePV[i],
+                spotPrimePV=spotPrimePV[i],
+                oracleUnderlyingPV=convert_to_underlying(
+                    snapshot.supplyFactor[i], oraclePrimePV[i]
+                ).item(),
+                spotUnderlyingPV=convert_to_underlying(
+                    snapshot.supplyFactor[i], spotPrimePV[i]
+                ).item(),
+                deviation=deviation[i],
+                reverted=bool(reverted[i]),
+            )
+        )
+    return records
+
+
+class NTokenValuationEngine:
+    """
+    Values every nToken on each poll with a single multicall. nToken addresses never change
+    once listed so they are loaded once on construction.
+    """
+
+    def __init__(self, notional, currencyIds=None, blockIdentifier="latest"):
+        self.notional = notional
+        self.multicall = get_multicall()
+        self.nTokenAddresses = load_ntoken_addresses(
+            notional, currencyIds, blockIdentifier, self.multicall
+        )
+
+    def value(self, blockIdentifier="latest"):
+        """Returns NTokenValue records keyed by currency id"""
+        snapshot = load_ntoken_snapshot(
+            self.notional, self.nTokenAddresses, blockIdentifier, self.multicall
+        )
+        return {v.currencyId: v for v in get_ntoken_values(snapshot)}
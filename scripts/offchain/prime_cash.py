@@ -0,0 +1,313 @@
+"""
+Vectorized prime cash accrual from contracts/internal/pCash/PrimeCashExchangeRate.sol.
+
+Accrual is a pure function of the stored PrimeCashFactors, the prime cash interest rate curve
+and the value reported by the holdings oracle, so a seed loaded once from chain can be projected
+over any grid of future block times and scenarios. All arguments broadcast, i.e. a (t,) time
+grid against (s, 1) prime debt scenarios projects an (s, t) surface in a single call. Values
+are object arrays of python ints so the scalar arithmetic is exact.
+"""
+from collections import namedtuple
+
+import numpy as np
+from brownie import interface
+from scripts.offchain.constants import RATE_PRECISION, SCALAR_PRECISION, YEAR
+from scripts.offchain.interest_rate_curve import (
+    PRIME_CASH_MARKET_INDEX,
+    decode_curve_storage,
+    get_interest_rate,
+    get_post_fee_interest_rate,
+    read_curve_storage,
+)
+from scripts.offchain.prime_rate import convert_debt_storage_to_underlying, convert_to_underlying
+from scripts.offchain.safe_math import as_int, mul_in_rate_precision
+
+# Field order matches the PrimeCashFactors struct returned by getPrimeFactorsStored
+PrimeCashFactors = namedtuple(
+    "PrimeCashFactors",
+    [
+        "lastAccrueTime",
+        "totalPrimeSupply",
+        "totalPrimeDebt",
+        "oracleSupplyRate",
+        "lastTotalUnderlyingValue",
+        "underlyingScalar",
+        "supplyScalar",
+        "debtScalar",
+        "rateOracleTimeWindow",
+    ],
+)
+
+PrimeRate = namedtuple("PrimeRate", ["supplyFactor", "debtFactor", "oracleSupplyRate"])
+
+# Prime cash curve, stored factors and the holdings oracle value of a currency at a block
+PrimeCashSeed = namedtuple(
+    "PrimeCashSeed", ["currencyId", "irParams", "factors", "underlyingValue"]
+)
+
+PrimeCashProjection = namedtuple(
+    "PrimeCashProjection",
+    [
+        "blockTime",
+        "factors",
+        "supplyFactor",
+        "debtFactor",
+        "primeSupplyToReserve",
+        "underlyingToReserve",
+        "totalUnderlyingSupply",
+        "totalUnderlyingDebt",
+        "reverted",
+    ],
+)
+
+
+def as_factors(factors, shape=()):
+    """Returns factors as object arrays broadcast to shape"""
+    return PrimeCashFactors(*[np.broadcast_to(as_int(f), shape).copy() for f in factors])
+
+
+def _where(condition, x, y):
+    """np.where that keeps python ints, operations on 0-d object arrays return scalars"""
+    return np.where(condition, as_int(x), as_int(y))
+
+
+def _safe_denominator(denominator):
+    return _where(as_int(denominator) == 0, 1, denominator)
+
+
+def get_utilization(factors):
+    """
+    Prime debt utilization in RATE_PRECISION, the underlying scalar cancels out so this is
+    (totalPrimeDebt * debtScalar) / (totalPrimeSupply * supplyScalar)
+    """
+    supply = as_int(factors.totalPrimeSupply) * as_int(factors.supplyScalar)
+    debt = as_int(factors.totalPrimeDebt) * as_int(factors.debtScalar)
+    return _where(supply > 0, debt * RATE_PRECISION // _safe_denominator(supply), 0)
+
+
+def get_prime_debt_at_utilization(factors, utilization):
+    """
+    Inverse of get_utilization, returns the total prime debt that sets the given utilization
+    on the factors. Used to build utilization scenarios from a seed.
+    """
+    supply = as_int(factors.totalPrimeSupply) * as_int(factors.supplyScalar)
+    return as_int(utilization) * supply // (as_int(factors.debtScalar) * RATE_PRECISION)
+
+
+def get_prime_interest_rates(irParams, factors, reverts=None):
+    """Returns the annual debt rate pre fee, the debt rate post fee and the supply rate"""
+    utilization = get_utilization(factors)
+    annualDebtRatePreFee = as_int(get_interest_rate(irParams, utilization, reverts))
+    # A zero utilization has a zero debt rate, applying the fee would accrue the debt scalar
+    annualDebtRatePostFee = _where(
+        utilization > 0,
+        as_int(get_post_fee_interest_rate(irParams, annualDebtRatePreFee, True)),
+        0,
+    )
+    annualSupplyRate = _where(
+        as_int(factors.totalPrimeSupply) > 0,
+        mul_in_rate_precision(annualDebtRatePreFee, utilization),
+        0,
+    )
+    return (annualDebtRatePreFee, annualDebtRatePostFee, annualSupplyRate)
+
+
+def _accrue_scalar(scalar, annualRate, scaledTime):
+    return scalar * (SCALAR_PRECISION + as_int(annualRate) * scaledTime // YEAR) // SCALAR_PRECISION
+
+
+def get_scalar_increase(irParams, factors, blockTime, reverts=None):
+    """
+    Returns the debt scalar with fees, the new supply scalar, the prime supply paid to the reserve
+    from the difference between the pre and post fee debt rates and the annual supply rate
+    """
+    shape = np.broadcast_shapes(np.shape(get_utilization(factors)), np.shape(blockTime))
+    mask = np.zeros(shape, dtype=bool) if reverts is None else reverts
+    (preFee, postFee, annualSupplyRate) = get_prime_interest_rates(irParams, factors, mask)
+
+    elapsed = as_int(blockTime) - as_int(factors.lastAccrueTime)
+    mask |= elapsed < 0
+    scaledTime = RATE_PRECISION * _where(elapsed < 0, 0, elapsed)
+
+    debtScalar = as_int(factors.debtScalar)
+    debtScalarWithFee = _accrue_scalar(debtScalar, postFee, scaledTime)
+    newSupplyScalar = _accrue_scalar(as_int(factors.supplyScalar), annualSupplyRate, scaledTime)
+    debtScalarNoFee = _accrue_scalar(debtScalar, preFee, scaledTime)
+
+    primeSupplyToReserve = _where(
+        preFee == postFee,
+        0,
+        as_int(factors.totalPrimeDebt)
+        * (debtScalarWithFee - debtScalarNoFee)
+        // _safe_denominator(newSupplyScalar),
+    )
+
+    if reverts is None and np.any(mask):
+        raise ValueError("Invalid prime cash accrual")
+    return (debtScalarWithFee, newSupplyScalar, primeSupplyToReserve, annualSupplyRate)
+
+
+def update_prime_cash_scalars(irParams, factors, currentUnderlyingValue, blockTime, reverts=None):
+    """
+    Accrues the factors to the block time, returns the new factors and the prime supply paid
+    to the reserve. Reverts where the block time decreases or the underlying value falls.
+    """
+    shape = np.broadcast_shapes(
+        np.shape(get_utilization(factors)),
+        np.shape(currentUnderlyingValue),
+        np.shape(blockTime),
+    )
+    mask = np.zeros(shape, dtype=bool) if reverts is None else reverts
+    factors = as_factors(factors, shape)
+    (debtScalar, supplyScalar, primeSupplyToReserve, _) = get_scalar_increase(
+        irParams, factors, blockTime, mask
+    )
+
+    # Interest earned on external money markets accrues to the underlying scalar
+    current = np.broadcast_to(as_int(currentUnderlyingValue), shape)
+    last = factors.lastTotalUnderlyingValue
+    mask |= (last > 0) & (current < last)
+    underlyingInterestRate = _where(
+        last > 0, (current - last) * SCALAR_PRECISION // _safe_denominator(last), 0
+    )
+    underlyingScalar = (
+        factors.underlyingScalar * (SCALAR_PRECISION + underlyingInterestRate) // SCALAR_PRECISION
+    )
+
+    if reverts is None and np.any(mask):
+        raise ValueError("Invalid prime cash accrual")
+    accrued = factors._replace(
+        lastAccrueTime=np.broadcast_to(as_int(blockTime), shape).copy(),
+        totalPrimeSupply=factors.totalPrimeSupply + primeSupplyToReserve,
+        lastTotalUnderlyingValue=current.copy(),
+        underlyingScalar=underlyingScalar,
+        supplyScalar=supplyScalar,
+        debtScalar=debtScalar,
+    )
+    return (accrued, primeSupplyToReserve)
+
+
+def _accrue_view(irParams, factors, currentUnderlyingValue, blockTime, reverts):
+    """Only accrues where the block time has increased, same block times return the factors"""
+    factors = as_factors(factors, reverts.shape)
+    stale = np.broadcast_to(as_int(blockTime), reverts.shape) == factors.lastAccrueTime
+    accrueReverts = np.zeros(reverts.shape, dtype=bool)
+    (accrued, primeSupplyToReserve) = update_prime_cash_scalars(
+        irParams, factors, currentUnderlyingValue, blockTime, accrueReverts
+    )
+    # Nothing is calculated on chain for stale factors so they cannot revert
+    reverts |= accrueReverts & ~stale
+    accrued = PrimeCashFactors(*[_where(stale, f, a) for (f, a) in zip(factors, accrued)])
+    return (accrued, _where(stale, 0, primeSupplyToReserve))
+
+
+def get_prime_rate(factors):
+    return PrimeRate(
+        as_int(factors.supplyScalar) * as_int(factors.underlyingScalar),
+        as_int(factors.debtScalar) * as_int(factors.underlyingScalar),
+        as_int(factors.oracleSupplyRate),
+    )
+
+
+def get_prime_cash_rate_view(irParams, factors, currentUnderlyingValue, blockTime, reverts=None):
+    """Returns the prime rate and factors at the block time as getPrimeCashRateView"""
+    shape = np.broadcast_shapes(
+        np.shape(get_utilization(factors)),
+        np.shape(currentUnderlyingValue),
+        np.shape(blockTime),
+    )
+    mask = np.zeros(shape, dtype=bool) if reverts is None else reverts
+    (accrued, _) = _accrue_view(irParams, factors, currentUnderlyingValue, blockTime, mask)
+
+    if reverts is None and np.any(mask):
+        raise ValueError("Invalid prime cash accrual")
+    return (get_prime_rate(accrued), accrued)
+
+
+def _project(factors, rate, primeSupplyToReserve, blockTime, reverted):
+    return PrimeCashProjection(
+        blockTime=blockTime,
+        factors=factors,
+        supplyFactor=rate.supplyFactor,
+        debtFactor=rate.debtFactor,
+        primeSupplyToReserve=primeSupplyToReserve,
+        underlyingToReserve=convert_to_underlying(rate.supplyFactor, primeSupplyToReserve),
+        totalUnderlyingSupply=convert_to_underlying(rate.supplyFactor, factors.totalPrimeSupply),
+        totalUnderlyingDebt=-convert_debt_storage_to_underlying(
+            rate.debtFactor, -factors.totalPrimeDebt
+        ),
+        reverted=reverted,
+    )
+
+
+def project_prime_cash(seed, blockTime, totalPrimeDebt=None, underlyingValue=None,
+                       compound=False):
+    """
+    Projects prime cash factors, reserve fees and total underlying supply and debt from a seed
+    over a grid of block times. totalPrimeDebt and underlyingValue are optional scenario arrays
+    that broadcast against blockTime, they default to the seed's stored prime debt and holdings
+    oracle value.
+
+    By default every point accrues from the seed in a single step, which is the view of an
+    account reading the rate at that time if no transaction touches the currency in between.
+    When compound is set, the last axis of blockTime is an ascending time grid and each point
+    accrues from the previous one, as if the currency were touched at every point. Prime debt
+    then stays fixed in prime terms and reserve fees accumulate along the grid.
+    """
+    factors = seed.factors
+    if totalPrimeDebt is not None:
+        factors = factors._replace(totalPrimeDebt=as_int(totalPrimeDebt))
+    underlyingValue = as_int(seed.underlyingValue if underlyingValue is None else underlyingValue)
+    blockTime = as_int(blockTime)
+    shape = np.broadcast_shapes(
+        np.shape(factors.totalPrimeDebt), underlyingValue.shape, blockTime.shape
+    )
+    blockTime = np.broadcast_to(blockTime, shape)
+    reverted = np.zeros(shape, dtype=bool)
+
+    if not compound:
+        (accrued, toReserve) = _accrue_view(
+            seed.irParams, factors, underlyingValue, blockTime, reverted
+        )
+        return _project(accrued, get_prime_rate(accrued), toReserve, blockTime, reverted)
+
+    # Each step is vectorized across scenarios, the loop only runs over the time grid
+    underlyingValue = np.broadcast_to(underlyingValue, shape)
+    step = PrimeCashFactors(*[f[..., 0] for f in as_factors(factors, shape)])
+    columns = {k: np.empty(shape, dtype=object) for k in PrimeCashFactors._fields}
+    toReserve = np.empty(shape, dtype=object)
+    cumulative = np.zeros(shape[:-1], dtype=object)
+    for i in range(shape[-1]):
+        stepReverts = np.zeros(shape[:-1], dtype=bool)
+        (step, increase) = _accrue_view(
+            seed.irParams, step, underlyingValue[..., i], blockTime[..., i], stepReverts
+        )
+        cumulative = cumulative + increase
+        for (k, v) in zip(PrimeCashFactors._fields, step):
+            columns[k][..., i] = v
+        toReserve[..., i] = cumulative
+        reverted[..., i] = stepReverts
+
+    # Once a step reverts the remaining path is invalid
+    reverted = np.logical_or.accumulate(reverted, axis=-1)
+    accrued = PrimeCashFactors(**columns)
+    return _project(accrued, get_prime_rate(accrued), toReserve, blockTime, reverted)
+
+
+def read_prime_cash_curve(address, currencyId, blockIdentifier="latest"):
+    """Reads the prime cash curve from the active interest rate storage of a LibStorage contract"""
+    storage = read_curve_storage(address, [currencyId], True, blockIdentifier)
+    return decode_curve_storage(storage[0], PRIME_CASH_MARKET_INDEX)
+
+
+def load_prime_cash_seed(notional, currencyId, blockIdentifier="latest"):
+    """Loads the stored prime cash factors, curve and holdings oracle value for a currency"""
+    call = {"block_identifier": blockIdentifier}
+    factors = as_factors(notional.getPrimeFactorsStored(currencyId, **call))
+    oracle = interface.IPrimeCashHoldingsOracle(
+        notional.getPrimeCashHoldingsOracle(currencyId, **call)
+    )
+    (_, underlyingValue) = oracle.getTotalUnderlyingValueView(**call)
+
+    irParams = read_prime_cash_curve(notional.address, currencyId, blockIdentifier)
+    return PrimeCashSeed(currencyId, irParams, factors, int(underlyingValue))
@@ -0,0 +1,48 @@
+"""Prime cash conversions mirroring contracts/internal/pCash/PrimeRateLib.sol"""
+import numpy as np
+from scripts.offchain.constants import DOUBLE_SCALAR_PRECISION
+from scripts.offchain.safe_math import as_int, div
+
+
+def convert_to_underlying(supplyFactor, primeCashBalance):
+    primeCashBalance = as_int(primeCashBalance)
+    result = div(primeCashBalance * as_int(supplyFactor), DOUBLE_SCALAR_PRECISION)
+    return np.where(primeCashBalance < 0, np.minimum(result, -1), result)
+
+
+def convert_from_underlying(supplyFactor, underlyingBalance):
+    underlyingBalance = as_int(underlyingBalance)
+    result = div(underlyingBalance * DOUBLE_SCALAR_PRECISION, supplyFactor)
+    return np.where(underlyingBalance < 0, np.minimum(result, -1), result)
+
+
+def convert_debt_storage_to_underlying(debtFactor, debtStorage):
+    debtStorage = as_int(debtStorage)
+    if np.any(debtStorage > 0):
+        raise ValueError("Debt storage must be negative")
+    result = div(debtStorage * as_int(debtFactor), DOUBLE_SCALAR_PRECISION) - 1
+    return np.where(debtStorage == 0, 0, result)
+
+
+def convert_underlying_to_debt_storage(debtFactor, underlying):
+    underlying = as_int(underlying)
+    dust = (0 <= underlying) & (underlying < 10)
+    if np.any(~dust & (underlying >= 0)):
+        raise ValueError("Underlying debt must be negative")
+    result = div(underlying * DOUBLE_SCALAR_PRECISION, debtFactor) - 1
+    return np.where(dust, 0, result)
+
+
+def convert_settled_fcash(presentSupplyFactor, presentDebtFactor, settledSupplyFactor,
+                          settledDebtFactor, fCashBalance):
+    """
+    Signed prime supply value of fCash that settled at the settled prime rate, debts accrue
+    prime debt interest from settlement up to the present prime rate.
+    """
+    signedPrimeSupplyValue = convert_from_underlying(settledSupplyFactor, fCashBalance)
+    debtValue = div(
+        div(signedPrimeSupplyValue * as_int(settledSupplyFactor), settledDebtFactor)
+        * as_int(presentDebtFactor),
+        presentSupplyFactor,
+    ) - 1
+    return np.where(signedPrimeSupplyValue < 0, debtValue, signedPrimeSupplyValue)
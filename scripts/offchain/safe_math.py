@@ -0,0 +1,30 @@
+"""
+Signed integer helpers with Solidity semantics (contracts/math/SafeInt256.sol) for numpy
+object arrays of python ints. Solidity division truncates towards zero whereas python
+floor division rounds towards negative infinity, so all signed division goes through div.
+"""
+import numpy as np
+from scripts.offchain.constants import RATE_PRECISION
+
+
+def as_int(values):
+    """Returns values as an object array of python ints"""
+    values = np.asarray(values)
+    if values.dtype == object:
+        return values
+    return np.vectorize(int, otypes=[object])(values) if values.size else values.astype(object)
+
+
+def div(a, b):
+    """Division truncated towards zero, b must be non zero"""
+    (a, b) = (as_int(a), as_int(b))
+    q = np.abs(a) // np.abs(b)
+    return np.where((a < 0) != (b < 0), -q, q)
+
+
+def mul_in_rate_precision(x, y):
+    return div(as_int(x) * as_int(y), RATE_PRECISION)
+
+
+def div_in_rate_precision(x, y):
+    return div(as_int(x) * RATE_PRECISION, y)
@@ -0,0 +1,323 @@
+"""
+Settlement projection for the next quarterly reference time, following
+contracts/internal/settlement/SettlePortfolioAssets.sol and SettleBitmapAssets.sol.
+
+Positions for many accounts are scanned at once for fCash that settles at the settle time
+(by default the next tRef). Settled prime cash is projected per (account, currency) using
+convertSettledfCash at estimated settlement rates: rates already set on chain are read from
+getSettlementRate, rates that are not yet set are projected forward to the settle time from the
+stored prime cash factors, since they are set by the first settlement at or after maturity.
+Settlement gas is estimated per account from a linear model over the storage it touches and
+accounts are ordered into a work plan for keepers.
+"""
+from collections import namedtuple
+
+import numpy as np
+from brownie.network import web3
+from scripts.offchain.constants import QUARTER
+from scripts.offchain.date_time import get_reference_time, get_time_utc0
+from scripts.offchain.exchange_rate import ETHRate, convert_to_eth
+from scripts.offchain.multicall import aggregate
+from scripts.offchain.prime_cash import load_prime_cash_seed, project_prime_cash
+from scripts.offchain.prime_rate import convert_settled_fcash, convert_to_underlying
+from scripts.offchain.safe_math import as_int
+
+SettlementInputs = namedtuple(
+    "SettlementInputs",
+    [
+        "blockTime",
+        "settleTime",
+        # currencyId => (supplyFactor, debtFactor) projected to the settle time
+        "presentRates",
+        # (currencyId, maturity) => (supplyFactor, debtFactor, isSet)
+        "settlementRates",
+        # currencyId => ETHRate
+        "ethRates",
+    ],
+)
+
+# Mirrors SettleAmount, one row per (account, currency) with settled assets
+SettleAmounts = namedtuple(
+    "SettleAmounts",
+    [
+        "accountIndex",
+        "currencyId",
+        "positiveSettledCash",
+        "negativeSettledCash",
+        "settledUnderlying",
+    ],
+)
+
+# Totals per (currency, maturity) across all accounts
+MaturitySettlement = namedtuple(
+    "MaturitySettlement",
+    [
+        "currencyId",
+        "maturity",
+        "positivefCash",
+        "negativefCash",
+        "positiveSettledCash",
+        "negativeSettledCash",
+        "settlementSupplyFactor",
+        "settlementDebtFactor",
+        "isSet",
+    ],
+)
+
+SettleGasFeatures = namedtuple(
+    "SettleGasFeatures", ["isBitmap", "numCurrencies", "numSettledAssets", "numRemainingAssets"]
+)
+
+# Gas used by settleAccount is modeled as base + sum(coefficient * feature)
+SettleGasModel = namedtuple(
+    "SettleGasModel",
+    ["base", "isBitmap", "numCurrencies", "numSettledAssets", "numRemainingAssets"],
+)
+
+# Rough costs of settleAccount on a warm node, calibrate with fit_settle_gas_model
+DEFAULT_SETTLE_GAS_MODEL = SettleGasModel(60_000, 10_000, 25_000, 15_000, 5_000)
+
+SettlementPlan = namedtuple(
+    "SettlementPlan",
+    ["accountIndex", "accounts", "settledValueETH", "estimatedGas", "cumulativeGas"],
+)
+
+
+def get_settlement_time(blockTime):
+    """Returns the next quarterly reference time, where the three month market settles"""
+    return get_reference_time(blockTime) + QUARTER
+
+
+def load_settlement_inputs(notional, positions, blockIdentifier="latest", settleTime=None,
+                           multicall=None):
+    """
+    Loads the prime cash seeds, ETH rates and settlement rates required to project settlement of
+    the positions at settleTime. All calls are made at the same block.
+    """
+    blockTime = web3.eth.get_block(blockIdentifier)["timestamp"]
+    settleTime = get_settlement_time(blockTime) if settleTime is None else settleTime
+    if settleTime < blockTime:
+        raise ValueError("Settle time in the past")
+
+    settling = positions.maturity <= settleTime
+    currencyIds = sorted(int(c) for c in np.unique(positions.assetCurrency[settling]))
+    call = {"block_identifier": blockIdentifier}
+    (presentRates, ethRates, currentRates) = ({}, {}, {})
+    for currencyId in currencyIds:
+        projection = project_prime_cash(
+            load_prime_cash_seed(notional, currencyId, blockIdentifier), settleTime
+        )
+        if projection.reverted:
+            raise ValueError("Prime cash accrual reverts at settle time")
+        presentRates[currencyId] = (int(projection.supplyFactor), int(projection.debtFactor))
+        ethRates[currencyId] = ETHRate(
+            *[int(v) for v in notional.getCurrencyAndRates(currencyId, **call)[2]]
+        )
+        (primeRate, *_) = notional.getPrimeFactors(currencyId, blockTime, **call)
+        currentRates[currencyId] = (int(primeRate[0]), int(primeRate[1]))
+
+    keys = sorted(
+        {
+            (int(c), int(m))
+            for (c, m) in zip(positions.assetCurrency[settling], positions.maturity[settling])
+        }
+    )
+    matured = [(c, m) for (c, m) in keys if m <= blockTime]
+    rates = dict(
+        zip(
+            matured,
+            aggregate(
+                [(notional.getSettlementRate, [c, m]) for (c, m) in matured],
+                blockIdentifier,
+                multicall,
+            ),
+        )
+    )
+
+    settlementRates = {}
+    for (currencyId, maturity) in keys:
+        rate = rates.get((currencyId, maturity))
+        rate = None if rate is None else (int(rate[0]), int(rate[1]))
+        # An unset settlement rate is returned as the current rate, it will be set by the first
+        # settlement which is projected to happen at the settle time
+        if rate is None or rate == currentRates[currencyId]:
+            settlementRates[(currencyId, maturity)] = presentRates[currencyId] + (False,)
+        else:
+            settlementRates[(currencyId, maturity)] = rate + (True,)
+
+    return SettlementInputs(blockTime, settleTime, presentRates, settlementRates, ethRates)
+
+
+def get_accounts_to_settle(settleTime, positions):
+    """Accounts where mustSettleAssets is true at settleTime"""
+    bitmapSettle = positions.nextSettleTime < get_time_utc0(settleTime)
+    arraySettle = (0 < positions.nextSettleTime) & (positions.nextSettleTime <= settleTime)
+    return np.where(positions.bitmapCurrencyId != 0, bitmapSettle, arraySettle)
+
+
+def get_settling_assets(settleTime, positions):
+    """
+    Asset rows that settle at settleTime. Bitmap portfolios settle every bit up to the UTC0
+    time, array portfolios settle fCash at maturity. Returns (settling, remaining) masks over
+    the asset rows of accounts that must settle.
+    """
+    mustSettle = get_accounts_to_settle(settleTime, positions)[positions.assetAccount]
+    isBitmap = positions.bitmapCurrencyId[positions.assetAccount] != 0
+    cutoff = np.where(isBitmap, get_time_utc0(settleTime), settleTime)
+    matured = positions.maturity <= cutoff
+    return (mustSettle & matured, mustSettle & ~matured)
+
+
+def _rate_column(inputs, currencyId, maturity, index):
+    return as_int(
+        [inputs.settlementRates[(int(c), int(m))][index] for (c, m) in zip(currencyId, maturity)]
+    )
+
+
+def _present_column(inputs, currencyId, index):
+    return as_int([inputs.presentRates[int(c)][index] for c in currencyId])
+
+
+def get_settled_cash(inputs, positions):
+    """Returns (settling, settledCash) with the settled prime cash of every settling asset row"""
+    (settling, _) = get_settling_assets(inputs.settleTime, positions)
+    currencyId = positions.assetCurrency[settling]
+    maturity = positions.maturity[settling]
+    settledCash = convert_settled_fcash(
+        _present_column(inputs, currencyId, 0),
+        _present_column(inputs, currencyId, 1),
+        _rate_column(inputs, currencyId, maturity, 0),
+        _rate_column(inputs, currencyId, maturity, 1),
+        positions.notional[settling],
+    )
+    return (settling, settledCash)
+
+
+def _group_sum(inverse, values, size):
+    total = np.zeros(size, dtype=object)
+    np.add.at(total, inverse, values)
+    return total
+
+
+def get_settle_amounts(inputs, positions):
+    """Projected positive and negative settled prime cash per (account, currency)"""
+    (settling, settledCash) = get_settled_cash(inputs, positions)
+    account = positions.assetAccount[settling]
+    currencyId = positions.assetCurrency[settling]
+    (keys, inverse) = np.unique(
+        np.stack([account, currencyId], axis=-1).reshape(-1, 2), axis=0, return_inverse=True
+    )
+    inverse = inverse.reshape(-1)
+    positive = _group_sum(inverse, np.where(settledCash > 0, settledCash, 0), len(keys))
+    negative = _group_sum(inverse, np.where(settledCash < 0, settledCash, 0), len(keys))
+
+    groupCurrency = keys[:, 1]
+    settledUnderlying = convert_to_underlying(
+        _present_column(inputs, groupCurrency, 0), positive + negative
+    )
+    return SettleAmounts(keys[:, 0], groupCurrency, positive, negative, settledUnderlying)
+
+
+def get_maturity_settlements(inputs, positions):
+    """
+    Totals of settling fCash and settled prime cash per (currency, maturity). Negative settled
+    cash is the prime debt that accounts will hold after settlement.
+    """
+    (settling, settledCash) = get_settled_cash(inputs, positions)
+    currencyId = positions.assetCurrency[settling]
+    maturity = positions.maturity[settling]
+    notional = positions.notional[settling]
+    (keys, inverse) = np.unique(
+        np.stack([currencyId, maturity], axis=-1).reshape(-1, 2), axis=0, return_inverse=True
+    )
+    inverse = inverse.reshape(-1)
+    size = len(keys)
+    rates = [inputs.settlementRates[(int(c), int(m))] for (c, m) in keys]
+
+    return MaturitySettlement(
+        keys[:, 0],
+        keys[:, 1],
+        _group_sum(inverse, np.where(notional > 0, notional, 0), size),
+        _group_sum(inverse, np.where(notional < 0, notional, 0), size),
+        _group_sum(inverse, np.where(settledCash > 0, settledCash, 0), size),
+        _group_sum(inverse, np.where(settledCash < 0, settledCash, 0), size),
+        as_int([r[0] for r in rates]),
+        as_int([r[1] for r in rates]),
+        np.array([r[2] for r in rates], dtype=bool),
+    )
+
+
+def get_settle_gas_features(settleTime, positions):
+    """Per account features of the gas model, zero for accounts that do not settle"""
+    mustSettle = get_accounts_to_settle(settleTime, positions)
+    (settling, remaining) = get_settling_assets(settleTime, positions)
+    size = len(positions.accounts)
+    numSettled = np.bincount(positions.assetAccount[settling], minlength=size)
+    numRemaining = np.bincount(positions.assetAccount[remaining], minlength=size)
+
+    # Distinct settled currencies per account, each one updates a balance
+    pairs = np.unique(
+        np.stack(
+            [positions.assetAccount[settling], positions.assetCurrency[settling]], axis=-1
+        ).reshape(-1, 2),
+        axis=0,
+    )
+    numCurrencies = np.bincount(pairs[:, 0], minlength=size)
+
+    return SettleGasFeatures(
+        (mustSettle & (positions.bitmapCurrencyId != 0)).astype(np.int64),
+        np.where(mustSettle, numCurrencies, 0),
+        np.where(mustSettle, numSettled, 0),
+        np.where(mustSettle, numRemaining, 0),
+    )
+
+
+def estimate_settle_gas(features, model=DEFAULT_SETTLE_GAS_MODEL):
+    gas = np.full(np.shape(features.isBitmap), model.base, dtype=np.int64)
+    for field in SettleGasFeatures._fields:
+        gas = gas + np.asarray(getattr(features, field), dtype=np.int64) * getattr(model, field)
+    return gas
+
+
+def fit_settle_gas_model(features, gasUsed):
+    """Fits the gas model to gasUsed observed from settleAccount transactions"""
+    design = np.column_stack(
+        [np.ones(len(gasUsed))]
+        + [np.asarray(getattr(features, f), dtype=np.float64) for f in SettleGasFeatures._fields]
+    )
+    (coefficients, *_) = np.linalg.lstsq(design, np.asarray(gasUsed, dtype=np.float64), rcond=None)
+    return SettleGasModel(*[int(round(c)) for c in coefficients])
+
+
+def get_settlement_plan(inputs, positions, model=DEFAULT_SETTLE_GAS_MODEL):
+    """
+    Orders the accounts that must settle by the absolute ETH value of their settled cash, the
+    largest first, so that the bulk of fCash settles early. cumulativeGas allows keepers to
+    split the plan into transactions or blocks under a gas limit.
+    """
+    size = len(positions.accounts)
+    amounts = get_settle_amounts(inputs, positions)
+    valueETH = np.zeros(size, dtype=object)
+    for currencyId in np.unique(amounts.currencyId):
+        rows = amounts.currencyId == currencyId
+        ethRate = inputs.ethRates[int(currencyId)]
+        underlying = convert_to_underlying(
+            inputs.presentRates[int(currencyId)][0],
+            amounts.positiveSettledCash[rows] - amounts.negativeSettledCash[rows],
+        )
+        np.add.at(valueETH, amounts.accountIndex[rows], convert_to_eth(ethRate, underlying))
+
+    mustSettle = get_accounts_to_settle(inputs.settleTime, positions)
+    gas = estimate_settle_gas(get_settle_gas_features(inputs.settleTime, positions), model)
+    accountIndex = np.flatnonzero(mustSettle)
+    # Stable sort keeps account order for equal values
+    order = sorted(range(len(accountIndex)), key=lambda i: -valueETH[accountIndex[i]])
+    accountIndex = accountIndex[order] if len(order) else accountIndex
+
+    return SettlementPlan(
+        accountIndex,
+        [positions.accounts[i] for i in accountIndex],
+        valueETH[accountIndex],
+        gas[accountIndex],
+        np.cumsum(gas[accountIndex]),
+    )
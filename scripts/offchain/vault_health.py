@@ -0,0 +1,624 @@
+"""
+Batched vault account health, a bit exact port of VaultAccountHealth.getVaultAccountHealthFactors
+(contracts/external/actions/VaultAccountHealth.sol) and the valuation in
+contracts/internal/vaults/VaultValuation.sol and VaultSecondaryBorrow.sol evaluated over many
+vault accounts at once.
+
+Inputs that are shared by every account in a vault are loaded once per block into VaultInputs:
+vault configs, the value of SHARE_VALUE_UNIT vault shares at each maturity, prime settlement
+rates of matured maturities and the prime rates, ETH rates and cash groups of every borrowed
+currency (as free_collateral.ValuationInputs). Vault accounts are loaded into VaultAccounts
+with one row per (account, vault) pair.
+
+Vault share values are priced linearly from the per maturity share value unless the accounts
+are loaded with exactShareValue, which calls convertStrategyToUnderlying for each account and
+matches the on chain value exactly for strategies that do not price shares linearly.
+"""
+from collections import namedtuple
+
+import numpy as np
+from brownie import interface
+from brownie.network import web3
+from scripts.offchain.asset_handler import get_present_fcash_value
+from scripts.offchain.constants import (
+    INT256_MAX,
+    INTERNAL_TOKEN_PRECISION,
+    PRIME_CASH_VAULT_MATURITY,
+    RATE_PRECISION,
+)
+from scripts.offchain.exchange_rate import exchange_rate
+from scripts.offchain.free_collateral import _currency_column, load_valuation_inputs
+from scripts.offchain.multicall import aggregate
+from scripts.offchain.prime_rate import convert_settled_fcash, convert_to_underlying
+from scripts.offchain.safe_math import as_int, div, div_in_rate_precision, mul_in_rate_precision
+
+# Flags from contracts/internal/vaults/VaultConfiguration.sol
+DISABLE_DELEVERAGE = 1 << 8
+ENABLE_FCASH_DISCOUNT = 1 << 9
+# Number of vault shares priced at each maturity, 1e8 shares in 1e8 precision
+SHARE_VALUE_UNIT = 10 ** 16
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+# Field order matches the VaultConfig struct returned by getVaultConfig
+VaultConfig = namedtuple(
+    "VaultConfig",
+    [
+        "vault",
+        "flags",
+        "borrowCurrencyId",
+        "minAccountBorrowSize",
+        "feeRate",
+        "minCollateralRatio",
+        "liquidationRate",
+        "reserveFeeShare",
+        "maxBorrowMarketIndex",
+        "maxDeleverageCollateralRatio",
+        "secondaryBorrowCurrencies",
+        "primeRate",
+        "maxRequiredAccountCollateralRatio",
+        "minAccountSecondaryBorrow",
+        "excessCashLiquidationBonus",
+    ],
+)
+
+SecondaryExchangeRates = namedtuple(
+    "SecondaryExchangeRates", ["rateDecimals", "exchangeRateOne", "exchangeRateTwo"]
+)
+
+VaultAccounts = namedtuple(
+    "VaultAccounts",
+    [
+        "accounts",
+        "vaults",
+        "maturity",
+        "vaultShares",
+        "accountDebtUnderlying",
+        "tempCashBalance",
+        "secondaryDebt",
+        "secondaryCashHeld",
+        "strategyValue",
+    ],
+)
+
+# VaultAccountHealthFactors followed by the liquidation factors of each currency index and a
+# mask of accounts that revert on chain
+VaultHealthResult = namedtuple(
+    "VaultHealthResult",
+    [
+        "collateralRatio",
+        "totalDebtOutstandingInPrimary",
+        "vaultShareValueUnderlying",
+        "netDebtOutstanding",
+        "maxLiquidatorDepositUnderlying",
+        "vaultSharesToLiquidator",
+        "reverted",
+    ],
+)
+
+DeleverageCandidates = namedtuple(
+    "DeleverageCandidates",
+    [
+        "accountIndex",
+        "currencyIndex",
+        "shortfall",
+        "shortfallETH",
+        "maxLiquidatorDepositUnderlying",
+        "vaultSharesToLiquidator",
+    ],
+)
+
+
+def _where(condition, x, y):
+    return np.where(condition, as_int(x), as_int(y))
+
+
+def _safe_denominator(denominator):
+    return _where(as_int(denominator) == 0, 1, denominator)
+
+
+def _mask(shape, reverts):
+    return np.zeros(shape, dtype=bool) if reverts is None else reverts
+
+
+def from_vault_config(config):
+    """Converts a getVaultConfig return value into a VaultConfig of python ints"""
+    (vault, *values) = config
+    values = [
+        tuple(int(v) for v in value) if isinstance(value, (list, tuple)) else int(value)
+        for value in values
+    ]
+    return VaultConfig(str(vault), *values)
+
+
+def has_secondary_borrows(config):
+    return any(c != 0 for c in config.secondaryBorrowCurrencies)
+
+
+class VaultInputs:
+    """Per vault and per (vault, maturity) inputs at a single block time shared by all accounts"""
+
+    def __init__(self, valuation, configs, decimals, shareValues, settlementRates):
+        # free_collateral.ValuationInputs for every primary and secondary borrow currency
+        self.valuation = valuation
+        self.configs = configs
+        # Underlying token decimals of each currency
+        self.decimals = decimals
+        # (vault, maturity) => external underlying value of SHARE_VALUE_UNIT vault shares
+        self.shareValues = shareValues
+        # (currencyId, maturity) => settled (supplyFactor, debtFactor), maturities without a
+        # settlement rate set use the current prime rate as they do on chain
+        self.settlementRates = settlementRates
+
+    @property
+    def blockTime(self):
+        return self.valuation.blockTime
+
+    def exchange_rates(self, vault):
+        """Exchange rates from the primary to each secondary currency, zero if not borrowed"""
+        config = self.configs[vault]
+        if not has_secondary_borrows(config):
+            return SecondaryExchangeRates(0, 0, 0)
+        primaryRate = self.valuation.currencies[config.borrowCurrencyId].ethRate
+        rates = [
+            int(exchange_rate(primaryRate, self.valuation.currencies[c].ethRate)) if c else 0
+            for c in config.secondaryBorrowCurrencies
+        ]
+        return SecondaryExchangeRates(primaryRate.rateDecimals, *rates)
+
+    def settlement_rate(self, currencyId, maturity):
+        currency = self.valuation.currencies[currencyId]
+        return self.settlementRates.get(
+            (currencyId, maturity), (currency.supplyFactor, currency.debtFactor)
+        )
+
+
+def _aggregate(calls, blockIdentifier, multicall):
+    results = aggregate(calls, blockIdentifier, multicall)
+    if any(r is None for r in results):
+        raise ValueError("Vault view reverted")
+    return results
+
+
+def load_vault_accounts(notional, vaultAccounts, blockIdentifier="latest", multicall=None,
+                        exactShareValue=False):
+    """
+    Loads the (account, vault) pairs into VaultAccounts, all calls are made at the same block.
+    Debts are returned by the views in underlying at the block's prime rates.
+    """
+    pairs = [(str(a), str(v)) for (a, v) in vaultAccounts]
+    calls = []
+    for (account, vault) in pairs:
+        calls.append((notional.getVaultAccount, [account, vault]))
+        calls.append((notional.getVaultAccountSecondaryDebt, [account, vault]))
+    results = _aggregate(calls, blockIdentifier, multicall)
+    vaultAccount = results[0::2]
+    secondary = results[1::2]
+
+    maturity = np.array([int(a[1]) for a in vaultAccount], dtype=np.int64)
+    vaultShares = as_int([int(a[2]) for a in vaultAccount])
+    strategyValue = None
+    if exactShareValue:
+        rows = np.nonzero(vaultShares > 0)[0]
+        values = _aggregate(
+            [
+                (
+                    interface.IStrategyVault(pairs[i][1]).convertStrategyToUnderlying,
+                    [pairs[i][0], int(vaultShares[i]), int(maturity[i])],
+                )
+                for i in rows
+            ],
+            blockIdentifier,
+            multicall,
+        )
+        strategyValue = np.zeros(len(pairs), dtype=object)
+        strategyValue[rows] = [int(v) for v in values]
+
+    return VaultAccounts(
+        [a for (a, _) in pairs],
+        [v for (_, v) in pairs],
+        maturity,
+        vaultShares,
+        as_int([int(a[0]) for a in vaultAccount]),
+        as_int([int(a[4]) for a in vaultAccount]),
+        as_int([[int(d) for d in s[1]] for s in secondary]).reshape(-1, 2),
+        as_int([[int(c) for c in s[2]] for s in secondary]).reshape(-1, 2),
+        strategyValue,
+    )
+
+
+def load_vault_inputs(notional, accounts, blockIdentifier="latest", multicall=None):
+    """
+    Loads the inputs required to value VaultAccounts, vault share values and settlement rates
+    are loaded once for each maturity held by an account.
+    """
+    call = {"block_identifier": blockIdentifier}
+    blockTime = web3.eth.get_block(blockIdentifier)["timestamp"]
+    vaults = sorted(set(accounts.vaults))
+    configs = {v: from_vault_config(notional.getVaultConfig(v, **call)) for v in vaults}
+    vaultCurrencies = {
+        v: [c.borrowCurrencyId] + [s for s in c.secondaryBorrowCurrencies if s != 0]
+        for (v, c) in configs.items()
+    }
+    currencyIds = sorted({c for currencies in vaultCurrencies.values() for c in currencies})
+    valuation = load_valuation_inputs(notional, currencyIds, blockIdentifier)
+    decimals = {c: int(notional.getCurrency(c, **call)[1][2]) for c in currencyIds}
+
+    vaultMaturities = sorted(
+        {(v, int(m)) for (v, m) in zip(accounts.vaults, accounts.maturity) if m != 0}
+    )
+    shareValues = _aggregate(
+        [
+            (
+                interface.IStrategyVault(v).convertStrategyToUnderlying,
+                [ZERO_ADDRESS, SHARE_VALUE_UNIT, m],
+            )
+            for (v, m) in vaultMaturities
+        ],
+        blockIdentifier,
+        multicall,
+    )
+
+    settled = sorted(
+        {(c, m) for (v, m) in vaultMaturities if m <= blockTime for c in vaultCurrencies[v]}
+    )
+    settlementRates = _aggregate(
+        [(notional.getSettlementRate, [c, m]) for (c, m) in settled], blockIdentifier, multicall
+    )
+
+    return VaultInputs(
+        valuation,
+        configs,
+        decimals,
+        {k: int(v) for (k, v) in zip(vaultMaturities, shareValues)},
+        {k: (int(r[0]), int(r[1])) for (k, r) in zip(settled, settlementRates)},
+    )
+
+
+def _config_column(inputs, vaults, field, index=None):
+    """Looks up a per vault config value for each row"""
+    values = {}
+    for v in set(vaults):
+        value = getattr(inputs.configs[v], field)
+        values[v] = value if index is None else value[index]
+    return np.array([values[v] for v in vaults], dtype=object)
+
+
+def get_vault_share_values(inputs, accounts):
+    """Value of each account's vault shares in primary underlying internal precision"""
+    currencyId = _config_column(inputs, accounts.vaults, "borrowCurrencyId")
+    vaultShares = as_int(accounts.vaultShares)
+    if accounts.strategyValue is None:
+        unitValue = as_int(
+            [
+                inputs.shareValues.get((v, int(m)), 0)
+                for (v, m) in zip(accounts.vaults, accounts.maturity)
+            ]
+        )
+        externalValue = div(vaultShares * unitValue, SHARE_VALUE_UNIT)
+    else:
+        externalValue = as_int(accounts.strategyValue)
+    decimals = np.array([inputs.decimals[c] for c in currencyId], dtype=object)
+    internal = _where(
+        decimals == INTERNAL_TOKEN_PRECISION,
+        externalValue,
+        div(externalValue * INTERNAL_TOKEN_PRECISION, decimals),
+    )
+    return _where(vaultShares == 0, 0, internal)
+
+
+def get_present_value(inputs, currencyId, maturity, debtUnderlying, enableDiscount,
+                      reverts=None):
+    """
+    Matured debts are valued at their settled prime debt value including interest accrued since
+    settlement. fCash debts are discounted to risk adjusted present value if enableDiscount is
+    set, prime cash debts are never discounted.
+    """
+    currencyId = np.asarray(currencyId, dtype=np.int64)
+    maturity = np.asarray(maturity, dtype=np.int64)
+    debtUnderlying = as_int(debtUnderlying)
+    enableDiscount = np.broadcast_to(np.asarray(enableDiscount, dtype=bool), maturity.shape)
+    mask = _mask(maturity.shape, reverts)
+    presentValue = debtUnderlying.copy()
+
+    matured = maturity <= inputs.blockTime
+    if np.any(matured):
+        present = _currency_column(inputs.valuation, currencyId[matured], "supplyFactor")
+        presentDebt = _currency_column(inputs.valuation, currencyId[matured], "debtFactor")
+        settled = [
+            inputs.settlement_rate(int(c), int(m))
+            for (c, m) in zip(currencyId[matured], maturity[matured])
+        ]
+        primeValue = convert_settled_fcash(
+            present,
+            presentDebt,
+            as_int([s[0] for s in settled]),
+            as_int([s[1] for s in settled]),
+            debtUnderlying[matured],
+        )
+        presentValue[matured] = convert_to_underlying(present, primeValue)
+
+    discounted = (
+        ~matured
+        & enableDiscount
+        & (maturity != PRIME_CASH_VAULT_MATURITY)
+        & (debtUnderlying != 0)
+    )
+    for c in np.unique(currencyId[discounted]):
+        rows = discounted & (currencyId == c)
+        (fCashDF, debtDF, reverted) = inputs.valuation.discount_factors(int(c), maturity[rows])
+        rowMask = mask[rows] | reverted
+        presentValue[rows] = get_present_fcash_value(
+            debtUnderlying[rows], _where(debtUnderlying[rows] > 0, fCashDF, debtDF), rowMask
+        )
+        mask[rows] = rowMask
+
+    if reverts is None and np.any(mask):
+        raise ValueError("Invalid discount factor")
+    return presentValue
+
+
+def calculate_collateral_ratio(vaultShareValue, netDebtOutstanding):
+    """Collateral ratio in RATE_PRECISION, INT256_MAX if there is no debt outstanding"""
+    (vaultShareValue, netDebtOutstanding) = (as_int(vaultShareValue), as_int(netDebtOutstanding))
+    hasDebt = netDebtOutstanding < 0
+    collateralRatio = div_in_rate_precision(
+        vaultShareValue + netDebtOutstanding, _where(hasDebt, -netDebtOutstanding, 1)
+    )
+    return _where(hasDebt, collateralRatio, INT256_MAX)
+
+
+def calculate_account_health_factors(inputs, accounts, reverts=None):
+    """
+    Returns (collateralRatio, totalDebtOutstandingInPrimary, vaultShareValueUnderlying,
+    netDebtOutstanding) where netDebtOutstanding has a trailing axis of the primary and both
+    secondary currencies.
+    """
+    vaults = accounts.vaults
+    maturity = np.asarray(accounts.maturity, dtype=np.int64)
+    mask = _mask(maturity.shape, reverts)
+    borrowCurrencyId = _config_column(inputs, vaults, "borrowCurrencyId").astype(np.int64)
+    enableDiscount = _config_column(inputs, vaults, "flags") & ENABLE_FCASH_DISCOUNT != 0
+
+    vaultShareValue = get_vault_share_values(inputs, accounts)
+    netDebtOutstanding = np.zeros(maturity.shape + (3,), dtype=object)
+    netDebtOutstanding[:, 0] = get_present_value(
+        inputs, borrowCurrencyId, maturity, accounts.accountDebtUnderlying, enableDiscount, mask
+    ) + convert_to_underlying(
+        _currency_column(inputs.valuation, borrowCurrencyId, "supplyFactor"),
+        accounts.tempCashBalance,
+    )
+    # Net cash held in excess of the primary debt is added to the vault share value
+    netPrimary = netDebtOutstanding[:, 0]
+    totalDebtOutstanding = _where(netPrimary < 0, netPrimary, 0)
+    vaultShareValue = _where(netPrimary < 0, vaultShareValue, vaultShareValue + netPrimary)
+
+    exchangeRates = [inputs.exchange_rates(v) for v in vaults]
+    rateDecimals = as_int([er.rateDecimals for er in exchangeRates])
+    for index in (1, 2):
+        currencyId = _config_column(inputs, vaults, "secondaryBorrowCurrencies", index - 1)
+        rows = currencyId != 0
+        if not np.any(rows):
+            continue
+
+        currencyId = currencyId[rows].astype(np.int64)
+        rowMask = mask[rows]
+        netDebt = get_present_value(
+            inputs,
+            currencyId,
+            maturity[rows],
+            accounts.secondaryDebt[rows, index - 1],
+            enableDiscount[rows],
+            rowMask,
+        ) + convert_to_underlying(
+            _currency_column(inputs.valuation, currencyId, "supplyFactor"),
+            accounts.secondaryCashHeld[rows, index - 1],
+        )
+        netDebtOutstanding[rows, index] = netDebt
+        mask[rows] = rowMask
+
+        exchangeRate = as_int([er[index] for er in exchangeRates])[rows]
+        netPrimary = div(netDebt * rateDecimals[rows], exchangeRate)
+        totalDebtOutstanding[rows] += _where(netPrimary < 0, netPrimary, 0)
+        vaultShareValue[rows] += _where(netPrimary > 0, netPrimary, 0)
+
+    if reverts is None and np.any(mask):
+        raise ValueError("Invalid discount factor")
+    return (
+        calculate_collateral_ratio(vaultShareValue, totalDebtOutstanding),
+        totalDebtOutstanding,
+        vaultShareValue,
+        netDebtOutstanding,
+    )
+
+
+def calculate_deleverage_amount(vaultShareValue, totalDebtOutstanding, localDebtOutstanding,
+                                minAccountBorrowSizeLocal, exchangeRate, rateDecimals,
+                                liquidationRate, maxDeleverageCollateralRatio):
+    """
+    Maximum liquidator deposit in local underlying that deleverages an account up to the max
+    deleverage collateral ratio. Debts are positive, vaultShareValue must be positive.
+    """
+    vaultShareValue = as_int(vaultShareValue)
+    localDebtOutstanding = as_int(localDebtOutstanding)
+    (exchangeRate, rateDecimals) = (as_int(exchangeRate), as_int(rateDecimals))
+    liquidationRate = as_int(liquidationRate)
+    maxCollateralRatioPlusOne = as_int(maxDeleverageCollateralRatio) + RATE_PRECISION
+
+    maxDepositPrimary = div_in_rate_precision(
+        mul_in_rate_precision(totalDebtOutstanding, maxCollateralRatioPlusOne) - vaultShareValue,
+        _safe_denominator(maxCollateralRatioPlusOne - liquidationRate),
+    )
+    maxDepositLocal = div(maxDepositPrimary * exchangeRate, _safe_denominator(rateDecimals))
+
+    # The entire debt must be repaid if the remaining debt is below the min borrow size
+    repayAll = (localDebtOutstanding < maxDepositLocal) | (
+        localDebtOutstanding - maxDepositLocal < as_int(minAccountBorrowSizeLocal)
+    )
+    maxDepositLocal = _where(repayAll, localDebtOutstanding, maxDepositLocal)
+    maxDepositPrimary = _where(
+        repayAll,
+        div(localDebtOutstanding * rateDecimals, _safe_denominator(exchangeRate)),
+        maxDepositPrimary,
+    )
+
+    # Limits the deposit to the value of the vault shares held by the account
+    safeShareValue = _where(vaultShareValue > 0, vaultShareValue, 1)
+    depositRatio = div(maxDepositPrimary * liquidationRate, safeShareValue)
+    insolvent = depositRatio >= RATE_PRECISION
+    maxDepositLocal = _where(
+        insolvent,
+        div(
+            div_in_rate_precision(vaultShareValue, _safe_denominator(liquidationRate))
+            * exchangeRate,
+            _safe_denominator(rateDecimals),
+        ),
+        maxDepositLocal,
+    )
+
+    return _where(localDebtOutstanding <= 0, 0, maxDepositLocal)
+
+
+def get_liquidation_factors(inputs, vaults, health, exchangeRates, currencyIndex, vaultShares,
+                            depositUnderlyingInternal, reverts=None):
+    """
+    Returns (depositUnderlyingInternal, vaultSharesToLiquidator) for deleveraging each account
+    in the currency index, deposits are limited to the maximum deleverage amount. health is
+    the output of calculate_account_health_factors and exchangeRates a SecondaryExchangeRates
+    of arrays.
+    """
+    (_, totalDebtOutstanding, vaultShareValue, netDebtOutstanding) = health
+    vaultShareValue = as_int(vaultShareValue)
+    mask = _mask(vaultShareValue.shape, reverts)
+    if currencyIndex == 0:
+        minBorrowSize = _config_column(inputs, vaults, "minAccountBorrowSize")
+        undefined = np.zeros(vaultShareValue.shape, dtype=bool)
+    else:
+        minBorrowSize = _config_column(
+            inputs, vaults, "minAccountSecondaryBorrow", currencyIndex - 1
+        )
+        undefined = (
+            _config_column(inputs, vaults, "secondaryBorrowCurrencies", currencyIndex - 1) == 0
+        )
+    skip = undefined | (vaultShareValue <= 0)
+
+    # Exchange rates are unset when there are no secondary borrows
+    rateDecimals = as_int(exchangeRates.rateDecimals)
+    unset = rateDecimals == 0
+    rateDecimals = _where(unset, 1, rateDecimals)
+    exchangeRate = rateDecimals if currencyIndex == 0 else as_int(exchangeRates[currencyIndex])
+    exchangeRate = _where(unset, 1, exchangeRate)
+
+    localDebt = -as_int(netDebtOutstanding)[:, currencyIndex]
+    maxDeposit = calculate_deleverage_amount(
+        vaultShareValue,
+        -as_int(totalDebtOutstanding),
+        localDebt,
+        minBorrowSize,
+        exchangeRate,
+        rateDecimals,
+        _config_column(inputs, vaults, "liquidationRate"),
+        _config_column(inputs, vaults, "maxDeleverageCollateralRatio"),
+    )
+
+    deposit = np.broadcast_to(as_int(depositUnderlyingInternal), vaultShareValue.shape)
+    belowMax = deposit < maxDeposit
+    postLiquidationDebt = localDebt - deposit
+    mask |= ~skip & belowMax & (postLiquidationDebt != 0) & (postLiquidationDebt < minBorrowSize)
+    deposit = _where(belowMax, deposit, maxDeposit)
+
+    depositPrimary = div(deposit * rateDecimals, _safe_denominator(exchangeRate))
+    vaultSharesToLiquidator = div(
+        div(
+            as_int(vaultShares)
+            * _config_column(inputs, vaults, "liquidationRate")
+            * depositPrimary,
+            _where(skip, 1, vaultShareValue),
+        ),
+        RATE_PRECISION,
+    )
+    mask |= ~skip & (vaultSharesToLiquidator < 0)
+
+    if reverts is None and np.any(mask):
+        raise ValueError("Must Liquidate All Debt")
+    return (_where(skip, 0, deposit), _where(skip, 0, vaultSharesToLiquidator))
+
+
+def get_vault_account_health(inputs, accounts):
+    """
+    Equivalent of getVaultAccountHealthFactors for each vault account, liquidation factors are
+    only calculated for accounts below the vault's min collateral ratio. Accounts that revert
+    on chain are flagged in the reverted mask and their results are undefined.
+    """
+    vaults = accounts.vaults
+    reverted = np.zeros(len(vaults), dtype=bool)
+    health = calculate_account_health_factors(inputs, accounts, reverted)
+    collateralRatio = health[0]
+
+    exchangeRates = [inputs.exchange_rates(v) for v in vaults]
+    exchangeRates = SecondaryExchangeRates(
+        *[as_int([er[i] for er in exchangeRates]) for i in range(3)]
+    )
+    hasSecondary = np.array([has_secondary_borrows(inputs.configs[v]) for v in vaults], dtype=bool)
+    undercollateralized = collateralRatio < _config_column(inputs, vaults, "minCollateralRatio")
+
+    maxDeposit = np.zeros((len(vaults), 3), dtype=object)
+    vaultSharesToLiquidator = np.zeros((len(vaults), 3), dtype=object)
+    for currencyIndex in range(3):
+        rows = undercollateralized & (hasSecondary if currencyIndex > 0 else True)
+        mask = np.zeros(len(vaults), dtype=bool)
+        (deposit, shares) = get_liquidation_factors(
+            inputs, vaults, health, exchangeRates, currencyIndex, accounts.vaultShares,
+            INT256_MAX, mask,
+        )
+        reverted |= rows & mask
+        maxDeposit[:, currencyIndex] = _where(rows, deposit, 0)
+        vaultSharesToLiquidator[:, currencyIndex] = _where(rows, shares, 0)
+
+    return VaultHealthResult(*health, maxDeposit, vaultSharesToLiquidator, reverted)
+
+
+def get_deleverage_queue(inputs, accounts, result):
+    """
+    Returns a DeleverageCandidates row for every (account, currency index) that can be
+    deleveraged, sorted by descending shortfall. The shortfall is the primary underlying value
+    required to restore the account to the vault's min collateral ratio, valued in ETH at the
+    oracle rate so that candidates in different vaults can be compared. Matured accounts must
+    be settled before they can be deleveraged and are excluded.
+    """
+    vaults = accounts.vaults
+    minCollateralRatio = _config_column(inputs, vaults, "minCollateralRatio")
+    flags = _config_column(inputs, vaults, "flags")
+    totalDebt = as_int(result.totalDebtOutstandingInPrimary)
+    shortfall = mul_in_rate_precision(-totalDebt, minCollateralRatio) - (
+        as_int(result.vaultShareValueUnderlying) + totalDebt
+    )
+
+    borrowCurrencyId = _config_column(inputs, vaults, "borrowCurrencyId")
+    rate = as_int([inputs.valuation.currencies[c].ethRate.rate for c in borrowCurrencyId])
+    rateDecimals = as_int(
+        [inputs.valuation.currencies[c].ethRate.rateDecimals for c in borrowCurrencyId]
+    )
+    shortfallETH = div(shortfall * rate, rateDecimals)
+
+    eligible = (
+        ~result.reverted
+        & (as_int(result.collateralRatio) < minCollateralRatio)
+        & (flags & DISABLE_DELEVERAGE == 0)
+        & (inputs.blockTime < np.asarray(accounts.maturity, dtype=np.int64))
+    )
+    deposit = as_int(result.maxLiquidatorDepositUnderlying)
+    (accountIndex, currencyIndex) = np.nonzero(eligible[:, np.newaxis] & (deposit > 0))
+    order = sorted(
+        range(len(accountIndex)),
+        key=lambda i: (-shortfallETH[accountIndex[i]], accountIndex[i], currencyIndex[i]),
+    )
+    (accountIndex, currencyIndex) = (accountIndex[order], currencyIndex[order])
+
+    return DeleverageCandidates(
+        accountIndex,
+        currencyIndex,
+        shortfall[accountIndex],
+        shortfallETH[accountIndex],
+        deposit[accountIndex, currencyIndex],
+        as_int(result.vaultSharesToLiquidator)[accountIndex, currencyIndex],
+    )
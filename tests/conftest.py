@@ -4,3 +4,14 @@ import pytest
 @pytest.fixture(scope="module", autouse=True)
 def shared_setup(module_isolation):
     pass
+
+
+@pytest.fixture
+def storage_profile():
+    """
+    Returns a function that profiles the storage accesses of a transaction receipt,
+    i.e. storage_profile(txn).redundant_reads()
+    """
+    from scripts.gas.storage_profiler import profile_storage
+
+    return profile_storage
@@ -10,20 +10,21 @@ from brownie import (
     accounts,
 )
 from brownie.network import Rpc
-from brownie.convert import to_bytes, to_uint
 from brownie.convert.datatypes import Wei
 from brownie.network.state import Chain
 from brownie.test import strategy
 from eth_abi.packed import encode_packed
 from scripts.config import CurrencyDefaults, nTokenDefaults
 from scripts.deployment import TestEnvironment
+from scripts.offchain.account_context import (  # noqa: F401
+    active_currencies_to_list,
+    list_to_active_currencies,
+)
 from tests.constants import (
-    BALANCE_FLAG_INT,
     CASH_GROUP_PARAMETERS,
     CURVE_SHAPES,
     DEPOSIT_ACTION_TYPE,
     MARKETS,
-    PORTFOLIO_FLAG_INT,
     RATE_PRECISION,
     SECONDS_IN_DAY,
     SECONDS_IN_QUARTER,
@@ -244,57 +245,7 @@ def random_asset_bitmap(numAssets, maxBit=254):
 
 
 def currencies_list_to_active_currency_bytes(currenciesList):
-    if len(currenciesList) == 0:
-        return to_bytes(0, "bytes18")
-
-    if len(currenciesList) > 9:
-        raise Exception("Currency list too long")
-
-    result = bytearray()
-    for (cid, portfolioActive, balanceActive) in currenciesList:
-        if cid < 0 or cid > 2 ** 14:
-            raise Exception("Invalid currency id")
-
-        if portfolioActive:
-            cid = cid | PORTFOLIO_FLAG_INT
-
-        if balanceActive:
-            cid = cid | BALANCE_FLAG_INT
-
-        result.extend(to_bytes(cid, "bytes2"))
-
-    if len(result) < 18:
-        # Pad this out to 18 bytes
-        result.extend(to_bytes(0, "bytes1") * (18 - len(result)))
-
-    return bytes(result)
-
-
-def active_currencies_to_list(activeCurrencies):
-    ba = bytearray(activeCurrencies)
-
-    currencies_list = []
-    byteLen = len(activeCurrencies)
-    for i in range(0, byteLen, 2):
-        cid = to_uint(bytes(ba[i : i + 2]), "uint16")
-        if cid == b"\x00\x00":
-            break
-
-        currencyId = cid
-        if currencyId > PORTFOLIO_FLAG_INT:
-            currencyId = currencyId - PORTFOLIO_FLAG_INT
-        if currencyId > BALANCE_FLAG_INT:
-            currencyId = currencyId - BALANCE_FLAG_INT
-
-        currencies_list.append(
-            (
-                currencyId,
-                cid & (1 << 15) != 0,  # portfolio active
-                cid & (1 << 14) != 0,  # currency active
-            )
-        )
-
-    return currencies_list
+    return list_to_active_currencies(currenciesList)
 
 
 def get_balance_action(currencyId, depositActionType, **kwargs):
@@ -0,0 +1,215 @@
+import pytest
+from brownie import MockAggregator
+from brownie.convert.datatypes import Wei
+from brownie.network.contract import Contract
+from brownie.network.state import Chain
+from brownie.test import given, strategy
+from scripts.offchain.exchange_rate import ETHRate, build_exchange_rate
+from scripts.offchain.liquidation import (
+    LiquidationFactors,
+    calculate_collateral_currency_liquidation,
+    calculate_local_currency_liquidation,
+)
+from tests.internal.liquidation.liquidation_helpers import (
+    ValuationMock,
+    get_expected,
+    move_collateral_exchange_rate,
+    setup_collateral_liquidation,
+)
+
+chain = Chain()
+
+
+def get_eth_rate(liquidation, currency):
+    ethRateStorage = liquidation.mock.getETHRate(currency)
+    oracleRate = 0
+    if currency != 1:
+        aggregator = Contract.from_abi("agg", ethRateStorage[0], MockAggregator.abi)
+        oracleRate = aggregator.latestAnswer()
+    return ETHRate(*[[v] for v in build_exchange_rate(currency, ethRateStorage, oracleRate)])
+
+
+def get_liquidation_factors(liquidation, account, local, collateral, nTokenBalance, blockTime):
+    """Builds liquidation factors for a single account from the mock views at blockTime"""
+    (fc, netLocal) = liquidation.mock.getFreeCollateralAtTime(account, blockTime)
+    # Net local values are returned in currency id order
+    available = dict(zip(sorted({local, collateral} - {0}), netLocal))
+    nTokenCurrency = collateral if collateral != 0 else local
+    nTokenPV = liquidation.mock.getNTokenPV(nTokenCurrency, blockTime)
+    (pvHaircut, liquidationHaircut) = liquidation.nTokenParameters[nTokenCurrency]
+    totalSupply = liquidation.nTokenTotalSupply[nTokenCurrency]
+    haircutValue = nTokenBalance * nTokenPV * pvHaircut // 100 // totalSupply
+
+    def supply_factor(currency):
+        return liquidation.mock.buildPrimeRateView(currency, blockTime)[0][0]
+
+    return LiquidationFactors(
+        [fc],
+        [available[local]],
+        [available.get(collateral, 0)],
+        [haircutValue],
+        [liquidationHaircut],
+        [pvHaircut],
+        get_eth_rate(liquidation, local),
+        get_eth_rate(liquidation, collateral if collateral != 0 else local),
+        [supply_factor(local)],
+        [supply_factor(collateral if collateral != 0 else local)],
+    )
+
+
+@pytest.mark.liquidation
+class TestOffChainLocalLiquidation:
+    @pytest.fixture(scope="module", autouse=True)
+    def liquidation(
+        self,
+        MockLocalLiquidation,
+        SettleAssetsExternal,
+        FreeCollateralExternal,
+        FreeCollateralAtTime,
+        TradingAction,
+        accounts,
+    ):
+        SettleAssetsExternal.deploy({"from": accounts[0]})
+        FreeCollateralExternal.deploy({"from": accounts[0]})
+        FreeCollateralAtTime.deploy({"from": accounts[0]})
+        TradingAction.deploy({"from": accounts[0]})
+        return ValuationMock(accounts[0], MockLocalLiquidation)
+
+    @pytest.fixture(autouse=True)
+    def isolation(self, fn_isolation):
+        pass
+
+    @given(
+        nTokenBalance=strategy("uint", min_value=1e8, max_value=100_000e8),
+        currency=strategy("uint", min_value=1, max_value=4),
+        ratio=strategy("uint", min_value=1, max_value=150),
+        nTokenLimit=strategy("uint", min_value=0, max_value=100_000e8),
+    )
+    def test_local_ntoken_liquidation_parity(
+        self, liquidation, accounts, currency, nTokenBalance, ratio, nTokenLimit
+    ):
+        # Sets a cash debt between the haircut and the liquidation value of the nTokens
+        time = chain.time()
+        haircut = liquidation.calculate_ntoken_to_asset(currency, nTokenBalance, time, "haircut")
+        liquidator = liquidation.calculate_ntoken_to_asset(
+            currency, nTokenBalance, time, "liquidator"
+        )
+        cashBalance = -Wei(haircut + ((liquidator - haircut) * ratio * 1e8) / 1e10)
+        liquidation.mock.setBalance(accounts[0], currency, cashBalance, nTokenBalance)
+
+        txn = liquidation.mock.calculateLocalCurrencyLiquidationTokens(
+            accounts[0], currency, nTokenLimit, {"from": accounts[1]}
+        )
+        (localPrimeCashFromLiquidator, nTokensPurchased, _, _) = txn.events[
+            "LocalLiquidationTokens"
+        ][0].values()
+
+        factors = get_liquidation_factors(
+            liquidation, accounts[0], currency, 0, nTokenBalance, txn.timestamp
+        )
+        (localPrimeCash, nTokens) = calculate_local_currency_liquidation(
+            factors, [nTokenBalance], [nTokenLimit]
+        )
+        assert localPrimeCash[0] == localPrimeCashFromLiquidator
+        assert nTokens[0] == nTokensPurchased
+
+
+@pytest.mark.liquidation
+class TestOffChainCollateralLiquidation:
+    @pytest.fixture(scope="module", autouse=True)
+    def liquidation(
+        self,
+        MockCollateralLiquidation,
+        SettleAssetsExternal,
+        FreeCollateralExternal,
+        FreeCollateralAtTime,
+        accounts,
+    ):
+        SettleAssetsExternal.deploy({"from": accounts[0]})
+        FreeCollateralExternal.deploy({"from": accounts[0]})
+        FreeCollateralAtTime.deploy({"from": accounts[0]})
+        return ValuationMock(accounts[0], MockCollateralLiquidation)
+
+    @pytest.fixture(autouse=True)
+    def isolation(self, fn_isolation):
+        pass
+
+    @given(
+        local=strategy("uint", min_value=1, max_value=4),
+        localDebt=strategy("int", min_value=-100_000e8, max_value=-1e8),
+        ratio=strategy("uint", min_value=5, max_value=150),
+        balanceShare=strategy("uint", min_value=0, max_value=100),
+        acceptNToken=strategy("bool"),
+    )
+    def test_collateral_liquidation_parity(
+        self, liquidation, accounts, local, localDebt, ratio, balanceShare, acceptNToken
+    ):
+        blockTime = chain.time()
+        localDebtAsset = liquidation.calculate_from_underlying(local, localDebt, blockTime)
+        (collateral, collateralUnderlying) = setup_collateral_liquidation(
+            liquidation, local, localDebt
+        )
+        collateralAssetRequired = liquidation.calculate_from_underlying(
+            collateral, collateralUnderlying, blockTime
+        )
+
+        # Splits the collateral between cash and nTokens
+        collateralCashAsset = Wei(collateralAssetRequired * balanceShare / 100)
+        nTokenBalance = liquidation.calculate_ntoken_from_asset(
+            collateral,
+            collateralAssetRequired * (100 - balanceShare) / 100,
+            blockTime,
+            valueType="haircut",
+        )
+        liquidation.mock.setBalance(accounts[0], collateral, collateralCashAsset, nTokenBalance)
+        liquidation.mock.setBalance(accounts[0], local, localDebtAsset, 0)
+
+        (newExchangeRate, discountedExchangeRate) = move_collateral_exchange_rate(
+            liquidation, local, collateral, ratio
+        )
+        maxNTokenLiquidation = 0 if acceptNToken else 1
+        txn = liquidation.mock.calculateCollateralCurrencyTokens(
+            accounts[0], local, collateral, 0, maxNTokenLiquidation, {"from": accounts[1]}
+        )
+        (
+            localPrimeCashFromLiquidator,
+            collateralPrimeCashToLiquidator,
+            nTokensPurchased,
+            _,
+            _,
+        ) = txn.events["CollateralLiquidationTokens"][0].values()
+
+        factors = get_liquidation_factors(
+            liquidation, accounts[0], local, collateral, nTokenBalance, txn.timestamp
+        )
+        (localPrimeCash, collateralPrimeCash, nTokens) = calculate_collateral_currency_liquidation(
+            factors, [collateralCashAsset], [nTokenBalance], 0, maxNTokenLiquidation
+        )
+        assert localPrimeCash[0] == localPrimeCashFromLiquidator
+        assert collateralPrimeCash[0] == collateralPrimeCashToLiquidator
+        assert nTokens[0] == nTokensPurchased
+
+        # The off chain result is also within the tolerance of the expected trade
+        (expectedCollateralTrade, *_) = get_expected(
+            liquidation,
+            local,
+            collateral,
+            newExchangeRate,
+            discountedExchangeRate,
+            liquidation.calculate_to_underlying(
+                collateral, factors.collateralAssetAvailable[0], txn.timestamp
+            ),
+            factors.netETHValue[0],
+        )
+        totalCollateralValueToLiquidator = collateralPrimeCash[0] + (
+            liquidation.calculate_ntoken_to_asset(
+                collateral, nTokens[0], txn.timestamp, valueType="liquidator"
+            )
+        )
+        assert (
+            pytest.approx(
+                liquidation.calculate_from_underlying(collateral, expectedCollateralTrade),
+                rel=1e-2,
+            )
+            == totalCollateralValueToLiquidator
+        )
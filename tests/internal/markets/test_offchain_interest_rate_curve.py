@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+from brownie.test import given, strategy
+from scripts.offchain.interest_rate_curve import (
+    InterestRateParameters,
+    decode_curve_storage,
+    get_interest_rate,
+    get_post_fee_interest_rate,
+    get_utilization_from_interest_rate,
+    read_curve_storage,
+    set_interest_rate_params,
+)
+from tests.helpers import get_interest_rate_curve
+
+NUM_EXAMPLES = 512
+CURVES = {
+    0: get_interest_rate_curve(maxRateUnits=200, kinkRate2=200),
+    1: get_interest_rate_curve(),
+    2: get_interest_rate_curve(kinkUtilization1=15, kinkUtilization2=80, feeRatePercent=20),
+    3: get_interest_rate_curve(kinkRate1=10, kinkRate2=250, maxRateUnits=180),
+    4: get_interest_rate_curve(minFeeRateBPS=1, maxFeeRateBPS=8, feeRatePercent=50),
+    5: get_interest_rate_curve(kinkUtilization2=100, maxRateUnits=255),
+    6: get_interest_rate_curve(kinkUtilization1=1, kinkUtilization2=2, maxRateUnits=1),
+    7: get_interest_rate_curve(feeRatePercent=0, minFeeRateBPS=0, maxFeeRateBPS=0),
+}
+
+
+class TestOffchainInterestRateCurve:
+    @pytest.fixture(autouse=True)
+    def isolation(self, fn_isolation):
+        pass
+
+    @pytest.fixture(scope="module", autouse=True)
+    def mock(self, MockInterestRateCurve, accounts):
+        mock = accounts[0].deploy(MockInterestRateCurve)
+        for currencyId in [1, 2]:
+            mock.setPrimeCashInterestRateParameters(currencyId, CURVES[0])
+            for (marketIndex, curve) in CURVES.items():
+                if marketIndex > 0:
+                    mock.setNextInterestRateParameters(currencyId, marketIndex, curve)
+            mock.setActiveInterestRateParameters(currencyId)
+
+        return mock
+
+    @pytest.fixture
+    def rng(self):
+        return np.random.default_rng(31)
+
+    def expected_storage(self):
+        storage = [0, 0]
+        for (marketIndex, curve) in CURVES.items():
+            storage = set_interest_rate_params(storage, marketIndex, curve)
+        return storage
+
+    def test_decodes_storage(self, mock):
+        storage = read_curve_storage(mock.address, [1, 2])
+        assert [
+            int.from_bytes(storage[0, i].tobytes(), "big") for i in range(2)
+        ] == self.expected_storage()
+
+        params = decode_curve_storage(storage[:, np.newaxis], np.arange(0, 8))
+        assert params.maxRate.shape == (2, 8)
+
+        for currencyId in [1, 2]:
+            for marketIndex in range(0, 8):
+                onChain = (
+                    mock.getPrimeCashInterestRateParameters(currencyId)
+                    if marketIndex == 0
+                    else mock.getActiveInterestRateParameters(currencyId, marketIndex)
+                )
+                offChain = [int(f[currencyId - 1, marketIndex]) for f in params]
+                assert offChain == list(onChain)
+
+    def test_decodes_next_storage(self, mock):
+        mock.setNextInterestRateParameters(1, 3, get_interest_rate_curve(feeRatePercent=42))
+        params = decode_curve_storage(read_curve_storage(mock.address, [1], active=False), 3)
+
+        assert int(params.feeRatePercent[0]) == 42
+        assert [int(f[0]) for f in params] == list(mock.getNextInterestRateParameters(1, 3))
+
+    def test_rejects_invalid_market_index(self):
+        with pytest.raises(ValueError):
+            decode_curve_storage(self.expected_storage(), 8)
+
+    @pytest.mark.parametrize("marketIndex", range(1, 8))
+    def test_interest_rate_parity(self, mock, rng, marketIndex):
+        params = decode_curve_storage(self.expected_storage(), marketIndex)
+        utilization = np.concatenate(
+            [
+                [0, 10 ** 9, int(params.kinkUtilization1), int(params.kinkUtilization2)],
+                rng.integers(0, 10 ** 9 + 1, size=NUM_EXAMPLES),
+            ]
+        )
+        isBorrow = rng.random(len(utilization)) < 0.5
+
+        preFee = get_interest_rate(params, utilization)
+        postFee = get_post_fee_interest_rate(params, preFee, isBorrow)
+        (onChainPreFee, onChainPostFee) = mock.batchGetInterestRates(
+            1, marketIndex, [bool(b) for b in isBorrow], [int(u) for u in utilization]
+        )
+        assert list(preFee) == list(onChainPreFee)
+        assert list(postFee) == list(onChainPostFee)
+
+        rates = rng.integers(0, int(params.maxRate) * 6 // 5 + 1, size=NUM_EXAMPLES)
+        onChainUtilization = mock.batchGetUtilizationFromInterestRate(
+            1, marketIndex, [int(r) for r in rates]
+        )
+        assert list(get_utilization_from_interest_rate(params, rates)) == list(onChainUtilization)
+
+    def test_vectorized_surface(self, mock, rng):
+        storage = read_curve_storage(mock.address, [1, 2])
+        params = decode_curve_storage(storage[:, np.newaxis], np.arange(1, 8))
+        # Broadcast (currency, market) parameters against a utilization axis
+        surface = InterestRateParameters(*[f[..., np.newaxis] for f in params])
+        utilization = rng.integers(0, 10 ** 9 + 1, size=64)
+        rates = get_interest_rate(surface, utilization)
+
+        assert rates.shape == (2, 7, 64)
+        for marketIndex in range(1, 8):
+            (preFee, _) = mock.batchGetInterestRates(
+                2, marketIndex, [False] * 64, [int(u) for u in utilization]
+            )
+            assert list(rates[1, marketIndex - 1]) == list(preFee)
+
+    @given(utilization=strategy("uint256", min_value=10 ** 9 + 1, max_value=2 ** 128))
+    def test_reverts_above_max_utilization(self, mock, utilization):
+        params = decode_curve_storage(self.expected_storage(), 1)
+        with pytest.raises(ValueError):
+            get_interest_rate(params, [utilization])
+
+    def test_uninitialized_curve_reverts(self):
+        params = decode_curve_storage([0, 0], 1)
+        with pytest.raises(ValueError):
+            get_interest_rate(params, [0])
+        with pytest.raises(ValueError):
+            get_utilization_from_interest_rate(params, [0])
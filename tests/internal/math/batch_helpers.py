@@ -0,0 +1,159 @@
+import numpy as np
+
+# Number of inputs sent per eth_call, sized to stay well under the node gas cap
+# for the most expensive batch entry point (interest rate curve evaluation).
+DEFAULT_CHUNK_SIZE = 512
+RATE_PRECISION = 10 ** 9
+PERCENTAGE_DECIMALS = 100
+
+
+def evaluate_chunked(fn, *arrays, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Calls a batch entry point over equally sized input arrays in chunks, returns a list of
+    numpy object arrays (one per return value) covering all the inputs.
+    """
+    length = len(arrays[0])
+    assert all(len(a) == length for a in arrays)
+    results = None
+
+    for start in range(0, length, chunk_size):
+        args = [_to_abi(a[start : start + chunk_size]) for a in arrays]
+        chunk = fn(*args)
+        if not isinstance(chunk, tuple):
+            chunk = (chunk,)
+
+        if results is None:
+            results = [[] for _ in chunk]
+        for (r, c) in zip(results, chunk):
+            r.extend(c)
+
+    return [np.array(r, dtype=object) for r in results]
+
+
+def _to_abi(values):
+    if isinstance(values, np.ndarray) and values.dtype == np.uint8 and values.ndim == 2:
+        # Rows of 32 bytes are bytes32 values
+        return ["0x" + row.tobytes().hex() for row in values]
+    if isinstance(values, np.ndarray) and values.dtype == np.bool_:
+        return [bool(v) for v in values]
+    return [int(v) for v in values]
+
+
+def random_bitmaps(rng, size):
+    """
+    Returns bitmaps as an (n, 32) uint8 array, mixing bit densities so that sparse
+    bitmaps (the common case for portfolios) and edge cases are well represented.
+    """
+    density = rng.choice([0.005, 0.02, 0.1, 0.5, 0.9], size=(size, 1))
+    bits = (rng.random((size, 256)) < density).astype(np.uint8)
+    edges = np.zeros((4, 256), dtype=np.uint8)
+    edges[1, :] = 1
+    edges[2, 0] = 1
+    edges[3, 255] = 1
+    return np.packbits(np.vstack([edges, bits]), axis=1)
+
+
+def bitmaps_from_abi(values):
+    return np.vstack([np.frombuffer(bytes(v), dtype=np.uint8) for v in values])
+
+
+def random_uints(rng, size, bits):
+    """Returns random uints of varying bit lengths up to `bits` as a numpy object array"""
+    words = (bits + 63) // 64
+    raw = rng.integers(0, 2 ** 64, size=(size, words), dtype=np.uint64)
+    values = np.array(
+        [sum(int(w) << (64 * i) for (i, w) in enumerate(row)) for row in raw], dtype=object
+    )
+    shifts = rng.integers(0, bits, size=size).astype(object)
+    values = (values % (2 ** bits)) >> shifts
+    edges = np.array([0, 1, 2 ** 24 - 1, 2 ** 24, 2 ** 48 - 1, 2 ** 48, 2 ** bits - 1], dtype=object)
+    return np.concatenate([edges, values])
+
+
+# Vectorized reference implementations of contracts/math/Bitmap.sol
+def ref_is_bit_set(bitmaps, indexes):
+    bits = np.unpackbits(bitmaps, axis=1)
+    return bits[np.arange(len(bitmaps)), indexes - 1].astype(bool)
+
+
+def ref_set_bit(bitmaps, indexes, setOn):
+    bits = np.unpackbits(bitmaps, axis=1)
+    bits[np.arange(len(bitmaps)), indexes - 1] = setOn
+    return np.packbits(bits, axis=1)
+
+
+def ref_total_bits_set(bitmaps):
+    return np.unpackbits(bitmaps, axis=1).sum(axis=1)
+
+
+def ref_next_bit_num(bitmaps):
+    bits = np.unpackbits(bitmaps, axis=1)
+    return np.where(bits.any(axis=1), bits.argmax(axis=1) + 1, 0)
+
+
+def ref_next_bit_num_after(bitmaps, bitNums):
+    # First set bit strictly after bitNum (one indexed from the left), zero if there is none
+    bits = np.unpackbits(bitmaps, axis=1)
+    bits[np.arange(256) < bitNums[:, None]] = 0
+    return ref_next_bit_num(np.packbits(bits, axis=1))
+
+
+def ref_msb(bitmaps):
+    # MSB is zero indexed from the right, undefined for zero values
+    return 256 - ref_next_bit_num(bitmaps)
+
+
+# Vectorized reference implementation of contracts/math/FloatingPoint.sol
+_bit_length = np.frompyfunc(int.bit_length, 1, 1)
+
+
+def ref_pack(values, mantissaBits):
+    msb = _bit_length(values) - 1
+    bitShift = np.where(values > 2 ** mantissaBits - 1, msb - (mantissaBits - 1), 0).astype(object)
+    packed = ((values >> bitShift) << 8) | bitShift
+    unpacked = (packed >> 8) << bitShift
+    return (packed, unpacked)
+
+
+# Vectorized reference implementation of contracts/internal/markets/InterestRateCurve.sol,
+# all intermediate values fit inside int64 since utilization and rates are in RATE_PRECISION
+def ref_interest_rate(params, utilization):
+    u = np.asarray(utilization, dtype=np.int64)
+    (ku1, ku2, kr1, kr2, maxRate) = (
+        params["kinkUtilization1"],
+        params["kinkUtilization2"],
+        params["kinkRate1"],
+        params["kinkRate2"],
+        params["maxRate"],
+    )
+
+    lower = u * kr1 // max(ku1, 1)
+    middle = (u - ku1) * (kr2 - kr1) // (ku2 - ku1) + kr1
+    upper = (u - ku2) * (maxRate - kr2) // max(RATE_PRECISION - ku2, 1) + kr2
+    return np.where(u <= ku1, lower, np.where(u <= ku2, middle, upper))
+
+
+def ref_post_fee_interest_rate(params, preFeeInterestRate, isBorrow):
+    pre = np.asarray(preFeeInterestRate, dtype=np.int64)
+    feeRate = np.clip(
+        pre * params["feeRatePercent"] // PERCENTAGE_DECIMALS,
+        params["minFeeRate"],
+        params["maxFeeRate"],
+    )
+    return np.where(isBorrow, pre + feeRate, np.where(feeRate > pre, 0, pre - feeRate))
+
+
+def ref_utilization_from_interest_rate(params, interestRate):
+    r = np.asarray(interestRate, dtype=np.int64)
+    (ku1, ku2, kr1, kr2, maxRate) = (
+        params["kinkUtilization1"],
+        params["kinkUtilization2"],
+        params["kinkRate1"],
+        params["kinkRate2"],
+        params["maxRate"],
+    )
+
+    lower = r * ku1 // kr1
+    middle = (r - kr1) * (ku2 - ku1) // (kr2 - kr1) + ku1
+    upper = (r - kr2) * (RATE_PRECISION - ku2) // (maxRate - kr2) + ku2
+    return np.where(r <= kr1, lower, np.where(r <= kr2, middle, upper))
@@ -0,0 +1,181 @@
+import numpy as np
+import pytest
+from brownie.test import given, strategy
+from tests.helpers import get_interest_rate_curve
+from tests.internal.math.batch_helpers import (
+    bitmaps_from_abi,
+    evaluate_chunked,
+    random_bitmaps,
+    random_uints,
+    ref_interest_rate,
+    ref_is_bit_set,
+    ref_msb,
+    ref_next_bit_num,
+    ref_next_bit_num_after,
+    ref_pack,
+    ref_post_fee_interest_rate,
+    ref_set_bit,
+    ref_total_bits_set,
+    ref_utilization_from_interest_rate,
+)
+
+NUM_EXAMPLES = 4096
+
+
+@pytest.mark.math
+class TestBatchFuzz:
+    """
+    Evaluates thousands of inputs per test against the batch entry points on the math
+    mocks, chunked into a handful of eth_calls, and compares them to vectorized
+    reference implementations in batch_helpers.
+    """
+
+    @pytest.fixture(scope="module", autouse=True)
+    def mockBitmap(self, MockBitmap, accounts):
+        return accounts[0].deploy(MockBitmap)
+
+    @pytest.fixture(scope="module", autouse=True)
+    def floatingPoint(self, MockFloatingPoint, accounts):
+        return accounts[0].deploy(MockFloatingPoint)
+
+    @pytest.fixture(scope="module", autouse=True)
+    def interestRateCurve(self, MockInterestRateCurve, accounts):
+        return accounts[0].deploy(MockInterestRateCurve)
+
+    @pytest.fixture(autouse=True)
+    def isolation(self, fn_isolation):
+        pass
+
+    @pytest.fixture(scope="module")
+    def rng(self):
+        return np.random.default_rng(20210101)
+
+    def test_batch_bitmap_is_bit_set(self, mockBitmap, rng):
+        bitmaps = random_bitmaps(rng, NUM_EXAMPLES)
+        indexes = rng.integers(1, 257, size=len(bitmaps))
+
+        (result,) = evaluate_chunked(mockBitmap.batchIsBitSet, bitmaps, indexes)
+        assert np.array_equal(result.astype(bool), ref_is_bit_set(bitmaps, indexes))
+
+    def test_batch_bitmap_set_bit(self, mockBitmap, rng):
+        bitmaps = random_bitmaps(rng, NUM_EXAMPLES)
+        indexes = rng.integers(1, 257, size=len(bitmaps))
+        setOn = rng.random(len(bitmaps)) < 0.5
+
+        (result,) = evaluate_chunked(mockBitmap.batchSetBit, bitmaps, indexes, setOn)
+        assert np.array_equal(bitmaps_from_abi(result), ref_set_bit(bitmaps, indexes, setOn))
+
+    def test_batch_bitmap_total_bits_set(self, mockBitmap, rng):
+        bitmaps = random_bitmaps(rng, NUM_EXAMPLES)
+
+        (result,) = evaluate_chunked(mockBitmap.batchTotalBitsSet, bitmaps)
+        assert np.array_equal(result.astype(np.int64), ref_total_bits_set(bitmaps))
+
+    def test_batch_bitmap_msb_and_bit_num(self, mockBitmap, rng):
+        bitmaps = random_bitmaps(rng, NUM_EXAMPLES)
+
+        (bitNum,) = evaluate_chunked(mockBitmap.batchGetNextBitNum, bitmaps)
+        assert np.array_equal(bitNum.astype(np.int64), ref_next_bit_num(bitmaps))
+
+        # getMSB reverts on zero values so they are excluded from the batch
+        nonZero = bitmaps[bitmaps.any(axis=1)]
+        values = np.array([int.from_bytes(b.tobytes(), "big") for b in nonZero], dtype=object)
+        (msb,) = evaluate_chunked(mockBitmap.batchGetMSB, values)
+        assert np.array_equal(msb.astype(np.int64), ref_msb(nonZero))
+
+    def test_batch_bitmap_msb_parity(self, mockBitmap, rng):
+        # Every single bit position and random values of every bit length
+        values = np.concatenate(
+            [
+                np.array([2 ** i for i in range(256)], dtype=object),
+                np.array([2 ** (i + 1) - 1 for i in range(256)], dtype=object),
+                random_uints(rng, NUM_EXAMPLES, 256),
+            ]
+        )
+        values = values[values != 0]
+
+        (msb, binarySearch) = evaluate_chunked(mockBitmap.batchGetMSBParity, values)
+        assert list(msb) == list(binarySearch)
+        assert list(msb) == [int(v).bit_length() - 1 for v in values]
+
+    def test_batch_bitmap_next_bit_num_after(self, mockBitmap, rng):
+        bitmaps = random_bitmaps(rng, NUM_EXAMPLES)
+        bitNums = rng.integers(0, 257, size=len(bitmaps))
+
+        (result,) = evaluate_chunked(mockBitmap.batchGetNextBitNumAfter, bitmaps, bitNums)
+        assert np.array_equal(result.astype(np.int64), ref_next_bit_num_after(bitmaps, bitNums))
+
+    @pytest.mark.parametrize("mantissaBits", [48, 24])
+    def test_batch_floating_point(self, floatingPoint, rng, mantissaBits):
+        values = random_uints(rng, NUM_EXAMPLES, 128)
+        batchFn = (
+            floatingPoint.batchPackingUnpacking56
+            if mantissaBits == 48
+            else floatingPoint.batchPackingUnpacking32
+        )
+
+        (packed, unpacked) = evaluate_chunked(batchFn, values)
+        (refPacked, refUnpacked) = ref_pack(values, mantissaBits)
+        assert [int(p.hex(), 16) for p in packed] == list(refPacked)
+        assert list(unpacked) == list(refUnpacked)
+        # Unpacked values never exceed the original value
+        assert (unpacked <= values).all()
+
+    @given(
+        kinkUtilization1=strategy("uint8", min_value=1, max_value=49),
+        kinkUtilization2=strategy("uint8", min_value=50, max_value=100),
+        kinkRate1=strategy("uint8", min_value=1, max_value=127),
+        kinkRate2=strategy("uint8", min_value=128, max_value=255),
+        maxRateUnits=strategy("uint8", min_value=1),
+        feeRatePercent=strategy("uint8", max_value=99),
+    )
+    def test_batch_interest_rates(
+        self,
+        interestRateCurve,
+        rng,
+        kinkUtilization1,
+        kinkUtilization2,
+        kinkRate1,
+        kinkRate2,
+        maxRateUnits,
+        feeRatePercent,
+    ):
+        interestRateCurve.setNextInterestRateParameters(
+            1,
+            1,
+            get_interest_rate_curve(
+                kinkUtilization1=kinkUtilization1,
+                kinkUtilization2=kinkUtilization2,
+                kinkRate1=kinkRate1,
+                kinkRate2=kinkRate2,
+                maxRateUnits=maxRateUnits,
+                feeRatePercent=feeRatePercent,
+            ),
+        )
+        interestRateCurve.setActiveInterestRateParameters(1)
+        params = interestRateCurve.getActiveInterestRateParameters(1, 1)
+
+        utilization = np.concatenate(
+            [
+                [0, 10 ** 9, params["kinkUtilization1"], params["kinkUtilization2"]],
+                rng.integers(0, 10 ** 9 + 1, size=NUM_EXAMPLES),
+            ]
+        ).astype(np.int64)
+        isBorrow = rng.random(len(utilization)) < 0.5
+
+        (preFee, postFee) = evaluate_chunked(
+            lambda b, u: interestRateCurve.batchGetInterestRates(1, 1, b, u), isBorrow, utilization
+        )
+        refPreFee = ref_interest_rate(params, utilization)
+        assert np.array_equal(preFee.astype(np.int64), refPreFee)
+        assert np.array_equal(
+            postFee.astype(np.int64), ref_post_fee_interest_rate(params, refPreFee, isBorrow)
+        )
+
+        rates = rng.integers(0, params["maxRate"] * 6 // 5, size=NUM_EXAMPLES)
+        (utilizationFromRate,) = evaluate_chunked(
+            lambda r: interestRateCurve.batchGetUtilizationFromInterestRate(1, 1, r), rates
+        )
+        assert np.array_equal(
+            utilizationFromRate.astype(np.int64), ref_utilization_from_interest_rate(params, rates)
+        )
@@ -61,3 +61,11 @@ class TestBitmap:
         else:
             assert msb == (255 - min(indexes))
             assert bitNum == (min(indexes) + 1)
+
+    @given(bitmap=strategy("bytes32"))
+    def test_set_bit_iteration(self, mockBitmap, bitmap):
+        bitstring = "{:0256b}".format(int(bitmap.hex(), 16))
+        bitNums = [i + 1 for (i, b) in enumerate(list(bitstring)) if b == "1"]
+
+        assert mockBitmap.getSetBits(bitmap) == bitNums
+        assert mockBitmap.getSetBitsBinarySearch(bitmap) == bitNums
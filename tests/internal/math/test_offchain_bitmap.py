@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+from brownie import Contract
+from brownie.test import given, strategy
+from scripts.offchain.bitmap import (
+    get_assets_bitmap,
+    get_assets_bitmap_maturities,
+    get_bit_nums,
+    get_msb,
+    get_next_bit_num,
+    is_bit_set,
+    set_bit,
+    total_bits_set,
+)
+from scripts.offchain.date_time import get_bit_num_from_maturity, get_maturity_from_bit_num
+from tests.constants import SECONDS_IN_DAY, SECONDS_IN_YEAR, START_TIME
+from tests.internal.math.batch_helpers import bitmaps_from_abi, evaluate_chunked, random_bitmaps
+
+NUM_EXAMPLES = 1024
+
+
+@pytest.mark.math
+class TestOffChainBitmap:
+    @pytest.fixture(scope="module", autouse=True)
+    def mockBitmap(self, MockBitmap, accounts):
+        return accounts[0].deploy(MockBitmap)
+
+    @pytest.fixture(scope="module", autouse=True)
+    def bitmapAssets(self, MockBitmapAssetsHandler, MockSettingsLib, accounts):
+        settings = MockSettingsLib.deploy({"from": accounts[0]})
+        handler = MockBitmapAssetsHandler.deploy(settings.address, {"from": accounts[0]})
+        return Contract.from_abi(
+            "mock",
+            handler.address,
+            MockSettingsLib.abi + MockBitmapAssetsHandler.abi,
+            owner=accounts[0],
+        )
+
+    @pytest.fixture(autouse=True)
+    def isolation(self, fn_isolation):
+        pass
+
+    @pytest.fixture(scope="module")
+    def rng(self):
+        return np.random.default_rng(20210101)
+
+    def test_bitmap_operations(self, mockBitmap, rng):
+        bitmaps = random_bitmaps(rng, NUM_EXAMPLES)
+        indexes = rng.integers(1, 257, size=len(bitmaps))
+        setOn = rng.random(len(bitmaps)) < 0.5
+
+        (result,) = evaluate_chunked(mockBitmap.batchIsBitSet, bitmaps, indexes)
+        assert np.array_equal(is_bit_set(bitmaps, indexes), result.astype(bool))
+
+        (result,) = evaluate_chunked(mockBitmap.batchSetBit, bitmaps, indexes, setOn)
+        assert np.array_equal(set_bit(bitmaps, indexes, setOn), bitmaps_from_abi(result))
+
+        (result,) = evaluate_chunked(mockBitmap.batchTotalBitsSet, bitmaps)
+        assert np.array_equal(total_bits_set(bitmaps), result.astype(np.int64))
+
+        (result,) = evaluate_chunked(mockBitmap.batchGetNextBitNum, bitmaps)
+        assert np.array_equal(get_next_bit_num(bitmaps), result.astype(np.int64))
+
+        nonZero = bitmaps[bitmaps.any(axis=1)]
+        values = [int.from_bytes(row.tobytes(), "big") for row in nonZero]
+        (result,) = evaluate_chunked(mockBitmap.batchGetMSB, values)
+        assert np.array_equal(get_msb(nonZero), result.astype(np.int64))
+
+    def test_bit_nums_iterate_in_order(self, mockBitmap, rng):
+        bitmaps = random_bitmaps(rng, 16)
+        (index, bitNums) = get_bit_nums(bitmaps)
+
+        for (i, bitmap) in enumerate(bitmaps):
+            expected = []
+            value = int.from_bytes(bitmap.tobytes(), "big")
+            while value != 0:
+                bitNum = mockBitmap.getNextBitNum(value.to_bytes(32, "big"))
+                expected.append(bitNum)
+                value &= ~(1 << (256 - bitNum))
+            assert list(bitNums[index == i]) == expected
+
+    @given(
+        blockTime=strategy("uint", min_value=START_TIME, max_value=START_TIME + SECONDS_IN_YEAR),
+        offset=strategy("int", min_value=-SECONDS_IN_DAY, max_value=8000 * SECONDS_IN_DAY),
+    )
+    def test_bit_num_from_maturity(self, bitmapAssets, blockTime, offset):
+        # Half of the examples are aligned to a day boundary
+        maturity = blockTime + offset
+        maturities = [maturity, maturity - maturity % SECONDS_IN_DAY]
+        (bitNum, isExact) = get_bit_num_from_maturity(blockTime, maturities)
+
+        for (i, m) in enumerate(maturities):
+            assert (bitNum[i], isExact[i]) == bitmapAssets.getBitNumFromMaturity(blockTime, m)
+
+    @given(blockTime=strategy("uint", min_value=START_TIME, max_value=START_TIME + SECONDS_IN_YEAR))
+    def test_maturity_from_bit_num(self, bitmapAssets, blockTime):
+        bitNums = np.arange(1, 257)
+        maturities = get_maturity_from_bit_num(blockTime, bitNums)
+
+        for bitNum in [1, 90, 91, 135, 136, 195, 196, 256]:
+            assert maturities[bitNum - 1] == bitmapAssets.getMaturityFromBitNum(
+                blockTime, bitNum
+            )
+
+        (roundTrip, isExact) = get_bit_num_from_maturity(blockTime, maturities)
+        assert np.array_equal(roundTrip, bitNums)
+        assert isExact.all()
+
+    def test_decode_assets_bitmap(self, bitmapAssets, accounts, rng):
+        nextSettleTimes = [START_TIME - START_TIME % SECONDS_IN_DAY, START_TIME + SECONDS_IN_DAY]
+        bitmaps = []
+        for (currencyId, nextSettleTime) in enumerate(nextSettleTimes, start=1):
+            for bitNum in rng.choice(np.arange(1, 257), size=10, replace=False):
+                maturity = bitmapAssets.getMaturityFromBitNum(nextSettleTime, int(bitNum))
+                bitmapAssets.addifCashAsset(accounts[0], currencyId, maturity, nextSettleTime, 1e8)
+            bitmaps.append(bitmapAssets.getAssetsBitmap(accounts[0], currencyId))
+
+        (index, maturities) = get_assets_bitmap_maturities(bitmaps, nextSettleTimes)
+        for (currencyId, nextSettleTime) in enumerate(nextSettleTimes, start=1):
+            portfolio = bitmapAssets.getifCashArray(accounts[0], currencyId, nextSettleTime)
+            assert list(maturities[index == currencyId - 1]) == [a[1] for a in portfolio]
+
+        encoded = get_assets_bitmap(index, maturities, nextSettleTimes, len(bitmaps))
+        assert [b.tobytes() for b in encoded] == [bytes(b) for b in bitmaps]
@@ -0,0 +1,155 @@
+import math
+
+import brownie
+import numpy as np
+import pytest
+from brownie import Contract
+from brownie.network import Chain, Rpc
+from brownie.test import given, strategy
+from scripts.offchain.prime_cash import (
+    PrimeCashSeed,
+    as_factors,
+    get_prime_cash_rate_view,
+    project_prime_cash,
+    read_prime_cash_curve,
+)
+from tests.constants import RATE_PRECISION, SECONDS_IN_DAY, SECONDS_IN_YEAR, ZERO_ADDRESS
+from tests.helpers import get_interest_rate_curve
+
+chain = Chain()
+
+
+class TestOffChainPrimeCash:
+    @pytest.fixture(autouse=True)
+    def isolation(self, fn_isolation):
+        pass
+
+    @pytest.fixture(scope="module", autouse=True)
+    def mock(self, MockPrimeCash, MockSettingsLib, accounts):
+        settingsLib = MockSettingsLib.deploy({"from": accounts[0]})
+        mock = MockPrimeCash.deploy(settingsLib, {"from": accounts[0]})
+        # 100_000e18 ETH
+        Rpc().backend._request(
+            "evm_setAccountBalance",
+            [mock.address, "0x00000000000000000000000000000000000000000000152d02c7e14af6800000"],
+        )
+
+        return Contract.from_abi(
+            "mock", mock.address, MockSettingsLib.abi + mock.abi, owner=accounts[0]
+        )
+
+    @pytest.fixture(scope="module", autouse=True)
+    def oracle(self, UnderlyingHoldingsOracle, mock, accounts):
+        return UnderlyingHoldingsOracle.deploy(mock.address, ZERO_ADDRESS, {"from": accounts[0]})
+
+    def init_prime_cash(self, mock, oracle, utilization, **kwargs):
+        debt = math.floor(100_000e8 * (utilization / (RATE_PRECISION - utilization)))
+        txn = mock.initPrimeCashCurve(
+            1, 100_000e8, debt, get_interest_rate_curve(**kwargs), oracle, True
+        )
+        return txn.timestamp
+
+    def get_seed(self, mock, oracle):
+        (_, underlyingValue) = oracle.getTotalUnderlyingValueView()
+        return PrimeCashSeed(
+            1,
+            read_prime_cash_curve(mock.address, 1),
+            as_factors(mock.getPrimeCashFactors(1)),
+            underlyingValue,
+        )
+
+    def check_view_parity(self, mock, projection, index, blockTime):
+        (pr, factors) = mock.buildPrimeRateView(1, int(blockTime))
+        assert not projection.reverted[index]
+        assert [f[index] for f in projection.factors] == list(factors)
+        assert projection.supplyFactor[index] == pr["supplyFactor"]
+        assert projection.debtFactor[index] == pr["debtFactor"]
+
+    @given(
+        offset=strategy("int", min_value=1, max_value=SECONDS_IN_YEAR),
+        utilization=strategy("int", min_value=0, max_value=RATE_PRECISION),
+    )
+    def test_projection_matches_view(self, mock, oracle, offset, utilization):
+        start = self.init_prime_cash(mock, oracle, utilization)
+        seed = self.get_seed(mock, oracle)
+        blockTimes = [start, start + 1, start + offset, start + SECONDS_IN_YEAR]
+        projection = project_prime_cash(seed, blockTimes)
+
+        for (i, blockTime) in enumerate(blockTimes):
+            self.check_view_parity(mock, projection, i, blockTime)
+
+        # Same block time returns the stored factors without accruing
+        assert projection.primeSupplyToReserve[0] == 0
+        if 0.01e9 < utilization:
+            assert projection.primeSupplyToReserve[-1] > 0
+            assert projection.debtFactor[-1] > projection.supplyFactor[-1]
+
+    def test_projection_over_underlying_scenarios(self, mock, oracle):
+        start = self.init_prime_cash(mock, oracle, 0.5e9)
+        seed = self.get_seed(mock, oracle)
+        scalesBPS = [10000, 10500, 12000, 15000]
+        blockTimes = np.array([start + SECONDS_IN_DAY, start + 90 * SECONDS_IN_DAY])
+        underlyingValue = np.array([seed.underlyingValue * s // 10000 for s in scalesBPS])
+        projection = project_prime_cash(
+            seed, blockTimes[np.newaxis, :], underlyingValue=underlyingValue[:, np.newaxis]
+        )
+
+        for (i, value) in enumerate(underlyingValue):
+            # ETH has 18 decimals, the oracle reports values in 8 decimals
+            mock.setStoredTokenBalance(ZERO_ADDRESS, int(value) * 10 ** 10)
+            for (j, blockTime) in enumerate(blockTimes):
+                self.check_view_parity(mock, projection, (i, j), blockTime)
+
+    def test_projection_over_utilization_scenarios(self, mock, oracle):
+        for utilization in [0, 0.1e9, 0.5e9, 0.9e9]:
+            start = self.init_prime_cash(mock, oracle, utilization)
+            seed = self.get_seed(mock, oracle)
+            offsets = np.array([0, SECONDS_IN_DAY, 30 * SECONDS_IN_DAY])
+            blockTimes = start + offsets
+            projection = project_prime_cash(seed, blockTimes)
+            rateProjection = get_prime_cash_rate_view(
+                seed.irParams, seed.factors, seed.underlyingValue, blockTimes
+            )
+
+            for (i, blockTime) in enumerate(blockTimes):
+                self.check_view_parity(mock, projection, i, blockTime)
+                assert rateProjection[0].supplyFactor[i] == projection.supplyFactor[i]
+
+            # Prime cash can only be initialized once per currency
+            chain.undo()
+
+    def test_compound_projection_matches_stateful_accrual(self, mock, oracle):
+        start = self.init_prime_cash(mock, oracle, 0.7e9)
+        seed = self.get_seed(mock, oracle)
+        blockTimes = start + np.arange(1, 11) * 7 * SECONDS_IN_DAY
+        projection = project_prime_cash(seed, blockTimes, compound=True)
+
+        for (i, blockTime) in enumerate(blockTimes):
+            pr = mock.buildPrimeRateStateful(1, int(blockTime)).return_value
+            assert not projection.reverted[i]
+            assert [f[i] for f in projection.factors] == list(mock.getPrimeCashFactors(1))
+            assert projection.supplyFactor[i] == pr["supplyFactor"]
+            assert projection.debtFactor[i] == pr["debtFactor"]
+
+        # Fees accrue to the reserve along the path and are included in the total supply
+        reserve = projection.primeSupplyToReserve
+        assert all(reserve[1:] > reserve[:-1])
+        assert (
+            projection.factors.totalPrimeSupply[-1]
+            == seed.factors.totalPrimeSupply + reserve[-1]
+        )
+
+    def test_projection_flags_reverts(self, mock, oracle):
+        start = self.init_prime_cash(mock, oracle, 0.5e9)
+        seed = self.get_seed(mock, oracle)
+        projection = project_prime_cash(
+            seed,
+            [start - 1, start, start + 1],
+            underlyingValue=[seed.underlyingValue, 0, seed.underlyingValue - 1],
+        )
+
+        # Decreasing block time and a falling underlying value revert, the same block time
+        # does not accrue and cannot revert
+        assert list(projection.reverted) == [True, False, True]
+        with brownie.reverts():
+            mock.buildPrimeRateView(1, start - 1)
@@ -5,6 +5,12 @@ import pytest
 from brownie.convert.datatypes import HexString
 from brownie.test import given, strategy
 from tests.constants import BALANCE_FLAG, PORTFOLIO_FLAG, START_TIME
+from scripts.offchain.account_context import (
+    decode_account_contexts,
+    decode_active_currencies,
+    has_asset_debt,
+    has_cash_debt,
+)
 from tests.helpers import currencies_list_to_active_currency_bytes
 
 
@@ -39,7 +45,7 @@ class TestAccountContext:
     def test_get_and_set_account_context(
         self, accountContext, accounts, length, hasDebt, arrayLength, bitmapId, allowPrimeDebt
     ):
-        currencies = [get_random_flags(random.randint(1, 2 ** 14)) for i in range(0, length)]
+        currencies = [get_random_flags(random.randint(1, 2 ** 14 - 1)) for i in range(0, length)]
         currenciesHex = HexString(currencies_list_to_active_currency_bytes(currencies), "bytes18")
         expectedContext = (
             START_TIME,
@@ -55,12 +61,38 @@ class TestAccountContext:
 
     @given(length=strategy("uint", min_value=0, max_value=9))
     def test_is_active_in_balances(self, accountContext, length):
-        currencies = [get_random_flags(random.randint(1, 2 ** 14)) for i in range(0, length)]
+        currencies = [get_random_flags(random.randint(1, 2 ** 14 - 1)) for i in range(0, length)]
         ac = (0, "0x00", 0, 0, currencies_list_to_active_currency_bytes(currencies), False)
 
         for (c, _, balanceActive) in currencies:
             assert accountContext.isActiveInBalances(ac, c) == balanceActive
 
+    def test_batch_decode_account_contexts(self, accountContext, accounts):
+        expected = []
+        for (i, account) in enumerate(accounts):
+            currencyIds = sorted(random.sample(range(1, 2 ** 14), random.randint(0, 9)))
+            currencies = [get_random_flags(c) for c in currencyIds]
+            activeCurrencies = currencies_list_to_active_currency_bytes(currencies)
+            context = (START_TIME + i, HexString(i % 4, "bytes1"), i, i, activeCurrencies, False)
+            accountContext.setAccountContext(context, account)
+            expected.append(currencies)
+
+        decoded = decode_account_contexts([accountContext.getAccountContext(a) for a in accounts])
+        active = decode_active_currencies(decoded.activeCurrencies)
+        for (i, account) in enumerate(accounts):
+            context = accountContext.getAccountContext(account)
+            assert decoded.nextSettleTime[i] == context[0]
+            assert has_asset_debt(decoded.hasDebt[i]) == (i % 4 & 1 != 0)
+            assert has_cash_debt(decoded.hasDebt[i]) == (i % 4 & 2 != 0)
+            assert decoded.assetArrayLength[i] == context[2]
+            assert decoded.bitmapCurrencyId[i] == context[3]
+
+            assert active.active[i].sum() == len(expected[i])
+            for (j, (currencyId, _, balanceActive)) in enumerate(expected[i]):
+                assert active.currencyId[i][j] == currencyId
+                assert active.inBalances[i][j] == balanceActive
+                assert accountContext.isActiveInBalances(context, currencyId) == balanceActive
+
     def test_active_and_set_portfolio_flag(self, accountContext):
         # is active and in list
         currencies = [(2, True, True), (4, True, False), (512, False, True), (1024, True, False)]
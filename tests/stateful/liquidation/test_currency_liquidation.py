@@ -1,12 +1,13 @@
 import math
 
 import pytest
-from brownie import MockERC20
+from brownie import ZERO_ADDRESS, MockERC20
 from brownie.network.state import Chain
 from brownie.test import given, strategy
 from liquidation_fixtures import *
 from scripts.config import nTokenDefaults
-from tests.helpers import get_balance_trade_action
+from scripts.EventProcessor import processTxn
+from tests.helpers import get_balance_action, get_balance_trade_action
 from tests.snapshot import EventChecker
 
 chain = Chain()
@@ -379,4 +380,190 @@ def test_liquidate_collateral_currency_over_supply_and_debt_cap(env, accounts):
     # Should be able to liquidate still
     check_collateral_currency_liquidation(env, accounts, currencyId, oracle,
         lambda x: len(x) == 1 and x[0]['assetType'] == 'pCash' and x[0]['underlying'] == currencyId
-    )
\ No newline at end of file
+    )
+
+def setup_prime_borrower(env, account, collateralAmount, mintNToken=False):
+    # Deposits ETH collateral and borrows DAI prime cash just below the free collateral limit
+    if mintNToken:
+        env.notional.batchBalanceAction(
+            account,
+            [
+                get_balance_action(
+                    1, "DepositUnderlyingAndMintNToken", depositActionAmount=collateralAmount
+                )
+            ],
+            {"from": account, "value": collateralAmount}
+        )
+    else:
+        env.notional.depositUnderlyingToken(
+            account, 1, collateralAmount, {"from": account, "value": collateralAmount}
+        )
+    env.notional.enablePrimeBorrow(True, {"from": account})
+
+    oracle = env.ethOracle["DAI"]
+    (fc, _) = env.notional.getFreeCollateral(account)
+    buffer = env.notional.getRateStorage(2)["ethRate"]["buffer"]
+    maxBorrowUnderlying = math.floor(fc * 1e18 / oracle.latestAnswer() * 99 / buffer)
+    env.notional.withdraw(
+        2, env.notional.convertUnderlyingToPrimeCash(2, maxBorrowUnderlying * 1e10), True,
+        {"from": account}
+    )
+
+
+def test_liquidate_ntoken_collateral_batch_matches_sequential(env, accounts):
+    # The nToken present value is calculated for the first account and shared with the rest
+    liquidated = accounts[2:4]
+    for (i, account) in enumerate(liquidated):
+        setup_prime_borrower(env, account, (i + 1) * 10e18, mintNToken=True)
+
+    oracle = env.ethOracle["DAI"]
+    oracle.setAnswer(math.floor(oracle.latestAnswer() * 1.10))
+
+    chain.snapshot()
+    sequential = []
+    for account in liquidated:
+        txn = env.notional.liquidateCollateralCurrency(
+            account, 2, 1, 0, 0, True, True, {"from": accounts[0]}
+        )
+        sequential.append(txn.events["LiquidateCollateralCurrency"])
+    chain.revert()
+
+    nTokensBefore = env.nToken[1].balanceOf(accounts[0])
+    txn = env.notional.liquidateCollateralCurrencyBatch(
+        liquidated, 2, 1, [0] * 2, [0] * 2, True, True, {"from": accounts[0]}
+    )
+    batch = txn.events["LiquidateCollateralCurrency"]
+    assert len(batch) == len(sequential)
+
+    for (b, s) in zip(batch, sequential):
+        assert b["liquidated"] == s["liquidated"]
+        assert b["netNTokenTransfer"] > 0
+        assert pytest.approx(b["netNTokenTransfer"], rel=1e-5) == s["netNTokenTransfer"]
+        assert pytest.approx(b["localPrimeCashFromLiquidator"], rel=1e-5) == s[
+            "localPrimeCashFromLiquidator"
+        ]
+
+    (_, _, totalNTokens) = txn.return_value
+    assert totalNTokens == sum(e["netNTokenTransfer"] for e in batch)
+    assert env.nToken[1].balanceOf(accounts[0]) - nTokensBefore == totalNTokens
+
+
+TRANSFER_FIELDS = ["from", "to", "asset", "assetType", "transferType"]
+
+
+def _liquidation_transfers(env, txn, liquidator):
+    # The liquidator's deposit and collateral withdraw are aggregated in a batch, every other
+    # transfer must match the sequential liquidations
+    return [
+        t
+        for t in processTxn(env, txn)["transfers"]
+        if not (t["from"] == ZERO_ADDRESS and t["to"] == liquidator)
+        and not (t["from"] == liquidator and t["to"] == ZERO_ADDRESS)
+    ]
+
+
+def test_liquidate_collateral_currency_batch_event_stream(env, accounts):
+    liquidated = accounts[2:4]
+    for (i, account) in enumerate(liquidated):
+        setup_prime_borrower(env, account, (i + 1) * 10e18)
+
+    oracle = env.ethOracle["DAI"]
+    oracle.setAnswer(math.floor(oracle.latestAnswer() * 1.10))
+
+    chain.snapshot()
+    sequential = []
+    for account in liquidated:
+        txn = env.notional.liquidateCollateralCurrency(
+            account, 2, 1, 0, 0, True, True, {"from": accounts[0]}
+        )
+        sequential.extend(_liquidation_transfers(env, txn, accounts[0]))
+    chain.revert()
+
+    txn = env.notional.liquidateCollateralCurrencyBatch(
+        liquidated, 2, 1, [0] * 2, [0] * 2, True, True, {"from": accounts[0]}
+    )
+    batch = _liquidation_transfers(env, txn, accounts[0])
+
+    assert len(batch) == len(sequential)
+    for (b, s) in zip(batch, sequential):
+        assert {f: b[f] for f in TRANSFER_FIELDS} == {f: s[f] for f in TRANSFER_FIELDS}
+        # Sequential liquidations happen in later blocks, amounts differ by prime rate accrual
+        assert pytest.approx(b["value"], rel=1e-5) == s["value"]
+
+    # As in liquidateCollateralCurrency, the liquidator's local currency deposit is emitted before
+    # any local currency is transferred from the liquidator
+    transfers = processTxn(env, txn)["transfers"]
+    depositIndex = next(
+        i
+        for (i, t) in enumerate(transfers)
+        if t["from"] == ZERO_ADDRESS
+        and t["to"] == accounts[0]
+        and t["asset"] == env.pCash[2].address
+    )
+    firstPaymentIndex = next(
+        i
+        for (i, t) in enumerate(transfers)
+        if t["from"] == accounts[0] and t["to"] in liquidated
+    )
+    assert depositIndex < firstPaymentIndex
+
+
+def test_liquidate_collateral_currency_batch_matches_sequential(env, accounts):
+    liquidated = accounts[2:5]
+    for (i, account) in enumerate(liquidated):
+        setup_prime_borrower(env, account, (i + 1) * 10e18)
+
+    oracle = env.ethOracle["DAI"]
+    oracle.setAnswer(math.floor(oracle.latestAnswer() * 1.10))
+    fcBefore = [env.notional.getFreeCollateral(a)[0] for a in liquidated]
+
+    chain.snapshot()
+    sequential = []
+    for account in liquidated:
+        txn = env.notional.liquidateCollateralCurrency(
+            account, 2, 1, 0, 0, True, True, {"from": accounts[0]}
+        )
+        sequential.append(txn.events["LiquidateCollateralCurrency"])
+    chain.revert()
+
+    liquidatorBalanceBefore = env.notional.getAccountBalance(1, accounts[0])[0]
+    txn = env.notional.liquidateCollateralCurrencyBatch(
+        liquidated, 2, 1, [0] * 3, [0] * 3, True, True, {"from": accounts[0]}
+    )
+    batch = txn.events["LiquidateCollateralCurrency"]
+    assert len(batch) == len(sequential)
+
+    # Sequential liquidations happen in later blocks, amounts differ by prime rate accrual
+    for (b, s) in zip(batch, sequential):
+        assert b["liquidated"] == s["liquidated"]
+        assert b["liquidator"] == accounts[0]
+        assert b["netNTokenTransfer"] == 0
+        assert pytest.approx(b["localPrimeCashFromLiquidator"], rel=1e-5) == s[
+            "localPrimeCashFromLiquidator"
+        ]
+        assert pytest.approx(b["netCollateralTransfer"], rel=1e-5) == s["netCollateralTransfer"]
+
+    # The local prime cash transfer from the liquidator is emitted per account, as in
+    # liquidateCollateralCurrency
+    localTransfers = [
+        e
+        for e in txn.events["Transfer"]
+        if e.address == env.pCash[2].address and e["from"] == accounts[0]
+    ]
+    assert [e["to"] for e in localTransfers] == [a.address for a in liquidated]
+
+    (totalLocal, totalCollateral, totalNTokens) = txn.return_value
+    assert totalLocal == sum(e["localPrimeCashFromLiquidator"] for e in batch)
+    assert totalCollateral == sum(e["netCollateralTransfer"] for e in batch)
+    assert totalNTokens == 0
+    # Collateral is withdrawn to the liquidator
+    assert env.notional.getAccountBalance(1, accounts[0])[0] == liquidatorBalanceBefore
+
+    for (account, fc) in zip(liquidated, fcBefore):
+        assert env.notional.getFreeCollateral(account)[0] > fc
+
+    with brownie.reverts():
+        # Mismatched maximum arrays
+        env.notional.liquidateCollateralCurrencyBatch(
+            liquidated, 2, 1, [0] * 2, [0] * 3, True, True, {"from": accounts[0]}
+        )
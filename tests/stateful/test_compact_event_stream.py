@@ -0,0 +1,117 @@
+import pytest
+from brownie.convert import to_bytes
+from scripts.EventProcessor import (
+    COMPACT_TRANSFER_BATCH,
+    COMPACT_TRANSFER_SINGLE,
+    DecodedEvent,
+    expandCompactTransfers,
+    processTxn,
+)
+from tests.helpers import get_balance_trade_action, initialize_environment
+
+
+@pytest.fixture(scope="module", autouse=True)
+def environment(accounts):
+    return initialize_environment(accounts)
+
+
+@pytest.fixture(autouse=True)
+def isolation(fn_isolation):
+    pass
+
+
+class CompactTxn:
+    # The parts of a brownie transaction read by processTxn, with the events replaced
+    def __init__(self, txn, events):
+        self.txid = txn.txid
+        self.block_number = txn.block_number
+        self.timestamp = txn.timestamp
+        self.events = events
+
+
+def _encode_record(e):
+    # Mirrors the abi.encodePacked records appended by Emitter._transferSingle and _transferBatch
+    data = b"".join(to_bytes(e[f], "bytes20") for f in ["operator", "from", "to"])
+    if e.name == "TransferSingle":
+        return (
+            bytes([COMPACT_TRANSFER_SINGLE])
+            + data
+            + e["id"].to_bytes(32, "big")
+            + e["value"].to_bytes(32, "big")
+        )
+
+    return (
+        bytes([COMPACT_TRANSFER_BATCH])
+        + data
+        + bytes([len(e["ids"])])
+        + b"".join(i.to_bytes(32, "big") for i in e["ids"])
+        + b"".join(v.to_bytes(32, "big") for v in e["values"])
+    )
+
+
+def _compact_events(environment, events):
+    """Packs every run of consecutive ERC1155 events into a CompactTransfers log"""
+    compact = []
+    records = b""
+    for e in list(events) + [None]:
+        if e is not None and e.address == environment.notional.address and e.name in [
+            "TransferSingle",
+            "TransferBatch",
+        ]:
+            records += _encode_record(e)
+            continue
+
+        if records:
+            compact.append(
+                DecodedEvent(
+                    "CompactTransfers",
+                    environment.notional.address,
+                    {"transfers": records},
+                    (len(compact),),
+                )
+            )
+            records = b""
+        if e is not None:
+            compact.append(e)
+
+    return compact
+
+
+def _event_store(eventStore):
+    markers = [(m["name"], m["logIndex"]) for m in eventStore["markers"]]
+    return dict({k: v for (k, v) in eventStore.items() if k != "markers"}, markers=markers)
+
+
+def _multi_currency_batch(environment, accounts):
+    lendDAI = get_balance_trade_action(
+        2,
+        "DepositUnderlying",
+        [{"tradeActionType": "Lend", "marketIndex": 1, "notional": 1_000e8, "minSlippage": 0}],
+        depositActionAmount=5_000e18,
+        withdrawEntireCashBalance=True,
+    )
+    borrowUSDC = get_balance_trade_action(
+        3,
+        "DepositUnderlyingAndMintNToken",
+        [{"tradeActionType": "Borrow", "marketIndex": 2, "notional": 100e8, "maxSlippage": 0}],
+        depositActionAmount=5_000e6,
+        withdrawEntireCashBalance=True,
+    )
+    return environment.notional.batchBalanceAndTradeAction(
+        accounts[1], [lendDAI, borrowUSDC], {"from": accounts[1]}
+    )
+
+
+def test_compact_event_stream_matches_individual_events(environment, accounts):
+    txn = _multi_currency_batch(environment, accounts)
+    # Builds with Deployments.COMPACT_EVENTS set are expanded first so that both builds compare
+    # the expansion of a compact stream against the individual events it replaces
+    individual = CompactTxn(txn, expandCompactTransfers(environment, txn.events))
+    compact = CompactTxn(txn, _compact_events(environment, individual.events))
+    assert any(e.name == "CompactTransfers" for e in compact.events)
+    # Proxy ERC20 transfers are never packed
+    assert any(e.name == "Transfer" for e in compact.events)
+
+    expected = _event_store(processTxn(environment, individual))
+    assert len(expected["transactionTypes"]) > 0
+    assert _event_store(processTxn(environment, compact)) == expected
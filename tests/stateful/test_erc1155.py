@@ -772,4 +772,97 @@ def test_create_and_settle_one_month_fcash(environment, accounts):
     assert len(environment.notional.getAccountPortfolio(accounts[0])) == 0
     assert environment.approxInternal('DAI', environment.notional.getAccountBalance(2, accounts[1])['cashBalance'], -100e8)
 
-    check_system_invariants(environment, accounts)
\ No newline at end of file
+    check_system_invariants(environment, accounts)
+
+def test_balance_of_batch_matches_single(environment, accounts):
+    zeroAddress = to_bytes(0, "bytes20")
+    # Array portfolio lending in two markets and borrowing in a third
+    environment.notional.batchBalanceAndTradeAction(
+        accounts[1],
+        [
+            get_balance_trade_action(
+                2,
+                "DepositUnderlying",
+                [
+                    {
+                        "tradeActionType": "Lend",
+                        "marketIndex": 1,
+                        "notional": 100e8,
+                        "minSlippage": 0,
+                    },
+                    {
+                        "tradeActionType": "Lend",
+                        "marketIndex": 2,
+                        "notional": 100e8,
+                        "minSlippage": 0,
+                    },
+                    {
+                        "tradeActionType": "Borrow",
+                        "marketIndex": 3,
+                        "notional": 50e8,
+                        "maxSlippage": 0,
+                    },
+                ],
+                depositActionAmount=500e18,
+                withdrawEntireCashBalance=True,
+            )
+        ],
+        {"from": accounts[1]},
+    )
+    # Bitmap portfolio lending in one market and borrowing in another
+    environment.token["DAI"].transfer(accounts[2], 500e18, {"from": accounts[0]})
+    environment.token["DAI"].approve(environment.notional.address, 2 ** 255, {"from": accounts[2]})
+    environment.notional.batchBalanceAndTradeAction(
+        accounts[2],
+        [
+            get_balance_trade_action(
+                2,
+                "DepositUnderlying",
+                [
+                    {
+                        "tradeActionType": "Lend",
+                        "marketIndex": 1,
+                        "notional": 100e8,
+                        "minSlippage": 0,
+                    },
+                    {
+                        "tradeActionType": "Borrow",
+                        "marketIndex": 2,
+                        "notional": 50e8,
+                        "maxSlippage": 0,
+                    },
+                ],
+                depositActionAmount=500e18,
+                withdrawEntireCashBalance=True,
+            )
+        ],
+        {"from": accounts[2]},
+    )
+
+    markets = environment.notional.getActiveMarkets(2)
+    ids = []
+    for currencyId in [2, 3]:
+        for m in markets:
+            for isDebt in [False, True]:
+                ids.append(environment.notional.encode(currencyId, m[1], 1, zeroAddress, isDebt))
+    # A maturity that is not on a market and not in the bitmap
+    ids.append(environment.notional.encodeToId(2, markets[0][1] + SECONDS_IN_DAY, 1))
+
+    nToken = environment.nToken[2].address
+    # Pairs grouped by account and interleaved across accounts
+    grouped = [(a, i) for a in [accounts[1], accounts[2], nToken, accounts[3]] for i in ids]
+    interleaved = [(a, i) for i in ids for a in [accounts[1], accounts[2], nToken]]
+
+    for pairs in [grouped, interleaved]:
+        batchAccounts = [a for (a, _) in pairs]
+        batchIds = [i for (_, i) in pairs]
+        signed = environment.notional.signedBalanceOfBatch(batchAccounts, batchIds)
+        unsigned = environment.notional.balanceOfBatch(batchAccounts, batchIds)
+
+        for (k, (a, i)) in enumerate(pairs):
+            assert signed[k] == environment.notional.signedBalanceOf(a, i)
+            assert unsigned[k] == environment.notional.balanceOf(a, i)
+
+    assert any(b < 0 for b in environment.notional.signedBalanceOfBatch(
+        [accounts[1]] * len(ids), ids
+    ))
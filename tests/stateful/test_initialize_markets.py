@@ -303,6 +303,29 @@ def test_settle_and_initialize(environment, accounts):
 
     ntoken_asserts(environment, currencyId, False, accounts)
 
+def test_initialize_markets_batch_skips_failing_currency(environment, accounts):
+    initialize_markets(environment, accounts)
+    currencyId = 2
+
+    blockTime = chain.time()
+    chain.mine(1, timestamp=(blockTime + SECONDS_IN_QUARTER))
+    # Currency id 99 is not listed and will fail without reverting the batch
+    txn = environment.notional.initializeMarketsBatch([99, currencyId], False)
+
+    assert txn.return_value == (False, True)
+    assert txn.events["MarketsInitializationFailed"]["currencyId"] == 99
+    assert txn.events["MarketsInitialized"]["currencyId"] == currencyId
+    assert "SetPrimeSettlementRate" in txn.events
+    ntoken_asserts(environment, currencyId, False, accounts)
+
+    # Initializing again immediately fails and leaves markets unchanged
+    markets = environment.notional.getActiveMarkets(currencyId)
+    txn = environment.notional.initializeMarketsBatch([currencyId], False)
+    assert txn.return_value == (False,)
+    assert "MarketsInitialized" not in txn.events
+    assert environment.notional.getActiveMarkets(currencyId) == markets
+    check_system_invariants(environment, accounts)
+
 def test_settle_and_extend(environment, accounts):
     initialize_markets(environment, accounts)
     currencyId = 2
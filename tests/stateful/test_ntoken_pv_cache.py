@@ -0,0 +1,164 @@
+import pytest
+from brownie import MockMulticall3
+from brownie.network.state import Chain
+from scripts.config import nTokenDefaults
+from tests.helpers import (
+    get_balance_action,
+    get_balance_trade_action,
+    initialize_environment,
+    setup_residual_environment,
+)
+from tests.stateful.invariants import check_system_invariants
+
+chain = Chain()
+
+COLLATERAL_CURRENCY = 2
+DEBT_CURRENCY = 3
+NTOKEN_COLLATERAL = 100_000e8
+
+
+@pytest.fixture(scope="module", autouse=True)
+def environment(accounts):
+    return initialize_environment(accounts)
+
+
+@pytest.fixture(autouse=True)
+def isolation(fn_isolation):
+    pass
+
+
+@pytest.fixture
+def multicall(environment, accounts):
+    # The account is a multicall contract so that each action and the free collateral checks
+    # around it execute at the same block time
+    multicall = MockMulticall3.deploy({"from": accounts[0]})
+    environment.nToken[COLLATERAL_CURRENCY].transfer(
+        multicall, NTOKEN_COLLATERAL, {"from": accounts[0]}
+    )
+    environment.token["DAI"].transfer(multicall, 100_000e18, {"from": accounts[0]})
+    multicall.aggregate3(
+        [
+            _call(environment.token["DAI"], "approve", environment.notional, 2 ** 255),
+            _call(environment.notional, "enablePrimeBorrow", True),
+            # Borrow against the nToken so that every following action runs a free collateral check
+            _call(environment.notional, "withdraw", DEBT_CURRENCY, 1_000e8, True),
+        ],
+        {"from": accounts[0]},
+    )
+    return multicall
+
+
+def _call(contract, method, *args):
+    return (contract.address, False, getattr(contract, method).encode_input(*args))
+
+
+def _free_collateral_check(env):
+    # A small borrow runs a stateful free collateral check which calculates the nToken PV
+    return _call(env.notional, "withdraw", DEBT_CURRENCY, 10e8, True)
+
+
+def _free_collateral(env, multicall):
+    return _call(env.notional, "getFreeCollateral", multicall)
+
+
+def _decode_free_collateral(env, txn):
+    (_, returnData) = txn.return_value[-1]
+    return env.notional.getFreeCollateral.decode_output(returnData)
+
+
+def _action(env, multicall, action):
+    if action == "lend":
+        lendAction = get_balance_trade_action(
+            COLLATERAL_CURRENCY,
+            "DepositUnderlying",
+            [{"tradeActionType": "Lend", "marketIndex": 1, "notional": 50_000e8, "minSlippage": 0}],
+            depositActionAmount=50_000e18,
+            withdrawEntireCashBalance=True,
+        )
+        return _call(env.notional, "batchBalanceAndTradeAction", multicall, [lendAction])
+    elif action == "mint":
+        mintAction = get_balance_action(
+            COLLATERAL_CURRENCY, "DepositUnderlyingAndMintNToken", depositActionAmount=10_000e18
+        )
+        return _call(env.notional, "batchBalanceAction", multicall, [mintAction])
+    elif action == "redeem":
+        redeemAction = get_balance_action(
+            COLLATERAL_CURRENCY,
+            "RedeemNToken",
+            depositActionAmount=10_000e8,
+            withdrawEntireCashBalance=True,
+        )
+        return _call(env.notional, "batchBalanceAction", multicall, [redeemAction])
+    elif action == "governance":
+        collateral = list(nTokenDefaults["Collateral"])
+        # Lower the pv haircut
+        collateral[1] = 70
+        return _call(
+            env.notional, "updateTokenCollateralParameters", COLLATERAL_CURRENCY, *collateral
+        )
+
+
+def _assert_free_collateral_after(environment, accounts, multicall, call):
+    # The action runs after the nToken PV has been calculated in the same block, the free
+    # collateral view must not read a stale value
+    txn = multicall.aggregate3(
+        [_free_collateral_check(environment), call, _free_collateral(environment, multicall)],
+        {"from": accounts[0]},
+    )
+    (sameBlockFC, sameBlockNetLocal) = _decode_free_collateral(environment, txn)
+    check_system_invariants(environment, accounts)
+    chain.undo()
+
+    # Same balance changes with the nToken PV calculated after the action
+    txn = multicall.aggregate3(
+        [call, _free_collateral_check(environment), _free_collateral(environment, multicall)],
+        {"from": accounts[0]},
+    )
+    (fc, netLocal) = _decode_free_collateral(environment, txn)
+
+    assert pytest.approx(sameBlockFC, rel=1e-6) == fc
+    assert pytest.approx(sameBlockNetLocal[0], rel=1e-6) == netLocal[0]
+
+
+@pytest.mark.parametrize("action", ["lend", "mint", "redeem", "governance"])
+def test_free_collateral_reads_fresh_values_after_action(
+    environment, accounts, multicall, action
+):
+    if action == "governance":
+        environment.notional.transferOwnership(
+            multicall, True, {"from": environment.notional.owner()}
+        )
+
+    _assert_free_collateral_after(
+        environment, accounts, multicall, _action(environment, multicall, action)
+    )
+
+
+def test_free_collateral_after_residual_purchase(environment, accounts, multicall):
+    setup_residual_environment(
+        environment, accounts, residualType=1, marketResiduals=False, canSellResiduals=True
+    )
+    # 96 hour buffer period before residuals can be purchased
+    chain.mine(1, timestamp=chain.time() + 96 * 3600)
+
+    nTokenAddress = environment.notional.nTokenAddress(COLLATERAL_CURRENCY)
+    (_, ifCashAssetsBefore) = environment.notional.getNTokenPortfolio(nTokenAddress)
+    purchaseAction = get_balance_trade_action(
+        COLLATERAL_CURRENCY,
+        "DepositUnderlying",
+        [
+            {
+                "tradeActionType": "PurchaseNTokenResidual",
+                "maturity": ifCashAssetsBefore[2][1],
+                "fCashAmountToPurchase": ifCashAssetsBefore[2][3],
+            }
+        ],
+        depositActionAmount=100e18,
+    )
+    call = _call(environment.notional, "batchBalanceAndTradeAction", multicall, [purchaseAction])
+
+    # The residual purchase changes the nToken's ifCash, the multicall holds nTokens and its free
+    # collateral in the same block must reflect the purchase
+    _assert_free_collateral_after(environment, accounts, multicall, call)
+    (_, ifCashAssetsAfter) = environment.notional.getNTokenPortfolio(nTokenAddress)
+    assert ifCashAssetsAfter != ifCashAssetsBefore
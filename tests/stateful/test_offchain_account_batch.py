@@ -0,0 +1,88 @@
+import pytest
+from brownie.network import web3
+from scripts.offchain.account_batch import get_accounts_batch, load_accounts_batch
+from tests.helpers import get_balance_action, get_balance_trade_action, initialize_environment
+from tests.stateful.test_settlement import setup_multiple_asset_settlement
+
+
+@pytest.fixture(scope="module", autouse=True)
+def environment(accounts):
+    env = initialize_environment(accounts)
+    setup_multiple_asset_settlement(env, accounts[1])
+
+    # Lender in a bitmap portfolio with nTokens
+    env.notional.enableBitmapCurrency(2, {"from": accounts[2]})
+    env.notional.batchBalanceAndTradeAction(
+        accounts[2],
+        [
+            get_balance_trade_action(
+                2,
+                "DepositUnderlying",
+                [
+                    {
+                        "tradeActionType": "Lend",
+                        "marketIndex": 2,
+                        "notional": 500e8,
+                        "minSlippage": 0,
+                    }
+                ],
+                depositActionAmount=1000e18,
+            )
+        ],
+        {"from": accounts[2]},
+    )
+    env.notional.batchBalanceAction(
+        accounts[2],
+        [get_balance_action(2, "DepositUnderlyingAndMintNToken", depositActionAmount=1000e18)],
+        {"from": accounts[2]},
+    )
+
+    # Cash only account
+    env.notional.depositUnderlyingToken(accounts[3], 1, 1e18, {"from": accounts[3], "value": 1e18})
+    return env
+
+
+@pytest.fixture(autouse=True)
+def isolation(fn_isolation):
+    pass
+
+
+def test_accounts_batch_matches_get_account(environment, accounts):
+    notional = environment.notional
+    block = web3.eth.block_number
+    results = get_accounts_batch(notional, accounts[0:5], block)
+
+    assert len(results) == 5
+    for (account, (context, balances, portfolio)) in zip(accounts[0:5], results):
+        (expectedContext, expectedBalances, expectedPortfolio) = notional.getAccount(
+            account, block_identifier=block
+        )
+        assert context == expectedContext
+        assert balances == expectedBalances
+        assert portfolio == expectedPortfolio
+
+
+def test_accounts_batch_chunks_under_gas_cap(environment, accounts):
+    notional = environment.notional
+    block = web3.eth.block_number
+    expected = get_accounts_batch(notional, accounts[0:5], block)
+
+    # A gas cap that only fits a few accounts per call forces the chunks to be split
+    data = notional.getAccountsBatch.encode_input(accounts[0:5])
+    gasUsed = web3.eth.estimate_gas({"to": notional.address, "data": data}, block)
+    results = get_accounts_batch(notional, accounts[0:5], block, gasCap=gasUsed // 2)
+    assert results == expected
+
+    batch = load_accounts_batch(notional, accounts[0:5], block, chunkSize=2)
+    assert list(batch.contexts.bitmapCurrencyId[1:4]) == [0, 2, 0]
+    assert set(batch.balanceCurrency[batch.balanceAccount == 1]) == {2, 3}
+    assert list(batch.assetCurrency[batch.assetAccount == 1]) == [2, 3]
+    assert list(batch.assetCurrency[batch.assetAccount == 2]) == [2]
+    for (i, account) in enumerate(accounts[0:5]):
+        for c in batch.balanceCurrency[batch.balanceAccount == i]:
+            row = (batch.balanceAccount == i) & (batch.balanceCurrency == c)
+            (cashBalance, nTokenBalance, _) = notional.getAccountBalance(
+                c, account, block_identifier=block
+            )
+            assert batch.cashBalance[row][0] == cashBalance
+            assert batch.nTokenBalance[row][0] == nTokenBalance
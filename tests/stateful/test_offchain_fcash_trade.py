@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+from brownie.exceptions import VirtualMachineError
+from brownie.network import web3
+from brownie.test import given, strategy
+from scripts.offchain.fcash_trade import (
+    get_cash_amount_given_fcash_amount,
+    get_fcash_amount_given_cash_amount,
+    load_market_snapshot,
+)
+from tests.helpers import get_balance_action, initialize_environment
+
+NUM_TRADES = 32
+
+
+@pytest.fixture(scope="module", autouse=True)
+def environment(accounts):
+    env = initialize_environment(accounts)
+    env.notional.batchBalanceAction(
+        accounts[0],
+        [
+            get_balance_action(
+                2, "DepositUnderlyingAndMintNToken", depositActionAmount=100_000_000e18
+            ),
+            get_balance_action(
+                3, "DepositUnderlyingAndMintNToken", depositActionAmount=100_000_000e6
+            ),
+        ],
+        {"from": accounts[0]},
+    )
+
+    return env
+
+
+@pytest.fixture(autouse=True)
+def isolation(fn_isolation):
+    pass
+
+
+def call_view(method, block, *args):
+    try:
+        return (method(*args, block_identifier=block), False)
+    except VirtualMachineError:
+        return (None, True)
+
+
+def random_trades(snapshot, seed, maxProportion):
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(snapshot.currencyId), size=NUM_TRADES)
+    liquidity = np.array([int(c) for c in snapshot.totalCashUnderlying[rows]], dtype=np.float64)
+    amounts = (rng.uniform(-maxProportion, maxProportion, size=NUM_TRADES) * liquidity).astype(
+        np.int64
+    )
+    amounts[amounts == 0] = 1
+    return (snapshot.currencyId[rows], snapshot.marketIndex[rows], amounts)
+
+
+@given(seed=strategy("uint32"), maxProportion=strategy("decimal", min_value=0.001, max_value=1.2))
+def test_cash_given_fcash_parity(environment, seed, maxProportion):
+    block = web3.eth.block_number
+    snapshot = load_market_snapshot(environment.notional, [2, 3], block)
+    (currencyId, marketIndex, fCash) = random_trades(snapshot, seed, float(maxProportion))
+
+    (primeCash, underlying, reverted) = get_cash_amount_given_fcash_amount(
+        snapshot, currencyId, marketIndex, fCash
+    )
+
+    for i in range(NUM_TRADES):
+        (result, didRevert) = call_view(
+            environment.notional.getCashAmountGivenfCashAmount,
+            block,
+            int(currencyId[i]),
+            int(fCash[i]),
+            int(marketIndex[i]),
+            snapshot.blockTime,
+        )
+        assert reverted[i] == didRevert
+        if not didRevert:
+            assert (primeCash[i], underlying[i]) == tuple(result)
+
+
+@given(seed=strategy("uint32"), maxProportion=strategy("decimal", min_value=0.001, max_value=1.2))
+def test_fcash_given_cash_parity(environment, seed, maxProportion):
+    block = web3.eth.block_number
+    snapshot = load_market_snapshot(environment.notional, [2, 3], block)
+    (currencyId, marketIndex, cash) = random_trades(snapshot, seed, float(maxProportion))
+
+    (fCash, reverted) = get_fcash_amount_given_cash_amount(
+        snapshot, currencyId, marketIndex, cash
+    )
+
+    for i in range(NUM_TRADES):
+        (result, didRevert) = call_view(
+            environment.notional.getfCashAmountGivenCashAmount,
+            block,
+            int(currencyId[i]),
+            int(cash[i]),
+            int(marketIndex[i]),
+            snapshot.blockTime,
+        )
+        assert reverted[i] == didRevert
+        if not didRevert:
+            assert fCash[i] == result
+
+
+def test_fcash_given_cash_round_trips(environment):
+    snapshot = load_market_snapshot(environment.notional, [2, 3])
+    (currencyId, marketIndex, cash) = random_trades(snapshot, 1, 0.05)
+
+    (fCash, reverted) = get_fcash_amount_given_cash_amount(
+        snapshot, currencyId, marketIndex, cash
+    )
+    assert not reverted.any()
+
+    # Trading the solved fCash amount returns the original cash amount within rounding
+    (_, underlying, reverted) = get_cash_amount_given_fcash_amount(
+        snapshot, currencyId, marketIndex, fCash
+    )
+    assert not reverted.any()
+    for i in range(NUM_TRADES):
+        assert pytest.approx(int(underlying[i]), abs=100) == int(cash[i])
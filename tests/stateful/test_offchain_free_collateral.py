@@ -0,0 +1,191 @@
+import pytest
+from brownie.exceptions import VirtualMachineError
+from brownie.network import web3
+from brownie.network.state import Chain
+from scripts.offchain.free_collateral import (
+    FreeCollateralEngine,
+    get_free_collateral,
+    load_account_positions,
+    load_valuation_inputs,
+)
+from tests.helpers import get_balance_action, get_balance_trade_action, initialize_environment
+
+chain = Chain()
+CURRENCIES = [1, 2, 3, 4]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def environment(accounts):
+    env = initialize_environment(accounts)
+    env.token["DAI"].transfer(accounts[2], 100_000e18, {"from": accounts[0]})
+    env.token["DAI"].approve(env.notional.address, 2 ** 255, {"from": accounts[2]})
+
+    # Fixed rate borrower with cash collateral
+    env.notional.batchBalanceAndTradeAction(
+        accounts[1],
+        [
+            get_balance_trade_action(
+                2,
+                "None",
+                [
+                    {
+                        "tradeActionType": "Borrow",
+                        "marketIndex": 1,
+                        "notional": 1000e8,
+                        "maxSlippage": 0,
+                    }
+                ],
+                withdrawEntireCashBalance=True,
+                redeemToUnderlying=True,
+            ),
+            get_balance_trade_action(3, "DepositUnderlying", [], depositActionAmount=10_000e6),
+        ],
+        {"from": accounts[1]},
+    )
+
+    # Lender in a bitmap portfolio with nTokens
+    env.notional.enableBitmapCurrency(2, {"from": accounts[2]})
+    env.notional.batchBalanceAndTradeAction(
+        accounts[2],
+        [
+            get_balance_trade_action(
+                2,
+                "DepositUnderlying",
+                [
+                    {
+                        "tradeActionType": "Lend",
+                        "marketIndex": 2,
+                        "notional": 500e8,
+                        "minSlippage": 0,
+                    }
+                ],
+                depositActionAmount=1000e18,
+            )
+        ],
+        {"from": accounts[2]},
+    )
+    env.notional.batchBalanceAction(
+        accounts[2],
+        [get_balance_action(2, "DepositUnderlyingAndMintNToken", depositActionAmount=1000e18)],
+        {"from": accounts[2]},
+    )
+
+    # Cash only account
+    env.notional.depositUnderlyingToken(accounts[3], 1, 1e18, {"from": accounts[3], "value": 1e18})
+
+    return env
+
+
+@pytest.fixture(autouse=True)
+def isolation(fn_isolation):
+    pass
+
+
+def check_parity(notional, accounts, result, positions, block):
+    for (i, account) in enumerate(accounts):
+        try:
+            (netETHValue, netLocal) = notional.getFreeCollateral(account, block_identifier=block)
+        except VirtualMachineError:
+            assert result.reverted[i]
+            continue
+
+        assert not result.reverted[i]
+        assert result.netETHValue[i] == netETHValue
+        offChain = positions.net_local_values(result.netLocalPrimeValue, i)
+        assert offChain == list(netLocal[: len(offChain)])
+        assert all(v == 0 for v in netLocal[len(offChain) :])
+
+
+def test_free_collateral_parity(environment, accounts):
+    block = web3.eth.block_number
+    inputs = load_valuation_inputs(environment.notional, CURRENCIES, block)
+    positions = load_account_positions(environment.notional, accounts[0:5], block)
+    result = get_free_collateral(inputs, positions)
+
+    check_parity(environment.notional, accounts[0:5], result, positions, block)
+    assert result.netETHValue[1] > 0
+    assert positions.assetCurrency.tolist().count(2) >= 2
+
+
+def test_free_collateral_batch_view(environment, accounts):
+    notional = environment.notional
+    block = web3.eth.block_number
+    (netETHValues, netLocalValues, mustSettle) = notional.getFreeCollateralBatch(
+        accounts[0:5], block_identifier=block
+    )
+    for (i, account) in enumerate(accounts[0:5]):
+        (netETHValue, netLocal) = notional.getFreeCollateral(account, block_identifier=block)
+        assert not mustSettle[i]
+        assert netETHValues[i] == netETHValue
+        assert list(netLocalValues[i]) == list(netLocal)
+
+    # Accounts that must settle are flagged instead of reverting the batch
+    chain.mine(1, timedelta=365 * 86400)
+    block = web3.eth.block_number
+    (netETHValues, _, mustSettle) = notional.getFreeCollateralBatch(
+        [accounts[1], accounts[3]], block_identifier=block
+    )
+    with pytest.raises(VirtualMachineError):
+        notional.getFreeCollateral(accounts[1], block_identifier=block)
+    assert list(mustSettle) == [True, False]
+    assert netETHValues[0] == 0
+    assert netETHValues[1] == notional.getFreeCollateral(accounts[3], block_identifier=block)[0]
+
+
+def test_free_collateral_parity_after_time_passes(environment, accounts):
+    engine = FreeCollateralEngine(environment.notional, accounts[0:5], CURRENCIES)
+    chain.mine(1, timedelta=30 * 86400)
+
+    revalued = engine.update()
+    assert accounts[1] in revalued
+    check_parity(
+        environment.notional, accounts[0:5], engine.result, engine.positions, web3.eth.block_number
+    )
+
+
+def test_engine_reloads_changed_accounts(environment, accounts):
+    engine = FreeCollateralEngine(environment.notional, accounts[0:5], CURRENCIES)
+    environment.notional.batchBalanceAndTradeAction(
+        accounts[1],
+        [
+            get_balance_trade_action(
+                2,
+                "None",
+                [
+                    {
+                        "tradeActionType": "Borrow",
+                        "marketIndex": 2,
+                        "notional": 500e8,
+                        "maxSlippage": 0,
+                    }
+                ],
+                withdrawEntireCashBalance=True,
+                redeemToUnderlying=True,
+            )
+        ],
+        {"from": accounts[1]},
+    )
+
+    before = engine.result.netETHValue[1]
+    engine.update(changedAccounts=[accounts[1]])
+    assert engine.result.netETHValue[1] < before
+    check_parity(
+        environment.notional, accounts[0:5], engine.result, engine.positions, web3.eth.block_number
+    )
+
+    # Accounts added after construction are loaded on their first update
+    engine.update(changedAccounts=[accounts[6]])
+    assert engine.positions.accounts[-1] == accounts[6]
+    assert engine.result.netETHValue[-1] == 0
+
+
+def test_engine_eth_rate_shock(environment, accounts):
+    engine = FreeCollateralEngine(environment.notional, accounts[0:5], CURRENCIES)
+    unchanged = engine.shock_eth_rates({})
+    assert list(unchanged.netETHValue) == list(engine.result.netETHValue)
+
+    # Doubling the value of DAI debt lowers free collateral of the DAI borrower only
+    daiRate = engine.inputs.currencies[2].ethRate
+    shocked = engine.shock_eth_rates({2: daiRate._replace(rate=daiRate.rate * 2)})
+    assert shocked.netETHValue[1] < engine.result.netETHValue[1]
+    assert shocked.netETHValue[3] == engine.result.netETHValue[3]
@@ -0,0 +1,116 @@
+import pytest
+from brownie.network import web3
+from brownie.network.state import Chain
+from scripts.offchain.free_collateral import load_account_positions
+from scripts.offchain.settlement import (
+    estimate_settle_gas,
+    fit_settle_gas_model,
+    get_maturity_settlements,
+    get_settle_amounts,
+    get_settle_gas_features,
+    get_settlement_plan,
+    get_settlement_time,
+    load_settlement_inputs,
+)
+from tests.constants import SECONDS_IN_QUARTER
+from tests.helpers import get_balance_trade_action, get_tref, initialize_environment
+from tests.stateful.test_settlement import setup_multiple_asset_settlement
+
+chain = Chain()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def environment(accounts):
+    return initialize_environment(accounts)
+
+
+@pytest.fixture(autouse=True)
+def isolation(fn_isolation):
+    pass
+
+
+def setup_bitmap_settlement(environment, account):
+    environment.notional.enableBitmapCurrency(2, {"from": account})
+    borrowAction = get_balance_trade_action(
+        2,
+        "None",
+        [{"tradeActionType": "Borrow", "marketIndex": 2, "notional": 100e8, "maxSlippage": 0}],
+        withdrawEntireCashBalance=True,
+        redeemToUnderlying=True,
+    )
+    collateral = get_balance_trade_action(3, "DepositUnderlying", [], depositActionAmount=10000e6)
+    environment.notional.batchBalanceAndTradeAction(
+        account, [borrowAction, collateral], {"from": account}
+    )
+    # Bitmap portfolios hold both settling and remaining maturities
+    environment.notional.batchBalanceAndTradeAction(
+        account,
+        [
+            get_balance_trade_action(
+                2,
+                "None",
+                [
+                    {
+                        "tradeActionType": "Borrow",
+                        "marketIndex": 1,
+                        "notional": 50e8,
+                        "maxSlippage": 0,
+                    }
+                ],
+                withdrawEntireCashBalance=True,
+                redeemToUnderlying=True,
+            )
+        ],
+        {"from": account},
+    )
+
+
+def test_settlement_projection(environment, accounts):
+    notional = environment.notional
+    setup_multiple_asset_settlement(environment, accounts[1])
+    setup_bitmap_settlement(environment, accounts[2])
+
+    # accounts[3] has no assets and is not in the plan
+    block = web3.eth.block_number
+    blockTime = chain.time()
+    positions = load_account_positions(notional, accounts[1:4], block)
+    inputs = load_settlement_inputs(notional, positions, block)
+    assert inputs.settleTime == get_tref(blockTime) + SECONDS_IN_QUARTER
+    assert inputs.settleTime == get_settlement_time(blockTime)
+
+    plan = get_settlement_plan(inputs, positions)
+    assert sorted(plan.accounts) == sorted([accounts[1].address, accounts[2].address])
+    assert list(plan.settledValueETH) == sorted(plan.settledValueETH, reverse=True)
+
+    totals = get_maturity_settlements(inputs, positions)
+    assert set(totals.currencyId) == {2, 3}
+    assert all(m == inputs.settleTime for m in totals.maturity)
+    assert not any(totals.isSet)
+
+    amounts = get_settle_amounts(inputs, positions)
+    features = get_settle_gas_features(inputs.settleTime, positions)
+    chain.mine(1, timestamp=inputs.settleTime + 1)
+    for currencyId in [1, 2, 3]:
+        notional.initializeMarkets(currencyId, False, {"from": accounts[0]})
+
+    gasUsed = []
+    for (i, account) in zip(plan.accountIndex, plan.accounts):
+        rows = amounts.accountIndex == i
+        before = {c: notional.getAccountBalance(c, account)[0] for c in amounts.currencyId[rows]}
+        txn = notional.settleAccount(account, {"from": accounts[0]})
+        gasUsed.append(txn.gas_used)
+
+        for (c, positive, negative) in zip(
+            amounts.currencyId[rows],
+            amounts.positiveSettledCash[rows],
+            amounts.negativeSettledCash[rows],
+        ):
+            settled = notional.getAccountBalance(c, account)[0] - before[c]
+            assert pytest.approx(positive + negative, rel=1e-4) == settled
+
+    # The calibrated model reproduces the observed gas
+    planFeatures = type(features)(*[f[plan.accountIndex] for f in features])
+    model = fit_settle_gas_model(planFeatures, gasUsed)
+    estimated = estimate_settle_gas(planFeatures, model)
+    for (e, g) in zip(estimated, gasUsed):
+        assert pytest.approx(g, abs=100) == e
@@ -363,4 +363,118 @@ def test_can_settle_above_supply_and_debt_cap(environment, accounts):
     with brownie.reverts("Over Supply Cap"):
         environment.notional.depositUnderlyingToken(accounts[1], 2, 1e18, {"from": accounts[1]})
 
-    check_system_invariants(environment, accounts)
\ No newline at end of file
+    check_system_invariants(environment, accounts)
+
+def fund_accounts(environment, accounts):
+    for account in accounts:
+        environment.token["DAI"].transfer(account, 100000e18, {"from": accounts[0]})
+        environment.token["DAI"].approve(environment.notional.address, 2 ** 255, {"from": account})
+        environment.token["USDC"].transfer(account, 100000e6, {"from": accounts[0]})
+        environment.token["USDC"].approve(environment.notional.address, 2 ** 255, {"from": account})
+
+
+def setup_bitmap_settlement(environment, account):
+    # Bitmap portfolio borrowing in the same maturity as setup_multiple_asset_settlement
+    environment.notional.enableBitmapCurrency(2, {"from": account})
+    environment.notional.batchBalanceAndTradeAction(
+        account,
+        [
+            get_balance_trade_action(
+                2,
+                "None",
+                [{"tradeActionType": "Borrow", "marketIndex": 1, "notional": 100e8, "maxSlippage": 0}],
+                withdrawEntireCashBalance=True,
+                redeemToUnderlying=True,
+            ),
+            get_balance_trade_action(3, "DepositUnderlying", [], depositActionAmount=1000e6),
+        ],
+        {"from": account},
+    )
+
+
+def get_settled_state(environment, account):
+    return (
+        environment.notional.getAccountContext(account),
+        [environment.notional.getAccountBalance(c, account)[0] for c in [2, 3]],
+    )
+
+
+def assert_settled_state(environment, account, expected):
+    (context, cashBalances) = expected
+    assert environment.notional.getAccountContext(account) == context
+    for (c, cashBalance) in zip([2, 3], cashBalances):
+        assert environment.notional.getAccountBalance(c, account)[0] == pytest.approx(
+            cashBalance, rel=1e-6, abs=1
+        )
+
+
+def test_settle_accounts_batch_matches_single(environment, accounts):
+    fund_accounts(environment, accounts[2:4])
+    # Array portfolio across two currencies
+    setup_multiple_asset_settlement(environment, accounts[1])
+    setup_bitmap_settlement(environment, accounts[2])
+
+    blockTime = chain.time()
+    chain.mine(1, timestamp=blockTime + SECONDS_IN_QUARTER)
+    environment.notional.initializeMarketsBatch([1, 2, 3], False)
+    settleAccounts = [accounts[1], accounts[2], accounts[3]]
+
+    chain.snapshot()
+    for account in settleAccounts:
+        environment.notional.settleAccount(account)
+    expected = [get_settled_state(environment, a) for a in settleAccounts]
+    chain.revert()
+
+    txn = environment.notional.settleAccountsBatch(settleAccounts)
+    assert txn.return_value == (True, True, False)
+    assert [e["account"] for e in txn.events["AccountSettled"]] == settleAccounts[:2]
+    # Settlement rates were set when markets were initialized
+    assert "SetPrimeSettlementRate" not in txn.events
+
+    for (account, state) in zip(settleAccounts, expected):
+        assert_settled_state(environment, account, state)
+
+    # Settled accounts are skipped on subsequent batches
+    txn = environment.notional.settleAccountsBatch(settleAccounts)
+    assert txn.return_value == (False, False, False)
+    assert "AccountSettled" not in txn.events
+
+    check_system_invariants(environment, accounts)
+
+
+def test_settle_accounts_batch_mixed_portfolios(environment, accounts):
+    fund_accounts(environment, accounts[2:5])
+    (arrayAccount, bitmapAccount, settledAccount, otherBitmapAccount) = accounts[1:5]
+    setup_multiple_asset_settlement(environment, arrayAccount)
+    setup_bitmap_settlement(environment, bitmapAccount)
+    setup_multiple_asset_settlement(environment, settledAccount)
+    setup_bitmap_settlement(environment, otherBitmapAccount)
+
+    blockTime = chain.time()
+    chain.mine(1, timestamp=blockTime + SECONDS_IN_QUARTER)
+    environment.notional.initializeMarketsBatch([1, 2, 3], False)
+    # Already settled before the batch
+    environment.notional.settleAccount(settledAccount)
+
+    # Each account settled alone from the same state
+    settleAccounts = [bitmapAccount, settledAccount, arrayAccount, otherBitmapAccount]
+    expected = {settledAccount: get_settled_state(environment, settledAccount)}
+    for account in [bitmapAccount, arrayAccount, otherBitmapAccount]:
+        chain.snapshot()
+        environment.notional.settleAccount(account)
+        expected[account] = get_settled_state(environment, account)
+        chain.revert()
+
+    # The bitmap account is listed twice, the second entry is already settled by the batch
+    txn = environment.notional.settleAccountsBatch(settleAccounts + [bitmapAccount])
+    assert txn.return_value == (True, False, True, True, False)
+    assert [e["account"] for e in txn.events["AccountSettled"]] == [
+        bitmapAccount,
+        arrayAccount,
+        otherBitmapAccount,
+    ]
+
+    for account in settleAccounts:
+        assert_settled_state(environment, account, expected[account])
+
+    check_system_invariants(environment, accounts)
@@ -0,0 +1,187 @@
+import brownie
+import eth_abi
+import pytest
+from brownie.convert.datatypes import HexString, Wei
+from brownie.network import web3
+from brownie.network.state import Chain
+from fixtures import *
+from scripts.offchain.vault_health import (
+    get_deleverage_queue,
+    get_vault_account_health,
+    load_vault_accounts,
+    load_vault_inputs,
+)
+from tests.constants import PRIME_CASH_VAULT_MATURITY
+from tests.internal.vaults.fixtures import get_vault_config, set_flags
+
+chain = Chain()
+zeroAddress = HexString(0, type_str="bytes20")
+
+
+@pytest.fixture(autouse=True)
+def isolation(fn_isolation):
+    pass
+
+
+def check_parity(notional, vaultAccounts, result, block):
+    for (i, (account, vault)) in enumerate(zip(vaultAccounts.accounts, vaultAccounts.vaults)):
+        (h, maxDeposit, vaultShares) = notional.getVaultAccountHealthFactors(
+            account, vault, block_identifier=block
+        )
+        assert not result.reverted[i]
+        assert result.collateralRatio[i] == h[0]
+        assert result.totalDebtOutstandingInPrimary[i] == h[1]
+        assert result.vaultShareValueUnderlying[i] == h[2]
+        assert list(result.netDebtOutstanding[i]) == list(h[3])
+        assert list(result.maxLiquidatorDepositUnderlying[i]) == list(maxDeposit)
+        assert list(result.vaultSharesToLiquidator[i]) == list(vaultShares)
+
+
+def enter_vault(notional, vault, account, maturity, depositAmount):
+    notional.enterVault(
+        account, vault.address, depositAmount, maturity, 100_000e8, 0, "", {"from": account}
+    )
+
+
+@pytest.mark.parametrize("isPrime", [True, False])
+@pytest.mark.parametrize("enablefCashDiscount", [True, False])
+def test_vault_health_parity(environment, accounts, vault, isPrime, enablefCashDiscount):
+    notional = environment.notional
+    notional.updateVault(
+        vault.address,
+        get_vault_config(
+            currencyId=2,
+            flags=set_flags(0, ENABLED=True, ENABLE_FCASH_DISCOUNT=enablefCashDiscount),
+        ),
+        100_000_000e8,
+    )
+    maturity = PRIME_CASH_VAULT_MATURITY if isPrime else notional.getActiveMarkets(2)[0][1]
+    enter_vault(notional, vault, accounts[1], maturity, 25_000e18)
+    enter_vault(notional, vault, accounts[2], maturity, 50_000e18)
+    vault.setExchangeRate(0.9e18)
+
+    # accounts[3] does not hold a vault position
+    block = web3.eth.block_number
+    pairs = [(a, vault) for a in accounts[1:4]]
+    vaultAccounts = load_vault_accounts(notional, pairs, block, exactShareValue=True)
+    inputs = load_vault_inputs(notional, vaultAccounts, block)
+    result = get_vault_account_health(inputs, vaultAccounts)
+    check_parity(notional, vaultAccounts, result, block)
+
+    queue = get_deleverage_queue(inputs, vaultAccounts, result)
+    assert list(queue.accountIndex) == [0]
+    assert list(queue.currencyIndex) == [0]
+    assert queue.shortfall[0] > 0
+
+    # Vault shares priced from the per maturity share value are within rounding
+    priced = get_vault_account_health(inputs, load_vault_accounts(notional, pairs, block))
+    for (i, value) in enumerate(result.vaultShareValueUnderlying):
+        assert pytest.approx(value, abs=100) == priced.vaultShareValueUnderlying[i]
+
+
+def test_vault_health_batch_view(environment, accounts, vault):
+    notional = environment.notional
+    notional.updateVault(
+        vault.address,
+        get_vault_config(currencyId=2, flags=set_flags(0, ENABLED=True)),
+        100_000_000e8,
+    )
+    maturity = notional.getActiveMarkets(2)[0][1]
+    enter_vault(notional, vault, accounts[1], maturity, 25_000e18)
+    enter_vault(notional, vault, accounts[2], PRIME_CASH_VAULT_MATURITY, 50_000e18)
+    enter_vault(notional, vault, accounts[3], maturity, 50_000e18)
+    vault.setExchangeRate(0.9e18)
+
+    block = web3.eth.block_number
+    (h, maxDeposit, vaultShares) = notional.getVaultAccountHealthFactorsBatch(
+        accounts[1:5], vault.address, block_identifier=block
+    )
+    assert len(h) == 4
+    for (i, account) in enumerate(accounts[1:5]):
+        expected = notional.getVaultAccountHealthFactors(
+            account, vault.address, block_identifier=block
+        )
+        assert h[i] == expected[0]
+        assert list(maxDeposit[i]) == list(expected[1])
+        assert list(vaultShares[i]) == list(expected[2])
+
+
+def test_vault_health_parity_after_maturity(environment, accounts, vault):
+    notional = environment.notional
+    notional.updateVault(
+        vault.address,
+        get_vault_config(currencyId=2, flags=set_flags(0, ENABLED=True)),
+        100_000_000e8,
+    )
+    maturity = notional.getActiveMarkets(2)[0][1]
+    enter_vault(notional, vault, accounts[1], maturity, 25_000e18)
+    enter_vault(notional, vault, accounts[2], maturity, 50_000e18)
+
+    chain.mine(1, timestamp=maturity)
+    notional.initializeMarkets(2, False, {"from": accounts[0]})
+    chain.mine(1, timedelta=30 * 86400)
+
+    block = web3.eth.block_number
+    pairs = [(a, vault) for a in accounts[1:3]]
+    vaultAccounts = load_vault_accounts(notional, pairs, block, exactShareValue=True)
+    inputs = load_vault_inputs(notional, vaultAccounts, block)
+    assert (2, maturity) in inputs.settlementRates
+    result = get_vault_account_health(inputs, vaultAccounts)
+    check_parity(notional, vaultAccounts, result, block)
+
+    # Matured accounts must settle before they are deleveraged
+    vault.setExchangeRate(0.5e18)
+    block = web3.eth.block_number
+    vaultAccounts = load_vault_accounts(notional, pairs, block, exactShareValue=True)
+    inputs = load_vault_inputs(notional, vaultAccounts, block)
+    result = get_vault_account_health(inputs, vaultAccounts)
+    check_parity(notional, vaultAccounts, result, block)
+    assert len(get_deleverage_queue(inputs, vaultAccounts, result).accountIndex) == 0
+
+
+@pytest.mark.parametrize("isPrime", [True, False])
+def test_secondary_borrow_vault_health_parity(
+    environment, accounts, MultiBorrowStrategyVault, MockAggregator, isPrime
+):
+    notional = environment.notional
+    oracleAddress = notional.getRateStorage(2)[0][0]
+    ethDAIOracle = brownie.Contract.from_abi("eth-dai", oracleAddress, MockAggregator.abi)
+    vault = MultiBorrowStrategyVault.deploy(
+        "multi", notional.address, 2, 1, 0, [ethDAIOracle, zeroAddress], {"from": accounts[0]}
+    )
+    notional.updateVault(
+        vault.address,
+        get_vault_config(
+            currencyId=2,
+            flags=set_flags(0, ENABLED=True, ALLOW_ROLL_POSITION=True),
+            secondaryBorrowCurrencies=[1, 0],
+            minAccountSecondaryBorrow=[1e8, 0],
+            maxDeleverageCollateralRatioBPS=2500,
+            minAccountBorrowSize=50_000e8,
+        ),
+        100_000_000e8,
+    )
+    notional.updateSecondaryBorrowCapacity(vault.address, 1, 10_000e8)
+
+    maturity = PRIME_CASH_VAULT_MATURITY if isPrime else notional.getActiveMarkets(2)[0][1]
+    for (account, secondaryBorrow) in [(accounts[1], 10e8), (accounts[2], 5e8)]:
+        notional.enterVault(
+            account,
+            vault.address,
+            25_000e18,
+            maturity,
+            100_000e8,
+            0,
+            eth_abi.encode(["uint256[2]"], [[Wei(secondaryBorrow), 0]]),
+            {"from": account},
+        )
+
+    # Increasing the value of ETH increases the secondary debt
+    ethDAIOracle.setAnswer(ethDAIOracle.latestAnswer() * 85 // 100, {"from": accounts[0]})
+    block = web3.eth.block_number
+    pairs = [(a, vault) for a in accounts[1:3]]
+    vaultAccounts = load_vault_accounts(notional, pairs, block, exactShareValue=True)
+    inputs = load_vault_inputs(notional, vaultAccounts, block)
+    result = get_vault_account_health(inputs, vaultAccounts)
+    check_parity(notional, vaultAccounts, result, block)
+    assert all(d < 0 for d in result.netDebtOutstanding[:, 1])
@@ -0,0 +1,77 @@
+from brownie.convert import to_address
+import pytest
+from scripts.EventProcessor import (
+    COMPACT_TRANSFER_BATCH,
+    COMPACT_TRANSFER_SINGLE,
+    decodeCompactTransfers,
+)
+
+NOTIONAL = to_address("0x1344A36A1B56144C3Bc62E7757377D288fDE0369")
+ACCOUNT = to_address("0x66F820a414680B5bcda5eECA5dea238543F42054")
+ZERO = to_address("0x0000000000000000000000000000000000000000")
+
+
+def _pack(*fields):
+    # Mirrors abi.encodePacked for the uint8, address and uint256 fields used by Emitter
+    data = b""
+    for (kind, value) in fields:
+        if kind == "uint8":
+            data += value.to_bytes(1, "big")
+        elif kind == "address":
+            data += bytes.fromhex(value[2:])
+        else:
+            data += value.to_bytes(32, "big")
+    return data
+
+
+def test_decode_compact_transfers_matches_individual_events():
+    fCashId = (2 << 48) | (1700000000 << 8) | 1
+    data = _pack(
+        ("uint8", COMPACT_TRANSFER_SINGLE),
+        ("address", ACCOUNT),
+        ("address", ZERO),
+        ("address", ACCOUNT),
+        ("uint256", fCashId),
+        ("uint256", 10_000_000_000),
+        ("uint8", COMPACT_TRANSFER_BATCH),
+        ("address", ACCOUNT),
+        ("address", ACCOUNT),
+        ("address", ZERO),
+        ("uint8", 2),
+        ("uint256", fCashId),
+        ("uint256", fCashId | (1 << 64)),
+        ("uint256", 500_000_000),
+        ("uint256", 500_000_000),
+    )
+
+    assert decodeCompactTransfers(NOTIONAL, data) == [
+        (
+            "TransferSingle",
+            NOTIONAL,
+            {
+                "operator": ACCOUNT,
+                "from": ZERO,
+                "to": ACCOUNT,
+                "id": fCashId,
+                "value": 10_000_000_000,
+            },
+        ),
+        (
+            "TransferBatch",
+            NOTIONAL,
+            {
+                "operator": ACCOUNT,
+                "from": ACCOUNT,
+                "to": ZERO,
+                "ids": [fCashId, fCashId | (1 << 64)],
+                "values": [500_000_000, 500_000_000],
+            },
+        ),
+    ]
+
+
+def test_decode_compact_transfers_rejects_erc20_records():
+    # ERC20 transfers are emitted by the proxies and never packed
+    data = _pack(("uint8", 1), ("address", ACCOUNT), ("address", ACCOUNT), ("address", ZERO))
+    with pytest.raises(Exception, match="Unknown compact transfer record"):
+        decodeCompactTransfers(NOTIONAL, data + (123).to_bytes(32, "big"))
@@ -0,0 +1,40 @@
+from scripts.gas.registry import Scenario
+from scripts.gas.runner import compare, summarize
+
+SCENARIOS = {
+    "deposit": Scenario("deposit", None, params={"currencyId": [1, 2]}),
+    "withdraw": Scenario("withdraw", None),
+}
+
+
+def _statuses(comparisons):
+    return {c["key"]: c["status"] for c in comparisons}
+
+
+def test_compare_reports_missing_baseline_entries():
+    results = {
+        "deposit.currencyId=1": summarize(100_000, [50_000]),
+        "deposit.currencyId=2": summarize(100_000, [50_000]),
+    }
+    baseline = dict(
+        results,
+        **{
+            "withdraw": summarize(80_000, [40_000]),
+            # Renamed scenario
+            "depositUnderlying.currencyId=1": summarize(100_000, [50_000]),
+            # Removed parameter value
+            "deposit.currencyId=3": summarize(100_000, [50_000]),
+        }
+    )
+
+    statuses = _statuses(compare(results, baseline, SCENARIOS))
+    assert statuses["deposit.currencyId=1"] == "ok"
+    assert statuses["withdraw"] == "missing"
+    assert statuses["depositUnderlying.currencyId=1"] == "missing"
+    assert statuses["deposit.currencyId=3"] == "missing"
+
+    # Only registered scenarios outside of the selection are skipped
+    statuses = _statuses(compare(results, baseline, SCENARIOS, selected=[SCENARIOS["deposit"]]))
+    assert "withdraw" not in statuses
+    assert statuses["depositUnderlying.currencyId=1"] == "missing"
+    assert statuses["deposit.currencyId=3"] == "missing"
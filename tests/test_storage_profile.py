@@ -0,0 +1,87 @@
+import pytest
+from scripts.gas.storage_profiler import (
+    COLD_SLOAD_COST,
+    WARM_STORAGE_READ_COST,
+    replay_storage_accesses,
+)
+from scripts.gas.trace_profiler import get_struct_logs
+from tests.helpers import get_balance_action, initialize_environment
+
+PROXY = "0x1344a36a1b56144c3bc62e7757377d288fde0369"
+ROUTER = "0x00000000000000000000000000000000000000aa"
+TOKEN = "0x00000000000000000000000000000000000000bb"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def environment(accounts):
+    return initialize_environment(accounts)
+
+
+@pytest.fixture(autouse=True)
+def isolation(fn_isolation):
+    pass
+
+
+def test_storage_profile_maps_slots_to_storage_ids(environment, accounts, storage_profile):
+    txn = environment.notional.batchBalanceAction(
+        accounts[1],
+        [get_balance_action(2, "DepositUnderlying", depositActionAmount=100e18)],
+        {"from": accounts[1]},
+    )
+    profile = storage_profile(txn)
+    byStorageId = profile.by_storage_id()
+
+    assert byStorageId["AccountStorage"]["coldSLOAD"] > 0
+    assert byStorageId["AccountStorage"]["warmSSTORE"] + byStorageId["AccountStorage"][
+        "coldSSTORE"
+    ] > 0
+    assert byStorageId["Balance"]["coldSLOAD"] > 0
+    assert byStorageId["PrimeCashFactors"]["coldSLOAD"] > 0
+
+    labels = [label for (_, label) in profile.summary().keys()]
+    account = accounts[1].address.lower()
+    assert "AccountStorage[{}]".format(account) in labels
+    assert any(label.startswith("Balance[{}][2]".format(account)) for label in labels)
+
+    # The cold and warm classification matches the SLOAD gas charged by the node
+    sloadGas = sum(step["gasCost"] for step in get_struct_logs(txn.txid) if step["op"] == "SLOAD")
+    loads = [a for a in profile.accesses if a.op == "SLOAD"]
+    assert sloadGas == sum(
+        COLD_SLOAD_COST if a.cold else WARM_STORAGE_READ_COST for a in loads
+    )
+
+
+def _step(depth, op, *stack):
+    return {"depth": depth, "op": op, "stack": [hex(s) for s in stack]}
+
+
+def test_storage_context_follows_call_and_not_delegate_call():
+    structLogs = [
+        _step(1, "SLOAD", 1),
+        # Stack is gas, address, ... with the gas on top
+        _step(1, "DELEGATECALL", 0, 0, 0, 0, int(ROUTER, 16), 50_000),
+        _step(2, "SLOAD", 1),
+        _step(2, "CALL", 0, 0, 0, 0, 0, int(TOKEN, 16), 50_000),
+        _step(3, "SLOAD", 1),
+        _step(3, "SSTORE", 0, 1),
+        _step(3, "STOP"),
+        _step(2, "SLOAD", 2),
+        _step(2, "STATICCALL", 0, 0, 0, 0, int(TOKEN, 16), 50_000),
+        _step(3, "SLOAD", 1),
+        _step(3, "STOP"),
+        _step(2, "RETURN", 0, 0),
+        _step(1, "SSTORE", 0, 1),
+    ]
+    profile = replay_storage_accesses(structLogs, PROXY)
+
+    assert [(a.address, a.slot, a.op, a.cold) for a in profile.accesses] == [
+        (PROXY, 1, "SLOAD", True),
+        # The delegate call reads the proxy's storage
+        (PROXY, 1, "SLOAD", False),
+        (TOKEN, 1, "SLOAD", True),
+        (TOKEN, 1, "SSTORE", False),
+        # Back in the delegate call frame after the call returns
+        (PROXY, 2, "SLOAD", True),
+        (TOKEN, 1, "SLOAD", False),
+        (PROXY, 1, "SSTORE", False),
+    ]